@@ -0,0 +1,189 @@
+"""
+Mede o agendador de alertas com muitos alertas pendentes.
+
+Primeiro, as operações do heap em memória: agendar, reagendar e cancelar
+alertas em posições aleatórias. Depois, o cálculo sob demanda das
+ocorrências de alertas recorrentes iniciados há 3 anos. Por fim, contra um
+banco SQLite temporário com os alertas pendentes espalhados pelos próximos
+30 dias e uma parte já vencida, metade dela recorrente (semente 42): o
+tempo de cada carga da janela e a vazão do disparo dos vencidos, até
+esvaziá-los.
+
+Uso:
+    python -m benchmarks.bench_alertas [pendentes] [vencidos]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from benchmarks.utils import Cronometro, report
+from fibrolog_api.agendador import AgendadorAlertas
+from fibrolog_api.models import Alerta, Paciente, table_registry
+from fibrolog_api.recorrencia import ocorrencias_entre, proxima_execucao
+from fibrolog_api.relogio import utcnow
+
+JANELA = 120
+LIMITE_CARGA = 10_000
+LOTE_INSERCAO = 50_000
+FUSO = 'America/Sao_Paulo'
+REGRAS = [
+    'FREQ=HOURLY;INTERVAL=8',
+    'FREQ=DAILY;BYHOUR=8,14,20',
+    'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;BYHOUR=9',
+]
+
+
+async def medir_heap(pendentes: int) -> None:
+    """Operações do heap em memória, com uma janela que cobre todos."""
+    rng = random.Random(42)
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:')
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+    agendador = AgendadorAlertas(
+        janela=30 * 24 * 60 * 60,
+        limite_carga=LIMITE_CARGA,
+        sessoes=lambda: AsyncSession(engine),
+    )
+    # A carga do banco vazio só abre a janela
+    await agendador.carregar()
+    await engine.dispose()
+    momentos = [
+        utcnow() + timedelta(seconds=rng.uniform(1, 29 * 24 * 60 * 60))
+        for _ in range(pendentes)
+    ]
+
+    operacoes = {'agendar': [], 'reagendar': [], 'cancelar': []}
+    with Cronometro(operacoes['agendar']):
+        for alerta_id, momento in enumerate(momentos):
+            agendador.agendar(alerta_id, momento)
+    amostra = rng.sample(range(pendentes), pendentes // 2)
+    with Cronometro(operacoes['reagendar']):
+        for alerta_id in amostra:
+            agendador.agendar(alerta_id, momentos[alerta_id] + timedelta(1))
+    with Cronometro(operacoes['cancelar']):
+        for alerta_id in amostra:
+            agendador.cancelar(alerta_id)
+
+    for nome, [duracao] in operacoes.items():
+        n = pendentes if nome == 'agendar' else len(amostra)
+        print(f'{nome:<10} {duracao / n * 1e6:6.2f}µs por alerta (n={n})')
+    print(f'heap após cancelar: {agendador.resumo()["heap"]} entradas')
+
+
+def medir_recorrencia() -> None:
+    inicio = utcnow() - timedelta(days=3 * 365)
+    for regra in REGRAS:
+        proximas, agendas = [], []
+        for _ in range(1000):
+            agora = utcnow()
+            with Cronometro(proximas):
+                proxima_execucao(inicio, regra, FUSO, agora)
+            with Cronometro(agendas):
+                n = sum(
+                    1
+                    for _ in ocorrencias_entre(
+                        inicio, regra, FUSO, agora, agora + timedelta(30)
+                    )
+                )
+        print(regra)
+        report('  próxima ocorrência', proximas)
+        report(f'  agenda de 30 dias ({n})', agendas)
+
+
+async def popular(engine, pendentes: int, vencidos: int) -> None:
+    rng = random.Random(42)
+    agora = utcnow()
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            insert(Paciente.__table__),
+            {'id': 1, 'nome': 'Bench', 'email': 'b@b.com', 'password': 'x'},
+        )
+        momentos = [
+            agora
+            + timedelta(
+                seconds=rng.uniform(-3600, 0)
+                if i < vencidos
+                else rng.uniform(JANELA, 30 * 24 * 60 * 60)
+            )
+            for i in range(pendentes)
+        ]
+        linhas = [
+            {
+                'tipo': 'medicação',
+                'paciente_id': 1,
+                'descricao': 'Pregabalina 75mg',
+                'ativo': True,
+                'data_hora': momento,
+                'proxima_execucao': momento,
+                'recorrencia': REGRAS[0] if i < vencidos // 2 else None,
+            }
+            for i, momento in enumerate(momentos)
+        ]
+        for inicio in range(0, pendentes, LOTE_INSERCAO):
+            await conn.execute(
+                insert(Alerta.__table__),
+                linhas[inicio : inicio + LOTE_INSERCAO],
+            )
+
+
+async def medir_banco(pendentes: int, vencidos: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        await popular(engine, pendentes, vencidos)
+
+        def sessoes():
+            return AsyncSession(engine, expire_on_commit=False)
+
+        agendador = AgendadorAlertas(
+            janela=JANELA, limite_carga=LIMITE_CARGA, sessoes=sessoes
+        )
+        cargas = []
+        inicio = time.perf_counter()
+        while True:
+            with Cronometro(cargas):
+                carregados = await agendador.carregar()
+            if not carregados:
+                break
+            await agendador.disparar_vencidos()
+        duracao = time.perf_counter() - inicio
+
+        async with engine.connect() as conn:
+            restantes = await conn.scalar(
+                select(func.count()).where(Alerta.__table__.c.ativo)
+            )
+        await engine.dispose()
+
+    report('carga da janela', cargas)
+    disparados = agendador.metricas.disparados
+    print(
+        f'disparados={disparados} em {duracao:.2f}s '
+        f'({disparados / duracao:,.0f} alertas/s), '
+        f'pendentes restantes={restantes}'
+    )
+
+
+async def main(pendentes: int, vencidos: int) -> None:
+    await medir_heap(pendentes)
+    medir_recorrencia()
+    await medir_banco(pendentes, vencidos)
+
+
+if __name__ == '__main__':
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(
+        main(
+            argumentos[0] if argumentos else 200_000,
+            argumentos[1] if len(argumentos) > 1 else 20_000,
+        )
+    )
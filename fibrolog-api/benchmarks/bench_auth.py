@@ -0,0 +1,58 @@
+"""
+Compara o custo de um login (verificação Argon2) com o de um refresh.
+
+Uso:
+    python -m benchmarks.bench_auth [iteracoes]
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.utils import Cronometro, bench_client, report
+from fibrolog_api.security import password_hasher
+
+EMAIL = 'bench@example.com'
+PASSWORD = 'Senha@123'
+
+
+async def main(iteracoes: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        async with bench_client(str(Path(tmp) / 'bench.db')) as (client, _):
+            await client.post(
+                '/pacientes/',
+                json={'nome': 'Bench', 'email': EMAIL, 'password': PASSWORD},
+            )
+
+            login: list[float] = []
+            refresh_token = None
+            for _ in range(iteracoes):
+                with Cronometro(login):
+                    response = await client.post(
+                        '/auth/token',
+                        data={'username': EMAIL, 'password': PASSWORD},
+                    )
+                refresh_token = response.json()['refresh_token']
+
+            refresh: list[float] = []
+            for _ in range(iteracoes):
+                with Cronometro(refresh):
+                    response = await client.post(
+                        '/auth/refresh',
+                        json={'refresh_token': refresh_token},
+                    )
+                refresh_token = response.json()['refresh_token']
+
+    login_stats = report('login (/auth/token)', login)
+    refresh_stats = report('refresh (/auth/refresh)', refresh)
+    print(
+        'refresh é '
+        f'{login_stats["media_ms"] / refresh_stats["media_ms"]:.1f}x '
+        'mais barato que login'
+    )
+    password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
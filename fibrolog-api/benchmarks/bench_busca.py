@@ -0,0 +1,192 @@
+"""
+Compara a busca pelo índice FTS5 (`fibrolog_api.busca`) com uma varredura
+`LIKE '%termo%'` nos registros do paciente.
+
+Um banco SQLite temporário recebe pacientes com registros diários e crises
+transcritas, com textos sorteados de um vocabulário (semente 42); 2% das
+crises citam também uma palavra rara, que a varredura só encontra depois de
+percorrer todo o histórico (e, com o acento, nem encontra). O índice é
+mantido pelos gatilhos durante a carga, cujo tempo também é medido. Depois,
+cada termo é buscado por pacientes sorteados, pedindo a primeira página
+(20 resultados) em ordem de relevância no FTS5 e de data na varredura.
+
+Uso:
+    python -m benchmarks.bench_busca [pacientes] [registros_por_paciente]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from benchmarks.utils import Cronometro, report
+from fibrolog_api.busca import buscar
+from fibrolog_api.models import (
+    EstadoEmocional,
+    Paciente,
+    Registro,
+    RegistroCrise,
+    RegistroDiario,
+    table_registry,
+)
+
+LOCAIS = [
+    'joelho', 'ombro', 'lombar', 'cervical', 'quadril', 'cotovelo',
+    'punho', 'tornozelo', 'pescoço', 'mandíbula', 'coxa', 'panturrilha',
+]  # fmt: skip
+PALAVRAS = [
+    'dor', 'forte', 'acordei', 'cansaço', 'febre', 'tontura', 'remédio',
+    'caminhada', 'trabalho', 'sono', 'rigidez', 'formigamento', 'calor',
+    'frio', 'chuva', 'estresse', 'ansiedade', 'pregabalina', 'duloxetina',
+]  # fmt: skip
+# Palavra rara: a varredura percorre todo o histórico para achar a página
+RARA = 'ressonância'
+TERMOS = ['joelho', 'formigamento', 'pregabalina', 'mandibula', 'ressonancia']
+LOTE_INSERCAO = 10_000
+CONSULTAS = 200
+LIMITE = 20
+
+
+def _texto(rng: random.Random) -> str:
+    palavras = rng.choices(PALAVRAS + LOCAIS, k=rng.randint(15, 60))
+    if rng.random() < 0.02:  # noqa: PLR2004
+        palavras.append(RARA)
+    return ' '.join(palavras).capitalize()
+
+
+async def popular(engine, pacientes: int, por_paciente: int) -> float:
+    """Insere os dados e retorna o tempo da carga, com os gatilhos."""
+    rng = random.Random(42)
+    inicio_datas = datetime(2020, 1, 1, 9)
+    registros, diarios, crises = [], [], []
+    for paciente_id in range(1, pacientes + 1):
+        for i in range(por_paciente):
+            registro_id = len(registros) + 1
+            crise = i % 4 == 0
+            registros.append({
+                'id': registro_id,
+                'tipo_registro': 'crise' if crise else 'diario',
+                'paciente_id': paciente_id,
+                'data_hora': inicio_datas + timedelta(days=i),
+            })
+            if crise:
+                crises.append({
+                    'id': registro_id,
+                    'intensidade_dor': rng.randint(5, 10),
+                    'duracao': '2h',
+                    'texto_transcrito': _texto(rng),
+                })
+            else:
+                diarios.append({
+                    'id': registro_id,
+                    'intensidade_dor': rng.randint(0, 10),
+                    'qualidade_sono': rng.randint(0, 10),
+                    'nivel_fadiga': rng.randint(0, 10),
+                    'estado_emocional': rng.choice(list(EstadoEmocional)).name,
+                    'localizacao_dor': ', '.join(
+                        rng.sample(LOCAIS, rng.randint(1, 3))
+                    ),
+                })
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+    inicio = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Paciente.__table__),
+            [
+                {
+                    'id': paciente_id,
+                    'nome': f'Paciente {paciente_id}',
+                    'email': f'p{paciente_id}@example.com',
+                    'password': 'x',
+                    'medicacoes': 'Pregabalina 75mg (2x/dia)',
+                }
+                for paciente_id in range(1, pacientes + 1)
+            ],
+        )
+        for tabela, linhas in [
+            (Registro.__table__, registros),
+            (RegistroDiario.__table__, diarios),
+            (RegistroCrise.__table__, crises),
+        ]:
+            for i in range(0, len(linhas), LOTE_INSERCAO):
+                await conn.execute(
+                    insert(tabela), linhas[i : i + LOTE_INSERCAO]
+                )
+    return time.perf_counter() - inicio
+
+
+async def varrer(session: AsyncSession, paciente_id: int, termo: str):
+    """Equivalente sem índice: `LIKE` nas duas tabelas do paciente."""
+    padrao = f'%{termo}%'
+    return (
+        await session.execute(
+            select(Registro.id)
+            .outerjoin(
+                RegistroDiario.__table__,
+                RegistroDiario.__table__.c.id == Registro.id,
+            )
+            .outerjoin(
+                RegistroCrise.__table__,
+                RegistroCrise.__table__.c.id == Registro.id,
+            )
+            .where(
+                Registro.paciente_id == paciente_id,
+                or_(
+                    RegistroDiario.__table__.c.localizacao_dor.like(padrao),
+                    RegistroCrise.__table__.c.texto_transcrito.like(padrao),
+                ),
+            )
+            .order_by(Registro.data_hora.desc())
+            .limit(LIMITE)
+        )
+    ).all()
+
+
+async def main(pacientes: int, por_paciente: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        carga = await popular(engine, pacientes, por_paciente)
+        total = pacientes * por_paciente
+        print(
+            f'carga de {total} registros com o índice: {carga:.2f}s '
+            f'({total / carga:,.0f} registros/s)'
+        )
+
+        rng = random.Random(42)
+        async with AsyncSession(engine) as session:
+            for termo in TERMOS:
+                fts, like = [], []
+                encontrados = 0
+                for _ in range(CONSULTAS):
+                    paciente_id = rng.randint(1, pacientes)
+                    with Cronometro(fts):
+                        linhas = await buscar(
+                            session, paciente_id, termo, LIMITE
+                        )
+                    with Cronometro(like):
+                        await varrer(session, paciente_id, termo)
+                    encontrados += len(linhas)
+                print(f'{termo} ({encontrados / CONSULTAS:.0f} por página)')
+                report('  fts5', fts)
+                report('  like', like)
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(
+        main(
+            argumentos[0] if argumentos else 200,
+            argumentos[1] if len(argumentos) > 1 else 500,
+        )
+    )
@@ -0,0 +1,180 @@
+"""
+Mede o job de estatísticas de coorte com diferentes números de processos.
+
+Os dados são gerados com semente fixa: 1.000 pacientes com atributos
+variados e registros diários consecutivos até completar o total pedido.
+
+Antes, mede só a agregação em memória (`agregar_lote`) com uma cardinalidade
+realista de medicamentos: 2.000 nomes distintos, de 1 a 4 por paciente.
+
+Uso:
+    python -m benchmarks.bench_coorte [registros] [workers ...]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from fibrolog_api.coorte import (
+    TAMANHO_LOTE,
+    Atributos,
+    agregar_lote,
+    calcular_coorte,
+)
+from fibrolog_api.models import (
+    EstadoEmocional,
+    Paciente,
+    Registro,
+    RegistroDiario,
+    table_registry,
+)
+
+PACIENTES = 1_000
+MEDICAMENTOS_DISTINTOS = 2_000
+LOTE_INSERCAO = 100_000
+SEXOS = ['F', 'M', None]
+MEDICACOES = [
+    'Pregabalina 75mg (2x/dia)',
+    'Duloxetina 60mg (1x/dia)',
+    'Amitriptilina 25mg (1x/dia)',
+    'Gabapentina 300mg (3x/dia), Duloxetina 30mg',
+    None,
+]
+
+
+async def popular(url: str, registros: int) -> None:
+    """Cria pacientes e `registros` registros diários (semente 42)."""
+    rng = np.random.default_rng(42)
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            insert(Paciente.__table__),
+            [
+                {
+                    'id': i + 1,
+                    'nome': f'Paciente {i}',
+                    'email': f'paciente{i}@example.com',
+                    'password': 'x',
+                    'sexo': SEXOS[rng.integers(len(SEXOS))],
+                    'data_diagnostico': (
+                        datetime(2000, 1, 1)
+                        + timedelta(days=int(rng.integers(9000)))
+                        if rng.random() < 0.9  # noqa: PLR2004
+                        else None
+                    ),
+                    'medicacoes': MEDICACOES[rng.integers(len(MEDICACOES))],
+                }
+                for i in range(PACIENTES)
+            ],
+        )
+
+    por_paciente = -(-registros // PACIENTES)
+    estados = [estado.name for estado in EstadoEmocional]
+    inicio = date(2020, 1, 1)
+    for primeiro in range(0, registros, LOTE_INSERCAO):
+        ids = np.arange(primeiro, min(primeiro + LOTE_INSERCAO, registros))
+        dores = rng.integers(0, 11, ids.size)
+        async with engine.begin() as conn:
+            await conn.execute(
+                insert(Registro.__table__),
+                [
+                    {
+                        'id': int(i) + 1,
+                        'tipo_registro': 'diario',
+                        'paciente_id': int(i) // por_paciente + 1,
+                        'data_hora': datetime(2020, 1, 1)
+                        + timedelta(days=int(i) % por_paciente, hours=9),
+                        'dia_local': inicio
+                        + timedelta(days=int(i) % por_paciente),
+                    }
+                    for i in ids
+                ],
+            )
+            await conn.execute(
+                insert(RegistroDiario.__table__),
+                [
+                    {
+                        'id': int(i) + 1,
+                        'intensidade_dor': int(dor),
+                        'qualidade_sono': 10 - int(dor),
+                        'nivel_fadiga': int(dor),
+                        'estado_emocional': estados[int(i) % len(estados)],
+                    }
+                    for i, dor in zip(ids, dores)
+                ],
+            )
+    await engine.dispose()
+
+
+def medir_agregacao(registros: int) -> None:
+    """Mede `agregar_lote` com `MEDICAMENTOS_DISTINTOS` medicamentos."""
+    rng = np.random.default_rng(42)
+    medicacoes = np.zeros((PACIENTES, MEDICAMENTOS_DISTINTOS), dtype=bool)
+    for em_uso in medicacoes:
+        quantidade = rng.integers(1, 5)
+        em_uso[rng.choice(MEDICAMENTOS_DISTINTOS, quantidade)] = True
+    atributos = Atributos(
+        ids=np.arange(1, PACIENTES + 1),
+        sexo=rng.integers(len(SEXOS), size=PACIENTES),
+        diagnostico=rng.integers(10_000, 20_000, PACIENTES),
+        tem_diagnostico=rng.random(PACIENTES) < 0.9,  # noqa: PLR2004
+        medicacoes=medicacoes,
+    )
+    tamanho = min(registros, TAMANHO_LOTE)
+    paciente_ids = np.sort(rng.integers(1, PACIENTES + 1, tamanho))
+    dias = rng.integers(18_000, 20_000, tamanho)
+    dor = rng.integers(0, 11, tamanho)
+
+    inicio = time.perf_counter()
+    for _ in range(-(-registros // tamanho)):
+        agregar_lote(atributos, len(SEXOS), paciente_ids, dias, dor)
+    duracao = time.perf_counter() - inicio
+    print(
+        f'agregar_lote ({MEDICAMENTOS_DISTINTOS} medicamentos) '
+        f'{duracao:7.2f}s {registros / duracao:12,.0f} registros/s'
+    )
+
+
+async def main(registros: int, workers: list[int]) -> None:
+    medir_agregacao(registros)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite+aiosqlite:///{Path(tmp) / "coorte.db"}'
+        inicio = time.perf_counter()
+        await popular(url, registros)
+        print(
+            f'{registros} registros gerados em '
+            f'{time.perf_counter() - inicio:.1f}s '
+            f'({os.cpu_count()} CPUs)'
+        )
+
+        base = None
+        for quantidade in workers:
+            inicio = time.perf_counter()
+            resultado = await calcular_coorte(url, workers=quantidade)
+            duracao = time.perf_counter() - inicio
+            assert resultado['registros'] == registros
+            base = base or duracao
+            print(
+                f'workers={quantidade:<3} {duracao:7.2f}s '
+                f'{registros / duracao:12,.0f} registros/s '
+                f'aceleração={base / duracao:5.2f}x'
+            )
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    asyncio.run(
+        main(
+            argumentos[0] if argumentos else 1_000_000,
+            argumentos[1:] or [1, 2, 4],
+        )
+    )
@@ -0,0 +1,128 @@
+"""
+Compara o mapa de calor da dor calculado no banco, com operações bit a bit
+sobre `regioes_dor` (`fibrolog_api.estatisticas.frequencia_regioes`), com a
+alternativa anterior: ler `localizacao_dor` de cada registro e interpretar
+o texto em Python.
+
+Um banco SQLite temporário recebe um paciente com `registros` registros
+diários, com 1 a 3 partes do corpo sorteadas (semente 42) e a máscara
+correspondente. Cada consulta cobre o histórico inteiro.
+
+Uso:
+    python -m benchmarks.bench_heatmap [registros]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from benchmarks.utils import Cronometro, report
+from fibrolog_api.estatisticas import frequencia_regioes
+from fibrolog_api.models import (
+    EstadoEmocional,
+    Paciente,
+    Registro,
+    RegistroDiario,
+    table_registry,
+)
+from fibrolog_api.regioes import (
+    interpretar_localizacao,
+    regioes_da_mascara,
+)
+
+PARTES = [
+    'joelho esquerdo', 'ombros', 'lombar', 'pescoço', 'quadril direito',
+    'mãos', 'costas', 'coxa esquerda', 'mandíbula', 'abdômen', 'cabeça',
+]  # fmt: skip
+CONSULTAS = 50
+LOTE_INSERCAO = 10_000
+
+
+async def popular(engine, total: int) -> None:
+    rng = random.Random(42)
+    inicio = date(2000, 1, 1)
+    registros, diarios = [], []
+    for i in range(1, total + 1):
+        registros.append({
+            'id': i,
+            'tipo_registro': 'diario',
+            'paciente_id': 1,
+            'data_hora': inicio + timedelta(days=i),
+            'dia_local': inicio + timedelta(days=i),
+        })
+        localizacao = ', '.join(rng.sample(PARTES, rng.randint(1, 3)))
+        diarios.append({
+            'id': i,
+            'intensidade_dor': 5,
+            'qualidade_sono': 5,
+            'nivel_fadiga': 5,
+            'estado_emocional': EstadoEmocional.FELIZ.name,
+            'localizacao_dor': localizacao,
+            'regioes_dor': interpretar_localizacao(localizacao),
+        })
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            insert(Paciente.__table__),
+            {'id': 1, 'nome': 'Bench', 'email': 'b@b.com', 'password': 'x'},
+        )
+        for tabela, linhas in [
+            (Registro.__table__, registros),
+            (RegistroDiario.__table__, diarios),
+        ]:
+            for i in range(0, len(linhas), LOTE_INSERCAO):
+                await conn.execute(
+                    insert(tabela), linhas[i : i + LOTE_INSERCAO]
+                )
+
+
+async def interpretar_textos(session: AsyncSession) -> Counter:
+    """Alternativa sem a máscara: interpreta o texto de cada registro."""
+    contagens = Counter()
+    textos = await session.scalars(
+        select(RegistroDiario.localizacao_dor).where(
+            RegistroDiario.paciente_id == 1
+        )
+    )
+    for texto in textos:
+        contagens.update(regioes_da_mascara(interpretar_localizacao(texto)))
+    return contagens
+
+
+async def main(total: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        await popular(engine, total)
+
+        bits, textos = [], []
+        async with AsyncSession(engine) as session:
+            for _ in range(CONSULTAS):
+                with Cronometro(bits):
+                    mapa = await frequencia_regioes(session, 1)
+                with Cronometro(textos):
+                    contagens = await interpretar_textos(session)
+        await engine.dispose()
+
+    assert {
+        regiao['regiao']: regiao['registros']
+        for regiao in mapa['regioes']
+        if regiao['registros']
+    } == dict(contagens)
+    print(f'mapa de calor de {total} registros')
+    report('  máscara (SQL)', bits)
+    report('  texto (Python)', textos)
+
+
+if __name__ == '__main__':
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(main(argumentos[0] if argumentos else 10_000))
@@ -0,0 +1,101 @@
+"""
+Mede a latência de `/registros-diarios/insights` com 10 anos de registros.
+
+Uso:
+    python -m benchmarks.bench_insights [iteracoes]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import zoneinfo
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert, select
+
+from benchmarks.utils import Cronometro, bench_client, report
+from fibrolog_api.models import (
+    EstadoEmocional,
+    Paciente,
+    Registro,
+    RegistroDiario,
+)
+from fibrolog_api.security import password_hasher
+
+EMAIL = 'bench@example.com'
+PASSWORD = 'Senha@123'
+ANOS = 10
+ORCAMENTO_P95_MS = 150
+
+
+async def popular(engine, paciente_id: int, dias: int) -> None:
+    """Insere um registro diário por dia, terminando hoje."""
+    hoje = datetime.now(zoneinfo.ZoneInfo('America/Sao_Paulo')).date()
+    rng = random.Random(42)
+    registros = []
+    diarios = []
+    for i in range(dias):
+        dia = hoje - timedelta(days=dias - 1 - i)
+        sono = rng.randint(0, 10)
+        registros.append({
+            'id': i + 1,
+            'tipo_registro': 'diario',
+            'paciente_id': paciente_id,
+            'data_hora': datetime.combine(dia, time(9)),
+            'dia_local': dia,
+        })
+        diarios.append({
+            'id': i + 1,
+            'intensidade_dor': max(0, min(10, 10 - sono + rng.randint(-2, 2))),
+            'qualidade_sono': sono,
+            'nivel_fadiga': rng.randint(0, 10),
+            'estado_emocional': rng.choice(list(EstadoEmocional)).name,
+        })
+    async with engine.begin() as conn:
+        await conn.execute(insert(Registro.__table__), registros)
+        await conn.execute(insert(RegistroDiario.__table__), diarios)
+
+
+async def main(iteracoes: int) -> None:
+    dias = 365 * ANOS
+    with tempfile.TemporaryDirectory() as tmp:
+        async with bench_client(str(Path(tmp) / 'bench.db')) as (
+            client,
+            engine,
+        ):
+            await client.post(
+                '/pacientes/',
+                json={'nome': 'Bench', 'email': EMAIL, 'password': PASSWORD},
+            )
+            async with engine.connect() as conn:
+                paciente_id = await conn.scalar(select(Paciente.id))
+            await popular(engine, paciente_id, dias)
+
+            token = (
+                await client.post(
+                    '/auth/token',
+                    data={'username': EMAIL, 'password': PASSWORD},
+                )
+            ).json()['access_token']
+            headers = {'Authorization': f'Bearer {token}'}
+
+            amostras: list[float] = []
+            for _ in range(iteracoes):
+                with Cronometro(amostras):
+                    response = await client.get(
+                        '/registros-diarios/insights',
+                        headers=headers,
+                        params={'dias': dias},
+                    )
+            assert response.json()['dias_com_registro'] == dias
+
+    stats = report(f'insights ({ANOS} anos)', amostras)
+    situacao = 'dentro' if stats['p95_ms'] <= ORCAMENTO_P95_MS else 'FORA'
+    print(f'p95 {situacao} do orçamento de {ORCAMENTO_P95_MS}ms')
+    password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 30))
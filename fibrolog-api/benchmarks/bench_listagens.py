@@ -0,0 +1,138 @@
+"""
+Compara as listagens de 500 itens no caminho padrão e no JSON rápido
+(`FAST_JSON_RESPONSES`).
+
+Uso:
+    python -m benchmarks.bench_listagens [iteracoes]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert, select
+
+from benchmarks.utils import Cronometro, bench_client, report
+from fibrolog_api import json_rapido
+from fibrolog_api.models import (
+    EstadoEmocional,
+    Paciente,
+    Registro,
+    RegistroDiario,
+)
+from fibrolog_api.security import password_hasher
+
+EMAIL = 'bench@example.com'
+PASSWORD = 'Senha@123'
+ITENS = 500
+LISTAGENS = {'/pacientes/': 'pacientes', '/registros-diarios/': 'registros'}
+
+
+async def popular(engine, paciente_id: int) -> None:
+    """Insere `ITENS` pacientes e `ITENS` registros diários (semente 42)."""
+    rng = random.Random(42)
+    inicio = date(2023, 1, 1)
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Paciente.__table__),
+            [
+                {
+                    'nome': f'Paciente {i}',
+                    'email': f'paciente{i}@example.com',
+                    'password': 'x',
+                    'data_nascimento': datetime(1980 + i % 30, 1, 1),
+                    'sexo': rng.choice(['F', 'M']),
+                    'medicacoes': 'Pregabalina 75mg (2x/dia)',
+                }
+                for i in range(ITENS - 1)
+            ],
+        )
+        await conn.execute(
+            insert(Registro.__table__),
+            [
+                {
+                    'id': i + 1,
+                    'tipo_registro': 'diario',
+                    'paciente_id': paciente_id,
+                    'data_hora': datetime.combine(
+                        inicio + timedelta(days=i), time(9)
+                    ),
+                    'dia_local': inicio + timedelta(days=i),
+                }
+                for i in range(ITENS)
+            ],
+        )
+        await conn.execute(
+            insert(RegistroDiario.__table__),
+            [
+                {
+                    'id': i + 1,
+                    'intensidade_dor': rng.randint(0, 10),
+                    'qualidade_sono': rng.randint(0, 10),
+                    'nivel_fadiga': rng.randint(0, 10),
+                    'estado_emocional': rng.choice(list(EstadoEmocional)).name,
+                    'localizacao_dor': 'Lombar',
+                }
+                for i in range(ITENS)
+            ],
+        )
+
+
+async def medir(
+    client, url: str, chave: str, headers: dict, iteracoes: int
+) -> list:
+    amostras: list[float] = []
+    for _ in range(iteracoes):
+        with Cronometro(amostras):
+            response = await client.get(
+                url, headers=headers, params={'limit': ITENS}
+            )
+    assert len(response.json()[chave]) == ITENS
+    return amostras
+
+
+async def main(iteracoes: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        async with bench_client(str(Path(tmp) / 'bench.db')) as (
+            client,
+            engine,
+        ):
+            await client.post(
+                '/pacientes/',
+                json={'nome': 'Bench', 'email': EMAIL, 'password': PASSWORD},
+            )
+            async with engine.connect() as conn:
+                paciente_id = await conn.scalar(select(Paciente.id))
+            await popular(engine, paciente_id)
+
+            token = (
+                await client.post(
+                    '/auth/token',
+                    data={'username': EMAIL, 'password': PASSWORD},
+                )
+            ).json()['access_token']
+            headers = {'Authorization': f'Bearer {token}'}
+
+            resultados = {}
+            for rapido in (False, True):
+                json_rapido.settings.FAST_JSON_RESPONSES = rapido
+                for url, chave in LISTAGENS.items():
+                    resultados[url, rapido] = await medir(
+                        client, url, chave, headers, iteracoes
+                    )
+
+    for url in LISTAGENS:
+        padrao = report(f'{url} padrão', resultados[url, False])
+        rapido = report(f'{url} rápido', resultados[url, True])
+        print(
+            f'{url} JSON rápido é '
+            f'{padrao["media_ms"] / rapido["media_ms"]:.1f}x mais rápido'
+        )
+    password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
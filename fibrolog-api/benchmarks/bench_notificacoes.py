@@ -0,0 +1,184 @@
+"""
+Vazão do despachante de notificações com um remetente simulado, que leva
+5 ms por e-mail e 20 ms por mensagem de telefone (como a chamada a um
+provedor externo).
+
+Primeiro, o custo do outbox na transação de uma crise: gravar as
+notificações de 3 contatos (6 linhas), comparado ao envio direto delas
+durante a requisição. Depois, para cada tamanho de lote, um banco SQLite
+temporário com as notificações pendentes, metade por canal, é esvaziado
+pelos workers dos dois canais com a concorrência padrão.
+
+Uso:
+    python -m benchmarks.bench_notificacoes [notificacoes] [lote ...]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from benchmarks.utils import Cronometro, report
+from fibrolog_api.models import (
+    ContatoApoio,
+    Notificacao,
+    Paciente,
+    table_registry,
+)
+from fibrolog_api.notificacoes import (
+    EMAIL,
+    ENVIADA,
+    TELEFONE,
+    DespachanteNotificacoes,
+    chave_notificacao,
+    enfileirar_notificacoes,
+)
+from fibrolog_api.relogio import utcnow
+from fibrolog_api.settings import Settings
+
+LATENCIA = {EMAIL: 0.005, TELEFONE: 0.020}
+LOTE_INSERCAO = 50_000
+
+
+class RemetenteSimulado:
+    @staticmethod
+    async def enviar(notificacao: Notificacao) -> None:
+        await asyncio.sleep(LATENCIA[notificacao.canal])
+
+
+async def criar_banco(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            insert(Paciente.__table__),
+            {'id': 1, 'nome': 'Bench', 'email': 'b@b.com', 'password': 'x'},
+        )
+        await conn.execute(
+            insert(ContatoApoio.__table__),
+            [
+                {
+                    'nome': f'Contato {i}',
+                    'email': f'contato{i}@example.com',
+                    'telefone': f'+551190000000{i}',
+                    'parentesco': 'amigo',
+                    'paciente_id': 1,
+                }
+                for i in range(3)
+            ],
+        )
+
+
+async def medir_outbox() -> None:
+    amostras = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        await criar_banco(engine)
+        async with AsyncSession(engine) as session:
+            for i in range(500):
+                with Cronometro(amostras):
+                    await enfileirar_notificacoes(
+                        session, 1, f'bench:{i}', 'Crise', 'Mensagem'
+                    )
+                    await session.commit()
+        await engine.dispose()
+    report('outbox (6 notificações)', amostras)
+    inline = 3 * (LATENCIA[EMAIL] + LATENCIA[TELEFONE])
+    print(f'{"envio na requisição":<28} {inline * 1000:.2f}ms (sequencial)')
+
+
+async def popular(engine, notificacoes: int) -> None:
+    agora = utcnow()
+    linhas = []
+    for i in range(notificacoes):
+        canal = (EMAIL, TELEFONE)[i % 2]
+        linhas.append({
+            'canal': canal,
+            'destino': f'destino{i}',
+            'assunto': 'Crise',
+            'mensagem': 'Mensagem',
+            'chave': chave_notificacao(f'bench:{i}', canal, f'destino{i}'),
+            'disponivel_em': agora,
+            'estado': 'pendente',
+            'tentativas': 0,
+        })
+    async with engine.begin() as conn:
+        for inicio in range(0, notificacoes, LOTE_INSERCAO):
+            await conn.execute(
+                insert(Notificacao.__table__),
+                linhas[inicio : inicio + LOTE_INSERCAO],
+            )
+
+
+async def esvaziar(despachante: DespachanteNotificacoes, canal: str):
+    inicio = time.perf_counter()
+    while await despachante.processar_lote(canal):
+        pass
+    return time.perf_counter() - inicio
+
+
+async def medir_lote(notificacoes: int, lote: int) -> None:
+    settings = Settings()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        await criar_banco(engine)
+        await popular(engine, notificacoes)
+
+        despachante = DespachanteNotificacoes(
+            remetente=RemetenteSimulado(),
+            concorrencia={
+                EMAIL: settings.NOTIFICATIONS_EMAIL_CONCURRENCY,
+                TELEFONE: settings.NOTIFICATIONS_PHONE_CONCURRENCY,
+            },
+            lote=lote,
+            max_tentativas=settings.NOTIFICATIONS_MAX_ATTEMPTS,
+            tempo_limite=settings.NOTIFICATIONS_SEND_TIMEOUT_SECONDS,
+            visibilidade=settings.NOTIFICATIONS_VISIBILITY_TIMEOUT_SECONDS,
+            backoff=settings.NOTIFICATIONS_BACKOFF_SECONDS,
+            sessoes=lambda: AsyncSession(engine, expire_on_commit=False),
+        )
+        duracoes = await asyncio.gather(
+            esvaziar(despachante, EMAIL), esvaziar(despachante, TELEFONE)
+        )
+
+        async with engine.connect() as conn:
+            enviadas = await conn.scalar(
+                select(func.count()).where(
+                    Notificacao.__table__.c.estado == ENVIADA
+                )
+            )
+        await engine.dispose()
+
+    por_canal = despachante.resumo()['enviadas_por_canal']
+    vazoes = ', '.join(
+        f'{canal}={por_canal[canal] / duracao:,.0f}/s'
+        for canal, duracao in zip((EMAIL, TELEFONE), duracoes)
+    )
+    print(
+        f'lote={lote:<5} enviadas={enviadas} em {max(duracoes):.2f}s '
+        f'({enviadas / max(duracoes):,.0f}/s; {vazoes}), '
+        f'lotes={despachante.metricas.lotes}'
+    )
+
+
+async def main(notificacoes: int, lotes: list[int]) -> None:
+    await medir_outbox()
+    for lote in lotes:
+        await medir_lote(notificacoes, lote)
+
+
+if __name__ == '__main__':
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(
+        main(
+            argumentos[0] if argumentos else 2_000,
+            argumentos[1:] or [1, 10, 100],
+        )
+    )
@@ -0,0 +1,177 @@
+"""
+Carga na fila de transcrição com o motor local (`TranscritorLocal`), usando
+o pool de processos real.
+
+Cada cenário enfileira as mesmas tarefas (áudios aleatórios de 20 a 200 KiB,
+semente 42) e mede a vazão da fila e o tempo de cada tarefa, do
+enfileiramento até a conclusão.
+
+Uso:
+    python -m benchmarks.bench_transcricao [tarefas] [workers ...]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from benchmarks.utils import report
+from fibrolog_api import audio
+from fibrolog_api.models import (
+    Paciente,
+    Registro,
+    RegistroCrise,
+    TarefaTranscricao,
+    table_registry,
+)
+from fibrolog_api.relogio import utcnow
+from fibrolog_api.transcricao import (
+    CONCLUIDA,
+    PENDENTE,
+    FilaTranscricao,
+)
+
+MOTOR = 'fibrolog_api.transcricao:TranscritorLocal'
+
+
+async def popular(engine, tarefas: int) -> None:
+    """Cria `tarefas` crises com áudio e as tarefas de transcrição."""
+    rng = random.Random(42)
+    caminhos = []
+    for i in range(tarefas):
+        relativo = f'bench/{i}.ogg'
+        caminho = audio.caminho_audio(relativo)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        caminho.write_bytes(rng.randbytes(rng.randint(20, 200) * 1024))
+        caminhos.append(relativo)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            insert(Paciente.__table__),
+            {'id': 1, 'nome': 'Bench', 'email': 'b@b.com', 'password': 'x'},
+        )
+        await conn.execute(
+            insert(Registro.__table__),
+            [
+                {
+                    'id': i + 1,
+                    'tipo_registro': 'crise',
+                    'paciente_id': 1,
+                    'data_hora': datetime(2024, 1, 1),
+                }
+                for i in range(tarefas)
+            ],
+        )
+        await conn.execute(
+            insert(RegistroCrise.__table__),
+            [
+                {
+                    'id': i + 1,
+                    'intensidade_dor': 8,
+                    'duracao': '1h',
+                    'audio_path': caminho,
+                }
+                for i, caminho in enumerate(caminhos)
+            ],
+        )
+        await conn.execute(
+            insert(TarefaTranscricao.__table__),
+            [
+                {
+                    'registro_id': i + 1,
+                    'audio_path': caminho,
+                    'disponivel_em': utcnow(),
+                    'estado': PENDENTE,
+                    'tentativas': 0,
+                }
+                for i, caminho in enumerate(caminhos)
+            ],
+        )
+
+
+async def executar(engine, workers: int, tarefas: int) -> dict:
+    tabela = TarefaTranscricao.__table__
+    enfileiradas_em = utcnow()
+    async with engine.begin() as conn:
+        await conn.execute(
+            update(tabela).values(
+                estado=PENDENTE,
+                tentativas=0,
+                dono=None,
+                disponivel_em=enfileiradas_em,
+                concluida_em=None,
+            )
+        )
+
+    def sessoes():
+        return AsyncSession(engine, expire_on_commit=False)
+
+    fila = FilaTranscricao(
+        workers=workers,
+        motor=MOTOR,
+        max_tentativas=3,
+        visibilidade=600,
+        backoff=1,
+        sessoes=sessoes,
+    )
+    inicio = time.perf_counter()
+    await fila.iniciar()
+    while True:
+        async with engine.connect() as conn:
+            concluidas = await conn.scalar(
+                select(func.count()).where(tabela.c.estado == CONCLUIDA)
+            )
+        if concluidas == tarefas:
+            break
+        await asyncio.sleep(0.05)
+    duracao = time.perf_counter() - inicio
+    await fila.parar()
+
+    async with engine.connect() as conn:
+        esperas = [
+            (concluida_em - enfileiradas_em).total_seconds()
+            for concluida_em in await conn.scalars(
+                select(tabela.c.concluida_em)
+            )
+        ]
+    return {
+        'duracao': duracao,
+        'esperas': esperas,
+        'metricas': fila.resumo(),
+    }
+
+
+async def main(tarefas: int, cenarios: list[int]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        audio.settings.AUDIO_DIR = str(Path(tmp) / 'audios')
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        await popular(engine, tarefas)
+
+        for workers in cenarios:
+            resultado = await executar(engine, workers, tarefas)
+            report(f'espera workers={workers}', resultado['esperas'])
+            print(
+                f'workers={workers}: {tarefas / resultado["duracao"]:.1f} '
+                'tarefas/s, transcrição média '
+                f'{resultado["metricas"]["transcricao_media_ms"]:.1f}ms'
+            )
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(
+        main(
+            argumentos[0] if argumentos else 100,
+            argumentos[1:] or [1, 2, 4],
+        )
+    )
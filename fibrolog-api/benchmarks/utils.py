@@ -0,0 +1,72 @@
+"""
+Utilitários compartilhados pelos benchmarks.
+"""
+
+import statistics
+import time
+from contextlib import asynccontextmanager
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fibrolog_api.app import app
+from fibrolog_api.database import get_session
+from fibrolog_api.models import table_registry
+
+
+@asynccontextmanager
+async def bench_client(database_path: str):
+    """
+    Cliente HTTP em processo ligado a um banco SQLite temporário.
+
+    Cada requisição recebe uma sessão nova, como em produção.
+    """
+    engine = create_async_engine(f'sqlite+aiosqlite:///{database_path}')
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    async def get_session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url='http://bench'
+        ) as client:
+            yield client, engine
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+def report(nome: str, amostras: list[float]) -> dict:
+    """Imprime e retorna estatísticas (em milissegundos) de uma série."""
+    ms = sorted(a * 1000 for a in amostras)
+    resultado = {
+        'n': len(ms),
+        'media_ms': statistics.fmean(ms),
+        'p50_ms': ms[len(ms) // 2],
+        'p95_ms': ms[int(len(ms) * 0.95) - 1],
+    }
+    print(
+        f'{nome:<28} n={resultado["n"]:<6} '
+        f'media={resultado["media_ms"]:8.2f}ms '
+        f'p50={resultado["p50_ms"]:8.2f}ms '
+        f'p95={resultado["p95_ms"]:8.2f}ms'
+    )
+    return resultado
+
+
+class Cronometro:
+    """Gerenciador de contexto que acumula durações em uma lista."""
+
+    def __init__(self, amostras: list[float]):
+        self.amostras = amostras
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.amostras.append(time.perf_counter() - self._inicio)
@@ -0,0 +1,338 @@
+"""
+Agendador em memória dos alertas.
+
+Os alertas ativos que vencem nos próximos `ALERTS_WINDOW_SECONDS` são lidos
+do índice `(ativo, proxima_execucao)`, no máximo `ALERTS_LOAD_LIMIT` por vez,
+para um heap mínimo por `proxima_execucao`. O agendador dorme até o topo do
+heap vencer e relê a janela a cada metade do seu tamanho, sem percorrer a
+tabela.
+
+- Inclusão e reagendamento pela API entram direto no heap, em O(log n), se
+  vencem dentro da janela carregada; os demais são lidos em uma carga
+  seguinte. Alertas criados fora da API (como os do detector de crises)
+  também.
+- Cancelamento é O(1): o alerta sai de `_agendados` e a sua entrada no heap
+  é descartada ao chegar ao topo. O heap é reconstruído quando as entradas
+  descartadas passam da metade.
+- Disparo: um `UPDATE` condicional marca `disparado_em` nos alertas que
+  ainda estão ativos e vencidos. Os alertas sem recorrência ficam inativos;
+  nos recorrentes, `proxima_execucao` avança para a ocorrência seguinte, na
+  mesma transação. Como um alerta disparado não volta a estar vencido,
+  reiniciar a aplicação (ou rodar várias instâncias) não dispara nada duas
+  vezes. Ocorrências vencidas com a aplicação parada disparam uma única vez
+  na inicialização.
+
+Os tratadores em `ao_disparar` recebem os alertas na mesma transação do
+disparo: se um deles falha, nada é disparado e os alertas voltam na próxima
+carga.
+"""
+
+import asyncio
+import heapq
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.database import async_session
+from fibrolog_api.models import Alerta, Paciente
+from fibrolog_api.recorrencia import proxima_execucao
+from fibrolog_api.relogio import utcnow
+from fibrolog_api.settings import Settings
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+# Alertas marcados como disparados por transação
+LOTE_DISPARO = 500
+# Entradas descartadas toleradas no heap antes de reconstruí-lo
+MINIMO_COMPACTACAO = 64
+
+Tratador = Callable[[AsyncSession, list[Alerta]], Awaitable[None]]
+
+
+async def registrar_disparo(
+    session: AsyncSession, alertas: list[Alerta]
+) -> None:
+    for alerta in alertas:
+        logger.info(
+            'Alerta %s (%s) disparado para o paciente %s',
+            alerta.id,
+            alerta.tipo,
+            alerta.paciente_id,
+        )
+
+
+async def avancar_recorrencias(
+    session: AsyncSession, alertas: list[Alerta], agora: datetime
+) -> None:
+    """
+    Leva os alertas recorrentes disparados à ocorrência seguinte, sem fazer
+    commit. Os que não têm mais ocorrências ficam inativos.
+    """
+    recorrentes = [alerta for alerta in alertas if alerta.recorrencia]
+    if not recorrentes:
+        return
+    fusos = dict(
+        (
+            await session.execute(
+                select(Paciente.id, Paciente.fuso_horario).where(
+                    Paciente.id.in_({a.paciente_id for a in recorrentes})
+                )
+            )
+        ).all()
+    )
+    for alerta in recorrentes:
+        proxima = proxima_execucao(
+            alerta.data_hora,
+            alerta.recorrencia,
+            fusos[alerta.paciente_id],
+            agora,
+        )
+        if proxima is None:
+            alerta.ativo = False
+        else:
+            alerta.proxima_execucao = proxima
+
+
+@dataclass
+class MetricasAlertas:
+    """Métricas acumuladas do agendador (tempos em segundos)."""
+
+    cargas: int = 0
+    carregados: int = 0
+    disparados: int = 0
+    descartados: int = 0
+    atraso_total: float = 0.0
+
+    def resumo(self) -> dict:
+        return {
+            'cargas': self.cargas,
+            'carregados': self.carregados,
+            'disparados': self.disparados,
+            'descartados': self.descartados,
+            'atraso_medio_ms': (
+                self.atraso_total / (self.disparados or 1) * 1000
+            ),
+        }
+
+
+class AgendadorAlertas:
+    """
+    Dispara os alertas no momento de `proxima_execucao` (UTC).
+
+    Args:
+        janela: Segundos à frente carregados do banco a cada carga.
+        limite_carga: Máximo de alertas lidos por carga.
+        sessoes: Fábrica de sessões do banco.
+    """
+
+    def __init__(
+        self, janela: float, limite_carga: int, sessoes=async_session
+    ):
+        self.janela = timedelta(seconds=janela)
+        self.limite_carga = limite_carga
+        self.sessoes = sessoes
+        self.ao_disparar: list[Tratador] = [registrar_disparo]
+        self.metricas = MetricasAlertas()
+        self._heap: list[tuple[datetime, int]] = []
+        self._agendados: dict[int, datetime] = {}
+        # Todo alerta ativo que vence antes deste momento está no heap
+        self._carregado_ate: datetime | None = None
+        self._proxima_carga: datetime | None = None
+        self._carga_incompleta = False
+        self._aviso = asyncio.Event()
+        self._tarefa: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._agendados)
+
+    def agendar(self, alerta_id: int, momento: datetime) -> None:
+        """Inclui ou reagenda um alerta ativo, após o commit."""
+        if self._carregado_ate is None or momento >= self._carregado_ate:
+            # Fora da janela: será lido em uma carga seguinte
+            self.cancelar(alerta_id)
+            return
+        if self._agendados.get(alerta_id) == momento:
+            return
+        if alerta_id in self._agendados:
+            self.cancelar(alerta_id)
+        self._agendados[alerta_id] = momento
+        heapq.heappush(self._heap, (momento, alerta_id))
+        if self._heap[0] == (momento, alerta_id):
+            self._aviso.set()
+
+    def cancelar(self, alerta_id: int) -> None:
+        """Remove um alerta excluído ou desativado, após o commit."""
+        if self._agendados.pop(alerta_id, None) is None:
+            return
+        descartadas = len(self._heap) - len(self._agendados)
+        if descartadas > max(len(self._agendados), MINIMO_COMPACTACAO):
+            self._heap = [
+                (momento, alerta_id)
+                for alerta_id, momento in self._agendados.items()
+            ]
+            heapq.heapify(self._heap)
+
+    def _topo(self) -> tuple[datetime, int] | None:
+        """Primeira entrada válida do heap, descartando as canceladas."""
+        while self._heap:
+            momento, alerta_id = self._heap[0]
+            if self._agendados.get(alerta_id) == momento:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    async def carregar(self) -> int:
+        """
+        Lê do banco os alertas ativos que vencem dentro da janela.
+
+        Returns:
+            Quantidade de alertas incluídos no heap.
+        """
+        agora = utcnow()
+        horizonte = agora + self.janela
+        async with self.sessoes() as session:
+            linhas = (
+                await session.execute(
+                    select(Alerta.id, Alerta.proxima_execucao)
+                    .where(Alerta.ativo, Alerta.proxima_execucao < horizonte)
+                    .order_by(Alerta.proxima_execucao)
+                    .limit(self.limite_carga)
+                )
+            ).all()
+
+        # Com a carga limitada, só o que vence antes do último alerta lido
+        # está garantidamente no heap; o restante vem nas próximas cargas.
+        self._carga_incompleta = len(linhas) == self.limite_carga
+        if self._carga_incompleta:
+            horizonte = linhas[-1].proxima_execucao
+        self._carregado_ate = horizonte
+        self._proxima_carga = agora + self.janela / 2
+
+        incluidos = 0
+        for alerta_id, momento in linhas:
+            if self._agendados.get(alerta_id) != momento:
+                self._agendados[alerta_id] = momento
+                heapq.heappush(self._heap, (momento, alerta_id))
+                incluidos += 1
+        self.metricas.cargas += 1
+        self.metricas.carregados += incluidos
+        return incluidos
+
+    async def disparar_vencidos(self) -> int:
+        """
+        Dispara os alertas do heap que já venceram.
+
+        Returns:
+            Quantidade de alertas disparados por este processo.
+        """
+        agora = utcnow()
+        disparados = 0
+        while True:
+            vencidos = []
+            while len(vencidos) < LOTE_DISPARO:
+                topo = self._topo()
+                if topo is None or topo[0] > agora:
+                    break
+                heapq.heappop(self._heap)
+                del self._agendados[topo[1]]
+                vencidos.append(topo[1])
+            if not vencidos:
+                return disparados
+            disparados += await self._disparar(vencidos, agora)
+
+    async def _disparar(self, ids: list[int], agora: datetime) -> int:
+        async with self.sessoes() as session:
+            # Alertas desativados, reagendados ou já disparados por outra
+            # instância não atendem mais às condições e são ignorados.
+            alertas = (
+                await session.scalars(
+                    update(Alerta)
+                    .where(
+                        Alerta.id.in_(ids),
+                        Alerta.ativo,
+                        Alerta.proxima_execucao <= agora,
+                    )
+                    .values(
+                        disparado_em=agora,
+                        ativo=Alerta.recorrencia.is_not(None),
+                    )
+                    .returning(Alerta)
+                )
+            ).all()
+            atraso = sum(
+                (agora - alerta.proxima_execucao).total_seconds()
+                for alerta in alertas
+            )
+            await avancar_recorrencias(session, alertas, agora)
+            for tratador in self.ao_disparar:
+                await tratador(session, alertas)
+            await session.commit()
+            # Atualizado antes de fechar a sessão: um cancelamento durante
+            # o fechamento não perde os disparos já confirmados.
+            self.metricas.disparados += len(alertas)
+            self.metricas.descartados += len(ids) - len(alertas)
+            self.metricas.atraso_total += atraso
+            for alerta in alertas:
+                if alerta.ativo:
+                    self.agendar(alerta.id, alerta.proxima_execucao)
+        return len(alertas)
+
+    def _precisa_carregar(self) -> bool:
+        if self._proxima_carga is None or utcnow() >= self._proxima_carga:
+            return True
+        # O heap esvaziou antes de esgotar os alertas da janela
+        return self._carga_incompleta and not self._agendados
+
+    def _espera(self) -> float:
+        if self._precisa_carregar():
+            return 0.0
+        limite = self._proxima_carga
+        topo = self._topo()
+        if topo is not None and topo[0] < limite:
+            limite = topo[0]
+        return max((limite - utcnow()).total_seconds(), 0.0)
+
+    async def _executar(self) -> None:
+        while True:
+            try:
+                if self._precisa_carregar():
+                    await self.carregar()
+                await self.disparar_vencidos()
+            except Exception:
+                logger.exception('Falha ao disparar alertas')
+                # Os alertas retirados do heap voltam na próxima carga
+                self._proxima_carga = utcnow() + self.janela / 2
+                self._carga_incompleta = False
+            try:
+                await asyncio.wait_for(self._aviso.wait(), self._espera())
+            except TimeoutError:
+                pass
+            self._aviso.clear()
+
+    async def iniciar(self) -> None:
+        self._tarefa = asyncio.create_task(self._executar())
+
+    def resumo(self) -> dict:
+        return {
+            'agendados': len(self._agendados),
+            'heap': len(self._heap),
+            'carregado_ate': self._carregado_ate,
+            **self.metricas.resumo(),
+        }
+
+    async def parar(self) -> None:
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+
+agendador_alertas = AgendadorAlertas(
+    janela=settings.ALERTS_WINDOW_SECONDS,
+    limite_carga=settings.ALERTS_LOAD_LIMIT,
+)
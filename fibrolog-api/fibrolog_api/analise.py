@@ -0,0 +1,200 @@
+"""
+Análises de tendência e correlação das séries de sintomas de um paciente.
+
+As séries são lidas coluna a coluna (sem objetos ORM) e dispostas em um
+calendário diário denso, com `NaN` nos dias sem registro. Todas as métricas
+são calculadas com operações vetorizadas do NumPy sobre esse calendário:
+
+- correlações de Pearson e de Spearman entre dor, sono e fadiga;
+- correlação defasada entre o sono de um dia e a dor do dia seguinte;
+- médias móveis de 7 e 30 dias;
+- tendência (inclinação da regressão linear) de cada métrica.
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.models import Registro, RegistroDiario
+
+METRICAS = ('intensidade_dor', 'qualidade_sono', 'nivel_fadiga')
+JANELAS_MEDIA_MOVEL = (7, 30)
+MIN_PONTOS_CORRELACAO = 3
+
+
+@dataclass
+class Series:
+    """Calendário diário denso de um paciente, de `inicio` a `fim`."""
+
+    inicio: date
+    fim: date
+    valores: dict[str, np.ndarray]
+
+
+async def carregar_series(
+    session: AsyncSession, paciente_id: int, de: date, ate: date
+) -> Series:
+    """
+    Lê as métricas diárias de `de` a `ate` (inclusive) em arrays NumPy.
+
+    Args:
+        session: Sessão da requisição atual.
+        paciente_id: Paciente dono dos registros.
+        de: Primeiro dia local do calendário.
+        ate: Último dia local do calendário.
+    """
+    registros = Registro.__table__
+    diarios = RegistroDiario.__table__
+    resultado = await session.execute(
+        select(registros.c.dia_local, *(diarios.c[m] for m in METRICAS))
+        .join(diarios, diarios.c.id == registros.c.id)
+        .where(
+            registros.c.paciente_id == paciente_id,
+            registros.c.dia_local.between(de, ate),
+        )
+    )
+    linhas = resultado.all()
+    dias, *colunas = zip(*linhas) if linhas else [()] * (len(METRICAS) + 1)
+
+    posicoes = (
+        np.array(dias, dtype='datetime64[D]') - np.datetime64(de, 'D')
+    ).astype(np.int64)
+    tamanho = (ate - de).days + 1
+    valores = {}
+    for metrica, coluna in zip(METRICAS, colunas):
+        serie = np.full(tamanho, np.nan)
+        serie[posicoes] = np.asarray(coluna, dtype=np.float64)
+        valores[metrica] = serie
+    return Series(inicio=de, fim=ate, valores=valores)
+
+
+def _pareados(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    presentes = ~(np.isnan(x) | np.isnan(y))
+    return x[presentes], y[presentes]
+
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> float | None:
+    if x.size < MIN_PONTOS_CORRELACAO:
+        return None
+    dx, dy = x - x.mean(), y - y.mean()
+    denominador = np.sqrt((dx * dx).sum() * (dy * dy).sum())
+    if denominador == 0:
+        return None
+    return float((dx * dy).sum() / denominador)
+
+
+def postos(x: np.ndarray) -> np.ndarray:
+    """Postos de `x` (a partir de 1), com a média dos postos nos empates."""
+    ordem = np.argsort(x, kind='stable')
+    sequenciais = np.empty(x.size)
+    sequenciais[ordem] = np.arange(1, x.size + 1)
+    _, grupos, tamanhos = np.unique(x, return_inverse=True, return_counts=True)
+    return (np.bincount(grupos, weights=sequenciais) / tamanhos)[grupos]
+
+
+def correlacao(x: np.ndarray, y: np.ndarray) -> dict:
+    """Pearson e Spearman entre duas séries, ignorando dias sem registro."""
+    x, y = _pareados(x, y)
+    return {
+        'pearson': _pearson(x, y),
+        'spearman': _pearson(postos(x), postos(y)),
+        'n': int(x.size),
+    }
+
+
+def correlacao_defasada(
+    causa: np.ndarray, efeito: np.ndarray, defasagem: int
+) -> dict:
+    """Correlação entre `causa` no dia t e `efeito` no dia t + defasagem."""
+    if defasagem <= 0:
+        return correlacao(causa, efeito)
+    return correlacao(causa[:-defasagem], efeito[defasagem:])
+
+
+def media_movel(serie: np.ndarray, janela: int) -> np.ndarray:
+    """
+    Média dos dias com registro nos últimos `janela` dias (inclusive).
+
+    Dias sem registro não contam no denominador; se a janela não tem
+    nenhum registro, o resultado é `NaN`.
+    """
+    presentes = ~np.isnan(serie)
+    somas = np.concatenate(([0.0], np.cumsum(np.where(presentes, serie, 0))))
+    contagens = np.concatenate(([0], np.cumsum(presentes)))
+    fim = np.arange(1, serie.size + 1)
+    inicio = np.maximum(fim - janela, 0)
+    n = contagens[fim] - contagens[inicio]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n > 0, (somas[fim] - somas[inicio]) / n, np.nan)
+
+
+def tendencia(serie: np.ndarray) -> float | None:
+    """Inclinação da regressão linear da série, em unidades por dia."""
+    dias = np.arange(serie.size, dtype=np.float64)
+    dias, valores = _pareados(dias, serie)
+    if dias.size < 2:  # noqa: PLR2004
+        return None
+    dx = dias - dias.mean()
+    variancia = (dx * dx).sum()
+    if variancia == 0:
+        return None
+    return float((dx * (valores - valores.mean())).sum() / variancia)
+
+
+def _lista(serie: np.ndarray, casas: int = 3) -> list[float | None]:
+    return np.where(np.isnan(serie), None, np.round(serie, casas)).tolist()
+
+
+async def calcular_insights(
+    session: AsyncSession,
+    paciente_id: int,
+    ate: date,
+    dias: int,
+    defasagem: int = 1,
+) -> dict:
+    """
+    Calcula as análises dos últimos `dias` dias até `ate`.
+
+    Os 29 dias anteriores à janela também são lidos, para que as médias
+    móveis de 30 dias estejam completas desde o primeiro dia.
+    """
+    folga = max(JANELAS_MEDIA_MOVEL) - 1
+    de = ate - timedelta(days=dias - 1)
+    series = await carregar_series(
+        session, paciente_id, de - timedelta(days=folga), ate
+    )
+    v = {metrica: serie[folga:] for metrica, serie in series.valores.items()}
+    dor, sono, fadiga = (v[metrica] for metrica in METRICAS)
+
+    return {
+        'inicio': de,
+        'fim': ate,
+        'dias_com_registro': int(np.count_nonzero(~np.isnan(dor))),
+        'correlacoes': {
+            'dor_sono': correlacao(dor, sono),
+            'dor_fadiga': correlacao(dor, fadiga),
+            'sono_fadiga': correlacao(sono, fadiga),
+            'sono_dor_seguinte': correlacao_defasada(sono, dor, defasagem),
+        },
+        'tendencias': {
+            metrica: _por_semana(tendencia(v[metrica])) for metrica in METRICAS
+        },
+        'medias_moveis': {
+            metrica: {
+                f'media_{janela}d': _lista(
+                    media_movel(series.valores[metrica], janela)[folga:]
+                )
+                for janela in JANELAS_MEDIA_MOVEL
+            }
+            for metrica in METRICAS
+        },
+    }
+
+
+def _por_semana(inclinacao: float | None) -> float | None:
+    if inclinacao is None:
+        return None
+    return round(inclinacao * 7, 3)
@@ -1,9 +1,51 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from fibrolog_api.routers import auth, pacientes, registros_diarios
+from fibrolog_api.agendador import agendador_alertas
+from fibrolog_api.compressao import CompressaoMiddleware
+from fibrolog_api.notificacoes import despachante_notificacoes
+from fibrolog_api.routers import (
+    alertas,
+    auth,
+    busca,
+    metricas,
+    pacientes,
+    registros_crise,
+    registros_diarios,
+    sync,
+)
+from fibrolog_api.security import password_hasher
+from fibrolog_api.settings import Settings
+from fibrolog_api.transcricao import fila_transcricao
+from fibrolog_api.uploads import coletar_periodicamente
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    coleta_uploads = asyncio.create_task(coletar_periodicamente())
+    await fila_transcricao.iniciar()
+    await agendador_alertas.iniciar()
+    await despachante_notificacoes.iniciar()
+    yield
+    await despachante_notificacoes.parar()
+    await agendador_alertas.parar()
+    await fila_transcricao.parar()
+    coleta_uploads.cancel()
+    password_hasher.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CompressaoMiddleware, minimo=Settings().COMPRESSION_MIN_SIZE
+)
 
+app.include_router(alertas.router)
 app.include_router(auth.router)
+app.include_router(busca.router)
+app.include_router(metricas.router)
 app.include_router(pacientes.router)
+app.include_router(registros_crise.router)
 app.include_router(registros_diarios.router)
+app.include_router(sync.router)
@@ -0,0 +1,359 @@
+"""
+Armazenamento dos áudios das crises.
+
+O upload multipart é lido direto do corpo da requisição, pedaço a pedaço,
+sem passar pelo `UploadFile` (que copiaria o arquivo inteiro antes de o
+handler rodar). Cada pedaço do arquivo é escrito em um arquivo temporário,
+com I/O em threads via `anyio`, e somado ao SHA-256 ao mesmo tempo. No fim,
+o arquivo é movido para um caminho derivado do hash (`ab/abcdef….m4a`): se
+esse caminho já existe, o conteúdo é idêntico e o existente é reaproveitado.
+
+Um áudio reaproveitado pode ficar órfão e ser apagado pela exclusão de
+outro registro antes do commit do registro que o reaproveitou. Por isso, o
+temporário é mantido até depois do commit (`AudioArmazenado.confirmar`), e
+volta para o lugar se o arquivo sumiu; e `remover_audio_orfao` tira o
+arquivo do lugar e conta as referências de novo antes de apagá-lo.
+
+Só o pedaço atual fica em memória. O limite `AUDIO_MAX_BYTES` é verificado
+pelo `Content-Length`, antes de ler o corpo, e de novo a cada pedaço
+escrito, para corpos enviados sem `Content-Length`.
+"""
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from http import HTTPStatus
+from pathlib import Path
+
+import anyio
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.models import RegistroCrise
+from fibrolog_api.settings import Settings
+
+settings = Settings()
+
+CAMPO_AUDIO = 'audio'
+TIPOS_AUDIO = {
+    'audio/aac': '.aac',
+    'audio/amr': '.amr',
+    'audio/3gpp': '.3gp',
+    'audio/mp4': '.m4a',
+    'audio/mpeg': '.mp3',
+    'audio/ogg': '.ogg',
+    'audio/wav': '.wav',
+    'audio/webm': '.webm',
+    'audio/x-wav': '.wav',
+}
+EXTENSOES = {extensao: tipo for tipo, extensao in TIPOS_AUDIO.items()}
+# Delimitadores e cabeçalhos do multipart além do próprio arquivo
+FOLGA_MULTIPART = 16 * 1024
+
+
+def diretorio_audios() -> Path:
+    return Path(settings.AUDIO_DIR)
+
+
+def caminho_audio(audio_path: str) -> Path:
+    """Caminho no disco de um `RegistroCrise.audio_path`."""
+    return diretorio_audios() / audio_path
+
+
+def tipo_audio(audio_path: str) -> str:
+    return EXTENSOES.get(Path(audio_path).suffix, 'application/octet-stream')
+
+
+def _muito_grande() -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+        detail=(
+            f'O áudio excede o limite de {settings.AUDIO_MAX_BYTES} bytes.'
+        ),
+    )
+
+
+def verificar_tamanho(tamanho: int) -> None:
+    """
+    Raises:
+        HTTPException: Se `tamanho` excede `AUDIO_MAX_BYTES`.
+    """
+    if tamanho > settings.AUDIO_MAX_BYTES:
+        raise _muito_grande()
+
+
+@dataclass
+class AudioArmazenado:
+    """
+    Áudio no seu endereço, ainda não associado a um registro no banco.
+
+    Attributes:
+        audio_path: Caminho relativo, para `RegistroCrise.audio_path`.
+        reserva: Cópia recebida de um áudio que já existia, mantida até o
+            commit.
+    """
+
+    audio_path: str
+    reserva: Path | None = None
+
+    async def confirmar(self) -> None:
+        """
+        Deve ser chamado depois do commit: devolve a reserva ao endereço,
+        se o áudio foi removido como órfão nesse meio tempo, ou a apaga.
+        """
+        if self.reserva is None:
+            return
+        destino = caminho_audio(self.audio_path)
+        if await anyio.Path(destino).exists():
+            await anyio.Path(self.reserva).unlink(missing_ok=True)
+        else:
+            await anyio.to_thread.run_sync(os.replace, self.reserva, destino)
+
+
+async def armazenar(
+    arquivo: Path, digest: str, extensao: str
+) -> AudioArmazenado:
+    """
+    Move um arquivo completo para o caminho derivado do seu SHA-256.
+
+    O arquivo é renomeado, não copiado. Se já existe um áudio com o mesmo
+    conteúdo, o existente é reaproveitado e `arquivo` fica como reserva.
+    """
+    relativo = f'{digest[:2]}/{digest}{extensao}'
+    destino = anyio.Path(caminho_audio(relativo))
+    await destino.parent.mkdir(parents=True, exist_ok=True)
+    if await destino.exists():
+        return AudioArmazenado(relativo, reserva=arquivo)
+    await anyio.to_thread.run_sync(os.replace, arquivo, destino)
+    return AudioArmazenado(relativo)
+
+
+class GravacaoAudio:
+    """
+    Arquivo de áudio sendo recebido, endereçado pelo conteúdo ao concluir.
+
+    Args:
+        extensao: Extensão do arquivo final, conforme o tipo do áudio.
+    """
+
+    def __init__(self, extensao: str):
+        self.extensao = extensao
+        self.hash = hashlib.sha256()
+        self.tamanho = 0
+        self.temporario = (
+            diretorio_audios() / 'tmp' / f'{uuid.uuid4().hex}.parcial'
+        )
+        self._arquivo = None
+
+    async def abrir(self) -> None:
+        await anyio.Path(self.temporario.parent).mkdir(
+            parents=True, exist_ok=True
+        )
+        self._arquivo = await anyio.open_file(self.temporario, 'wb')
+
+    async def escrever(self, dados: bytes) -> None:
+        self.tamanho += len(dados)
+        verificar_tamanho(self.tamanho)
+        self.hash.update(dados)
+        await self._arquivo.write(dados)
+
+    async def concluir(self) -> AudioArmazenado:
+        """Move o arquivo para o seu endereço."""
+        await self._arquivo.aclose()
+        return await armazenar(
+            self.temporario, self.hash.hexdigest(), self.extensao
+        )
+
+    async def descartar(self) -> None:
+        if self._arquivo is not None:
+            await self._arquivo.aclose()
+        await anyio.Path(self.temporario).unlink(missing_ok=True)
+
+
+class _EventosMultipart:
+    """Callbacks síncronos do parser, acumulados para processamento async."""
+
+    def __init__(self):
+        self.eventos: list[tuple[str, object]] = []
+        self._cabecalhos: dict[str, str] = {}
+        self._campo = b''
+        self._valor = b''
+
+    def callbacks(self) -> dict:
+        return {
+            'on_part_begin': self._inicio,
+            'on_header_field': self._campo_cabecalho,
+            'on_header_value': self._valor_cabecalho,
+            'on_header_end': self._fim_cabecalho,
+            'on_headers_finished': self._fim_cabecalhos,
+            'on_part_data': self._dados,
+            'on_part_end': self._fim,
+        }
+
+    def _inicio(self) -> None:
+        self._cabecalhos = {}
+
+    def _campo_cabecalho(self, dados: bytes, inicio: int, fim: int) -> None:
+        self._campo += dados[inicio:fim]
+
+    def _valor_cabecalho(self, dados: bytes, inicio: int, fim: int) -> None:
+        self._valor += dados[inicio:fim]
+
+    def _fim_cabecalho(self) -> None:
+        nome = self._campo.decode('latin-1').lower()
+        self._cabecalhos[nome] = self._valor.decode('latin-1')
+        self._campo = self._valor = b''
+
+    def _fim_cabecalhos(self) -> None:
+        self.eventos.append(('cabecalhos', self._cabecalhos))
+
+    def _dados(self, dados: bytes, inicio: int, fim: int) -> None:
+        self.eventos.append(('dados', dados[inicio:fim]))
+
+    def _fim(self) -> None:
+        self.eventos.append(('fim', None))
+
+    def consumir(self) -> list[tuple[str, object]]:
+        eventos, self.eventos = self.eventos, []
+        return eventos
+
+
+def _verificar_requisicao(request: Request) -> bytes:
+    tamanho = request.headers.get('content-length', '')
+    if (
+        tamanho.isdigit()
+        and int(tamanho) > settings.AUDIO_MAX_BYTES + FOLGA_MULTIPART
+    ):
+        raise _muito_grande()
+
+    tipo, parametros = parse_options_header(
+        request.headers.get('content-type', '')
+    )
+    if tipo != b'multipart/form-data' or b'boundary' not in parametros:
+        raise HTTPException(
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            detail='Envie o áudio como multipart/form-data.',
+        )
+    return parametros[b'boundary']
+
+
+def _iniciar_gravacao(cabecalhos: dict[str, str]) -> GravacaoAudio | None:
+    _, disposicao = parse_options_header(
+        cabecalhos.get('content-disposition', '')
+    )
+    if disposicao.get(b'name', b'').decode() != CAMPO_AUDIO:
+        return None
+
+    tipo, _ = parse_options_header(cabecalhos.get('content-type', ''))
+    extensao = TIPOS_AUDIO.get(tipo.decode())
+    if extensao is None:
+        raise HTTPException(
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            detail=(
+                'Formato de áudio não suportado. Use: '
+                f'{", ".join(sorted(TIPOS_AUDIO))}.'
+            ),
+        )
+    return GravacaoAudio(extensao)
+
+
+class _Recepcao:
+    """Partes do formulário já recebidas e o áudio em gravação."""
+
+    def __init__(self):
+        self.gravacao: GravacaoAudio | None = None
+        self._atual: GravacaoAudio | None = None
+
+    async def processar(self, evento: str, valor) -> None:
+        if evento == 'cabecalhos':
+            self._atual = _iniciar_gravacao(valor)
+            if self._atual is None:
+                return
+            if self.gravacao is not None:
+                raise HTTPException(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    detail='Envie um único arquivo de áudio.',
+                )
+            self.gravacao = self._atual
+            await self.gravacao.abrir()
+        elif evento == 'dados' and self._atual is not None:
+            await self._atual.escrever(valor)
+        elif evento == 'fim':
+            self._atual = None
+
+    async def concluir(self) -> AudioArmazenado:
+        if self.gravacao is None or self.gravacao.tamanho == 0:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f'O campo `{CAMPO_AUDIO}` com o áudio é obrigatório.',
+            )
+        return await self.gravacao.concluir()
+
+    async def descartar(self) -> None:
+        if self.gravacao is not None:
+            await self.gravacao.descartar()
+
+
+async def receber_audio(request: Request) -> AudioArmazenado:
+    """
+    Grava o campo `audio` de um upload multipart.
+
+    Os demais campos do formulário são ignorados.
+
+    Raises:
+        HTTPException: Se o corpo não é multipart, o áudio está ausente,
+            vazio, repetido, em formato não suportado ou acima do limite.
+    """
+    eventos = _EventosMultipart()
+    parser = MultipartParser(
+        _verificar_requisicao(request), eventos.callbacks()
+    )
+    recepcao = _Recepcao()
+    try:
+        async for pedaco in request.stream():
+            parser.write(pedaco)
+            for evento, valor in eventos.consumir():
+                await recepcao.processar(evento, valor)
+        parser.finalize()
+        return await recepcao.concluir()
+    except BaseException:
+        await recepcao.descartar()
+        raise
+
+
+async def _referencias(session: AsyncSession, audio_path: str) -> int:
+    crises = RegistroCrise.__table__
+    return await session.scalar(
+        select(func.count())
+        .select_from(crises)
+        .where(crises.c.audio_path == audio_path)
+    )
+
+
+async def remover_audio_orfao(session: AsyncSession, audio_path: str) -> None:
+    """
+    Apaga o arquivo de um áudio que nenhum registro referencia mais.
+
+    Como arquivos idênticos são deduplicados, o mesmo áudio pode pertencer
+    a mais de um registro. Deve ser chamado depois do commit.
+    """
+    if await _referencias(session, audio_path):
+        return
+
+    # Um upload idêntico pode ter reaproveitado o arquivo e feito commit
+    # depois da contagem: o arquivo sai do lugar, as referências são
+    # contadas de novo, em outra transação, e ele volta se houver alguma.
+    caminho = caminho_audio(audio_path)
+    removido = caminho.with_name(f'{caminho.name}.{uuid.uuid4().hex}.orfao')
+    try:
+        await anyio.to_thread.run_sync(os.replace, caminho, removido)
+    except FileNotFoundError:
+        return
+    await session.commit()
+    if await _referencias(session, audio_path):
+        await anyio.to_thread.run_sync(os.replace, removido, caminho)
+    else:
+        await anyio.Path(removido).unlink()
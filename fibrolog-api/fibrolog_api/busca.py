@@ -0,0 +1,260 @@
+"""
+Busca textual no histórico do paciente, com um índice FTS5 do SQLite.
+
+A tabela virtual `busca` tem um documento por texto pesquisável:
+
+- `registros_crises.texto_transcrito` (tipo `crise`), com `rowid` igual ao
+  id do registro;
+- `registros_diarios.localizacao_dor` (tipo `diario`), idem;
+- `pacientes.medicacoes` (tipo `medicacoes`), com `rowid` igual ao id do
+  paciente negativo, para não colidir com os registros.
+
+O índice é mantido por gatilhos nas tabelas de origem, e não pelas rotas:
+assim, ele acompanha também as escritas em lote e as feitas fora do ORM,
+como a gravação da transcrição pela fila.
+
+O tokenizador `unicode61` com `remove_diacritics 2` ignora acentos e
+maiúsculas ("pregabalína" encontra "Pregabalina"), e cada palavra buscada
+também encontra o seu plural ou singular ("joelho" e "joelhos", "pulmão" e
+"pulmões").
+
+O custo de uma busca depende só do histórico do paciente, e não do tamanho
+do índice. A coluna `paciente` guarda o dono como um token (`p42`), e o
+FTS5 cruza a lista de documentos do paciente com a de cada palavra. Os
+termos são exatos: prefixos (`joelho*`) e a função `bm25()` do FTS5 leem a
+lista inteira de cada termo, de todos os pacientes. Por isso, a relevância
+é o BM25 calculado aqui, com as estatísticas dos documentos do paciente.
+
+O FTS5 é exclusivo do SQLite; com outros bancos, o índice não é criado e a
+busca não está disponível.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import DDL, DateTime, Integer, String, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.models import table_registry
+from fibrolog_api.texto import PALAVRA, palavras, variantes
+
+# Palavras consideradas por busca
+MAX_TERMOS = 10
+# Marcadores das palavras encontradas no trecho retornado
+DESTAQUE = ('**', '**')
+# Tokens de contexto em cada trecho
+TOKENS_TRECHO = 12
+# Parâmetros do BM25
+K1 = 1.2
+B = 0.75
+
+CRIAR_TABELA = """
+CREATE VIRTUAL TABLE busca USING fts5(
+    texto,
+    paciente,
+    tipo UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+
+def _gatilhos(tabela: str, coluna: str, tipo: str, chave: str, dono: str):
+    """
+    Gatilhos que mantêm os documentos de `tabela.coluna` no índice.
+
+    `chave` e `dono` são expressões SQL com o `rowid` e o id do paciente do
+    documento, em função de `{linha}` (`new` ou `old`).
+    """
+    nova, antiga = chave.format(linha='new'), chave.format(linha='old')
+    inserir = (
+        f'INSERT INTO busca(rowid, texto, paciente, tipo) '
+        f"SELECT {nova}, new.{coluna}, 'p' || {dono.format(linha='new')}, "
+        f"'{tipo}' WHERE new.{coluna} IS NOT NULL;"
+    )
+    remover = f'DELETE FROM busca WHERE rowid = {antiga};'
+    return [
+        f'CREATE TRIGGER busca_{tabela}_ai AFTER INSERT ON {tabela} '
+        f'BEGIN {inserir} END',
+        f'CREATE TRIGGER busca_{tabela}_au AFTER UPDATE OF {coluna} '
+        f'ON {tabela} BEGIN {remover} {inserir} END',
+        f'CREATE TRIGGER busca_{tabela}_ad AFTER DELETE ON {tabela} '
+        f'BEGIN {remover} END',
+    ]
+
+
+# Os registros são inseridos antes das suas subclasses, então o paciente
+# já pode ser lido de `registros`.
+DONO_REGISTRO = '(SELECT paciente_id FROM registros WHERE id = {linha}.id)'
+
+CRIAR_INDICE = [
+    CRIAR_TABELA,
+    *_gatilhos(
+        'registros_crises',
+        'texto_transcrito',
+        'crise',
+        '{linha}.id',
+        DONO_REGISTRO,
+    ),
+    *_gatilhos(
+        'registros_diarios',
+        'localizacao_dor',
+        'diario',
+        '{linha}.id',
+        DONO_REGISTRO,
+    ),
+    *_gatilhos(
+        'pacientes', 'medicacoes', 'medicacoes', '-{linha}.id', '{linha}.id'
+    ),
+]
+
+for comando in CRIAR_INDICE:
+    event.listen(
+        table_registry.metadata,
+        'after_create',
+        DDL(comando).execute_if(dialect='sqlite'),
+    )
+event.listen(
+    table_registry.metadata,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS busca').execute_if(dialect='sqlite'),
+)
+
+
+def consulta_fts(paciente_id: int, termos: list[set[str]]) -> str:
+    """
+    Consulta FTS5 pelos documentos do paciente com todos os termos, cada um
+    em qualquer das suas formas.
+    """
+    grupos = ' AND '.join(
+        '(' + ' OR '.join(f'"{forma}"' for forma in sorted(formas)) + ')'
+        for formas in termos
+    )
+    return f'paciente : "p{paciente_id}" AND texto : ({grupos})'
+
+
+def trecho(texto: str, termos: list[set[str]]) -> str:
+    """
+    Janela de `TOKENS_TRECHO` palavras do texto com mais palavras buscadas,
+    que ficam entre os marcadores de `DESTAQUE`.
+    """
+    formas = set().union(*termos)
+    achadas = list(PALAVRA.finditer(texto))
+    marcadas = [
+        any(palavra in formas for palavra in palavras(achada[0]))
+        for achada in achadas
+    ]
+    inicio = max(
+        range(max(len(achadas) - TOKENS_TRECHO, 0) + 1),
+        key=lambda i: sum(marcadas[i : i + TOKENS_TRECHO]),
+    )
+    fim = min(inicio + TOKENS_TRECHO, len(achadas))
+
+    partes = ['…'] if inicio > 0 else []
+    anterior = achadas[inicio].start()
+    for achada, marcada in zip(achadas[inicio:fim], marcadas[inicio:fim]):
+        partes.append(texto[anterior : achada.start()])
+        partes.append(
+            f'{DESTAQUE[0]}{achada[0]}{DESTAQUE[1]}' if marcada else achada[0]
+        )
+        anterior = achada.end()
+    if fim < len(achadas):
+        partes.append('…')
+    return ''.join(partes)
+
+
+@dataclass
+class Resultado:
+    id: int
+    tipo: str
+    trecho: str
+    data_hora: datetime | None
+    relevancia: float
+
+
+async def _contar(session: AsyncSession, consulta: str) -> int:
+    return await session.scalar(
+        text('SELECT count(*) FROM busca WHERE busca MATCH :consulta'),
+        {'consulta': consulta},
+    )
+
+
+async def buscar(
+    session: AsyncSession,
+    paciente_id: int,
+    busca: str,
+    limite: int,
+    apos: tuple[float, int] | None = None,
+) -> list[Resultado]:
+    """
+    Documentos do paciente com todas as palavras buscadas, do mais relevante
+    ao menos relevante e, no empate, pelo `rowid`.
+
+    Aspas e operadores do texto buscado são descartados.
+
+    Args:
+        apos: Chave `(relevancia, id)` do último resultado da página
+            anterior.
+    """
+    termos = [
+        variantes(palavra)
+        for palavra in list(dict.fromkeys(palavras(busca)))[:MAX_TERMOS]
+    ]
+    if not termos:
+        return []
+
+    linhas = (
+        await session.execute(
+            text(
+                'SELECT busca.rowid AS id, busca.tipo, busca.texto, '
+                'registros.data_hora '
+                'FROM busca '
+                'LEFT JOIN registros ON registros.id = busca.rowid '
+                'WHERE busca MATCH :consulta'
+            ).columns(
+                id=Integer, tipo=String, texto=String, data_hora=DateTime
+            ),
+            {'consulta': consulta_fts(paciente_id, termos)},
+        )
+    ).all()
+    if not linhas:
+        return []
+
+    # Estatísticas do BM25 restritas ao paciente: total de documentos,
+    # documentos com cada termo e comprimento médio dos encontrados
+    total = await _contar(session, f'paciente : "p{paciente_id}"')
+    if len(termos) == 1:
+        com_termo = [len(linhas)]
+    else:
+        com_termo = [
+            await _contar(session, consulta_fts(paciente_id, [formas]))
+            for formas in termos
+        ]
+    pesos = [math.log((total - n + 0.5) / (n + 0.5) + 1) for n in com_termo]
+    documentos = [palavras(linha.texto) for linha in linhas]
+    media = sum(map(len, documentos)) / len(documentos)
+
+    pontuadas = []
+    for linha, documento in zip(linhas, documentos):
+        normalizacao = K1 * (1 - B + B * len(documento) / media)
+        relevancia = 0.0
+        for peso, formas in zip(pesos, termos):
+            frequencia = sum(palavra in formas for palavra in documento)
+            relevancia += (
+                peso * frequencia * (K1 + 1) / (frequencia + normalizacao)
+            )
+        if apos is None or (-relevancia, linha.id) > (-apos[0], apos[1]):
+            pontuadas.append((-relevancia, linha.id, linha))
+    pontuadas.sort(key=lambda pontuada: pontuada[:2])
+
+    # O trecho é montado apenas para os documentos da página
+    return [
+        Resultado(
+            linha.id,
+            linha.tipo,
+            trecho(linha.texto, termos),
+            linha.data_hora,
+            -negativa,
+        )
+        for negativa, _, linha in pontuadas[:limite]
+    ]
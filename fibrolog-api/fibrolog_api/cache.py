@@ -0,0 +1,110 @@
+"""
+Cache em memória dos pacientes autenticados.
+
+Evita a consulta ao banco em `get_current_paciente` quando o mesmo token é
+reutilizado. As entradas expiram pelo TTL configurado ou pela expiração do
+próprio token (o que ocorrer primeiro) e são descartadas em ordem LRU quando
+o cache atinge o tamanho máximo.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from fibrolog_api.models import Paciente
+
+_INIT_FIELDS = {f.name for f in fields(Paciente) if f.init}
+_COLUMNS = [attr.key for attr in inspect(Paciente).column_attrs]
+
+
+@dataclass
+class _Entrada:
+    paciente_id: int
+    dados: dict
+    expira_em: float
+
+
+class PrincipalCache:
+    """
+    Cache LRU com TTL de pacientes indexado pelo token de acesso.
+
+    Args:
+        max_size: Quantidade máxima de tokens mantidos em cache.
+        ttl: Tempo máximo, em segundos, que uma entrada permanece válida.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entradas: OrderedDict[str, _Entrada] = OrderedDict()
+        self._tokens_por_paciente: dict[int, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def get(self, token: str) -> dict | None:
+        entrada = self._entradas.get(token)
+        if entrada is None:
+            return None
+        if entrada.expira_em <= time.time():
+            self._remover(token)
+            return None
+        self._entradas.move_to_end(token)
+        return entrada.dados
+
+    def set(self, token: str, paciente: Paciente, token_exp: float) -> None:
+        if self.max_size <= 0:
+            return
+        if token in self._entradas:
+            self._remover(token)
+
+        self._entradas[token] = _Entrada(
+            paciente_id=paciente.id,
+            dados={key: getattr(paciente, key) for key in _COLUMNS},
+            expira_em=min(time.time() + self.ttl, token_exp),
+        )
+        self._tokens_por_paciente.setdefault(paciente.id, set()).add(token)
+
+        while len(self._entradas) > self.max_size:
+            self._remover(next(iter(self._entradas)))
+
+    def invalidate(self, paciente_id: int) -> None:
+        """Remove todas as entradas de um paciente."""
+        for token in self._tokens_por_paciente.pop(paciente_id, set()):
+            self._entradas.pop(token, None)
+
+    def clear(self) -> None:
+        self._entradas.clear()
+        self._tokens_por_paciente.clear()
+
+    def _remover(self, token: str) -> None:
+        entrada = self._entradas.pop(token)
+        tokens = self._tokens_por_paciente.get(entrada.paciente_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_por_paciente[entrada.paciente_id]
+
+
+async def attach_paciente(session: AsyncSession, dados: dict) -> Paciente:
+    """
+    Reconstrói um paciente em cache e o associa à sessão sem consultar o banco.
+
+    Args:
+        session: Sessão da requisição atual.
+        dados: Colunas do paciente armazenadas em cache.
+
+    Returns:
+        A instância persistente na sessão, pronta para ser alterada.
+    """
+    init_kwargs = {k: v for k, v in dados.items() if k in _INIT_FIELDS}
+    paciente = Paciente(**init_kwargs)
+    for key, value in dados.items():
+        if key not in _INIT_FIELDS:
+            setattr(paciente, key, value)
+    make_transient_to_detached(paciente)
+    return await session.merge(paciente, load=False)
@@ -0,0 +1,320 @@
+"""
+Compressão das respostas HTTP (gzip e, se o pacote `brotli` estiver
+instalado, brotli).
+
+O middleware é ASGI puro, para funcionar também com `StreamingResponse`:
+os primeiros pedaços do corpo são acumulados até atingir o tamanho mínimo;
+se a resposta termina antes disso, ela é enviada sem compressão. A partir
+daí, cada pedaço é comprimido e descarregado (`flush`) imediatamente, de modo
+que exportações longas continuam chegando aos poucos ao cliente.
+
+Só são comprimidos os tipos de conteúdo textuais (JSON, NDJSON, CSV, texto);
+mídias que já são comprimidas, como o áudio das crises, passam intactas. A
+resposta comprimida é outra representação do recurso, por isso a sua ETag
+passa a ser fraca (`W/`), o que `If-None-Match` continua aceitando.
+
+O tempo de CPU gasto comprimindo é acumulado por rota e exposto em
+`/metricas/compressao`.
+"""
+
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from http import HTTPStatus
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = (
+    'text/',
+    'application/json',
+    'application/x-ndjson',
+    'application/problem+json',
+    'application/xml',
+    'application/javascript',
+    'image/svg+xml',
+)
+# Respostas sem corpo ou parciais (Range) nunca são comprimidas
+SEM_CORPO_COMPRIMIVEL = {
+    HTTPStatus.NO_CONTENT,
+    HTTPStatus.PARTIAL_CONTENT,
+    HTTPStatus.NOT_MODIFIED,
+}
+NIVEL_GZIP = 6
+QUALIDADE_BROTLI = 4
+
+
+def escolher_codificacao(
+    accept_encoding: str, brotli_disponivel: bool = brotli is not None
+) -> str | None:
+    """
+    Codificação preferida entre as aceitas pelo cliente.
+
+    Valores com `q=0` são recusas explícitas; `*` aceita qualquer uma.
+    """
+    aceitas = {}
+    for item in accept_encoding.lower().split(','):
+        nome, _, parametros = item.strip().partition(';')
+        qualidade = 1.0
+        parametro = parametros.strip()
+        if parametro.startswith('q='):
+            try:
+                qualidade = float(parametro[2:])
+            except ValueError:
+                qualidade = 0.0
+        if nome:
+            aceitas[nome.strip()] = qualidade
+
+    candidatas = ['br', 'gzip'] if brotli_disponivel else ['gzip']
+    coringa = aceitas.get('*', 0.0)
+    pontuadas = [
+        (aceitas.get(nome, coringa), -posicao, nome)
+        for posicao, nome in enumerate(candidatas)
+    ]
+    qualidade, _, nome = max(pontuadas)
+    return nome if qualidade > 0 else None
+
+
+def comprimivel(content_type: str) -> bool:
+    return content_type.lower().startswith(TIPOS_COMPRIMIVEIS)
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(NIVEL_GZIP, wbits=31)
+
+    def comprimir(self, dados: bytes, fim: bool) -> bytes:
+        modo = zlib.Z_FINISH if fim else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(dados) + self._compressor.flush(modo)
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=QUALIDADE_BROTLI)
+
+    def comprimir(self, dados: bytes, fim: bool) -> bytes:
+        saida = self._compressor.process(dados)
+        final = self._compressor.finish() if fim else self._compressor.flush()
+        return saida + final
+
+
+COMPRESSORES = {'gzip': _Gzip, 'br': _Brotli}
+
+
+@dataclass
+class _MetricasRota:
+    respostas: int = 0
+    comprimidas: int = 0
+    bytes_originais: int = 0
+    bytes_enviados: int = 0
+    cpu: float = 0.0
+
+
+class MetricasCompressao:
+    """Bytes economizados e CPU gasta com compressão, por rota."""
+
+    def __init__(self):
+        self._rotas: defaultdict[str, _MetricasRota] = defaultdict(
+            _MetricasRota
+        )
+
+    def registrar(
+        self,
+        rota: str,
+        originais: int,
+        enviados: int,
+        cpu: float,
+        comprimida: bool,
+    ) -> None:
+        metricas = self._rotas[rota]
+        metricas.respostas += 1
+        metricas.comprimidas += comprimida
+        metricas.bytes_originais += originais
+        metricas.bytes_enviados += enviados
+        metricas.cpu += cpu
+
+    def resumo(self) -> dict:
+        return {
+            rota: {
+                'respostas': m.respostas,
+                'comprimidas': m.comprimidas,
+                'bytes_originais': m.bytes_originais,
+                'bytes_enviados': m.bytes_enviados,
+                'razao': (
+                    round(m.bytes_originais / m.bytes_enviados, 2)
+                    if m.bytes_enviados
+                    else None
+                ),
+                'cpu_total_ms': m.cpu * 1000,
+                'cpu_media_ms': m.cpu / (m.comprimidas or 1) * 1000,
+            }
+            for rota, m in sorted(self._rotas.items())
+        }
+
+    def limpar(self) -> None:
+        self._rotas.clear()
+
+
+metricas_compressao = MetricasCompressao()
+
+
+def _rota(scope: Scope) -> str:
+    rota = scope.get('route')
+    caminho = getattr(rota, 'path', None) or 'sem rota'
+    return f'{scope["method"]} {caminho}'
+
+
+class CompressaoMiddleware:
+    """
+    Comprime respostas textuais conforme o `Accept-Encoding` do cliente.
+
+    Args:
+        app: Aplicação ASGI.
+        minimo: Tamanho mínimo, em bytes, para comprimir uma resposta.
+        metricas: Onde registrar os tempos de compressão.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimo: int = 500,
+        metricas: MetricasCompressao = metricas_compressao,
+    ):
+        self.app = app
+        self.minimo = minimo
+        self.metricas = metricas
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        codificacao = escolher_codificacao(
+            Headers(scope=scope).get('accept-encoding', '')
+        )
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+        resposta = _RespostaComprimida(self, scope, send, codificacao)
+        await self.app(scope, receive, resposta.send)
+
+
+class _RespostaComprimida:
+    """Estado de uma resposta: aguardando, sem compressão ou comprimindo."""
+
+    def __init__(
+        self,
+        middleware: CompressaoMiddleware,
+        scope: Scope,
+        send: Send,
+        codificacao: str,
+    ):
+        self.middleware = middleware
+        self.scope = scope
+        self._send = send
+        self.codificacao = codificacao
+        self.inicio: Message | None = None
+        self.pendente: list[bytes] = []
+        self.tamanho_pendente = 0
+        self.compressor = None
+        self.passar = False
+        self.originais = 0
+        self.enviados = 0
+        self.cpu = 0.0
+
+    async def send(self, message: Message) -> None:
+        if self.passar:
+            await self._send(message)
+        elif message['type'] == 'http.response.start':
+            await self._iniciar(message)
+        elif message['type'] == 'http.response.body':
+            await self._corpo(message)
+        else:
+            await self._send(message)
+
+    async def _iniciar(self, message: Message) -> None:
+        headers = Headers(raw=message['headers'])
+        if (
+            message['status'] in SEM_CORPO_COMPRIMIVEL
+            or 'content-encoding' in headers
+            or not comprimivel(headers.get('content-type', ''))
+        ):
+            self.passar = True
+            await self._send(message)
+        else:
+            # O início só é enviado quando se sabe se haverá compressão.
+            self.inicio = {**message, 'headers': list(message['headers'])}
+
+    async def _corpo(self, message: Message) -> None:
+        corpo = message.get('body', b'')
+        mais = message.get('more_body', False)
+        self.originais += len(corpo)
+
+        if self.compressor is not None:
+            await self._enviar_comprimido(corpo, mais)
+            return
+
+        self.pendente.append(corpo)
+        self.tamanho_pendente += len(corpo)
+        if mais and self.tamanho_pendente < self.middleware.minimo:
+            return
+
+        corpo = b''.join(self.pendente)
+        self.pendente = []
+        if self.tamanho_pendente < self.middleware.minimo:
+            await self._enviar_sem_compressao(corpo)
+            return
+
+        self.compressor = COMPRESSORES[self.codificacao]()
+        headers = MutableHeaders(raw=self.inicio['headers'])
+        headers['Content-Encoding'] = self.codificacao
+        headers.add_vary_header('Accept-Encoding')
+        etag = headers.get('etag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = f'W/{etag}'
+        if mais:
+            del headers['Content-Length']
+        await self._enviar_comprimido(corpo, mais, headers)
+
+    async def _enviar_sem_compressao(self, corpo: bytes) -> None:
+        headers = MutableHeaders(raw=self.inicio['headers'])
+        headers.add_vary_header('Accept-Encoding')
+        await self._send(self.inicio)
+        await self._send({'type': 'http.response.body', 'body': corpo})
+        self.middleware.metricas.registrar(
+            _rota(self.scope), len(corpo), len(corpo), 0.0, comprimida=False
+        )
+
+    async def _enviar_comprimido(
+        self,
+        corpo: bytes,
+        mais: bool,
+        headers: MutableHeaders | None = None,
+    ) -> None:
+        inicio = time.thread_time()
+        comprimido = self.compressor.comprimir(corpo, fim=not mais)
+        self.cpu += time.thread_time() - inicio
+        self.enviados += len(comprimido)
+
+        if headers is not None:
+            if not mais:
+                headers['Content-Length'] = str(len(comprimido))
+            await self._send(self.inicio)
+        await self._send({
+            'type': 'http.response.body',
+            'body': comprimido,
+            'more_body': mais,
+        })
+        if not mais:
+            self.middleware.metricas.registrar(
+                _rota(self.scope),
+                self.originais,
+                self.enviados,
+                self.cpu,
+                comprimida=True,
+            )
@@ -0,0 +1,414 @@
+"""
+Estatísticas de coorte: distribuição da dor entre todos os pacientes.
+
+Job offline/administrativo, fora da API. A intensidade da dor é agrupada por
+sexo, por anos desde o diagnóstico (na data de cada registro) e por
+medicação em uso.
+
+Os pacientes são divididos em faixas contíguas de `id` com aproximadamente
+o mesmo número de registros diários, e cada faixa é processada em um
+processo de um `ProcessPoolExecutor`. O processo lê a sua faixa em lotes,
+converte cada lote em arrays NumPy e acumula, por grupo, o histograma da dor
+(0 a 10). Como a dor é inteira, o histograma é um agregado exato: contagem,
+soma, soma dos quadrados e quantis saem dele, e os parciais de processos
+diferentes são mesclados por soma.
+
+    python -m fibrolog_api.coorte [--workers N] [--saida ARQUIVO]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from fibrolog_api.database import dias_desde_epoca
+from fibrolog_api.models import Paciente, Registro, RegistroDiario
+from fibrolog_api.settings import Settings
+
+NIVEIS_DOR = 11
+TAMANHO_LOTE = 50_000
+# Mais faixas que processos equilibram a carga entre eles
+FAIXAS_POR_WORKER = 4
+# Limites, em anos desde o diagnóstico, das faixas de tempo de doença
+LIMITES_ANOS = (1, 3, 5, 10)
+ANOS_DIAGNOSTICO = (
+    'antes do diagnóstico',
+    '<1',
+    '1-3',
+    '3-5',
+    '5-10',
+    '10+',
+    'não informado',
+)
+NAO_INFORMADO = 'não informado'
+NENHUMA = 'nenhuma'
+
+_EPOCA = date(1970, 1, 1)
+_PALAVRA = re.compile(r'\b[^\W\d_]+\b')
+
+
+def medicamentos(texto: str | None) -> set[str]:
+    """
+    Nomes dos medicamentos de `medicacoes`, em minúsculas.
+
+    O campo é texto livre; cada item separado por vírgula, ponto e vírgula,
+    `+` ou quebra de linha contribui com a sua primeira palavra (ex.:
+    `Pregabalina 75mg (2x/dia)` -> `pregabalina`).
+    """
+    nomes = set()
+    for item in re.split(r'[,;+\n]', texto or ''):
+        palavra = _PALAVRA.search(item)
+        if palavra:
+            nomes.add(palavra.group().lower())
+    return nomes
+
+
+def _dias(valores) -> np.ndarray:
+    """Dias desde 1970-01-01 de uma sequência de datas."""
+    return np.array(valores, dtype='datetime64[D]').astype(np.int64)
+
+
+@dataclass
+class Atributos:
+    """Atributos dos pacientes em arrays alinhados, ordenados por `ids`."""
+
+    ids: np.ndarray
+    sexo: np.ndarray
+    diagnostico: np.ndarray
+    tem_diagnostico: np.ndarray
+    medicacoes: np.ndarray
+
+    def fatia(self, primeiro: int, ultimo: int) -> 'Atributos':
+        """Pacientes com `id` entre `primeiro` e `ultimo` (inclusive)."""
+        inicio, fim = np.searchsorted(self.ids, [primeiro, ultimo + 1])
+        return Atributos(
+            self.ids[inicio:fim],
+            self.sexo[inicio:fim],
+            self.diagnostico[inicio:fim],
+            self.tem_diagnostico[inicio:fim],
+            self.medicacoes[inicio:fim],
+        )
+
+
+@dataclass
+class Parcial:
+    """Histogramas da dor (grupo x nível) de uma parte dos registros."""
+
+    sexo: np.ndarray
+    anos_diagnostico: np.ndarray
+    medicacao: np.ndarray
+
+    @classmethod
+    def vazio(cls, sexos: int, medicacoes: int) -> 'Parcial':
+        return cls(
+            np.zeros((sexos, NIVEIS_DOR), dtype=np.int64),
+            np.zeros((len(ANOS_DIAGNOSTICO), NIVEIS_DOR), dtype=np.int64),
+            np.zeros((medicacoes, NIVEIS_DOR), dtype=np.int64),
+        )
+
+    def mesclar(self, outro: 'Parcial') -> 'Parcial':
+        self.sexo += outro.sexo
+        self.anos_diagnostico += outro.anos_diagnostico
+        self.medicacao += outro.medicacao
+        return self
+
+
+def _histograma(grupos: np.ndarray, dor: np.ndarray, n: int) -> np.ndarray:
+    return np.bincount(
+        grupos * NIVEIS_DOR + dor, minlength=n * NIVEIS_DOR
+    ).reshape(n, NIVEIS_DOR)
+
+
+def agregar_lote(
+    atributos: Atributos,
+    sexos: int,
+    paciente_ids: np.ndarray,
+    dias: np.ndarray,
+    dor: np.ndarray,
+) -> Parcial:
+    """
+    Histogramas de um lote de registros diários.
+
+    Args:
+        atributos: Atributos de todos os pacientes presentes no lote.
+        sexos: Número de grupos de sexo.
+        paciente_ids: Paciente de cada registro.
+        dias: Dia local de cada registro (dias desde 1970-01-01).
+        dor: Intensidade da dor de cada registro (0 a 10).
+    """
+    posicoes = np.searchsorted(atributos.ids, paciente_ids)
+    dor = dor.astype(np.int64)
+
+    anos = (dias - atributos.diagnostico[posicoes]) / 365.25
+    faixa = np.where(
+        anos < 0, 0, 1 + np.searchsorted(LIMITES_ANOS, anos, side='right')
+    )
+    faixa[~atributos.tem_diagnostico[posicoes]] = len(ANOS_DIAGNOSTICO) - 1
+
+    # Histograma de cada paciente, e então
+    # (pacientes x medicações)ᵀ @ (pacientes x níveis): o custo depende do
+    # número de pacientes, e não do de registros
+    por_paciente = _histograma(posicoes, dor, len(atributos.ids))
+    em_uso = atributos.medicacoes.astype(np.int64)
+
+    return Parcial(
+        _histograma(atributos.sexo[posicoes], dor, sexos),
+        _histograma(faixa, dor, len(ANOS_DIAGNOSTICO)),
+        em_uso.T @ por_paciente,
+    )
+
+
+async def _agregar_faixa(
+    database_url: str,
+    atributos: Atributos,
+    sexos: int,
+    tamanho_lote: int,
+) -> Parcial:
+    parcial = Parcial.vazio(sexos, atributos.medicacoes.shape[1])
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    try:
+        async with AsyncSession(engine) as session:
+            registros = Registro.__table__
+            diarios = RegistroDiario.__table__
+            # Dias como inteiros evitam criar um `date` por linha.
+            statement = (
+                select(
+                    registros.c.paciente_id,
+                    dias_desde_epoca(session, registros.c.dia_local),
+                    diarios.c.intensidade_dor,
+                )
+                .join(diarios, diarios.c.id == registros.c.id)
+                .where(
+                    registros.c.paciente_id.between(
+                        int(atributos.ids[0]), int(atributos.ids[-1])
+                    ),
+                    registros.c.dia_local.is_not(None),
+                )
+                .execution_options(yield_per=tamanho_lote)
+            )
+            resultado = await session.stream(statement)
+            async for linhas in resultado.partitions():
+                paciente_ids, dias, dor = (
+                    np.array(coluna, dtype=np.int64) for coluna in zip(*linhas)
+                )
+                parcial.mesclar(
+                    agregar_lote(atributos, sexos, paciente_ids, dias, dor)
+                )
+    finally:
+        await engine.dispose()
+    return parcial
+
+
+def agregar_faixa(
+    database_url: str,
+    atributos: Atributos,
+    sexos: int,
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> Parcial:
+    """Histogramas dos pacientes de `atributos`, lidos em lotes do banco."""
+    return asyncio.run(
+        _agregar_faixa(database_url, atributos, sexos, tamanho_lote)
+    )
+
+
+def dividir_faixas(
+    contagens: list[tuple[int, int]], quantidade: int
+) -> list[tuple[int, int]]:
+    """
+    Divide pacientes em faixas contíguas de `id` com cargas parecidas.
+
+    Args:
+        contagens: Pares (paciente_id, registros), em ordem de `id`.
+        quantidade: Número máximo de faixas.
+
+    Returns:
+        Pares (primeiro id, último id) de cada faixa.
+    """
+    total = sum(registros for _, registros in contagens)
+    alvo = max(total / max(quantidade, 1), 1)
+    faixas = []
+    primeiro = None
+    acumulado = 0
+    for paciente_id, registros in contagens:
+        if primeiro is None:
+            primeiro = paciente_id
+        acumulado += registros
+        if acumulado >= alvo * (len(faixas) + 1):
+            faixas.append((primeiro, paciente_id))
+            primeiro = None
+    if primeiro is not None:
+        faixas.append((primeiro, contagens[-1][0]))
+    return faixas
+
+
+def resumir(histograma: np.ndarray) -> dict:
+    """Contagem, média, desvio padrão, quartis e distribuição da dor."""
+    n = int(histograma.sum())
+    niveis = np.arange(NIVEIS_DOR)
+    media = float((histograma * niveis).sum() / n)
+    variancia = float((histograma * niveis * niveis).sum() / n - media**2)
+    acumulado = np.cumsum(histograma)
+    p25, mediana, p75 = (
+        int(np.searchsorted(acumulado, q * n)) for q in (0.25, 0.5, 0.75)
+    )
+    return {
+        'registros': n,
+        'media': round(media, 3),
+        'desvio_padrao': round(max(variancia, 0.0) ** 0.5, 3),
+        'p25': p25,
+        'mediana': mediana,
+        'p75': p75,
+        'distribuicao': histograma.tolist(),
+    }
+
+
+def _grupos(rotulos, histogramas: np.ndarray) -> dict:
+    return {
+        rotulo: resumir(histograma)
+        for rotulo, histograma in zip(rotulos, histogramas)
+        if histograma.any()
+    }
+
+
+async def _carregar_atributos(
+    conn,
+) -> tuple[Atributos, list[str], list[str]]:
+    linhas = (
+        await conn.execute(
+            select(
+                Paciente.id,
+                Paciente.sexo,
+                Paciente.data_diagnostico,
+                Paciente.medicacoes,
+            ).order_by(Paciente.id)
+        )
+    ).all()
+
+    sexos = [
+        (sexo or '').strip().upper() or NAO_INFORMADO
+        for _, sexo, _, _ in linhas
+    ]
+    nomes_sexo = sorted(set(sexos))
+    por_paciente = [medicamentos(texto) or {NENHUMA} for *_, texto in linhas]
+    nomes_medicacao = sorted(set().union(*por_paciente))
+    coluna = {nome: posicao for posicao, nome in enumerate(nomes_medicacao)}
+
+    em_uso = np.zeros((len(linhas), len(nomes_medicacao)), dtype=bool)
+    for posicao, nomes in enumerate(por_paciente):
+        em_uso[posicao, [coluna[nome] for nome in nomes]] = True
+
+    diagnosticos = [linha.data_diagnostico for linha in linhas]
+    atributos = Atributos(
+        ids=np.array([linha.id for linha in linhas], dtype=np.int64),
+        sexo=np.searchsorted(nomes_sexo, sexos).astype(np.int64),
+        diagnostico=_dias([d.date() if d else _EPOCA for d in diagnosticos]),
+        tem_diagnostico=np.array([d is not None for d in diagnosticos]),
+        medicacoes=em_uso,
+    )
+    return atributos, nomes_sexo, nomes_medicacao
+
+
+async def calcular_coorte(
+    database_url: str | None = None,
+    workers: int | None = None,
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> dict:
+    """
+    Distribuição da dor por sexo, tempo de diagnóstico e medicação.
+
+    Args:
+        database_url: Banco a ler; o da configuração, se omitido.
+        workers: Número de processos; um por CPU, se omitido.
+        tamanho_lote: Registros lidos por vez em cada processo.
+    """
+    database_url = database_url or Settings().DATABASE_URL
+    workers = workers or os.cpu_count() or 1
+
+    registros = Registro.__table__
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    try:
+        async with engine.connect() as conn:
+            atributos, nomes_sexo, nomes_medicacao = await _carregar_atributos(
+                conn
+            )
+            contagens = (
+                await conn.execute(
+                    select(registros.c.paciente_id, func.count())
+                    .where(
+                        registros.c.tipo_registro == 'diario',
+                        registros.c.dia_local.is_not(None),
+                    )
+                    .group_by(registros.c.paciente_id)
+                    .order_by(registros.c.paciente_id)
+                )
+            ).all()
+    finally:
+        await engine.dispose()
+
+    total = Parcial.vazio(len(nomes_sexo), len(nomes_medicacao))
+    faixas = dividir_faixas(contagens, workers * FAIXAS_POR_WORKER)
+    if faixas:
+        loop = asyncio.get_running_loop()
+        # 'spawn' evita herdar o estado do loop de eventos e das conexões.
+        with ProcessPoolExecutor(
+            min(workers, len(faixas)),
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            parciais = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        pool,
+                        agregar_faixa,
+                        database_url,
+                        atributos.fatia(primeiro, ultimo),
+                        len(nomes_sexo),
+                        tamanho_lote,
+                    )
+                    for primeiro, ultimo in faixas
+                )
+            )
+        for parcial in parciais:
+            total.mesclar(parcial)
+
+    return {
+        'registros': int(total.sexo.sum()),
+        'pacientes': len(contagens),
+        'por_sexo': _grupos(nomes_sexo, total.sexo),
+        'por_anos_diagnostico': _grupos(
+            ANOS_DIAGNOSTICO, total.anos_diagnostico
+        ),
+        'por_medicacao': _grupos(nomes_medicacao, total.medicacao),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=(
+            'Calcula a distribuição da dor por sexo, tempo de diagnóstico '
+            'e medicação, entre todos os pacientes.'
+        )
+    )
+    parser.add_argument(
+        '--workers', type=int, help='Número de processos (padrão: CPUs).'
+    )
+    parser.add_argument(
+        '--saida', help='Arquivo JSON de saída (padrão: saída padrão).'
+    )
+    argumentos = parser.parse_args()
+    resultado = asyncio.run(calcular_coorte(workers=argumentos.workers))
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if argumentos.saida:
+        with open(argumentos.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+    else:
+        print(texto)
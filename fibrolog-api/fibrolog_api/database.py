@@ -1,3 +1,5 @@
+from sqlalchemy import Date, Integer, Table, cast, func, literal
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -13,3 +15,47 @@ async_session = sessionmaker(
 async def get_session():
     async with async_session() as session:
         yield session
+
+
+def upsert(session: AsyncSession, table: Table):
+    """
+    Retorna um `INSERT` com suporte a `ON CONFLICT` para o dialeto da sessão.
+
+    Args:
+        session: Sessão cujo banco determina o dialeto.
+        table: Tabela de destino.
+    """
+    if session.bind.dialect.name == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def dia_de(session: AsyncSession, coluna):
+    """Expressão SQL com a data (sem hora) de uma coluna `DateTime`."""
+    if session.bind.dialect.name == 'postgresql':
+        return cast(coluna, Date)
+    return func.date(coluna)
+
+
+def dias_desde_epoca(session: AsyncSession, coluna):
+    """Expressão SQL com o número de dias de 1970-01-01 até a data `coluna`."""
+    if session.bind.dialect.name == 'postgresql':
+        return coluna - cast(literal('1970-01-01'), Date)
+    return cast(func.julianday(coluna) - 2440587.5, Integer)
+
+
+def inicio_periodo(session: AsyncSession, coluna, periodo: str):
+    """
+    Expressão SQL com a data de início da semana ou do mês de `coluna`.
+
+    Args:
+        session: Sessão cujo banco determina o dialeto.
+        coluna: Expressão do tipo data.
+        periodo: `week` (semana iniciada na segunda-feira) ou `month`.
+    """
+    if session.bind.dialect.name == 'postgresql':
+        return cast(func.date_trunc(periodo, coluna), Date)
+    if periodo == 'month':
+        return func.strftime('%Y-%m-01', coluna)
+    # 'weekday 0' avança até o domingo (ou mantém, se já for domingo).
+    return func.date(coluna, literal('weekday 0'), literal('-6 days'))
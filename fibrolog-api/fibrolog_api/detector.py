@@ -0,0 +1,248 @@
+"""
+Detecção online de crises a partir dos registros diários.
+
+Para a dor e a fadiga, o detector mantém uma linha de base por média móvel
+exponencial (EWMA) e um CUSUM unilateral dos desvios padronizados em relação
+a essa base. Cada dia registrado atualiza o estado em O(1); quando o CUSUM
+acumula um aumento persistente, um `Alerta` do tipo `crise` é criado e o
+CUSUM é zerado.
+
+O estado é sequencial no tempo. Registros de um dia novo avançam o detector;
+correções do último dia reaplicam o passo a partir do estado anterior
+guardado em `anterior`; alterações em dias mais antigos (e exclusões) marcam
+o estado como desatualizado, e ele é refeito offline com:
+
+    python -m fibrolog_api.detector [--paciente ID] [--todos]
+"""
+
+import argparse
+import asyncio
+import math
+from dataclasses import asdict, dataclass, fields
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.database import async_session
+from fibrolog_api.models import (
+    Alerta,
+    DetectorCrise,
+    Registro,
+    RegistroDiario,
+)
+from fibrolog_api.relogio import utcnow
+
+METRICAS = {'dor': 'intensidade_dor', 'fadiga': 'nivel_fadiga'}
+
+# Peso de cada novo dia na linha de base
+ALFA = 0.1
+# Folga do CUSUM, em desvios padrão: variações menores não acumulam
+FOLGA = 0.5
+# CUSUM da dor que dispara o alerta; metade dele basta se a fadiga também
+# tiver acumulado metade
+LIMIAR = 5.0
+# Dias usados apenas para formar a linha de base
+DIAS_AQUECIMENTO = 7
+# Evita desvios padrão próximos de zero em séries quase constantes
+DESVIO_MINIMO = 1.0
+
+DESCRICAO_ALERTA = (
+    'Possível crise: {sintomas} acima do seu padrão nos últimos dias.'
+)
+
+
+@dataclass
+class EstadoDetector:
+    dias: int = 0
+    media_dor: float = 0.0
+    variancia_dor: float = 0.0
+    cusum_dor: float = 0.0
+    media_fadiga: float = 0.0
+    variancia_fadiga: float = 0.0
+    cusum_fadiga: float = 0.0
+
+    @classmethod
+    def de(cls, detector: DetectorCrise) -> 'EstadoDetector':
+        return cls(**{f.name: getattr(detector, f.name) for f in fields(cls)})
+
+    def copiar_para(self, detector: DetectorCrise) -> None:
+        for chave, valor in asdict(self).items():
+            setattr(detector, chave, valor)
+
+    def passo(self, valores: dict) -> str | None:
+        """
+        Incorpora um dia ao estado.
+
+        Args:
+            valores: Valores do registro diário do dia.
+
+        Returns:
+            Os sintomas em alta, se o padrão de crise foi atingido.
+        """
+        for nome, campo in METRICAS.items():
+            x = float(valores[campo])
+            media = getattr(self, f'media_{nome}')
+            variancia = getattr(self, f'variancia_{nome}')
+
+            if self.dias == 0:
+                media, variancia = x, 0.0
+            else:
+                if self.dias >= DIAS_AQUECIMENTO:
+                    desvio = max(math.sqrt(variancia), DESVIO_MINIMO)
+                    cusum = getattr(self, f'cusum_{nome}')
+                    cusum = max(0.0, cusum + (x - media) / desvio - FOLGA)
+                    setattr(self, f'cusum_{nome}', cusum)
+                diferenca = x - media
+                media += ALFA * diferenca
+                variancia = (1 - ALFA) * (
+                    variancia + ALFA * diferenca * diferenca
+                )
+
+            setattr(self, f'media_{nome}', media)
+            setattr(self, f'variancia_{nome}', variancia)
+        self.dias += 1
+
+        if self.cusum_dor >= LIMIAR:
+            sintomas = 'dor'
+        elif self.cusum_dor >= LIMIAR / 2 and self.cusum_fadiga >= LIMIAR / 2:
+            sintomas = 'dor e fadiga'
+        else:
+            return None
+        self.cusum_dor = self.cusum_fadiga = 0.0
+        return sintomas
+
+
+async def detectar_crises(
+    session: AsyncSession, paciente_id: int, dias: list[tuple[date, dict]]
+) -> None:
+    """
+    Atualiza o detector com registros diários gravados, sem fazer commit.
+
+    Args:
+        session: Sessão da transação de escrita.
+        paciente_id: Paciente dono dos registros.
+        dias: Pares (dia local, valores do registro); dias nulos são
+            ignorados.
+    """
+    detector = await session.get(
+        DetectorCrise, paciente_id, with_for_update=True
+    )
+    if detector is None:
+        detector = DetectorCrise(paciente_id=paciente_id)
+        session.add(detector)
+
+    for dia, valores in sorted(
+        (item for item in dias if item[0] is not None), key=lambda i: i[0]
+    ):
+        if detector.ultimo_dia is None or dia > detector.ultimo_dia:
+            estado = EstadoDetector.de(detector)
+            detector.anterior = asdict(estado)
+        elif dia == detector.ultimo_dia and detector.anterior is not None:
+            estado = EstadoDetector(**detector.anterior)
+        else:
+            detector.desatualizado = True
+            continue
+
+        sintomas = estado.passo(valores)
+        estado.copiar_para(detector)
+        detector.ultimo_dia = dia
+
+        if sintomas and detector.ultimo_alerta_dia != dia:
+            detector.ultimo_alerta_dia = dia
+            agora = utcnow()
+            session.add(
+                Alerta(
+                    tipo='crise',
+                    data_hora=agora,
+                    paciente_id=paciente_id,
+                    descricao=DESCRICAO_ALERTA.format(sintomas=sintomas),
+                    proxima_execucao=agora,
+                )
+            )
+
+
+async def invalidar_detector(session: AsyncSession, paciente_id: int) -> None:
+    """Marca o detector para reconstrução (ex.: após excluir um registro)."""
+    detector = await session.get(DetectorCrise, paciente_id)
+    if detector is not None:
+        detector.desatualizado = True
+
+
+async def reconstruir_detector(
+    session: AsyncSession, paciente_id: int
+) -> DetectorCrise:
+    """
+    Refaz o estado do detector a partir do histórico, sem criar alertas.
+
+    As séries são lidas coluna a coluna, em ordem de dia.
+    """
+    registros = Registro.__table__
+    diarios = RegistroDiario.__table__
+    resultado = await session.execute(
+        select(
+            registros.c.dia_local, *(diarios.c[c] for c in METRICAS.values())
+        )
+        .join(diarios, diarios.c.id == registros.c.id)
+        .where(
+            registros.c.paciente_id == paciente_id,
+            registros.c.dia_local.is_not(None),
+        )
+        .order_by(registros.c.dia_local)
+    )
+
+    estado = EstadoDetector()
+    anterior = None
+    ultimo_dia = None
+    for linha in resultado:
+        anterior = asdict(estado)
+        estado.passo(linha._mapping)
+        ultimo_dia = linha.dia_local
+
+    detector = await session.get(
+        DetectorCrise, paciente_id, with_for_update=True
+    )
+    if detector is None:
+        detector = DetectorCrise(paciente_id=paciente_id)
+        session.add(detector)
+    estado.copiar_para(detector)
+    detector.anterior = anterior
+    detector.ultimo_dia = ultimo_dia
+    detector.desatualizado = False
+    return detector
+
+
+async def _main(paciente_id: int | None, todos: bool) -> None:
+    async with async_session() as session:
+        if paciente_id is not None:
+            pacientes = [paciente_id]
+        elif todos:
+            pacientes = await session.scalars(
+                select(Registro.paciente_id).distinct()
+            )
+        else:
+            pacientes = await session.scalars(
+                select(DetectorCrise.paciente_id).where(
+                    DetectorCrise.desatualizado
+                )
+            )
+        for paciente in list(pacientes):
+            await reconstruir_detector(session, paciente)
+            await session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=(
+            'Reconstrói o estado do detector de crises. Sem argumentos, '
+            'apenas os pacientes marcados como desatualizados.'
+        )
+    )
+    parser.add_argument(
+        '--paciente', type=int, help='Reconstrói apenas este paciente.'
+    )
+    parser.add_argument(
+        '--todos', action='store_true', help='Reconstrói todos os pacientes.'
+    )
+    argumentos = parser.parse_args()
+    asyncio.run(_main(argumentos.paciente, argumentos.todos))
@@ -0,0 +1,233 @@
+"""
+Agregação de sintomas por semana ou mês.
+
+Os registros diários são agrupados pelo `dia_local` (a data no fuso horário
+do paciente no momento do registro), de modo que o agrupamento não depende
+do fuso do servidor. Semanas começam na segunda-feira.
+
+Os períodos inteiramente contidos no intervalo pedido são lidos dos resumos
+(`fibrolog_api.resumos`), com custo proporcional ao número de períodos. Só
+os períodos cortados pelas datas `from`/`to` (no máximo dois) são agregados
+a partir dos registros.
+
+O mapa de calor da dor conta, em uma única consulta, os registros com cada
+bit da máscara `regioes_dor` (`fibrolog_api.regioes`).
+"""
+
+from datetime import date, timedelta
+from typing import Literal
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.database import inicio_periodo
+from fibrolog_api.models import (
+    EstadoEmocional,
+    Registro,
+    RegistroDiario,
+    ResumoRegistros,
+)
+from fibrolog_api.regioes import REGIOES, ROTULOS
+from fibrolog_api.resumos import EMOCOES, fim_do_periodo, inicio_do_periodo
+
+Bucket = Literal['week', 'month']
+
+
+def _data(valor) -> date:
+    # No SQLite as funções de data retornam texto.
+    return valor if isinstance(valor, date) else date.fromisoformat(valor)
+
+
+async def _agregar_registros(
+    session: AsyncSession,
+    paciente_id: int,
+    bucket: Bucket,
+    de: date,
+    ate: date,
+) -> list[tuple]:
+    registros = Registro.__table__
+    diarios = RegistroDiario.__table__
+
+    periodo = inicio_periodo(session, registros.c.dia_local, bucket)
+    statement = (
+        select(
+            periodo,
+            func.count(),
+            func.avg(diarios.c.intensidade_dor),
+            func.avg(diarios.c.qualidade_sono),
+            func.avg(diarios.c.nivel_fadiga),
+            *(
+                func.sum(
+                    case((diarios.c.estado_emocional == estado, 1), else_=0)
+                )
+                for estado in EstadoEmocional
+            ),
+        )
+        .select_from(registros)
+        .join(diarios, diarios.c.id == registros.c.id)
+        .where(
+            registros.c.paciente_id == paciente_id,
+            registros.c.dia_local.between(de, ate),
+        )
+        .group_by(periodo)
+    )
+    return [
+        (_data(linha[0]), *linha[1:])
+        for linha in await session.execute(statement)
+    ]
+
+
+async def _ler_resumos(
+    session: AsyncSession,
+    paciente_id: int,
+    bucket: Bucket,
+    de: date | None,
+    ate: date | None,
+) -> list[tuple]:
+    resumos = ResumoRegistros.__table__
+    statement = select(
+        resumos.c.inicio,
+        resumos.c.registros,
+        resumos.c.soma_intensidade_dor / resumos.c.registros,
+        resumos.c.soma_qualidade_sono / resumos.c.registros,
+        resumos.c.soma_nivel_fadiga / resumos.c.registros,
+        *(resumos.c[coluna] for coluna in EMOCOES.values()),
+    ).where(
+        resumos.c.paciente_id == paciente_id,
+        resumos.c.periodo == bucket,
+        resumos.c.registros > 0,
+    )
+    if de:
+        statement = statement.where(resumos.c.inicio >= de)
+    if ate:
+        statement = statement.where(resumos.c.inicio <= ate)
+    return list(await session.execute(statement))
+
+
+async def agregar_registros_diarios(
+    session: AsyncSession,
+    paciente_id: int,
+    bucket: Bucket,
+    de: date | None = None,
+    ate: date | None = None,
+) -> dict:
+    """
+    Calcula médias e distribuição emocional por período.
+
+    Args:
+        session: Sessão da requisição atual.
+        paciente_id: Paciente dono dos registros.
+        bucket: Granularidade do agrupamento.
+        de: Primeiro dia local incluído, se informado.
+        ate: Último dia local incluído, se informado.
+
+    Returns:
+        Um dicionário de listas paralelas, uma posição por período, em ordem
+        cronológica.
+    """
+    # Intervalo coberto por períodos completos
+    inteiro_de = de
+    if de and inicio_do_periodo(de, bucket) != de:
+        inteiro_de = fim_do_periodo(inicio_do_periodo(de, bucket), bucket)
+        inteiro_de += timedelta(days=1)
+    inteiro_ate = ate
+    if ate and fim_do_periodo(inicio_do_periodo(ate, bucket), bucket) != ate:
+        inteiro_ate = inicio_do_periodo(ate, bucket) - timedelta(days=1)
+
+    if inteiro_de and inteiro_ate and inteiro_de > inteiro_ate:
+        linhas = await _agregar_registros(
+            session, paciente_id, bucket, de, ate
+        )
+    else:
+        linhas = await _ler_resumos(
+            session, paciente_id, bucket, inteiro_de, inteiro_ate
+        )
+        if de and de < inteiro_de:
+            linhas += await _agregar_registros(
+                session,
+                paciente_id,
+                bucket,
+                de,
+                inteiro_de - timedelta(days=1),
+            )
+        if ate and ate > inteiro_ate:
+            linhas += await _agregar_registros(
+                session,
+                paciente_id,
+                bucket,
+                inteiro_ate + timedelta(days=1),
+                ate,
+            )
+    linhas.sort(key=lambda linha: linha[0])
+
+    return {
+        'bucket': bucket,
+        'periodos': [linha[0] for linha in linhas],
+        'registros': [linha[1] for linha in linhas],
+        'intensidade_dor': [round(float(linha[2]), 2) for linha in linhas],
+        'qualidade_sono': [round(float(linha[3]), 2) for linha in linhas],
+        'nivel_fadiga': [round(float(linha[4]), 2) for linha in linhas],
+        'estado_emocional': {
+            estado.value: [linha[5 + posicao] for linha in linhas]
+            for posicao, estado in enumerate(EstadoEmocional)
+        },
+    }
+
+
+async def frequencia_regioes(
+    session: AsyncSession,
+    paciente_id: int,
+    de: date | None = None,
+    ate: date | None = None,
+) -> dict:
+    """
+    Conta os registros diários com dor em cada região do WPI.
+
+    Args:
+        session: Sessão da requisição atual.
+        paciente_id: Paciente dono dos registros.
+        de: Primeiro dia local incluído, se informado.
+        ate: Último dia local incluído, se informado.
+
+    Returns:
+        O total de registros, a média de regiões por registro e as regiões
+        da mais à menos frequente (no empate, na ordem de `RegiaoDor`).
+    """
+    registros = Registro.__table__
+    diarios = RegistroDiario.__table__
+
+    statement = (
+        select(
+            func.count(),
+            *(
+                func.sum(diarios.c.regioes_dor.op('>>')(bit).op('&')(1))
+                for bit in range(len(REGIOES))
+            ),
+        )
+        .select_from(registros)
+        .join(diarios, diarios.c.id == registros.c.id)
+        .where(registros.c.paciente_id == paciente_id)
+    )
+    if de:
+        statement = statement.where(registros.c.dia_local >= de)
+    if ate:
+        statement = statement.where(registros.c.dia_local <= ate)
+    total, *contagens = (await session.execute(statement)).one()
+    # Sem registros, as somas são nulas
+    contagens = [contagem or 0 for contagem in contagens]
+
+    frequencias = [
+        {
+            'regiao': regiao,
+            'rotulo': ROTULOS[regiao],
+            'registros': contagem,
+            'proporcao': round(contagem / total, 4) if total else 0.0,
+        }
+        for regiao, contagem in zip(REGIOES, contagens)
+    ]
+    frequencias.sort(key=lambda frequencia: -frequencia['registros'])
+    return {
+        'registros': total,
+        'media_regioes': round(sum(contagens) / total, 2) if total else 0.0,
+        'regioes': frequencias,
+    }
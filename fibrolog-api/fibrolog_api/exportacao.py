@@ -0,0 +1,104 @@
+"""
+Exportação do histórico completo de registros de um paciente.
+
+O histórico é lido com `AsyncSession.stream` (cursor do lado do servidor, em
+lotes de `LOTE_EXPORTACAO` linhas) e convertido para CSV ou NDJSON à medida
+que as linhas chegam, de modo que o uso de memória não depende do tamanho do
+histórico. A consulta projeta apenas colunas, com `LEFT JOIN` nas tabelas de
+registros diários e de crises, evitando instanciar objetos ORM.
+"""
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from datetime import date, datetime
+from enum import Enum
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.models import Registro, RegistroCrise, RegistroDiario
+
+LOTE_EXPORTACAO = 500
+
+MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _consulta_historico(paciente_id: int):
+    registros = Registro.__table__
+    diarios = RegistroDiario.__table__
+    crises = RegistroCrise.__table__
+
+    return (
+        select(
+            registros.c.id,
+            registros.c.tipo_registro,
+            registros.c.data_hora,
+            func.coalesce(
+                diarios.c.intensidade_dor, crises.c.intensidade_dor
+            ).label('intensidade_dor'),
+            diarios.c.qualidade_sono,
+            diarios.c.nivel_fadiga,
+            diarios.c.estado_emocional,
+            diarios.c.localizacao_dor,
+            crises.c.duracao,
+            crises.c.texto_transcrito,
+        )
+        .select_from(registros)
+        .outerjoin(diarios, diarios.c.id == registros.c.id)
+        .outerjoin(crises, crises.c.id == registros.c.id)
+        .where(registros.c.paciente_id == paciente_id)
+        .order_by(registros.c.data_hora, registros.c.id)
+        .execution_options(yield_per=LOTE_EXPORTACAO)
+    )
+
+
+CAMPOS = [column.name for column in _consulta_historico(0).selected_columns]
+
+
+def _valor(valor):
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _csv(linhas: list) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(linhas)
+    return buffer.getvalue()
+
+
+async def exportar_historico(
+    session: AsyncSession, paciente_id: int, formato: str
+) -> AsyncIterator[str]:
+    """
+    Gera o histórico de registros (diários e crises) do paciente.
+
+    Args:
+        session: Sessão usada para o streaming da consulta.
+        paciente_id: Paciente dono dos registros.
+        formato: `csv` (com cabeçalho) ou `ndjson` (um objeto por linha).
+
+    Yields:
+        Trechos do arquivo, um por lote de linhas lidas do banco.
+    """
+    if formato == 'csv':
+        yield _csv([CAMPOS])
+
+    resultado = await session.stream(_consulta_historico(paciente_id))
+    async for lote in resultado.partitions():
+        linhas = [[_valor(valor) for valor in row] for row in lote]
+        if formato == 'csv':
+            yield _csv(linhas)
+        else:
+            yield ''.join(
+                json.dumps(dict(zip(CAMPOS, linha)), ensure_ascii=False) + '\n'
+                for linha in linhas
+            )
@@ -0,0 +1,143 @@
+"""
+Filas com reserva sobre uma tabela do banco, usadas pela transcrição
+(`fibrolog_api.transcricao`) e pelas notificações
+(`fibrolog_api.notificacoes`).
+
+As linhas da fila têm as colunas `id`, `estado`, `dono`, `tentativas`,
+`erro` e `disponivel_em`:
+
+- Reserva: um `UPDATE` condicional passa as linhas disponíveis para o estado
+  reservado, com um dono novo e `disponivel_em` no fim do prazo de
+  visibilidade. Linhas reservadas cujo prazo expirou também estão
+  disponíveis, e o novo dono impede o anterior de alterá-las.
+- Falha: a linha volta a `pendente` com espera exponencial; esgotadas as
+  tentativas, fica como `falhou`.
+
+O trabalho de cada fila (motor de transcrição, remetente) é configurável no
+formato `modulo:Classe`, carregado por `instanciar`.
+"""
+
+import importlib
+import random
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.relogio import utcnow
+
+PENDENTE = 'pendente'
+FALHOU = 'falhou'
+
+BACKOFF_MAXIMO = 60 * 60
+
+
+def instanciar(nome: str):
+    """Instancia a classe `modulo:Classe`."""
+    modulo, _, classe = nome.partition(':')
+    return getattr(importlib.import_module(modulo), classe)()
+
+
+def espera_para_nova_tentativa(tentativas: int, base: float) -> float:
+    """Backoff exponencial com jitter (entre metade e o total do prazo)."""
+    prazo = min(base * 2 ** (tentativas - 1), BACKOFF_MAXIMO)
+    return prazo * random.uniform(0.5, 1.0)
+
+
+async def reservar(  # noqa: PLR0913, PLR0917
+    session: AsyncSession,
+    modelo,
+    reservado: str,
+    quantidade: int,
+    visibilidade: float,
+    *condicoes,
+) -> list:
+    """
+    Reserva as linhas de `modelo` disponíveis há mais tempo, com um dono
+    comum, e faz commit.
+
+    Args:
+        session: Sessão do worker.
+        modelo: Classe mapeada da fila.
+        reservado: Estado das linhas reservadas.
+        quantidade: Número máximo de linhas.
+        visibilidade: Segundos de reserva.
+        condicoes: Filtros adicionais das linhas disponíveis.
+    """
+    agora = utcnow()
+    disponivel = (
+        *condicoes,
+        modelo.estado.in_((PENDENTE, reservado)),
+        modelo.disponivel_em <= agora,
+    )
+    candidatas = (
+        select(modelo.id)
+        .where(*disponivel)
+        .order_by(modelo.disponivel_em, modelo.id)
+        .limit(quantidade)
+        .with_for_update(skip_locked=True)
+    )
+    # As condições são repetidas: linhas reservadas por outro worker entre
+    # a seleção e a atualização ficam de fora.
+    reservadas = (
+        await session.scalars(
+            update(modelo)
+            .where(modelo.id.in_(candidatas), *disponivel)
+            .values(
+                estado=reservado,
+                dono=uuid.uuid4().hex,
+                tentativas=modelo.tentativas + 1,
+                disponivel_em=agora + timedelta(seconds=visibilidade),
+            )
+            .returning(modelo)
+        )
+    ).all()
+    await session.commit()
+    return reservadas
+
+
+async def falhar(  # noqa: PLR0913, PLR0917
+    session: AsyncSession,
+    linha,
+    reservada: tuple,
+    erro: str,
+    max_tentativas: int,
+    backoff: float,
+) -> bool | None:
+    """
+    Agenda uma nova tentativa da linha com backoff ou, esgotadas as
+    tentativas, marca a falha definitiva. Não faz commit.
+
+    Args:
+        session: Sessão do worker.
+        linha: Linha reservada que falhou.
+        reservada: Condições de que a linha ainda pertence ao worker.
+        erro: Descrição do erro, gravada na linha.
+        max_tentativas: Tentativas antes da falha definitiva.
+        backoff: Espera, em segundos, antes da segunda tentativa.
+
+    Returns:
+        True se haverá nova tentativa, False se a falha é definitiva e None
+        se a reserva foi perdida.
+    """
+    modelo = type(linha)
+    nova_tentativa = linha.tentativas < max_tentativas
+    valores = {'erro': erro[:1000], 'dono': None}
+    if nova_tentativa:
+        espera = espera_para_nova_tentativa(linha.tentativas, backoff)
+        valores |= {
+            'estado': PENDENTE,
+            'disponivel_em': utcnow() + timedelta(seconds=espera),
+        }
+    else:
+        valores['estado'] = FALHOU
+    resultado = await session.execute(
+        update(modelo)
+        .where(modelo.id == linha.id, *reservada)
+        .values(**valores)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount == 0:
+        return None
+    return nova_tentativa
@@ -0,0 +1,132 @@
+"""
+Serviço assíncrono de hash de senhas executado em um pool de processos.
+
+O Argon2 é propositalmente caro em CPU; executá-lo dentro dos handlers
+assíncronos bloqueia o event loop do uvicorn. Este módulo despacha o hash e a
+verificação para um `ProcessPoolExecutor` limitado, rejeitando novas tarefas
+quando a fila está cheia (back-pressure) e coletando métricas de tempo de
+espera na fila e de tempo de hash.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from pwdlib import PasswordHash
+
+pwd_context = PasswordHash.recommended()
+
+
+def _hash(password: str) -> tuple[str, float]:
+    inicio = time.perf_counter()
+    hashed = pwd_context.hash(password)
+    return hashed, time.perf_counter() - inicio
+
+
+def _verify(plain_password: str, hashed_password: str) -> tuple[bool, float]:
+    inicio = time.perf_counter()
+    valido = pwd_context.verify(plain_password, hashed_password)
+    return valido, time.perf_counter() - inicio
+
+
+class HashingSaturatedError(Exception):
+    """Lançada quando o pool de hash atingiu o limite de tarefas pendentes."""
+
+
+@dataclass
+class HashingMetrics:
+    """Métricas acumuladas do serviço de hash (tempos em segundos)."""
+
+    concluidas: int = 0
+    rejeitadas: int = 0
+    espera_total: float = 0.0
+    espera_max: float = 0.0
+    hash_total: float = 0.0
+    hash_max: float = 0.0
+
+    def registrar(self, espera: float, duracao_hash: float) -> None:
+        self.concluidas += 1
+        self.espera_total += espera
+        self.espera_max = max(self.espera_max, espera)
+        self.hash_total += duracao_hash
+        self.hash_max = max(self.hash_max, duracao_hash)
+
+    def resumo(self) -> dict:
+        n = self.concluidas or 1
+        return {
+            'concluidas': self.concluidas,
+            'rejeitadas': self.rejeitadas,
+            'espera_media_ms': self.espera_total / n * 1000,
+            'espera_max_ms': self.espera_max * 1000,
+            'hash_medio_ms': self.hash_total / n * 1000,
+            'hash_max_ms': self.hash_max * 1000,
+        }
+
+
+class PasswordHasher:
+    """
+    Executa hash e verificação de senhas em um pool de processos limitado.
+
+    Args:
+        max_workers: Número de processos do pool.
+        max_queue: Quantidade máxima de tarefas aguardando um processo livre.
+            Ao exceder `max_workers + max_queue` tarefas pendentes, novas
+            chamadas lançam `HashingSaturatedError`.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.metrics = HashingMetrics()
+        self._pendentes = 0
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def pendentes(self) -> int:
+        return self._pendentes
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        if self._pendentes >= self.max_workers + self.max_queue:
+            self.metrics.rejeitadas += 1
+            raise HashingSaturatedError
+
+        self._pendentes += 1
+        inicio = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            resultado, duracao_hash = await loop.run_in_executor(
+                self._get_executor(), fn, *args
+            )
+        finally:
+            self._pendentes -= 1
+
+        # O tempo que não foi gasto calculando o hash foi gasto na fila
+        # (incluindo a serialização entre processos).
+        espera = max(time.perf_counter() - inicio - duracao_hash, 0.0)
+        self.metrics.registrar(espera, duracao_hash)
+        return resultado
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, plain_password, hashed_password)
+
+    def metricas(self) -> dict:
+        return {
+            'workers': self.max_workers,
+            'fila_max': self.max_queue,
+            'pendentes': self._pendentes,
+            **self.metrics.resumo(),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
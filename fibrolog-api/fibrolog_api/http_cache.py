@@ -0,0 +1,49 @@
+"""
+ETags e requisições condicionais (`If-None-Match`).
+
+Os handlers calculam a ETag a partir de um contador de versão obtido por uma
+consulta barata (uma coluna, via índice) e só carregam e serializam o recurso
+quando a versão do cliente está desatualizada. `Cache-Control: no-cache`
+obriga o cliente a revalidar a cada uso, e `private` impede que caches
+compartilhados guardem dados do paciente.
+"""
+
+import hashlib
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+CACHE_CONTROL = 'private, no-cache'
+
+
+def make_etag(*partes) -> str:
+    """Gera uma ETag forte a partir dos valores que identificam a versão."""
+    digest = hashlib.sha256(
+        ':'.join(str(parte) for parte in partes).encode()
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Indica se a ETag atual está entre as informadas em `If-None-Match`."""
+    header = request.headers.get('if-none-match')
+    if header is None:
+        return False
+    if header.strip() == '*':
+        return True
+    # If-None-Match usa comparação fraca: o prefixo W/ é ignorado.
+    return etag in {
+        tag.strip().removeprefix('W/') for tag in header.split(',')
+    }
+
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    """Resposta 304 sem corpo, com os mesmos cabeçalhos de cache."""
+    response = Response(status_code=HTTPStatus.NOT_MODIFIED)
+    set_cache_headers(response, etag)
+    return response
@@ -0,0 +1,48 @@
+"""
+Caminho rápido de serialização JSON para listagens.
+
+No caminho padrão, a listagem carrega objetos ORM completos, o FastAPI os
+valida contra o `response_model` (`from_attributes`) e só então serializa o
+resultado. Com `FAST_JSON_RESPONSES` ativo, o handler seleciona apenas as
+colunas do schema público, converte as linhas em dicionários e os serializa
+diretamente em Rust com `TypeAdapter.dump_json`, sem validação: os valores
+vêm do banco e já respeitam os tipos do schema.
+
+O JSON produzido é o mesmo nos dois caminhos.
+"""
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+from fibrolog_api.http_cache import set_cache_headers
+from fibrolog_api.settings import Settings
+
+settings = Settings()
+
+
+def ativo() -> bool:
+    return settings.FAST_JSON_RESPONSES
+
+
+def colunas_publicas(entidade, schema: type[BaseModel]) -> list:
+    """Atributos mapeados de `entidade` com os campos de `schema`."""
+    return [getattr(entidade, campo) for campo in schema.model_fields]
+
+
+def resposta_json(
+    adapter: TypeAdapter, conteudo, etag: str | None = None
+) -> Response:
+    """
+    Serializa `conteudo` sem validação.
+
+    Args:
+        adapter: Adaptador do `TypedDict` equivalente ao `response_model`.
+        conteudo: Dicionários montados a partir das linhas do banco.
+        etag: ETag da resposta, se a rota suporta requisições condicionais.
+    """
+    response = Response(
+        adapter.dump_json(conteudo), media_type='application/json'
+    )
+    if etag is not None:
+        set_cache_headers(response, etag)
+    return response
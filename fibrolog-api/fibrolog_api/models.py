@@ -1,12 +1,14 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from typing import List, Optional
 
-from sqlalchemy import ForeignKey, String, Text, func
+from sqlalchemy import JSON, ForeignKey, Index, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
 
+FUSO_HORARIO_PADRAO = 'America/Sao_Paulo'
+
 
 class EstadoEmocional(str, Enum):
     FELIZ = 'FELIZ'
@@ -27,17 +29,42 @@ class Paciente:
     sexo: Mapped[Optional[str]] = mapped_column(String(50), default=None)
     data_diagnostico: Mapped[Optional[datetime]] = mapped_column(default=None)
     medicacoes: Mapped[Optional[str]] = mapped_column(Text, default=None)
+    # Fuso IANA que define o dia local dos registros e das estatísticas
+    fuso_horario: Mapped[str] = mapped_column(
+        String(64),
+        default=FUSO_HORARIO_PADRAO,
+        server_default=FUSO_HORARIO_PADRAO,
+    )
+    # Incrementada a cada alteração; base da ETag do paciente
+    versao: Mapped[int] = mapped_column(
+        init=False, default=1, server_default='1'
+    )
 
     # Relacionamentos
     contatos: Mapped[List['ContatoApoio']] = relationship(
         back_populates='paciente', cascade='all, delete-orphan', init=False
     )
     alertas: Mapped[List['Alerta']] = relationship(
-        back_populates='paciente', init=False
+        back_populates='paciente', cascade='all, delete-orphan', init=False
     )
     registros: Mapped[List['Registro']] = relationship(
         back_populates='paciente', cascade='all, delete-orphan', init=False
     )
+    refresh_tokens: Mapped[List['RefreshToken']] = relationship(
+        back_populates='paciente', cascade='all, delete-orphan', init=False
+    )
+    registros_removidos: Mapped[List['RegistroRemovido']] = relationship(
+        back_populates='paciente', cascade='all, delete-orphan', init=False
+    )
+    resumos: Mapped[List['ResumoRegistros']] = relationship(
+        back_populates='paciente', cascade='all, delete-orphan', init=False
+    )
+    detector_crise: Mapped[Optional['DetectorCrise']] = relationship(
+        back_populates='paciente', cascade='all, delete-orphan', init=False
+    )
+    sequencias: Mapped[List['Sequencia']] = relationship(
+        back_populates='paciente', cascade='all, delete-orphan', init=False
+    )
 
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
@@ -47,6 +74,29 @@ class Paciente:
     )
 
 
+@table_registry.mapped_as_dataclass
+class RefreshToken:
+    """Refresh token emitido no login; apenas o HMAC do token é armazenado"""
+
+    __tablename__ = 'refresh_tokens'
+
+    id: Mapped[int] = mapped_column(primary_key=True, init=False)
+    paciente_id: Mapped[int] = mapped_column(
+        ForeignKey('pacientes.id'), index=True
+    )
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True)
+    expira_em: Mapped[datetime]
+    revogado_em: Mapped[Optional[datetime]] = mapped_column(default=None)
+
+    paciente: Mapped['Paciente'] = relationship(
+        back_populates='refresh_tokens', init=False
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
 @table_registry.mapped_as_dataclass
 class ContatoApoio:
     __tablename__ = 'contatos_apoio'
@@ -66,13 +116,34 @@ class ContatoApoio:
 @table_registry.mapped_as_dataclass
 class Alerta:
     __tablename__ = 'alertas'
+    __table_args__ = (
+        # O agendador carrega os próximos alertas ativos por janela de tempo
+        Index(
+            'ix_alertas_ativo_proxima_execucao', 'ativo', 'proxima_execucao'
+        ),
+        Index(
+            'ix_alertas_paciente_id_proxima_execucao',
+            'paciente_id',
+            'proxima_execucao',
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
     tipo: Mapped[str]  # "medicação" ou "consulta" [cite: 1310]
+    # Momento do disparo ou, com recorrência, o início da série, em UTC
     data_hora: Mapped[datetime]
     paciente_id: Mapped[int] = mapped_column(ForeignKey('pacientes.id'))
     descricao: Mapped[str] = mapped_column(Text)
+    # Única ocorrência materializada: o próximo disparo, em UTC
+    proxima_execucao: Mapped[datetime]
+    # Regra RRULE (ver `fibrolog_api.recorrencia`); sem ela, o alerta
+    # dispara uma vez e fica inativo
+    recorrencia: Mapped[Optional[str]] = mapped_column(
+        String(200), default=None
+    )
     ativo: Mapped[bool] = mapped_column(default=True)
+    # Último disparo
+    disparado_em: Mapped[Optional[datetime]] = mapped_column(default=None)
 
     paciente: Mapped['Paciente'] = relationship(
         back_populates='alertas', init=False
@@ -84,6 +155,21 @@ class Registro:
     """Classe base para RegistroDiario e RegistroCrise (Table-per-Class)"""
 
     __tablename__ = 'registros'
+    __table_args__ = (
+        # Todas as consultas dos routers filtram por paciente e período
+        Index(
+            'ix_registros_paciente_id_data_hora', 'paciente_id', 'data_hora'
+        ),
+        # RN006: um registro diário por paciente por dia (no fuso local).
+        # Registros de crise mantêm `dia_local` nulo e não são afetados.
+        Index(
+            'uq_registros_paciente_id_dia_local',
+            'paciente_id',
+            'dia_local',
+            unique=True,
+        ),
+        Index('ix_registros_paciente_id_seq', 'paciente_id', 'seq'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
     tipo_registro: Mapped[str]
@@ -91,6 +177,12 @@ class Registro:
     data_hora: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
+    dia_local: Mapped[Optional[date]] = mapped_column(init=False, default=None)
+    versao: Mapped[int] = mapped_column(
+        init=False, default=1, server_default='1'
+    )
+    # Posição na sequência global de alterações usada pela sincronização
+    seq: Mapped[int] = mapped_column(init=False, default=0, server_default='0')
 
     paciente: Mapped['Paciente'] = relationship(
         back_populates='registros', init=False
@@ -110,6 +202,8 @@ class RegistroDiario(Registro):
     nivel_fadiga: Mapped[int]
     estado_emocional: Mapped[EstadoEmocional]
     localizacao_dor: Mapped[Optional[str]] = mapped_column(default=None)
+    # Máscara de bits das regiões do WPI (`fibrolog_api.regioes`)
+    regioes_dor: Mapped[int] = mapped_column(default=0, server_default='0')
 
 
 @table_registry.mapped_as_dataclass
@@ -121,9 +215,244 @@ class RegistroCrise(Registro):
     )
     intensidade_dor: Mapped[int]
     duracao: Mapped[str]  # Ex: "2h" [cite: 1520]
+    # Caminho relativo a AUDIO_DIR; o nome é o SHA-256 do conteúdo, e o
+    # índice permite saber se um arquivo deduplicado ainda é referenciado
     audio_path: Mapped[Optional[str]] = mapped_column(
-        default=None
+        default=None, index=True
     )  # [cite: 409]
     texto_transcrito: Mapped[Optional[str]] = mapped_column(
         Text, default=None
     )  # [cite: 411]
+
+
+@table_registry.mapped_as_dataclass
+class UploadAudio:
+    """
+    Upload retomável do áudio de uma crise.
+
+    Os bytes recebidos ficam em `AUDIO_DIR/uploads/<id>.parcial`; `recebido`
+    é o offset confirmado, a partir do qual o próximo pedaço é gravado.
+    """
+
+    __tablename__ = 'uploads_audio'
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    registro_id: Mapped[int] = mapped_column(
+        ForeignKey('registros_crises.id'), index=True
+    )
+    tipo: Mapped[str] = mapped_column(String(50))
+    tamanho: Mapped[int]
+    # Renovada a cada pedaço recebido; depois dela o upload é descartado
+    expira_em: Mapped[datetime] = mapped_column(index=True)
+    recebido: Mapped[int] = mapped_column(default=0)
+
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TarefaTranscricao:
+    """
+    Transcrição pendente do áudio de uma crise (fila persistente).
+
+    Um worker reserva a tarefa por um prazo (`disponivel_em` no futuro);
+    se não concluir até lá, ela volta a ficar disponível.
+    """
+
+    __tablename__ = 'tarefas_transcricao'
+    __table_args__ = (
+        Index(
+            'ix_tarefas_transcricao_estado_disponivel_em',
+            'estado',
+            'disponivel_em',
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, init=False)
+    registro_id: Mapped[int] = mapped_column(
+        ForeignKey('registros_crises.id'), index=True
+    )
+    # Áudio a transcrever; se o registro trocar de áudio, o texto é descartado
+    audio_path: Mapped[str]
+    disponivel_em: Mapped[datetime]
+    estado: Mapped[str] = mapped_column(String(20), default='pendente')
+    tentativas: Mapped[int] = mapped_column(default=0)
+    # Identificador da reserva atual; muda a cada nova reserva
+    dono: Mapped[Optional[str]] = mapped_column(String(32), default=None)
+    erro: Mapped[Optional[str]] = mapped_column(Text, default=None)
+    concluida_em: Mapped[Optional[datetime]] = mapped_column(default=None)
+
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class Notificacao:
+    """
+    Notificação a enviar a um contato de apoio (outbox transacional).
+
+    Gravada na mesma transação do registro que a originou, com o texto já
+    pronto; o despachante a reserva, como as tarefas de transcrição.
+    """
+
+    __tablename__ = 'notificacoes'
+    __table_args__ = (
+        Index(
+            'ix_notificacoes_canal_estado_disponivel_em',
+            'canal',
+            'estado',
+            'disponivel_em',
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, init=False)
+    # "email" ou "telefone"
+    canal: Mapped[str] = mapped_column(String(20))
+    destino: Mapped[str]
+    assunto: Mapped[str]
+    mensagem: Mapped[str] = mapped_column(Text)
+    # Identifica a notificação para o envio não se repetir, ex.: SHA-256 de
+    # "crise:42:email:ana@example.com"
+    chave: Mapped[str] = mapped_column(String(64), unique=True)
+    disponivel_em: Mapped[datetime]
+    estado: Mapped[str] = mapped_column(String(20), default='pendente')
+    tentativas: Mapped[int] = mapped_column(default=0)
+    dono: Mapped[Optional[str]] = mapped_column(String(32), default=None)
+    erro: Mapped[Optional[str]] = mapped_column(Text, default=None)
+    enviada_em: Mapped[Optional[datetime]] = mapped_column(default=None)
+
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class RegistroRemovido:
+    """Marca (tombstone) de um registro excluído, para a sincronização"""
+
+    __tablename__ = 'registros_removidos'
+    __table_args__ = (
+        Index('ix_registros_removidos_paciente_id_seq', 'paciente_id', 'seq'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, init=False)
+    registro_id: Mapped[int]
+    tipo_registro: Mapped[str]
+    paciente_id: Mapped[int] = mapped_column(ForeignKey('pacientes.id'))
+    seq: Mapped[int]
+
+    paciente: Mapped['Paciente'] = relationship(
+        back_populates='registros_removidos', init=False
+    )
+
+    removido_em: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class Sequencia:
+    """Contadores monotônicos nomeados de cada paciente (ex.: sincronização)"""
+
+    __tablename__ = 'sequencias'
+
+    paciente_id: Mapped[int] = mapped_column(
+        ForeignKey('pacientes.id'), primary_key=True
+    )
+    nome: Mapped[str] = mapped_column(String(50), primary_key=True)
+    valor: Mapped[int]
+
+    paciente: Mapped['Paciente'] = relationship(
+        back_populates='sequencias', init=False
+    )
+
+
+@table_registry.mapped_as_dataclass
+class ResumoRegistros:
+    """
+    Agregados dos registros de um paciente em uma semana ou mês.
+
+    Mantidos incrementalmente a cada escrita (ver `fibrolog_api.resumos`);
+    as somas e somas dos quadrados permitem derivar média e variância.
+    """
+
+    __tablename__ = 'resumos_registros'
+
+    paciente_id: Mapped[int] = mapped_column(
+        ForeignKey('pacientes.id'), primary_key=True
+    )
+    periodo: Mapped[str] = mapped_column(String(5), primary_key=True)
+    inicio: Mapped[date] = mapped_column(primary_key=True)
+
+    # Registros diários
+    registros: Mapped[int] = mapped_column(default=0, server_default='0')
+    soma_intensidade_dor: Mapped[int] = mapped_column(
+        default=0, server_default='0'
+    )
+    soma_quadrados_intensidade_dor: Mapped[int] = mapped_column(
+        default=0, server_default='0'
+    )
+    min_intensidade_dor: Mapped[Optional[int]] = mapped_column(default=None)
+    max_intensidade_dor: Mapped[Optional[int]] = mapped_column(default=None)
+    soma_qualidade_sono: Mapped[int] = mapped_column(
+        default=0, server_default='0'
+    )
+    soma_quadrados_qualidade_sono: Mapped[int] = mapped_column(
+        default=0, server_default='0'
+    )
+    min_qualidade_sono: Mapped[Optional[int]] = mapped_column(default=None)
+    max_qualidade_sono: Mapped[Optional[int]] = mapped_column(default=None)
+    soma_nivel_fadiga: Mapped[int] = mapped_column(
+        default=0, server_default='0'
+    )
+    soma_quadrados_nivel_fadiga: Mapped[int] = mapped_column(
+        default=0, server_default='0'
+    )
+    min_nivel_fadiga: Mapped[Optional[int]] = mapped_column(default=None)
+    max_nivel_fadiga: Mapped[Optional[int]] = mapped_column(default=None)
+    feliz: Mapped[int] = mapped_column(default=0, server_default='0')
+    ansioso: Mapped[int] = mapped_column(default=0, server_default='0')
+    irritado: Mapped[int] = mapped_column(default=0, server_default='0')
+    triste: Mapped[int] = mapped_column(default=0, server_default='0')
+
+    # Registros de crise
+    crises: Mapped[int] = mapped_column(default=0, server_default='0')
+
+    paciente: Mapped['Paciente'] = relationship(
+        back_populates='resumos', init=False
+    )
+
+
+@table_registry.mapped_as_dataclass
+class DetectorCrise:
+    """
+    Estado do detector de crises (EWMA + CUSUM) de um paciente.
+
+    Atualizado a cada registro diário (ver `fibrolog_api.detector`).
+    `anterior` guarda o estado antes de `ultimo_dia`, para reaplicar uma
+    correção do último dia sem reprocessar o histórico.
+    """
+
+    __tablename__ = 'detectores_crise'
+
+    paciente_id: Mapped[int] = mapped_column(
+        ForeignKey('pacientes.id'), primary_key=True
+    )
+    dias: Mapped[int] = mapped_column(default=0)
+    media_dor: Mapped[float] = mapped_column(default=0.0)
+    variancia_dor: Mapped[float] = mapped_column(default=0.0)
+    cusum_dor: Mapped[float] = mapped_column(default=0.0)
+    media_fadiga: Mapped[float] = mapped_column(default=0.0)
+    variancia_fadiga: Mapped[float] = mapped_column(default=0.0)
+    cusum_fadiga: Mapped[float] = mapped_column(default=0.0)
+    ultimo_dia: Mapped[Optional[date]] = mapped_column(default=None)
+    anterior: Mapped[Optional[dict]] = mapped_column(JSON, default=None)
+    ultimo_alerta_dia: Mapped[Optional[date]] = mapped_column(default=None)
+    # Alterações em dias anteriores ao último exigem reconstrução offline
+    desatualizado: Mapped[bool] = mapped_column(default=False)
+
+    paciente: Mapped['Paciente'] = relationship(
+        back_populates='detector_crise', init=False
+    )
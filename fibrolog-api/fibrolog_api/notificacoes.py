@@ -0,0 +1,452 @@
+"""
+Notificações aos contatos de apoio, com um outbox transacional.
+
+Quando uma crise é registrada, uma linha por contato e canal (`email` ou
+`telefone`) é gravada em `notificacoes` na mesma transação do registro, já
+com o texto pronto. Nada é enviado durante a requisição, e uma notificação
+só existe se o registro existe.
+
+Um despachante na própria aplicação esvazia a tabela, com um worker por
+canal:
+
+- Reserva: um `UPDATE` condicional marca até `NOTIFICATIONS_BATCH_SIZE`
+  notificações do canal como `enviando`, com um dono comum ao lote e
+  `disponivel_em` no fim do prazo de visibilidade.
+- Envio: as notificações do lote são enviadas ao mesmo tempo, limitadas a
+  `NOTIFICATIONS_EMAIL_CONCURRENCY` e-mails e
+  `NOTIFICATIONS_PHONE_CONCURRENCY` mensagens de telefone simultâneos.
+- Conclusão: as enviadas e as falhas do lote são gravadas em uma única
+  transação, apenas se o lote ainda pertence ao worker. As falhas voltam a
+  `pendente` com espera exponencial; depois de `NOTIFICATIONS_MAX_ATTEMPTS`
+  tentativas, ficam como `falhou`.
+- Queda: se o processo morre no meio de um lote, a reserva expira e o lote
+  é enviado de novo.
+
+Por isso o envio é "pelo menos uma vez". Cada notificação tem uma `chave`
+única, derivada da origem, do canal e do destino: ela impede que o mesmo
+destino seja notificado duas vezes pela mesma crise e é repassada ao
+remetente, que a usa para descartar reenvios (como a chave de idempotência
+de um provedor de e-mail ou SMS).
+
+O remetente é configurável (`NOTIFICATIONS_SENDER`, no formato
+`modulo:Classe`) e deve seguir o protocolo `Remetente`. O padrão,
+`RemetenteArquivo`, não envia nada: ele grava as notificações em arquivos
+locais, para testes e desenvolvimento.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Protocol
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api import filas
+from fibrolog_api.database import async_session, upsert
+from fibrolog_api.models import (
+    ContatoApoio,
+    Notificacao,
+    Paciente,
+    RegistroCrise,
+)
+from fibrolog_api.relogio import utcnow
+from fibrolog_api.settings import Settings
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+EMAIL = 'email'
+TELEFONE = 'telefone'
+
+PENDENTE = filas.PENDENTE
+ENVIANDO = 'enviando'
+ENVIADA = 'enviada'
+FALHOU = filas.FALHOU
+
+# Espera máxima entre consultas quando não há avisos de novas notificações
+INTERVALO_CONSULTA = 5.0
+
+
+class Remetente(Protocol):
+    """Envia notificações; executado no event loop, deve ser assíncrono."""
+
+    async def enviar(self, notificacao: Notificacao) -> None:
+        """
+        Envia a notificação pelo seu canal.
+
+        A mesma notificação pode ser enviada mais de uma vez (após uma queda
+        ou um tempo esgotado); `notificacao.chave` permite descartá-la.
+
+        Raises:
+            Exception: Qualquer erro agenda uma nova tentativa.
+        """
+        ...
+
+
+class RemetenteArquivo:
+    """
+    Remetente local: acrescenta cada notificação, em JSON, ao arquivo
+    `<canal>.jsonl` do diretório, ignorando chaves já gravadas.
+
+    A escrita é síncrona, o que basta para testes e desenvolvimento.
+
+    Args:
+        diretorio: Destino dos arquivos; por padrão, `NOTIFICATIONS_DIR`.
+    """
+
+    def __init__(self, diretorio: str | Path | None = None):
+        self.diretorio = Path(diretorio or settings.NOTIFICATIONS_DIR)
+        self._chaves: set[str] | None = None
+
+    def _enviadas(self) -> set[str]:
+        if self._chaves is None:
+            self._chaves = set()
+            for caminho in self.diretorio.glob('*.jsonl'):
+                with caminho.open(encoding='utf-8') as arquivo:
+                    self._chaves.update(
+                        json.loads(linha)['chave'] for linha in arquivo
+                    )
+        return self._chaves
+
+    async def enviar(self, notificacao: Notificacao) -> None:
+        enviadas = self._enviadas()
+        if notificacao.chave in enviadas:
+            return
+        linha = json.dumps(
+            {
+                'chave': notificacao.chave,
+                'destino': notificacao.destino,
+                'assunto': notificacao.assunto,
+                'mensagem': notificacao.mensagem,
+                'enviada_em': utcnow().isoformat(),
+            },
+            ensure_ascii=False,
+        )
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        caminho = self.diretorio / f'{notificacao.canal}.jsonl'
+        with caminho.open('a', encoding='utf-8') as arquivo:
+            arquivo.write(linha + '\n')
+        enviadas.add(notificacao.chave)
+
+
+def carregar_remetente(nome: str) -> Remetente:
+    """Instancia o remetente `modulo:Classe`."""
+    return filas.instanciar(nome)
+
+
+def _destinos(email: str, telefone: str) -> list[tuple[str, str]]:
+    """Canais e destinos normalizados de um contato, sem os vazios."""
+    destinos = [
+        (EMAIL, email.strip().lower()),
+        (TELEFONE, re.sub(r'[^\d+]', '', telefone)),
+    ]
+    return [(canal, destino) for canal, destino in destinos if destino]
+
+
+def chave_notificacao(origem: str, canal: str, destino: str) -> str:
+    return hashlib.sha256(f'{origem}:{canal}:{destino}'.encode()).hexdigest()
+
+
+async def enfileirar_notificacoes(
+    session: AsyncSession,
+    paciente_id: int,
+    origem: str,
+    assunto: str,
+    mensagem: str,
+) -> int:
+    """
+    Grava uma notificação para cada contato de apoio do paciente e canal,
+    sem fazer commit.
+
+    Args:
+        origem: Identifica o evento notificado, ex.: `crise:42`. Um destino
+            é notificado uma única vez por origem.
+
+    Returns:
+        Quantidade de notificações gravadas.
+    """
+    contatos = await session.execute(
+        select(ContatoApoio.email, ContatoApoio.telefone).where(
+            ContatoApoio.paciente_id == paciente_id
+        )
+    )
+    agora = utcnow()
+    linhas = {}
+    for email, telefone in contatos:
+        for canal, destino in _destinos(email, telefone):
+            chave = chave_notificacao(origem, canal, destino)
+            linhas[chave] = {
+                'canal': canal,
+                'destino': destino,
+                'assunto': assunto,
+                'mensagem': mensagem,
+                'chave': chave,
+                'disponivel_em': agora,
+            }
+    if linhas:
+        await session.execute(
+            upsert(session, Notificacao.__table__)
+            .values(list(linhas.values()))
+            .on_conflict_do_nothing(index_elements=['chave'])
+        )
+    return len(linhas)
+
+
+async def notificar_crise(
+    session: AsyncSession, paciente: Paciente, registro: RegistroCrise
+) -> int:
+    """Enfileira o aviso de uma nova crise aos contatos, sem fazer commit."""
+    return await enfileirar_notificacoes(
+        session,
+        paciente.id,
+        f'crise:{registro.id}',
+        f'{paciente.nome} registrou uma crise de dor',
+        (
+            f'{paciente.nome} registrou uma crise de dor de intensidade '
+            f'{registro.intensidade_dor}/10 em '
+            f'{registro.data_hora:%d/%m/%Y às %H:%M}.'
+        ),
+    )
+
+
+async def reservar_lote(
+    session: AsyncSession, canal: str, lote: int, visibilidade: float
+) -> list[Notificacao]:
+    """
+    Reserva as notificações do canal disponíveis há mais tempo, com um dono
+    comum, e faz commit.
+
+    Notificações `enviando` cuja reserva expirou também estão disponíveis.
+    """
+    return await filas.reservar(
+        session,
+        Notificacao,
+        ENVIANDO,
+        lote,
+        visibilidade,
+        Notificacao.canal == canal,
+    )
+
+
+@dataclass
+class MetricasNotificacoes:
+    """Métricas acumuladas do despachante (tempos em segundos)."""
+
+    lotes: int = 0
+    enviadas: dict[str, int] = field(default_factory=dict)
+    retentativas: int = 0
+    falhas: int = 0
+    reservas_perdidas: int = 0
+    espera_total: float = 0.0
+
+    def resumo(self) -> dict:
+        total = sum(self.enviadas.values())
+        return {
+            'lotes': self.lotes,
+            'enviadas': total,
+            'enviadas_por_canal': dict(self.enviadas),
+            'retentativas': self.retentativas,
+            'falhas': self.falhas,
+            'reservas_perdidas': self.reservas_perdidas,
+            'espera_media_ms': self.espera_total / (total or 1) * 1000,
+        }
+
+
+class DespachanteNotificacoes:
+    """
+    Workers, um por canal, que enviam as notificações de `notificacoes`.
+
+    Args:
+        remetente: Quem efetivamente envia as notificações.
+        concorrencia: Envios simultâneos por canal; define os canais.
+        lote: Notificações reservadas por transação.
+        max_tentativas: Tentativas antes da falha definitiva.
+        tempo_limite: Segundos de espera por um envio.
+        visibilidade: Segundos de reserva de um lote; deve exceder o tempo
+            de envio do lote inteiro.
+        backoff: Espera, em segundos, antes da segunda tentativa; dobra a
+            cada nova falha.
+        sessoes: Fábrica de sessões do banco.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        remetente: Remetente,
+        concorrencia: dict[str, int],
+        lote: int,
+        max_tentativas: int,
+        tempo_limite: float,
+        visibilidade: float,
+        backoff: float,
+        sessoes=async_session,
+    ):
+        self.remetente = remetente
+        self.concorrencia = concorrencia
+        self.lote = lote
+        self.max_tentativas = max_tentativas
+        self.tempo_limite = tempo_limite
+        self.visibilidade = visibilidade
+        self.backoff = backoff
+        self.sessoes = sessoes
+        self.metricas = MetricasNotificacoes()
+        self._limites = {
+            canal: asyncio.Semaphore(limite)
+            for canal, limite in concorrencia.items()
+        }
+        self._avisos = {canal: asyncio.Event() for canal in concorrencia}
+        self._tarefas: list[asyncio.Task] = []
+
+    async def iniciar(self) -> None:
+        self._tarefas = [
+            asyncio.create_task(self._trabalhar(canal))
+            for canal in self.concorrencia
+        ]
+
+    def notificar(self) -> None:
+        """Avisa os workers de que há novas notificações, após o commit."""
+        for aviso in self._avisos.values():
+            aviso.set()
+
+    async def _trabalhar(self, canal: str) -> None:
+        aviso = self._avisos[canal]
+        while True:
+            try:
+                reservadas = await self.processar_lote(canal)
+            except Exception:
+                logger.exception('Falha ao enviar notificações (%s)', canal)
+                reservadas = 0
+            # Um lote cheio indica que há mais notificações na fila
+            if reservadas < self.lote:
+                try:
+                    await asyncio.wait_for(aviso.wait(), INTERVALO_CONSULTA)
+                except TimeoutError:
+                    pass
+                aviso.clear()
+
+    async def processar_lote(self, canal: str) -> int:
+        """
+        Reserva, envia e conclui um lote de notificações do canal.
+
+        Returns:
+            Quantidade de notificações reservadas.
+        """
+        async with self.sessoes() as session:
+            notificacoes = await reservar_lote(
+                session, canal, self.lote, self.visibilidade
+            )
+            if not notificacoes:
+                return 0
+            erros = await asyncio.gather(
+                *(self._enviar(notificacao) for notificacao in notificacoes)
+            )
+            await self._concluir(session, notificacoes, erros)
+        self.metricas.lotes += 1
+        return len(notificacoes)
+
+    async def _enviar(self, notificacao: Notificacao) -> str | None:
+        """Envia a notificação e retorna o erro, se houver."""
+        if notificacao.tentativas > self.max_tentativas:
+            # A reserva expirou em todas as tentativas anteriores.
+            return 'Prazo de visibilidade esgotado'
+        async with self._limites[notificacao.canal]:
+            try:
+                async with asyncio.timeout(self.tempo_limite):
+                    await self.remetente.enviar(notificacao)
+            except Exception as erro:
+                return f'{type(erro).__name__}: {erro}'
+        return None
+
+    async def _concluir(
+        self,
+        session: AsyncSession,
+        notificacoes: list[Notificacao],
+        erros: list[str | None],
+    ) -> None:
+        """Grava o resultado do lote em uma transação e faz commit."""
+        agora = utcnow()
+        dono = notificacoes[0].dono
+        reservada = (
+            Notificacao.dono == dono,
+            Notificacao.estado == ENVIANDO,
+        )
+        enviadas = [n for n, erro in zip(notificacoes, erros) if erro is None]
+        if enviadas:
+            resultado = await session.execute(
+                update(Notificacao)
+                .where(
+                    Notificacao.id.in_([n.id for n in enviadas]), *reservada
+                )
+                .values(estado=ENVIADA, enviada_em=agora, dono=None, erro=None)
+                .execution_options(synchronize_session=False)
+            )
+            canal = enviadas[0].canal
+            self.metricas.enviadas[canal] = (
+                self.metricas.enviadas.get(canal, 0) + resultado.rowcount
+            )
+            self.metricas.reservas_perdidas += (
+                len(enviadas) - resultado.rowcount
+            )
+            self.metricas.espera_total += sum(
+                max((agora - n.created_at).total_seconds(), 0.0)
+                for n in enviadas
+            )
+
+        for notificacao, erro in zip(notificacoes, erros):
+            if erro is not None:
+                await self._falhar(session, notificacao, erro, reservada)
+        await session.commit()
+
+    async def _falhar(
+        self,
+        session: AsyncSession,
+        notificacao: Notificacao,
+        erro: str,
+        reservada: tuple,
+    ) -> None:
+        nova_tentativa = await filas.falhar(
+            session,
+            notificacao,
+            reservada,
+            erro,
+            self.max_tentativas,
+            self.backoff,
+        )
+        if nova_tentativa is None:
+            self.metricas.reservas_perdidas += 1
+        elif nova_tentativa:
+            self.metricas.retentativas += 1
+        else:
+            self.metricas.falhas += 1
+
+    def resumo(self) -> dict:
+        return {
+            'remetente': type(self.remetente).__name__,
+            'concorrencia': self.concorrencia,
+            'lote': self.lote,
+            **self.metricas.resumo(),
+        }
+
+    async def parar(self) -> None:
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+
+
+despachante_notificacoes = DespachanteNotificacoes(
+    remetente=carregar_remetente(settings.NOTIFICATIONS_SENDER),
+    concorrencia={
+        EMAIL: settings.NOTIFICATIONS_EMAIL_CONCURRENCY,
+        TELEFONE: settings.NOTIFICATIONS_PHONE_CONCURRENCY,
+    },
+    lote=settings.NOTIFICATIONS_BATCH_SIZE,
+    max_tentativas=settings.NOTIFICATIONS_MAX_ATTEMPTS,
+    tempo_limite=settings.NOTIFICATIONS_SEND_TIMEOUT_SECONDS,
+    visibilidade=settings.NOTIFICATIONS_VISIBILITY_TIMEOUT_SECONDS,
+    backoff=settings.NOTIFICATIONS_BACKOFF_SECONDS,
+)
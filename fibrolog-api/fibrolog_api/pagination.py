@@ -0,0 +1,57 @@
+"""
+Cursores opacos para paginação por keyset.
+
+O cursor codifica os valores da chave de ordenação do último item retornado;
+a próxima página busca os itens estritamente após essa chave, o que mantém o
+custo constante independentemente da profundidade da página.
+"""
+
+import base64
+import json
+from datetime import datetime
+from http import HTTPStatus
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _converter(valor, tipo: type):
+    # `bool` é subclasse de `int`, mas nunca é gerado por `encode_cursor`
+    if isinstance(valor, bool):
+        raise TypeError(valor)
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is float and isinstance(valor, int):
+        return float(valor)
+    if not isinstance(valor, tipo):
+        raise TypeError(valor)
+    return valor
+
+
+def decode_cursor(cursor: str, tipos: tuple[type, ...]) -> list:
+    """
+    Decodifica um cursor gerado por `encode_cursor`.
+
+    Args:
+        cursor: Cursor recebido do cliente.
+        tipos: Tipo de cada valor da chave: `int`, `float`, `str` ou
+            `datetime` (gravado em ISO 8601).
+
+    Raises:
+        HTTPException: Se o cursor estiver malformado ou algum valor não
+            for do tipo esperado.
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(values, list) or len(values) != len(tipos):
+            raise ValueError(values)
+        return [_converter(v, tipo) for v, tipo in zip(values, tipos)]
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Cursor inválido'
+        )
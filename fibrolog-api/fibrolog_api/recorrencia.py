@@ -0,0 +1,289 @@
+"""
+Regras de recorrência dos alertas, em um subconjunto do RRULE (RFC 5545).
+
+Exemplos:
+
+    FREQ=HOURLY;INTERVAL=8                          a cada 8 horas
+    FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;BYHOUR=9       dias úteis às 9:00
+    FREQ=DAILY;BYHOUR=8,20;BYMINUTE=0;COUNT=28      2x/dia, por 14 dias
+
+Partes suportadas: `FREQ` (`HOURLY`, `DAILY` ou `WEEKLY`), `INTERVAL`,
+`BYDAY`, `BYHOUR`, `BYMINUTE`, `COUNT` e `UNTIL`. O início da série é o
+`data_hora` do alerta; sem `BYHOUR`/`BYMINUTE`, as ocorrências mantêm o seu
+horário.
+
+As ocorrências são calculadas sob demanda, nunca gravadas. `HOURLY` avança
+em horas absolutas; `DAILY` e `WEEKLY` seguem o relógio local do paciente,
+de modo que "às 9:00" continua às 9:00 depois de uma mudança de horário de
+verão. `BYDAY` e `BYHOUR` também são avaliados na hora local.
+"""
+
+import math
+import zoneinfo
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+
+FREQUENCIAS = ('HOURLY', 'DAILY', 'WEEKLY')
+DIAS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+INTERVALO_MAXIMO = 1000
+CONTAGEM_MAXIMA = 10_000
+# Períodos seguidos sem ocorrência após os quais a série é considerada
+# vazia (ex.: BYDAY=SA com INTERVAL=7 a partir de uma segunda-feira)
+PERIODOS_SEM_OCORRENCIA = 1000
+
+
+def _inteiros(valor: str, minimo: int, maximo: int) -> tuple[int, ...]:
+    numeros = sorted({int(parte) for parte in valor.split(',')})
+    if numeros[0] < minimo or numeros[-1] > maximo:
+        raise ValueError(f'valores fora do intervalo {minimo}-{maximo}')
+    return tuple(numeros)
+
+
+def _dias(valor: str) -> tuple[int, ...]:
+    dias = set(valor.split(','))
+    if not dias <= set(DIAS):
+        raise ValueError(f'use {",".join(DIAS)}')
+    return tuple(sorted(DIAS.index(dia) for dia in dias))
+
+
+def _ate(valor: str) -> datetime:
+    if len(valor) == len('20240131'):
+        return datetime.strptime(valor, '%Y%m%d') + timedelta(days=1)
+    return datetime.strptime(valor, '%Y%m%dT%H%M%SZ')
+
+
+def _utc(local: datetime, fuso: zoneinfo.ZoneInfo) -> datetime:
+    return (
+        local
+        .replace(tzinfo=fuso)
+        .astimezone(timezone.utc)
+        .replace(tzinfo=None)
+    )
+
+
+def _local(utc: datetime, fuso: zoneinfo.ZoneInfo) -> datetime:
+    return (
+        utc.replace(tzinfo=timezone.utc).astimezone(fuso).replace(tzinfo=None)
+    )
+
+
+@dataclass(frozen=True)
+class Recorrencia:
+    frequencia: str
+    intervalo: int = 1
+    dias: tuple[int, ...] = ()
+    horas: tuple[int, ...] = ()
+    minutos: tuple[int, ...] = ()
+    contagem: int | None = None
+    # Fim da série, exclusivo, em UTC
+    ate: datetime | None = None
+
+    @classmethod
+    def parse(cls, regra: str) -> 'Recorrencia':
+        """
+        Interpreta uma regra como `FREQ=DAILY;BYHOUR=9`.
+
+        Raises:
+            ValueError: Se a regra é inválida ou usa partes não suportadas.
+        """
+        partes = {}
+        for parte in regra.strip().removeprefix('RRULE:').split(';'):
+            nome, _, valor = parte.partition('=')
+            if not valor or nome in partes:
+                raise ValueError(f'Parte inválida na recorrência: {parte!r}')
+            partes[nome.upper()] = valor.upper()
+
+        frequencia = partes.pop('FREQ', None)
+        if frequencia not in FREQUENCIAS:
+            raise ValueError(f'FREQ deve ser um de: {", ".join(FREQUENCIAS)}')
+        dados = {'frequencia': frequencia}
+        conversoes = {
+            'INTERVAL': (
+                'intervalo',
+                lambda v: _inteiros(v, 1, INTERVALO_MAXIMO)[0],
+            ),
+            'BYDAY': ('dias', _dias),
+            'BYHOUR': ('horas', lambda v: _inteiros(v, 0, 23)),
+            'BYMINUTE': ('minutos', lambda v: _inteiros(v, 0, 59)),
+            'COUNT': (
+                'contagem',
+                lambda v: _inteiros(v, 1, CONTAGEM_MAXIMA)[0],
+            ),
+            'UNTIL': ('ate', _ate),
+        }
+        for nome, valor in partes.items():
+            if nome not in conversoes:
+                raise ValueError(f'Parte não suportada na recorrência: {nome}')
+            campo, converter = conversoes[nome]
+            try:
+                dados[campo] = converter(valor)
+            except ValueError as erro:
+                raise ValueError(f'{nome} inválido: {erro}') from None
+        if 'contagem' in dados and 'ate' in dados:
+            raise ValueError('COUNT e UNTIL não podem ser usados juntos')
+        return cls(**dados)
+
+    def __str__(self) -> str:
+        partes = [f'FREQ={self.frequencia}']
+        if self.intervalo != 1:
+            partes.append(f'INTERVAL={self.intervalo}')
+        if self.dias:
+            partes.append(f'BYDAY={",".join(DIAS[d] for d in self.dias)}')
+        if self.horas:
+            partes.append(f'BYHOUR={",".join(map(str, self.horas))}')
+        if self.minutos:
+            partes.append(f'BYMINUTE={",".join(map(str, self.minutos))}')
+        if self.contagem is not None:
+            partes.append(f'COUNT={self.contagem}')
+        if self.ate is not None:
+            partes.append(f'UNTIL={self.ate:%Y%m%dT%H%M%SZ}')
+        return ';'.join(partes)
+
+    def _horarios(self, inicio_local: datetime) -> list[time]:
+        horas = self.horas or (inicio_local.hour,)
+        if not self.horas and not self.minutos:
+            return [inicio_local.time()]
+        minutos = self.minutos or (inicio_local.minute,)
+        return [time(hora, minuto) for hora in horas for minuto in minutos]
+
+    def _periodo(
+        self,
+        indice: int,
+        inicio: datetime,
+        inicio_local: datetime,
+        fuso: zoneinfo.ZoneInfo,
+    ) -> list[datetime]:
+        """Candidatos (em UTC) do período `indice` da série, em ordem."""
+        if self.frequencia == 'HOURLY':
+            candidato = inicio + timedelta(hours=indice * self.intervalo)
+            local = _local(candidato, fuso)
+            if self.dias and local.weekday() not in self.dias:
+                return []
+            if self.horas and local.hour not in self.horas:
+                return []
+            return [candidato]
+
+        if self.frequencia == 'DAILY':
+            dias = [inicio_local.date() + timedelta(indice * self.intervalo)]
+            if self.dias and dias[0].weekday() not in self.dias:
+                return []
+        else:
+            semana = inicio_local.date() - timedelta(inicio_local.weekday())
+            semana += timedelta(weeks=indice * self.intervalo)
+            dias = [
+                semana + timedelta(dia)
+                for dia in (self.dias or (inicio_local.weekday(),))
+            ]
+        horarios = self._horarios(inicio_local)
+        return sorted(
+            _utc(datetime.combine(dia, horario), fuso)
+            for dia in dias
+            for horario in horarios
+        )
+
+    def _duracao_periodo(self) -> timedelta:
+        unidade = {
+            'HOURLY': timedelta(hours=1),
+            'DAILY': timedelta(days=1),
+            'WEEKLY': timedelta(weeks=1),
+        }[self.frequencia]
+        return unidade * self.intervalo
+
+    def ocorrencias(
+        self,
+        inicio: datetime,
+        fuso: zoneinfo.ZoneInfo,
+        a_partir_de: datetime | None = None,
+    ) -> Iterator[datetime]:
+        """
+        Gera as ocorrências em UTC, em ordem, sem limite se a regra não
+        tem fim.
+
+        Args:
+            inicio: Início da série (`Alerta.data_hora`), em UTC.
+            fuso: Fuso horário do paciente.
+            a_partir_de: Se informado, omite as ocorrências anteriores.
+        """
+        inicio_local = _local(inicio, fuso)
+        indice = 0
+        if a_partir_de is not None and self.contagem is None:
+            # Sem COUNT, não é preciso percorrer a série desde o início;
+            # um período de folga cobre as diferenças do fuso.
+            atraso = (a_partir_de - inicio) / self._duracao_periodo()
+            indice = max(math.floor(atraso) - 1, 0)
+
+        restantes = self.contagem
+        vazios = 0
+        while vazios < PERIODOS_SEM_OCORRENCIA:
+            try:
+                periodo = self._periodo(indice, inicio, inicio_local, fuso)
+            except OverflowError:
+                return  # A série passou do maior datetime representável
+            candidatos = [c for c in periodo if c >= inicio]
+            vazios = 0 if candidatos else vazios + 1
+            for candidato in candidatos:
+                if self.ate is not None and candidato >= self.ate:
+                    return
+                if a_partir_de is None or candidato >= a_partir_de:
+                    yield candidato
+                if restantes is not None:
+                    restantes -= 1
+                    if restantes == 0:
+                        return
+            indice += 1
+
+    def proxima(
+        self, inicio: datetime, fuso: zoneinfo.ZoneInfo, apos: datetime
+    ) -> datetime | None:
+        """Primeira ocorrência estritamente depois de `apos`, ou None."""
+        for ocorrencia in self.ocorrencias(inicio, fuso, apos):
+            if ocorrencia > apos:
+                return ocorrencia
+        return None
+
+
+def validar_recorrencia(regra: str | None) -> str | None:
+    """Valida a regra e a retorna na forma canônica."""
+    if regra is None:
+        return None
+    return str(Recorrencia.parse(regra))
+
+
+def proxima_execucao(
+    data_hora: datetime,
+    regra: str | None,
+    fuso_horario: str,
+    apos: datetime,
+) -> datetime | None:
+    """
+    Próximo disparo de um alerta depois de `apos` (tudo em UTC).
+
+    Sem regra, o alerta dispara uma vez, em `data_hora`.
+    """
+    if regra is None:
+        return data_hora if data_hora > apos else None
+    return Recorrencia.parse(regra).proxima(
+        data_hora, zoneinfo.ZoneInfo(fuso_horario), apos
+    )
+
+
+def ocorrencias_entre(
+    data_hora: datetime,
+    regra: str | None,
+    fuso_horario: str,
+    de: datetime,
+    ate: datetime,
+) -> Iterator[datetime]:
+    """Ocorrências de um alerta em `[de, ate)`, em UTC."""
+    if regra is None:
+        if de <= data_hora < ate:
+            yield data_hora
+        return
+    for ocorrencia in Recorrencia.parse(regra).ocorrencias(
+        data_hora, zoneinfo.ZoneInfo(fuso_horario), de
+    ):
+        if ocorrencia >= ate:
+            return
+        yield ocorrencia
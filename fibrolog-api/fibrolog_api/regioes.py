@@ -0,0 +1,241 @@
+"""
+Mapa corporal da dor: as 19 regiões do Índice de Dor Generalizada (WPI) dos
+critérios de fibromialgia do ACR, gravadas como uma máscara de bits.
+
+O bit `i` de `registros_diarios.regioes_dor` corresponde ao `i`-ésimo
+membro de `RegiaoDor`; por isso, novas regiões só podem ser acrescentadas
+ao final. A máscara permite contar as regiões de muitos registros em uma só
+consulta, com operações bit a bit no banco (`fibrolog_api.estatisticas`).
+
+A localização em texto livre (`localizacao_dor`) continua aceita: quando as
+regiões não são informadas, elas são extraídas do texto por
+`interpretar_localizacao`. Regiões fora do WPI, como a cabeça, são
+ignoradas.
+
+Para preencher as regiões dos registros gravados antes da máscara:
+
+    python -m fibrolog_api.regioes [--paciente ID]
+"""
+
+import argparse
+import asyncio
+import re
+from enum import Enum
+from typing import Iterable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.database import async_session
+from fibrolog_api.models import Registro, RegistroDiario
+from fibrolog_api.texto import palavras, variantes
+
+
+class RegiaoDor(str, Enum):
+    MANDIBULA_ESQUERDA = 'MANDIBULA_ESQUERDA'
+    MANDIBULA_DIREITA = 'MANDIBULA_DIREITA'
+    OMBRO_ESQUERDO = 'OMBRO_ESQUERDO'
+    OMBRO_DIREITO = 'OMBRO_DIREITO'
+    BRACO_ESQUERDO = 'BRACO_ESQUERDO'
+    BRACO_DIREITO = 'BRACO_DIREITO'
+    ANTEBRACO_ESQUERDO = 'ANTEBRACO_ESQUERDO'
+    ANTEBRACO_DIREITO = 'ANTEBRACO_DIREITO'
+    QUADRIL_ESQUERDO = 'QUADRIL_ESQUERDO'
+    QUADRIL_DIREITO = 'QUADRIL_DIREITO'
+    COXA_ESQUERDA = 'COXA_ESQUERDA'
+    COXA_DIREITA = 'COXA_DIREITA'
+    PERNA_ESQUERDA = 'PERNA_ESQUERDA'
+    PERNA_DIREITA = 'PERNA_DIREITA'
+    PESCOCO = 'PESCOCO'
+    COSTAS_SUPERIOR = 'COSTAS_SUPERIOR'
+    LOMBAR = 'LOMBAR'
+    TORAX = 'TORAX'
+    ABDOMEN = 'ABDOMEN'
+
+
+REGIOES = list(RegiaoDor)
+TODAS = (1 << len(REGIOES)) - 1
+
+ROTULOS = {
+    RegiaoDor.MANDIBULA_ESQUERDA: 'Mandíbula esquerda',
+    RegiaoDor.MANDIBULA_DIREITA: 'Mandíbula direita',
+    RegiaoDor.OMBRO_ESQUERDO: 'Ombro esquerdo',
+    RegiaoDor.OMBRO_DIREITO: 'Ombro direito',
+    RegiaoDor.BRACO_ESQUERDO: 'Braço esquerdo',
+    RegiaoDor.BRACO_DIREITO: 'Braço direito',
+    RegiaoDor.ANTEBRACO_ESQUERDO: 'Antebraço esquerdo',
+    RegiaoDor.ANTEBRACO_DIREITO: 'Antebraço direito',
+    RegiaoDor.QUADRIL_ESQUERDO: 'Quadril esquerdo',
+    RegiaoDor.QUADRIL_DIREITO: 'Quadril direito',
+    RegiaoDor.COXA_ESQUERDA: 'Coxa esquerda',
+    RegiaoDor.COXA_DIREITA: 'Coxa direita',
+    RegiaoDor.PERNA_ESQUERDA: 'Perna esquerda',
+    RegiaoDor.PERNA_DIREITA: 'Perna direita',
+    RegiaoDor.PESCOCO: 'Pescoço',
+    RegiaoDor.COSTAS_SUPERIOR: 'Parte superior das costas',
+    RegiaoDor.LOMBAR: 'Lombar',
+    RegiaoDor.TORAX: 'Tórax',
+    RegiaoDor.ABDOMEN: 'Abdômen',
+}
+
+# Palavras (sem acentos, no singular) de cada parte do corpo, e as regiões
+# dela: duas, esquerda e direita, ou uma só, nas partes centrais
+_PARTES = {
+    ('mandibula', 'maxilar', 'atm', 'queixo'): (
+        RegiaoDor.MANDIBULA_ESQUERDA,
+        RegiaoDor.MANDIBULA_DIREITA,
+    ),
+    ('ombro', 'clavicula', 'trapezio'): (
+        RegiaoDor.OMBRO_ESQUERDO,
+        RegiaoDor.OMBRO_DIREITO,
+    ),
+    ('braco', 'biceps', 'triceps', 'cotovelo'): (
+        RegiaoDor.BRACO_ESQUERDO,
+        RegiaoDor.BRACO_DIREITO,
+    ),
+    ('antebraco', 'punho', 'pulso', 'mao'): (
+        RegiaoDor.ANTEBRACO_ESQUERDO,
+        RegiaoDor.ANTEBRACO_DIREITO,
+    ),
+    ('quadril', 'nadega', 'gluteo', 'bacia', 'trocanter'): (
+        RegiaoDor.QUADRIL_ESQUERDO,
+        RegiaoDor.QUADRIL_DIREITO,
+    ),
+    ('coxa',): (RegiaoDor.COXA_ESQUERDA, RegiaoDor.COXA_DIREITA),
+    ('perna', 'joelho', 'panturrilha', 'canela', 'tornozelo', 'pe'): (
+        RegiaoDor.PERNA_ESQUERDA,
+        RegiaoDor.PERNA_DIREITA,
+    ),
+    ('pescoco', 'cervical', 'nuca'): (RegiaoDor.PESCOCO,),
+    ('escapula', 'omoplata', 'dorsal'): (RegiaoDor.COSTAS_SUPERIOR,),
+    ('lombar', 'lombo', 'sacro'): (RegiaoDor.LOMBAR,),
+    ('torax', 'peito', 'peitoral', 'costela', 'esterno'): (RegiaoDor.TORAX,),
+    ('abdomen', 'abdome', 'abdominal', 'barriga'): (RegiaoDor.ABDOMEN,),
+    ('costas',): (RegiaoDor.COSTAS_SUPERIOR, RegiaoDor.LOMBAR),
+}
+_REGIOES_POR_PALAVRA = {
+    forma: regioes
+    for nomes, regioes in _PARTES.items()
+    for nome in nomes
+    for forma in variantes(nome)
+}
+_ESQUERDA = {'esquerdo', 'esquerda', 'esquerdos', 'esquerdas', 'esq'}
+_DIREITA = {'direito', 'direita', 'direitos', 'direitas', 'dir'}
+_ALTO = {'superior', 'alta', 'altas', 'cima'}
+_BAIXO = {'inferior', 'baixa', 'baixas', 'baixo'}
+_TODO = {'todo', 'toda', 'inteiro'}
+
+# Cada trecho separado por pontuação ou "e" descreve uma parte do corpo,
+# com o seu lado ("joelho esquerdo e ombros")
+_SEPARADORES = re.compile(r'[,;+.\n]|\s+e\s+', re.IGNORECASE)
+
+
+def mascara(regioes: Iterable[RegiaoDor]) -> int:
+    """Máscara de bits das regiões."""
+    bits = 0
+    for regiao in regioes:
+        bits |= 1 << REGIOES.index(regiao)
+    return bits
+
+
+def regioes_da_mascara(bits: int) -> list[RegiaoDor]:
+    """Regiões da máscara, na ordem de `RegiaoDor`."""
+    return [regiao for i, regiao in enumerate(REGIOES) if bits >> i & 1]
+
+
+def descrever(bits: int) -> str:
+    """Rótulos das regiões da máscara, separados por vírgulas."""
+    return ', '.join(ROTULOS[regiao] for regiao in regioes_da_mascara(bits))
+
+
+def _interpretar_trecho(trecho: str) -> int:
+    tokens = set(palavras(trecho))
+    if 'corpo' in tokens and tokens & _TODO:
+        return TODAS
+
+    esquerda, direita = bool(tokens & _ESQUERDA), bool(tokens & _DIREITA)
+    bits = 0
+    for token in tokens:
+        regioes = _REGIOES_POR_PALAVRA.get(token, ())
+        if regioes == _PARTES[('costas',)]:
+            # "parte de cima das costas", "costas baixas"
+            if tokens & _ALTO and not tokens & _BAIXO:
+                regioes = (RegiaoDor.COSTAS_SUPERIOR,)
+            elif tokens & _BAIXO and not tokens & _ALTO:
+                regioes = (RegiaoDor.LOMBAR,)
+        elif len(regioes) == 2 and esquerda != direita:  # noqa: PLR2004
+            regioes = (regioes[0] if esquerda else regioes[1],)
+        bits |= mascara(regioes)
+    return bits
+
+
+def interpretar_localizacao(texto: Optional[str]) -> int:
+    """
+    Máscara das regiões citadas em uma localização em texto livre.
+
+    Uma parte do corpo sem lado ("ombros") conta dos dois lados; "corpo
+    todo" conta todas as regiões.
+    """
+    if not texto:
+        return 0
+    bits = 0
+    for trecho in _SEPARADORES.split(texto):
+        bits |= _interpretar_trecho(trecho)
+    return bits
+
+
+async def preencher_regioes(
+    session: AsyncSession, paciente_id: Optional[int] = None
+) -> int:
+    """
+    Extrai de `localizacao_dor` as regiões dos registros diários sem
+    nenhuma, e retorna quantos registros foram alterados.
+
+    As localizações se repetem muito: cada texto distinto é interpretado
+    uma vez e gravado em todos os registros com ele.
+    """
+    filtros = [
+        RegistroDiario.regioes_dor == 0,
+        RegistroDiario.localizacao_dor.is_not(None),
+    ]
+    if paciente_id is not None:
+        filtros.append(
+            RegistroDiario.id.in_(
+                select(Registro.id).where(Registro.paciente_id == paciente_id)
+            )
+        )
+    textos = await session.scalars(
+        select(RegistroDiario.localizacao_dor).where(*filtros).distinct()
+    )
+    alterados = 0
+    for texto in list(textos):
+        regioes = interpretar_localizacao(texto)
+        if regioes:
+            resultado = await session.execute(
+                update(RegistroDiario)
+                .where(*filtros, RegistroDiario.localizacao_dor == texto)
+                .values(regioes_dor=regioes)
+                .execution_options(synchronize_session=False)
+            )
+            alterados += resultado.rowcount
+    return alterados
+
+
+async def _main(paciente_id: Optional[int]) -> None:
+    async with async_session() as session:
+        alterados = await preencher_regioes(session, paciente_id)
+        await session.commit()
+    print(f'{alterados} registros diários atualizados')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=(
+            'Preenche as regiões da dor dos registros diários a partir da '
+            'localização em texto livre.'
+        )
+    )
+    parser.add_argument(
+        '--paciente', type=int, help='Preenche apenas este paciente.'
+    )
+    asyncio.run(_main(parser.parse_args().paciente))
@@ -0,0 +1,14 @@
+"""
+Relógio da aplicação.
+
+As colunas de data e hora guardam instantes em UTC sem fuso (`naive`), como
+os valores de `func.now()` do SQLite.
+"""
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+
+def utcnow() -> datetime:
+    """Instante atual em UTC, sem fuso, para comparar com o banco."""
+    return datetime.now(tz=ZoneInfo('UTC')).replace(tzinfo=None)
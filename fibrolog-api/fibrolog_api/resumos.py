@@ -0,0 +1,319 @@
+"""
+Resumos semanais e mensais dos registros de cada paciente.
+
+A tabela `resumos_registros` guarda, por paciente e período, contagens,
+somas, somas dos quadrados e mínimo/máximo de cada métrica, além das
+contagens por estado emocional e de crises. Os handlers de escrita acumulam
+as alterações em uma `AtualizacaoResumos` e a aplicam na mesma transação, com
+um único upsert multi-linha. Mínimo e máximo não podem ser desfeitos por
+subtração: quando um valor removido é o extremo do período, o período é
+recalculado a partir dos registros (no máximo 31 dias).
+
+Para preencher ou corrigir os resumos a partir do histórico:
+
+    python -m fibrolog_api.resumos [--paciente ID]
+"""
+
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.database import (
+    async_session,
+    dia_de,
+    inicio_periodo,
+    upsert,
+)
+from fibrolog_api.models import (
+    EstadoEmocional,
+    Registro,
+    RegistroDiario,
+    ResumoRegistros,
+)
+
+PERIODOS = ('week', 'month')
+METRICAS = ('intensidade_dor', 'qualidade_sono', 'nivel_fadiga')
+EMOCOES = {estado: estado.value.lower() for estado in EstadoEmocional}
+CAMPOS_DIARIO = (*METRICAS, 'estado_emocional')
+
+_CONTADORES = [
+    'registros',
+    *(f'soma_{metrica}' for metrica in METRICAS),
+    *(f'soma_quadrados_{metrica}' for metrica in METRICAS),
+    *EMOCOES.values(),
+    'crises',
+]
+_CHAVE = ['paciente_id', 'periodo', 'inicio']
+
+
+def inicio_do_periodo(dia: date, periodo: str) -> date:
+    """Primeiro dia da semana (segunda-feira) ou do mês de `dia`."""
+    if periodo == 'month':
+        return dia.replace(day=1)
+    return dia - timedelta(days=dia.weekday())
+
+
+def fim_do_periodo(inicio: date, periodo: str) -> date:
+    """Último dia do período iniciado em `inicio`."""
+    if periodo == 'month':
+        proximo = (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return proximo - timedelta(days=1)
+    return inicio + timedelta(days=6)
+
+
+@dataclass
+class _Delta:
+    contadores: Counter = field(default_factory=Counter)
+    adicionados: defaultdict = field(default_factory=lambda: defaultdict(set))
+    removidos: defaultdict = field(default_factory=lambda: defaultdict(set))
+
+
+class AtualizacaoResumos:
+    """
+    Acumula as alterações de registros de uma transação.
+
+    Registros sem `dia_local` (duplicatas anteriores à restrição de um
+    registro diário por dia) ficam fora dos resumos.
+
+    Args:
+        paciente_id: Paciente dono dos registros alterados.
+    """
+
+    def __init__(self, paciente_id: int):
+        self.paciente_id = paciente_id
+        self._deltas: dict[tuple[str, date], _Delta] = {}
+
+    def _delta(self, dia: date):
+        for periodo in PERIODOS:
+            chave = (periodo, inicio_do_periodo(dia, periodo))
+            yield self._deltas.setdefault(chave, _Delta())
+
+    def _diario(self, dia: date | None, valores: dict, sinal: int) -> None:
+        if dia is None:
+            return
+        emocao = EMOCOES[EstadoEmocional(valores['estado_emocional'])]
+        for delta in self._delta(dia):
+            delta.contadores['registros'] += sinal
+            delta.contadores[emocao] += sinal
+            for metrica in METRICAS:
+                valor = valores[metrica]
+                delta.contadores[f'soma_{metrica}'] += sinal * valor
+                delta.contadores[f'soma_quadrados_{metrica}'] += (
+                    sinal * valor * valor
+                )
+                extremos = delta.adicionados if sinal > 0 else delta.removidos
+                extremos[metrica].add(valor)
+
+    def _crise(self, dia: date, sinal: int) -> None:
+        for delta in self._delta(dia):
+            delta.contadores['crises'] += sinal
+
+    def adicionar_diario(self, dia: date | None, valores: dict) -> None:
+        self._diario(dia, valores, 1)
+
+    def remover_diario(self, dia: date | None, valores: dict) -> None:
+        self._diario(dia, valores, -1)
+
+    def adicionar_crise(self, dia: date) -> None:
+        self._crise(dia, 1)
+
+    def remover_crise(self, dia: date) -> None:
+        self._crise(dia, -1)
+
+    async def aplicar(self, session: AsyncSession) -> None:
+        """
+        Grava as alterações acumuladas nos resumos, sem fazer commit.
+
+        Deve ser chamado depois que as alterações dos registros foram
+        enviadas ao banco (`flush`), pois um período pode ser recalculado a
+        partir deles.
+        """
+        if not self._deltas:
+            return
+
+        tabela = ResumoRegistros.__table__
+        linhas = []
+        for (periodo, inicio), delta in self._deltas.items():
+            linha = {
+                'paciente_id': self.paciente_id,
+                'periodo': periodo,
+                'inicio': inicio,
+                **{nome: delta.contadores[nome] for nome in _CONTADORES},
+            }
+            for metrica in METRICAS:
+                adicionados = delta.adicionados[metrica]
+                linha[f'min_{metrica}'] = min(adicionados, default=None)
+                linha[f'max_{metrica}'] = max(adicionados, default=None)
+            linhas.append(linha)
+
+        statement = upsert(session, tabela).values(linhas)
+        excluded = statement.excluded
+        set_ = {nome: tabela.c[nome] + excluded[nome] for nome in _CONTADORES}
+        for metrica in METRICAS:
+            minimo, maximo = f'min_{metrica}', f'max_{metrica}'
+            set_[minimo] = case(
+                (excluded[minimo].is_(None), tabela.c[minimo]),
+                (
+                    tabela.c[minimo].is_(None)
+                    | (excluded[minimo] < tabela.c[minimo]),
+                    excluded[minimo],
+                ),
+                else_=tabela.c[minimo],
+            )
+            set_[maximo] = case(
+                (excluded[maximo].is_(None), tabela.c[maximo]),
+                (
+                    tabela.c[maximo].is_(None)
+                    | (excluded[maximo] > tabela.c[maximo]),
+                    excluded[maximo],
+                ),
+                else_=tabela.c[maximo],
+            )
+        statement = statement.on_conflict_do_update(
+            index_elements=_CHAVE, set_=set_
+        ).returning(*tabela.c)
+
+        resultado = (await session.execute(statement)).all()
+        deltas, self._deltas = self._deltas, {}
+        for resumo in resultado:
+            if _desatualizado(resumo, deltas[resumo.periodo, resumo.inicio]):
+                await reconstruir_resumos(
+                    session, self.paciente_id, resumo.periodo, resumo.inicio
+                )
+
+
+def _desatualizado(resumo, delta: _Delta) -> bool:
+    # Contagens negativas indicam um período que ainda não foi preenchido
+    # (ver `reconstruir_resumos`).
+    if resumo.registros < 0 or resumo.crises < 0:
+        return True
+    for metrica, removidos in delta.removidos.items():
+        minimo = getattr(resumo, f'min_{metrica}')
+        maximo = getattr(resumo, f'max_{metrica}')
+        if resumo.registros == 0 or minimo is None or maximo is None:
+            return True
+        if any(valor <= minimo or valor >= maximo for valor in removidos):
+            return True
+    return False
+
+
+async def reconstruir_resumos(
+    session: AsyncSession,
+    paciente_id: int | None = None,
+    periodo: str | None = None,
+    inicio: date | None = None,
+) -> None:
+    """
+    Recalcula resumos a partir dos registros, sem fazer commit.
+
+    Args:
+        session: Sessão da transação.
+        paciente_id: Restringe a um paciente; todos, se omitido.
+        periodo: Restringe a `week` ou `month`; ambos, se omitido.
+        inicio: Restringe ao período iniciado nesta data (exige `periodo`).
+    """
+    tabela = ResumoRegistros.__table__
+    registros = Registro.__table__
+    diarios = RegistroDiario.__table__
+
+    for atual in [periodo] if periodo else PERIODOS:
+        remover = tabela.delete().where(tabela.c.periodo == atual)
+        filtros_diarios = [registros.c.dia_local.is_not(None)]
+        filtros_crises = [registros.c.tipo_registro == 'crise']
+        if paciente_id is not None:
+            remover = remover.where(tabela.c.paciente_id == paciente_id)
+            filtros_diarios.append(registros.c.paciente_id == paciente_id)
+            filtros_crises.append(registros.c.paciente_id == paciente_id)
+        if inicio is not None:
+            fim = fim_do_periodo(inicio, atual)
+            remover = remover.where(tabela.c.inicio == inicio)
+            filtros_diarios.append(registros.c.dia_local.between(inicio, fim))
+            filtros_crises.extend((
+                registros.c.data_hora >= datetime.combine(inicio, time.min),
+                registros.c.data_hora
+                < datetime.combine(fim + timedelta(days=1), time.min),
+            ))
+        await session.execute(remover)
+
+        inicio_diario = inicio_periodo(session, registros.c.dia_local, atual)
+        agregados = select(
+            registros.c.paciente_id,
+            literal(atual),
+            inicio_diario,
+            func.count(),
+            *(func.sum(diarios.c[metrica]) for metrica in METRICAS),
+            *(
+                func.sum(diarios.c[metrica] * diarios.c[metrica])
+                for metrica in METRICAS
+            ),
+            *(
+                func.sum(
+                    case((diarios.c.estado_emocional == estado, 1), else_=0)
+                )
+                for estado in EMOCOES
+            ),
+            *(func.min(diarios.c[metrica]) for metrica in METRICAS),
+            *(func.max(diarios.c[metrica]) for metrica in METRICAS),
+        )
+        agregados = (
+            agregados
+            .select_from(registros)
+            .join(diarios, diarios.c.id == registros.c.id)
+            .where(*filtros_diarios)
+            .group_by(registros.c.paciente_id, inicio_diario)
+        )
+        await session.execute(
+            tabela.insert().from_select(
+                [
+                    *_CHAVE,
+                    *_CONTADORES[:-1],
+                    *(f'min_{metrica}' for metrica in METRICAS),
+                    *(f'max_{metrica}' for metrica in METRICAS),
+                ],
+                agregados,
+            )
+        )
+
+        inicio_crise = inicio_periodo(
+            session, dia_de(session, registros.c.data_hora), atual
+        )
+        crises = (
+            select(
+                registros.c.paciente_id,
+                literal(atual),
+                inicio_crise,
+                func.count(),
+            )
+            .where(*filtros_crises)
+            .group_by(registros.c.paciente_id, inicio_crise)
+        )
+        statement = upsert(session, tabela).from_select(
+            [*_CHAVE, 'crises'], crises
+        )
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=_CHAVE,
+                set_={'crises': statement.excluded.crises},
+            )
+        )
+
+
+async def _main(paciente_id: int | None) -> None:
+    async with async_session() as session:
+        await reconstruir_resumos(session, paciente_id)
+        await session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Reconstrói os resumos semanais e mensais dos registros.'
+    )
+    parser.add_argument(
+        '--paciente', type=int, help='Reconstrói apenas este paciente.'
+    )
+    asyncio.run(_main(parser.parse_args().paciente))
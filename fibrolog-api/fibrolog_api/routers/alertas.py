@@ -0,0 +1,320 @@
+"""
+Rotas para o CRUD de alertas de medicação e consulta e a sua agenda.
+"""
+
+import heapq
+import zoneinfo
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.agendador import agendador_alertas
+from fibrolog_api.database import get_session
+from fibrolog_api.models import Alerta, Paciente
+from fibrolog_api.pagination import decode_cursor, encode_cursor
+from fibrolog_api.recorrencia import ocorrencias_entre, proxima_execucao
+from fibrolog_api.relogio import utcnow
+from fibrolog_api.schemas.alerta import (
+    AgendaAlertas,
+    AlertaList,
+    AlertaPublic,
+    AlertaSchema,
+    AlertaUpdate,
+    FilterAgenda,
+    FilterAlertas,
+)
+from fibrolog_api.security import get_current_paciente
+
+router = APIRouter(prefix='/alertas', tags=['Alertas'])
+
+Session = Annotated[AsyncSession, Depends(get_session)]
+CurrentPaciente = Annotated[Paciente, Depends(get_current_paciente)]
+
+JANELA_AGENDA_PADRAO = timedelta(days=7)
+JANELA_AGENDA_MAXIMA = timedelta(days=366)
+
+
+def _data_hora_utc(paciente: Paciente, data_hora: datetime) -> datetime:
+    """Converte o momento informado para UTC, sem fuso."""
+    if data_hora.tzinfo is None:
+        data_hora = data_hora.replace(
+            tzinfo=zoneinfo.ZoneInfo(paciente.fuso_horario)
+        )
+    return data_hora.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _agendar(paciente: Paciente, alerta: Alerta) -> None:
+    """
+    Calcula o próximo disparo do alerta a partir de agora.
+
+    Raises:
+        HTTPException: Se o alerta não tem ocorrências futuras.
+    """
+    proxima = proxima_execucao(
+        alerta.data_hora, alerta.recorrencia, paciente.fuso_horario, utcnow()
+    )
+    if proxima is None:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='O alerta não tem ocorrências no futuro.',
+        )
+    alerta.proxima_execucao = proxima
+
+
+async def _buscar_alerta(
+    session: AsyncSession, alerta_id: int, paciente: Paciente
+) -> Alerta:
+    alerta = await session.scalar(
+        select(Alerta).where(
+            Alerta.id == alerta_id, Alerta.paciente_id == paciente.id
+        )
+    )
+    if not alerta:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='Alerta não encontrado.',
+        )
+    return alerta
+
+
+async def _atualizar_alerta(
+    session: AsyncSession, paciente: Paciente, alerta: Alerta, dados: dict
+) -> Alerta:
+    for key, value in dados.items():
+        setattr(alerta, key, value)
+    # Mudanças na série (ou a reativação) recalculam o próximo disparo
+    if alerta.ativo and dados.keys() & {'data_hora', 'recorrencia', 'ativo'}:
+        _agendar(paciente, alerta)
+    await session.commit()
+    await session.refresh(alerta)
+
+    if alerta.ativo:
+        agendador_alertas.agendar(alerta.id, alerta.proxima_execucao)
+    else:
+        agendador_alertas.cancelar(alerta.id)
+    return alerta
+
+
+def _ocorrencias(
+    paciente: Paciente, alerta: Alerta, de: datetime, ate: datetime
+) -> Iterator[tuple[datetime, int, Alerta]]:
+    for ocorrencia in ocorrencias_entre(
+        alerta.data_hora, alerta.recorrencia, paciente.fuso_horario, de, ate
+    ):
+        yield ocorrencia, alerta.id, alerta
+
+
+@router.post(
+    '/',
+    status_code=HTTPStatus.CREATED,
+    response_model=AlertaPublic,
+    summary='Criar alerta',
+    description=(
+        'Agenda um alerta de medicação ou consulta. `data_hora` sem fuso é '
+        'interpretada no fuso horário do paciente e é retornada em UTC. Com '
+        '`recorrencia` (RRULE com FREQ HOURLY, DAILY ou WEEKLY), '
+        '`data_hora` é o início da série e `proxima_execucao` é a próxima '
+        'ocorrência'
+    ),
+)
+async def create_alerta(
+    alerta_schema: AlertaSchema, session: Session, paciente: CurrentPaciente
+):
+    data_hora = _data_hora_utc(paciente, alerta_schema.data_hora)
+    alerta = Alerta(
+        paciente_id=paciente.id,
+        **alerta_schema.model_dump(exclude={'data_hora'}),
+        data_hora=data_hora,
+        proxima_execucao=data_hora,
+    )
+    _agendar(paciente, alerta)
+    session.add(alerta)
+    await session.commit()
+    await session.refresh(alerta)
+
+    agendador_alertas.agendar(alerta.id, alerta.proxima_execucao)
+    return alerta
+
+
+@router.get(
+    '/',
+    response_model=AlertaList,
+    summary='Listar alertas',
+    description=(
+        'Retorna os alertas do paciente autenticado pela próxima execução, '
+        'da mais próxima para a mais distante, paginados por cursor e '
+        'opcionalmente filtrados por `ativo`'
+    ),
+)
+async def get_alertas(
+    session: Session,
+    paciente: CurrentPaciente,
+    filtro: Annotated[FilterAlertas, Query()],
+):
+    statement = (
+        select(Alerta)
+        .where(Alerta.paciente_id == paciente.id)
+        .order_by(Alerta.proxima_execucao, Alerta.id)
+        .limit(filtro.limit + 1)
+    )
+    if filtro.ativo is not None:
+        statement = statement.where(Alerta.ativo == filtro.ativo)
+    if filtro.cursor:
+        proxima, alerta_id = decode_cursor(filtro.cursor, (datetime, int))
+        statement = statement.where(
+            or_(
+                Alerta.proxima_execucao > proxima,
+                and_(
+                    Alerta.proxima_execucao == proxima, Alerta.id > alerta_id
+                ),
+            )
+        )
+
+    alertas = (await session.scalars(statement)).all()
+
+    proximo_cursor = None
+    if len(alertas) > filtro.limit:
+        alertas = alertas[: filtro.limit]
+        ultimo = alertas[-1]
+        proximo_cursor = encode_cursor(
+            ultimo.proxima_execucao.isoformat(), ultimo.id
+        )
+
+    return {'alertas': alertas, 'proximo_cursor': proximo_cursor}
+
+
+@router.get(
+    '/agenda',
+    response_model=AgendaAlertas,
+    summary='Agenda de alertas',
+    description=(
+        'Retorna as ocorrências dos alertas ativos na janela from/to (por '
+        'padrão, os próximos 7 dias), em ordem. As ocorrências dos alertas '
+        'recorrentes são calculadas a partir da regra, sem serem gravadas'
+    ),
+)
+async def get_agenda_alertas(
+    session: Session,
+    paciente: CurrentPaciente,
+    filtro: Annotated[FilterAgenda, Query()],
+):
+    de = _data_hora_utc(paciente, filtro.de) if filtro.de else utcnow()
+    ate = (
+        _data_hora_utc(paciente, filtro.ate)
+        if filtro.ate
+        else de + JANELA_AGENDA_PADRAO
+    )
+    if not de < ate <= de + JANELA_AGENDA_MAXIMA:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='A janela da agenda deve ter entre 0 e 366 dias.',
+        )
+
+    alertas = (
+        await session.scalars(
+            select(Alerta).where(
+                Alerta.paciente_id == paciente.id,
+                Alerta.ativo,
+                Alerta.proxima_execucao < ate,
+            )
+        )
+    ).all()
+    series = [
+        _ocorrencias(paciente, alerta, max(de, alerta.proxima_execucao), ate)
+        for alerta in alertas
+    ]
+    ocorrencias = []
+    for ocorrencia, _, alerta in heapq.merge(*series):
+        if len(ocorrencias) == filtro.limit:
+            break
+        ocorrencias.append({
+            'alerta_id': alerta.id,
+            'tipo': alerta.tipo,
+            'descricao': alerta.descricao,
+            'data_hora': ocorrencia.replace(tzinfo=timezone.utc),
+        })
+    return {'ocorrencias': ocorrencias}
+
+
+@router.get(
+    '/{alerta_id}',
+    response_model=AlertaPublic,
+    summary='Buscar alerta',
+    description='Retorna um alerta específico',
+)
+async def get_alerta(
+    alerta_id: int, session: Session, paciente: CurrentPaciente
+):
+    return await _buscar_alerta(session, alerta_id, paciente)
+
+
+@router.put(
+    '/{alerta_id}',
+    response_model=AlertaPublic,
+    summary='Atualizar alerta',
+    description='Atualiza um alerta existente e o agenda de novo',
+)
+async def update_alerta(
+    alerta_id: int,
+    alerta_schema: AlertaSchema,
+    session: Session,
+    paciente: CurrentPaciente,
+):
+    alerta = await _buscar_alerta(session, alerta_id, paciente)
+
+    dados = alerta_schema.model_dump()
+    dados['data_hora'] = _data_hora_utc(paciente, alerta_schema.data_hora)
+    dados['ativo'] = True
+    return await _atualizar_alerta(session, paciente, alerta, dados)
+
+
+@router.patch(
+    '/{alerta_id}',
+    response_model=AlertaPublic,
+    summary='Atualizar parcialmente alerta',
+    description=(
+        'Atualiza parcialmente um alerta existente. Com `ativo` falso, o '
+        'alerta deixa de ser disparado'
+    ),
+)
+async def patch_alerta(
+    alerta_id: int,
+    alerta_schema: AlertaUpdate,
+    session: Session,
+    paciente: CurrentPaciente,
+):
+    alerta = await _buscar_alerta(session, alerta_id, paciente)
+
+    # `recorrencia` nula remove a recorrência; os demais campos nulos são
+    # ignorados
+    dados = {
+        campo: valor
+        for campo, valor in alerta_schema.model_dump(
+            exclude_unset=True
+        ).items()
+        if valor is not None or campo == 'recorrencia'
+    }
+    if 'data_hora' in dados:
+        dados['data_hora'] = _data_hora_utc(paciente, dados['data_hora'])
+    return await _atualizar_alerta(session, paciente, alerta, dados)
+
+
+@router.delete(
+    '/{alerta_id}',
+    status_code=HTTPStatus.NO_CONTENT,
+    summary='Excluir alerta',
+    description='Exclui um alerta, cancelando o seu disparo',
+)
+async def delete_alerta(
+    alerta_id: int, session: Session, paciente: CurrentPaciente
+):
+    alerta = await _buscar_alerta(session, alerta_id, paciente)
+    await session.delete(alerta)
+    await session.commit()
+
+    agendador_alertas.cancelar(alerta_id)
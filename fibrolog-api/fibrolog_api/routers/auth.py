@@ -3,16 +3,25 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fibrolog_api.database import get_session
-from fibrolog_api.models import Paciente
-from fibrolog_api.schemas import Token
-from fibrolog_api.security import create_access_token, verify_password
+from fibrolog_api.models import Paciente, RefreshToken
+from fibrolog_api.schemas import Message, RefreshTokenRequest, Token
+from fibrolog_api.security import (
+    create_access_token,
+    create_refresh_token,
+    hash_refresh_token,
+    revoke_refresh_tokens,
+    utcnow,
+    verify_password,
+)
 
 router = APIRouter(prefix='/auth', tags=['Autenticação'])
 
+Session = Annotated[AsyncSession, Depends(get_session)]
+
 
 @router.post(
     '/token',
@@ -22,13 +31,13 @@ router = APIRouter(prefix='/auth', tags=['Autenticação'])
 )
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Annotated[AsyncSession, Depends(get_session)],
+    session: Session,
 ):
     paciente = await session.scalar(
         select(Paciente).where(Paciente.email == form_data.username)
     )
 
-    credentials_ok = paciente and verify_password(
+    credentials_ok = paciente and await verify_password(
         form_data.password, paciente.password
     )
     if not credentials_ok:
@@ -38,5 +47,91 @@ async def login(
         )
 
     access_token = create_access_token(data={'sub': paciente.email})
+    refresh_token = create_refresh_token(session, paciente.id)
+    await session.commit()
+
+    return {
+        'access_token': access_token,
+        'token_type': 'bearer',
+        'refresh_token': refresh_token,
+    }
+
+
+@router.post(
+    '/refresh',
+    response_model=Token,
+    summary='Renovar token',
+    description=(
+        'Troca um refresh token válido por um novo par de tokens. O refresh '
+        'token usado é revogado; reutilizá-lo revoga todos os tokens do '
+        'paciente'
+    ),
+)
+async def refresh_access_token(body: RefreshTokenRequest, session: Session):
+    invalid_token_exception = HTTPException(
+        status_code=HTTPStatus.UNAUTHORIZED,
+        detail='Refresh token inválido ou expirado',
+        headers={'WWW-Authenticate': 'Bearer'},
+    )
+
+    token_hash = hash_refresh_token(body.refresh_token)
+    row = (
+        await session.execute(
+            select(
+                RefreshToken.id,
+                RefreshToken.paciente_id,
+                RefreshToken.expira_em,
+                Paciente.email,
+            )
+            .join(Paciente, Paciente.id == RefreshToken.paciente_id)
+            .where(RefreshToken.token_hash == token_hash)
+        )
+    ).first()
+    if not row:
+        raise invalid_token_exception
+
+    now = utcnow()
+    if row.expira_em <= now:
+        raise invalid_token_exception
+
+    # Revogação condicional: só uma requisição consegue rotacionar o token.
+    result = await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.revogado_em.is_(None))
+        .values(revogado_em=now)
+    )
+    if result.rowcount != 1:
+        # Token já rotacionado sendo reutilizado: possível vazamento.
+        await revoke_refresh_tokens(session, row.paciente_id)
+        await session.commit()
+        raise invalid_token_exception
+
+    access_token = create_access_token(data={'sub': row.email})
+    refresh_token = create_refresh_token(session, row.paciente_id)
+    await session.commit()
+
+    return {
+        'access_token': access_token,
+        'token_type': 'bearer',
+        'refresh_token': refresh_token,
+    }
+
+
+@router.post(
+    '/revoke',
+    response_model=Message,
+    summary='Revogar refresh token',
+    description='Revoga um refresh token (por exemplo, ao sair do app)',
+)
+async def revoke_refresh_token(body: RefreshTokenRequest, session: Session):
+    await session.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(body.refresh_token),
+            RefreshToken.revogado_em.is_(None),
+        )
+        .values(revogado_em=utcnow())
+    )
+    await session.commit()
 
-    return {'access_token': access_token, 'token_type': 'bearer'}
+    return {'message': 'Token revogado'}
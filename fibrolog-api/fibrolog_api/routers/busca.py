@@ -0,0 +1,71 @@
+"""
+Rotas para a busca textual no histórico do paciente.
+"""
+
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.busca import buscar
+from fibrolog_api.database import get_session
+from fibrolog_api.models import Paciente
+from fibrolog_api.pagination import decode_cursor, encode_cursor
+from fibrolog_api.schemas.busca import BuscaList, FilterBusca
+from fibrolog_api.security import get_current_paciente
+
+router = APIRouter(prefix='/busca', tags=['Busca'])
+
+Session = Annotated[AsyncSession, Depends(get_session)]
+CurrentPaciente = Annotated[Paciente, Depends(get_current_paciente)]
+
+
+@router.get(
+    '/',
+    response_model=BuscaList,
+    summary='Buscar no histórico',
+    description=(
+        'Busca palavras nas transcrições das crises, nas localizações da dor '
+        'dos registros diários e nas medicações do paciente autenticado, '
+        'ignorando acentos e maiúsculas. Todas as palavras devem aparecer '
+        'no texto, no singular ou no plural. Os resultados vêm do mais '
+        'relevante ao menos relevante, paginados por cursor'
+    ),
+)
+async def get_busca(
+    session: Session,
+    paciente: CurrentPaciente,
+    filtro: Annotated[FilterBusca, Query()],
+):
+    if session.bind.dialect.name != 'sqlite':
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_IMPLEMENTED,
+            detail='A busca textual só está disponível com SQLite.',
+        )
+
+    apos = None
+    if filtro.cursor:
+        apos = tuple(decode_cursor(filtro.cursor, (float, int)))
+    linhas = await buscar(
+        session, paciente.id, filtro.q, filtro.limit + 1, apos
+    )
+
+    proximo_cursor = None
+    if len(linhas) > filtro.limit:
+        linhas = linhas[: filtro.limit]
+        proximo_cursor = encode_cursor(linhas[-1].relevancia, linhas[-1].id)
+
+    return {
+        'resultados': [
+            {
+                'tipo': linha.tipo,
+                'registro_id': linha.id if linha.id > 0 else None,
+                'data_hora': linha.data_hora,
+                'trecho': linha.trecho,
+                'relevancia': linha.relevancia,
+            }
+            for linha in linhas
+        ],
+        'proximo_cursor': proximo_cursor,
+    }
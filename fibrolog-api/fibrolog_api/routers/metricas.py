@@ -0,0 +1,111 @@
+"""
+Rotas para consulta de métricas internas da aplicação.
+
+As métricas são operacionais, e não de um paciente: em vez do login, as
+rotas exigem o token de `METRICS_TOKEN`, usado por operadores e coletores.
+Sem o token configurado, elas ficam desativadas.
+"""
+
+import secrets
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from fibrolog_api.agendador import agendador_alertas
+from fibrolog_api.compressao import metricas_compressao
+from fibrolog_api.notificacoes import despachante_notificacoes
+from fibrolog_api.security import password_hasher
+from fibrolog_api.settings import Settings
+from fibrolog_api.transcricao import fila_transcricao
+
+settings = Settings()
+
+token_metricas = HTTPBearer(auto_error=False)
+
+
+async def verificar_token_metricas(
+    credenciais: Annotated[
+        HTTPAuthorizationCredentials | None, Depends(token_metricas)
+    ],
+):
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND)
+    if credenciais is None or not secrets.compare_digest(
+        credenciais.credentials.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail='Token de métricas inválido',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+
+
+router = APIRouter(
+    prefix='/metricas',
+    tags=['Métricas'],
+    dependencies=[Depends(verificar_token_metricas)],
+)
+
+
+@router.get(
+    '/hashing',
+    summary='Métricas de hash de senhas',
+    description=(
+        'Retorna o tempo de espera na fila e o tempo de hash do pool de '
+        'processos usado para Argon2'
+    ),
+)
+async def get_metricas_hashing():
+    return password_hasher.metricas()
+
+
+@router.get(
+    '/alertas',
+    summary='Métricas do agendador de alertas',
+    description=(
+        'Retorna os alertas agendados em memória, as cargas feitas do banco '
+        'e os alertas disparados neste processo, com o atraso médio do '
+        'disparo'
+    ),
+)
+async def get_metricas_alertas():
+    return agendador_alertas.resumo()
+
+
+@router.get(
+    '/compressao',
+    summary='Métricas de compressão',
+    description=(
+        'Retorna, por rota, os bytes antes e depois da compressão das '
+        'respostas e o tempo de CPU gasto comprimindo'
+    ),
+)
+async def get_metricas_compressao():
+    return metricas_compressao.resumo()
+
+
+@router.get(
+    '/notificacoes',
+    summary='Métricas de notificações',
+    description=(
+        'Retorna as notificações aos contatos de apoio enviadas, repetidas '
+        'e com falha neste processo, por canal, e o tempo médio entre o '
+        'registro e o envio'
+    ),
+)
+async def get_metricas_notificacoes():
+    return despachante_notificacoes.resumo()
+
+
+@router.get(
+    '/transcricao',
+    summary='Métricas de transcrição',
+    description=(
+        'Retorna as tarefas de transcrição concluídas, repetidas e com falha '
+        'neste processo e os tempos médios de espera na fila e de transcrição'
+    ),
+)
+async def get_metricas_transcricao():
+    return fila_transcricao.resumo()
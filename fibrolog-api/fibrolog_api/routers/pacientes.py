@@ -1,28 +1,47 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from fibrolog_api import json_rapido
 from fibrolog_api.database import get_session
+from fibrolog_api.http_cache import (
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_cache_headers,
+)
 from fibrolog_api.models import Paciente
+from fibrolog_api.pagination import decode_cursor, encode_cursor
 from fibrolog_api.schemas import (
-    FilterPage,
+    FilterCursor,
     Message,
     PacienteList,
+    PacienteListDict,
     PacientePublic,
     PacienteSchema,
     PacienteUpdate,
 )
-from fibrolog_api.security import get_current_paciente, get_password_hash
+from fibrolog_api.security import (
+    get_current_paciente,
+    get_password_hash,
+    principal_cache,
+    revoke_refresh_tokens,
+    verify_password,
+)
 
 router = APIRouter(prefix='/pacientes', tags=['Pacientes'])
 
 Session = Annotated[AsyncSession, Depends(get_session)]
 DBPaciente = Annotated[Paciente, Depends(get_current_paciente)]
 
+PACIENTE_COLUNAS = json_rapido.colunas_publicas(Paciente, PacientePublic)
+PACIENTE_LIST_JSON = TypeAdapter(PacienteListDict)
+
 
 @router.post(
     '/',
@@ -44,11 +63,12 @@ async def create_paciente(paciente: PacienteSchema, session: Session):
     db_paciente = Paciente(
         nome=paciente.nome,
         email=paciente.email,
-        password=get_password_hash(paciente.password),
+        password=await get_password_hash(paciente.password),
         data_nascimento=paciente.data_nascimento,
         sexo=paciente.sexo,
         data_diagnostico=paciente.data_diagnostico,
         medicacoes=paciente.medicacoes,
+        fuso_horario=paciente.fuso_horario,
     )
     session.add(db_paciente)
     await session.commit()
@@ -60,31 +80,76 @@ async def create_paciente(paciente: PacienteSchema, session: Session):
     '/',
     response_model=PacienteList,
     summary='Listar pacientes',
-    description='Retorna lista paginada de pacientes',
+    description='Retorna lista de pacientes paginada por cursor',
 )
 async def get_pacientes(
-    session: Session, filter_page: Annotated[FilterPage, Query()]
+    session: Session, filter_page: Annotated[FilterCursor, Query()]
 ):
-    pacientes = await session.scalars(
-        select(Paciente).offset(filter_page.offset).limit(filter_page.limit)
+    statement = (
+        select(Paciente).order_by(Paciente.id).limit(filter_page.limit + 1)
     )
-    return {'pacientes': pacientes.all()}
+    if filter_page.cursor:
+        (ultimo_id,) = decode_cursor(filter_page.cursor, (int,))
+        statement = statement.where(Paciente.id > ultimo_id)
+
+    rapido = json_rapido.ativo()
+    if rapido:
+        statement = statement.with_only_columns(*PACIENTE_COLUNAS)
+        pacientes = (await session.execute(statement)).all()
+    else:
+        pacientes = (await session.scalars(statement)).all()
+
+    proximo_cursor = None
+    if len(pacientes) > filter_page.limit:
+        pacientes = pacientes[: filter_page.limit]
+        proximo_cursor = encode_cursor(pacientes[-1].id)
+
+    if rapido:
+        return json_rapido.resposta_json(
+            PACIENTE_LIST_JSON,
+            {
+                'pacientes': [linha._asdict() for linha in pacientes],
+                'proximo_cursor': proximo_cursor,
+            },
+        )
+    return {'pacientes': pacientes, 'proximo_cursor': proximo_cursor}
 
 
 @router.get(
     '/{paciente_id}',
     response_model=PacientePublic,
     summary='Buscar paciente',
-    description='Retorna os dados de um paciente específico',
+    description=(
+        'Retorna os dados de um paciente específico. Suporta requisições '
+        'condicionais com `If-None-Match`'
+    ),
+    responses={HTTPStatus.NOT_MODIFIED: {'description': 'Não modificado'}},
 )
-async def get_paciente(paciente_id: int, session: Session):
-    paciente = await session.scalar(
-        select(Paciente).where(Paciente.id == paciente_id)
-    )
-    if not paciente:
+async def get_paciente(
+    paciente_id: int, session: Session, request: Request, response: Response
+):
+    versao = (
+        await session.execute(
+            select(Paciente.versao, Paciente.created_at).where(
+                Paciente.id == paciente_id
+            )
+        )
+    ).first()
+    if versao is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Paciente não encontrado'
         )
+
+    # O id de uma conta excluída pode ser reutilizado; `created_at` impede
+    # que a nova conta, também na versão 1, valide a ETag da anterior.
+    etag = make_etag('paciente', paciente_id, *versao)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    paciente = await session.scalar(
+        select(Paciente).where(Paciente.id == paciente_id)
+    )
+    set_cache_headers(response, etag)
     return paciente
 
 
@@ -105,23 +170,29 @@ async def update_paciente(
             status_code=HTTPStatus.FORBIDDEN, detail='Permissões insuficientes'
         )
 
+    current_paciente.nome = paciente.nome
+    current_paciente.email = paciente.email
+    if not await verify_password(paciente.password, current_paciente.password):
+        current_paciente.password = await get_password_hash(paciente.password)
+        # Nova senha encerra as sessões abertas com a senha antiga
+        await revoke_refresh_tokens(session, current_paciente.id)
+    current_paciente.data_nascimento = paciente.data_nascimento
+    current_paciente.sexo = paciente.sexo
+    current_paciente.data_diagnostico = paciente.data_diagnostico
+    current_paciente.medicacoes = paciente.medicacoes
+    current_paciente.fuso_horario = paciente.fuso_horario
+    current_paciente.versao = Paciente.versao + 1
     try:
-        current_paciente.nome = paciente.nome
-        current_paciente.email = paciente.email
-        current_paciente.password = get_password_hash(paciente.password)
-        current_paciente.data_nascimento = paciente.data_nascimento
-        current_paciente.sexo = paciente.sexo
-        current_paciente.data_diagnostico = paciente.data_diagnostico
-        current_paciente.medicacoes = paciente.medicacoes
         await session.commit()
-        await session.refresh(current_paciente)
-        return current_paciente
     except IntegrityError:
         await session.rollback()
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT,
             detail='Email já cadastrado',
         )
+    principal_cache.invalidate(current_paciente.id)
+    await session.refresh(current_paciente)
+    return current_paciente
 
 
 @router.patch(
@@ -145,11 +216,14 @@ async def patch_paciente(
 
     for key, value in paciente_data.items():
         if key == 'password':
-            setattr(current_paciente, key, get_password_hash(value))
+            setattr(current_paciente, key, await get_password_hash(value))
+            await revoke_refresh_tokens(session, current_paciente.id)
         else:
             setattr(current_paciente, key, value)
+    current_paciente.versao = Paciente.versao + 1
     try:
         await session.commit()
+        principal_cache.invalidate(current_paciente.id)
         await session.refresh(current_paciente)
     except IntegrityError:
         await session.rollback()
@@ -178,5 +252,6 @@ async def delete_paciente(
 
     await session.delete(current_paciente)
     await session.commit()
+    principal_cache.invalidate(paciente_id)
 
     return {'message': 'Paciente excluído'}
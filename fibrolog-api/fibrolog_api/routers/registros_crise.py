@@ -0,0 +1,521 @@
+"""
+Rotas para o CRUD de registros de crise e o upload dos seus áudios.
+"""
+
+import zoneinfo
+from datetime import datetime, time, timedelta
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import FileResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.audio import (
+    AudioArmazenado,
+    caminho_audio,
+    receber_audio,
+    remover_audio_orfao,
+    tipo_audio,
+)
+from fibrolog_api.database import get_session
+from fibrolog_api.models import Paciente, Registro, RegistroCrise
+from fibrolog_api.notificacoes import (
+    despachante_notificacoes,
+    notificar_crise,
+)
+from fibrolog_api.pagination import decode_cursor, encode_cursor
+from fibrolog_api.resumos import AtualizacaoResumos
+from fibrolog_api.schemas import FilterPeriodo
+from fibrolog_api.schemas.registro_crise import (
+    RegistroCriseList,
+    RegistroCrisePublic,
+    RegistroCriseSchema,
+    RegistroCriseUpdate,
+    UploadAudioPublic,
+    UploadAudioSchema,
+)
+from fibrolog_api.security import get_current_paciente
+from fibrolog_api.sincronizacao import registrar_remocao, reservar_seq
+from fibrolog_api.transcricao import (
+    cancelar_transcricoes,
+    enfileirar_transcricao,
+    fila_transcricao,
+)
+from fibrolog_api.uploads import (
+    buscar_upload,
+    concluir_upload,
+    criar_upload,
+    descartar_uploads,
+    gravar_pedaco,
+)
+
+router = APIRouter(prefix='/registros-crise', tags=['Registros de Crise'])
+
+Session = Annotated[AsyncSession, Depends(get_session)]
+CurrentPaciente = Annotated[Paciente, Depends(get_current_paciente)]
+
+
+def _data_hora_local(paciente: Paciente, data_hora: datetime | None):
+    """
+    Converte o momento informado para a hora local do paciente, sem fuso.
+
+    Raises:
+        HTTPException: Se o momento está no futuro.
+    """
+    fuso = zoneinfo.ZoneInfo(paciente.fuso_horario)
+    now = datetime.now(fuso)
+    if data_hora is None:
+        data_hora = now
+    elif data_hora.tzinfo is None:
+        data_hora = data_hora.replace(tzinfo=fuso)
+    else:
+        data_hora = data_hora.astimezone(fuso)
+
+    if data_hora > now:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='A data da crise não pode estar no futuro.',
+        )
+    return data_hora.replace(tzinfo=None)
+
+
+async def _buscar_crise(
+    session: AsyncSession, registro_id: int, paciente: Paciente
+) -> RegistroCrise:
+    registro = await session.scalar(
+        select(RegistroCrise).where(
+            RegistroCrise.id == registro_id,
+            RegistroCrise.paciente_id == paciente.id,
+        )
+    )
+    if not registro:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='Registro de crise não encontrado.',
+        )
+    return registro
+
+
+async def _atualizar_crise(
+    session: AsyncSession, registro: RegistroCrise, dados: dict
+) -> RegistroCrise:
+    """Aplica `dados` ao registro, movendo a crise nos resumos se mudar."""
+    resumos = AtualizacaoResumos(registro.paciente_id)
+    resumos.remover_crise(registro.data_hora.date())
+
+    for key, value in dados.items():
+        setattr(registro, key, value)
+    resumos.adicionar_crise(registro.data_hora.date())
+    registro.versao = RegistroCrise.versao + 1
+    registro.seq = await reservar_seq(session, registro.paciente_id)
+
+    await session.flush()
+    await resumos.aplicar(session)
+    await session.commit()
+    await session.refresh(registro)
+    return registro
+
+
+async def _trocar_audio(
+    session: AsyncSession,
+    registro: RegistroCrise,
+    anterior: str | None,
+    audio: AudioArmazenado,
+) -> RegistroCrise:
+    """
+    Associa o áudio ao registro, agenda a sua transcrição e apaga o
+    anterior, se ficou órfão.
+    """
+    registro.audio_path = audio.audio_path
+    registro.texto_transcrito = None
+    registro.versao = RegistroCrise.versao + 1
+    registro.seq = await reservar_seq(session, registro.paciente_id)
+    await enfileirar_transcricao(session, registro.id, audio.audio_path)
+    try:
+        await session.commit()
+    finally:
+        await audio.confirmar()
+    await session.refresh(registro)
+    fila_transcricao.notificar()
+
+    if anterior and anterior != audio.audio_path:
+        await remover_audio_orfao(session, anterior)
+    return registro
+
+
+@router.post(
+    '/',
+    status_code=HTTPStatus.CREATED,
+    response_model=RegistroCrisePublic,
+    summary='Criar registro de crise',
+    description=(
+        'Registra uma crise. Se `data_hora` for omitida, usa o momento '
+        'atual no fuso horário do paciente. O áudio é enviado depois, em '
+        '`PUT /registros-crise/{id}/audio`. Os contatos de apoio do '
+        'paciente são avisados por e-mail e telefone em segundo plano'
+    ),
+)
+async def create_registro_crise(
+    registro_schema: RegistroCriseSchema,
+    session: Session,
+    paciente: CurrentPaciente,
+):
+    registro = RegistroCrise(
+        tipo_registro='crise',
+        paciente_id=paciente.id,
+        **registro_schema.model_dump(exclude={'data_hora'}),
+    )
+    registro.data_hora = _data_hora_local(paciente, registro_schema.data_hora)
+    registro.seq = await reservar_seq(session, paciente.id)
+    session.add(registro)
+
+    resumos = AtualizacaoResumos(paciente.id)
+    resumos.adicionar_crise(registro.data_hora.date())
+    await session.flush()
+    await resumos.aplicar(session)
+    notificacoes = await notificar_crise(session, paciente, registro)
+    await session.commit()
+    await session.refresh(registro)
+    if notificacoes:
+        despachante_notificacoes.notificar()
+    return registro
+
+
+@router.get(
+    '/',
+    response_model=RegistroCriseList,
+    summary='Listar registros de crise',
+    description=(
+        'Retorna os registros de crise do paciente autenticado, do mais '
+        'recente para o mais antigo, paginados por cursor e opcionalmente '
+        'filtrados por período (from/to, inclusivos)'
+    ),
+)
+async def get_registros_crise(
+    session: Session,
+    paciente: CurrentPaciente,
+    filtro: Annotated[FilterPeriodo, Query()],
+):
+    statement = (
+        select(RegistroCrise)
+        .where(RegistroCrise.paciente_id == paciente.id)
+        .order_by(RegistroCrise.data_hora.desc(), Registro.id.desc())
+        .limit(filtro.limit + 1)
+    )
+    if filtro.de:
+        statement = statement.where(
+            RegistroCrise.data_hora >= datetime.combine(filtro.de, time.min)
+        )
+    if filtro.ate:
+        statement = statement.where(
+            RegistroCrise.data_hora
+            < datetime.combine(filtro.ate + timedelta(days=1), time.min)
+        )
+    if filtro.cursor:
+        data_hora, registro_id = decode_cursor(filtro.cursor, (datetime, int))
+        statement = statement.where(
+            or_(
+                RegistroCrise.data_hora < data_hora,
+                and_(
+                    RegistroCrise.data_hora == data_hora,
+                    Registro.id < registro_id,
+                ),
+            )
+        )
+
+    registros = (await session.scalars(statement)).all()
+
+    proximo_cursor = None
+    if len(registros) > filtro.limit:
+        registros = registros[: filtro.limit]
+        ultimo = registros[-1]
+        proximo_cursor = encode_cursor(ultimo.data_hora.isoformat(), ultimo.id)
+
+    return {'registros': registros, 'proximo_cursor': proximo_cursor}
+
+
+@router.get(
+    '/{registro_id}',
+    response_model=RegistroCrisePublic,
+    summary='Buscar registro de crise',
+    description='Retorna um registro de crise específico',
+)
+async def get_registro_crise(
+    registro_id: int, session: Session, paciente: CurrentPaciente
+):
+    return await _buscar_crise(session, registro_id, paciente)
+
+
+@router.put(
+    '/{registro_id}',
+    response_model=RegistroCrisePublic,
+    summary='Atualizar registro de crise',
+    description='Atualiza um registro de crise existente',
+)
+async def update_registro_crise(
+    registro_id: int,
+    registro_schema: RegistroCriseSchema,
+    session: Session,
+    paciente: CurrentPaciente,
+):
+    registro = await _buscar_crise(session, registro_id, paciente)
+
+    dados = registro_schema.model_dump(exclude={'data_hora'})
+    if registro_schema.data_hora is not None:
+        dados['data_hora'] = _data_hora_local(
+            paciente, registro_schema.data_hora
+        )
+    return await _atualizar_crise(session, registro, dados)
+
+
+@router.patch(
+    '/{registro_id}',
+    response_model=RegistroCrisePublic,
+    summary='Atualizar parcialmente registro de crise',
+    description='Atualiza parcialmente um registro de crise existente',
+)
+async def patch_registro_crise(
+    registro_id: int,
+    registro_schema: RegistroCriseUpdate,
+    session: Session,
+    paciente: CurrentPaciente,
+):
+    registro = await _buscar_crise(session, registro_id, paciente)
+
+    dados = registro_schema.model_dump(exclude_unset=True)
+    if 'data_hora' in dados:
+        dados['data_hora'] = _data_hora_local(paciente, dados['data_hora'])
+    return await _atualizar_crise(session, registro, dados)
+
+
+@router.delete(
+    '/{registro_id}',
+    status_code=HTTPStatus.NO_CONTENT,
+    summary='Excluir registro de crise',
+    description='Exclui um registro de crise e, se não for usado, seu áudio',
+)
+async def delete_registro_crise(
+    registro_id: int, session: Session, paciente: CurrentPaciente
+):
+    registro = await _buscar_crise(session, registro_id, paciente)
+    audio_path = registro.audio_path
+
+    resumos = AtualizacaoResumos(paciente.id)
+    resumos.remover_crise(registro.data_hora.date())
+
+    await descartar_uploads(session, registro.id)
+    await cancelar_transcricoes(session, registro.id)
+    await registrar_remocao(session, registro)
+    await session.delete(registro)
+    await session.flush()
+    await resumos.aplicar(session)
+    await session.commit()
+
+    if audio_path:
+        await remover_audio_orfao(session, audio_path)
+
+
+@router.put(
+    '/{registro_id}/audio',
+    response_model=RegistroCrisePublic,
+    summary='Enviar áudio da crise',
+    description=(
+        'Envia (ou substitui) o áudio de um registro de crise, como o campo '
+        '`audio` de um formulário multipart. O arquivo é gravado em '
+        'streaming, sem ser mantido inteiro em memória; uploads idênticos '
+        'compartilham o mesmo arquivo'
+    ),
+    responses={
+        HTTPStatus.REQUEST_ENTITY_TOO_LARGE: {
+            'description': 'Áudio acima do limite'
+        },
+        HTTPStatus.UNSUPPORTED_MEDIA_TYPE: {
+            'description': 'Formato de áudio não suportado'
+        },
+    },
+)
+async def upload_audio_crise(
+    registro_id: int,
+    session: Session,
+    paciente: CurrentPaciente,
+    request: Request,
+):
+    # O registro é verificado antes de ler o corpo da requisição, e a
+    # transação de leitura não fica aberta durante o upload.
+    registro = await _buscar_crise(session, registro_id, paciente)
+    anterior = registro.audio_path
+    await session.commit()
+
+    return await _trocar_audio(
+        session, registro, anterior, await receber_audio(request)
+    )
+
+
+@router.get(
+    '/{registro_id}/audio',
+    response_class=FileResponse,
+    summary='Baixar áudio da crise',
+    description='Retorna o áudio de um registro de crise',
+    responses={HTTPStatus.OK: {'content': {'audio/*': {}}}},
+)
+async def get_audio_crise(
+    registro_id: int, session: Session, paciente: CurrentPaciente
+):
+    registro = await _buscar_crise(session, registro_id, paciente)
+    if not registro.audio_path:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='O registro de crise não tem áudio.',
+        )
+    return FileResponse(
+        caminho_audio(registro.audio_path),
+        media_type=tipo_audio(registro.audio_path),
+    )
+
+
+@router.post(
+    '/{registro_id}/audio/uploads',
+    status_code=HTTPStatus.CREATED,
+    response_model=UploadAudioPublic,
+    summary='Iniciar upload retomável de áudio',
+    description=(
+        'Cria uma sessão de upload para o áudio da crise. Envie os bytes em '
+        'um ou mais `PATCH` e finalize com `POST .../concluir`. Uma sessão '
+        'sem atividade expira após `AUDIO_UPLOAD_TTL_HOURS`'
+    ),
+)
+async def create_upload_audio(
+    registro_id: int,
+    upload_schema: UploadAudioSchema,
+    session: Session,
+    paciente: CurrentPaciente,
+    response: Response,
+):
+    registro = await _buscar_crise(session, registro_id, paciente)
+    upload = await criar_upload(
+        session, registro.id, upload_schema.tamanho, upload_schema.tipo
+    )
+    await session.commit()
+
+    response.headers['Location'] = (
+        f'{router.prefix}/{registro.id}/audio/uploads/{upload.id}'
+    )
+    return upload
+
+
+@router.get(
+    '/{registro_id}/audio/uploads/{upload_id}',
+    response_model=UploadAudioPublic,
+    summary='Consultar upload de áudio',
+    description=(
+        'Retorna quantos bytes do upload já foram recebidos, a partir de '
+        'onde o envio deve ser retomado (também no cabeçalho '
+        '`Upload-Offset`)'
+    ),
+)
+async def get_upload_audio(
+    registro_id: int,
+    upload_id: str,
+    session: Session,
+    paciente: CurrentPaciente,
+    response: Response,
+):
+    await _buscar_crise(session, registro_id, paciente)
+    upload = await buscar_upload(session, registro_id, upload_id)
+
+    response.headers['Upload-Offset'] = str(upload.recebido)
+    return upload
+
+
+@router.patch(
+    '/{registro_id}/audio/uploads/{upload_id}',
+    response_model=UploadAudioPublic,
+    summary='Enviar pedaço do áudio',
+    description=(
+        'Grava o corpo da requisição (bytes crus) a partir do offset do '
+        'cabeçalho `Upload-Offset`, que deve ser igual ao número de bytes '
+        'já recebidos. Se a conexão cair, os bytes que chegaram são '
+        'mantidos: consulte o upload e retome do novo offset'
+    ),
+    responses={
+        HTTPStatus.CONFLICT: {'description': 'Offset divergente'},
+        HTTPStatus.REQUEST_ENTITY_TOO_LARGE: {
+            'description': 'Pedaço além do tamanho declarado'
+        },
+    },
+)
+async def patch_upload_audio(  # noqa: PLR0913, PLR0917
+    registro_id: int,
+    upload_id: str,
+    upload_offset: Annotated[int, Header(ge=0)],
+    session: Session,
+    paciente: CurrentPaciente,
+    request: Request,
+    response: Response,
+):
+    await _buscar_crise(session, registro_id, paciente)
+    upload = await buscar_upload(session, registro_id, upload_id)
+    # A transação de leitura não fica aberta durante o envio do pedaço.
+    await session.commit()
+
+    await gravar_pedaco(session, upload, upload_offset, request)
+    await session.commit()
+
+    response.headers['Upload-Offset'] = str(upload.recebido)
+    return upload
+
+
+@router.post(
+    '/{registro_id}/audio/uploads/{upload_id}/concluir',
+    response_model=RegistroCrisePublic,
+    summary='Concluir upload de áudio',
+    description=(
+        'Associa o áudio completo ao registro de crise, substituindo o '
+        'anterior, e encerra a sessão de upload'
+    ),
+    responses={HTTPStatus.CONFLICT: {'description': 'Upload incompleto'}},
+)
+async def concluir_upload_audio(
+    registro_id: int,
+    upload_id: str,
+    session: Session,
+    paciente: CurrentPaciente,
+):
+    registro = await _buscar_crise(session, registro_id, paciente)
+    upload = await buscar_upload(session, registro_id, upload_id)
+
+    return await _trocar_audio(
+        session,
+        registro,
+        registro.audio_path,
+        await concluir_upload(session, upload),
+    )
+
+
+@router.delete(
+    '/{registro_id}/audio/uploads/{upload_id}',
+    status_code=HTTPStatus.NO_CONTENT,
+    summary='Cancelar upload de áudio',
+    description='Encerra a sessão de upload e descarta os bytes recebidos',
+)
+async def delete_upload_audio(
+    registro_id: int,
+    upload_id: str,
+    session: Session,
+    paciente: CurrentPaciente,
+):
+    await _buscar_crise(session, registro_id, paciente)
+    await buscar_upload(session, registro_id, upload_id)
+
+    await descartar_uploads(session, registro_id, upload_id)
+    await session.commit()
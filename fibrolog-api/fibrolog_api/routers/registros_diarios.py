@@ -3,31 +3,206 @@ Rotas para o CRUD de registros diários de sintomas.
 """
 
 import zoneinfo
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fibrolog_api.database import get_session
-from fibrolog_api.models import Paciente, RegistroDiario
+from fibrolog_api import json_rapido
+from fibrolog_api.analise import calcular_insights
+from fibrolog_api.database import get_session, upsert
+from fibrolog_api.detector import detectar_crises, invalidar_detector
+from fibrolog_api.estatisticas import (
+    agregar_registros_diarios,
+    frequencia_regioes,
+)
+from fibrolog_api.exportacao import MEDIA_TYPES, exportar_historico
+from fibrolog_api.http_cache import (
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_cache_headers,
+)
+from fibrolog_api.models import (
+    Paciente,
+    Registro,
+    RegistroDiario,
+    RegistroRemovido,
+)
+from fibrolog_api.pagination import decode_cursor, encode_cursor
+from fibrolog_api.regioes import (
+    descrever,
+    interpretar_localizacao,
+    mascara,
+    regioes_da_mascara,
+)
+from fibrolog_api.resumos import CAMPOS_DIARIO, AtualizacaoResumos
+from fibrolog_api.schemas import FilterPeriodo
 from fibrolog_api.schemas.registro_diario import (
+    RegistroDiarioBatch,
+    RegistroDiarioBatchResponse,
+    RegistroDiarioHeatmap,
+    RegistroDiarioHeatmapFiltro,
+    RegistroDiarioInsights,
+    RegistroDiarioInsightsFiltro,
     RegistroDiarioList,
+    RegistroDiarioListDict,
     RegistroDiarioPublic,
     RegistroDiarioSchema,
+    RegistroDiarioStats,
+    RegistroDiarioStatsFiltro,
     RegistroDiarioUpdate,
 )
 from fibrolog_api.security import get_current_paciente
+from fibrolog_api.sincronizacao import registrar_remocao, reservar_seq
 
 router = APIRouter(prefix='/registros-diarios', tags=['Registros Diários'])
 
 Session = Annotated[AsyncSession, Depends(get_session)]
 CurrentPaciente = Annotated[Paciente, Depends(get_current_paciente)]
 
-# Timezone for Brazil (São Paulo)
-TIMEZONE = zoneinfo.ZoneInfo('America/Sao_Paulo')
+REGISTRO_COLUNAS = json_rapido.colunas_publicas(
+    RegistroDiario, RegistroDiarioPublic
+)
+REGISTRO_LIST_JSON = TypeAdapter(RegistroDiarioListDict)
+
+
+def _fuso(paciente: Paciente) -> zoneinfo.ZoneInfo:
+    return zoneinfo.ZoneInfo(paciente.fuso_horario)
+
+
+def _valores(registro: RegistroDiario) -> dict:
+    return {campo: getattr(registro, campo) for campo in CAMPOS_DIARIO}
+
+
+def _com_regioes(dados: dict) -> dict:
+    """
+    Troca a lista `regioes_dor` recebida pela sua máscara de bits.
+
+    Sem a lista, as regiões são extraídas de `localizacao_dor`; sem o texto,
+    ele é preenchido com os rótulos das regiões, que ficam pesquisáveis.
+    """
+    if dados['regioes_dor'] is None:
+        dados['regioes_dor'] = interpretar_localizacao(
+            dados['localizacao_dor']
+        )
+    else:
+        dados['regioes_dor'] = mascara(dados['regioes_dor'])
+        if dados['localizacao_dor'] is None:
+            dados['localizacao_dor'] = descrever(dados['regioes_dor']) or None
+    return dados
+
+
+async def _upsert_registros_diarios(
+    session: AsyncSession,
+    paciente_id: int,
+    itens: list[tuple[datetime, dict]],
+):
+    """
+    Grava registros diários com upsert pelo índice (paciente_id, dia_local).
+
+    Requisições concorrentes do mesmo dia convergem para o mesmo registro
+    (RN006). Como a herança usa uma tabela por classe, há um único upsert
+    multi-linha por tabela, ambos na transação da sessão. Os resumos são
+    atualizados com a diferença entre os valores sobrescritos e os novos.
+
+    Args:
+        session: Sessão da requisição atual.
+        paciente_id: Paciente dono dos registros.
+        itens: Pares (data e hora local, valores do registro), no máximo um
+            por dia.
+
+    Returns:
+        Para cada item, a linha de `registros` (id, dia_local, data_hora,
+        versao) e a linha de `registros_diarios`, na ordem recebida.
+    """
+    primeiro_seq = await reservar_seq(session, paciente_id, len(itens))
+
+    registros = Registro.__table__
+    registro_stmt = upsert(session, registros).values([
+        {
+            'tipo_registro': 'diario',
+            'paciente_id': paciente_id,
+            'data_hora': data_hora,
+            'dia_local': data_hora.date(),
+            'seq': primeiro_seq + posicao,
+        }
+        for posicao, (data_hora, _) in enumerate(itens)
+    ])
+    registro_stmt = registro_stmt.on_conflict_do_update(
+        index_elements=['paciente_id', 'dia_local'],
+        set_={
+            'data_hora': registro_stmt.excluded.data_hora,
+            'seq': registro_stmt.excluded.seq,
+            'versao': registros.c.versao + 1,
+        },
+    ).returning(
+        registros.c.id,
+        registros.c.dia_local,
+        registros.c.data_hora,
+        registros.c.versao,
+    )
+    # A ordem das linhas do RETURNING não é garantida: associa pelo dia.
+    por_dia = {
+        row.dia_local: row
+        for row in (await session.execute(registro_stmt)).all()
+    }
+
+    # O upsert acima bloqueia as linhas existentes: os valores que serão
+    # sobrescritos podem ser lidos sem disputa com outras transações.
+    diarios = RegistroDiario.__table__
+    resumos = AtualizacaoResumos(paciente_id)
+    sobrescritos = [row.id for row in por_dia.values() if row.versao > 1]
+    if sobrescritos:
+        anteriores = await session.execute(
+            select(registros.c.dia_local, *diarios.c)
+            .join(diarios, diarios.c.id == registros.c.id)
+            .where(registros.c.id.in_(sobrescritos))
+        )
+        for row in anteriores:
+            resumos.remover_diario(row.dia_local, row._mapping)
+
+    diario_stmt = upsert(session, diarios).values([
+        {'id': por_dia[data_hora.date()].id, **valores}
+        for data_hora, valores in itens
+    ])
+    diario_stmt = diario_stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={
+            column.name: diario_stmt.excluded[column.name]
+            for column in diarios.c
+            if column.name != 'id'
+        },
+    ).returning(*diarios.c)
+    por_id = {
+        row.id: row for row in (await session.execute(diario_stmt)).all()
+    }
+
+    for data_hora, valores in itens:
+        resumos.adicionar_diario(data_hora.date(), valores)
+    await resumos.aplicar(session)
+    await detectar_crises(
+        session,
+        paciente_id,
+        [(data_hora.date(), valores) for data_hora, valores in itens],
+    )
+
+    return [
+        (por_dia[dia], por_id[por_dia[dia].id])
+        for dia in (data_hora.date() for data_hora, _ in itens)
+    ]
 
 
 @router.post(
@@ -42,78 +217,326 @@ async def create_registro_diario(
     paciente: CurrentPaciente,
     response: Response,
 ):
-    today = datetime.now(TIMEZONE).date()
-    tomorrow = datetime.combine(
-        today + timedelta(days=1), datetime.min.time()
-    ).replace(tzinfo=TIMEZONE)
-    today_start = datetime.combine(today, datetime.min.time()).replace(
-        tzinfo=TIMEZONE
+    [(registro, diario)] = await _upsert_registros_diarios(
+        session,
+        paciente.id,
+        [
+            (
+                datetime.now(_fuso(paciente)),
+                _com_regioes(registro_schema.model_dump()),
+            )
+        ],
     )
+    await session.commit()
 
-    statement = (
-        select(RegistroDiario)
-        .where(RegistroDiario.paciente_id == paciente.id)
-        .where(RegistroDiario.data_hora >= today_start)
-        .where(RegistroDiario.data_hora < tomorrow)
+    response.status_code = (
+        HTTPStatus.CREATED if registro.versao == 1 else HTTPStatus.OK
     )
-    result = await session.execute(statement)
-    db_registro = result.scalar_one_or_none()
+    return {
+        **diario._mapping,
+        'paciente_id': paciente.id,
+        'data_hora': registro.data_hora,
+    }
+
 
-    if db_registro:
-        response.status_code = HTTPStatus.OK
-        for key, value in registro_schema.model_dump().items():
-            setattr(db_registro, key, value)
-        db_registro.data_hora = datetime.now(TIMEZONE)
+@router.post(
+    '/batch',
+    response_model=RegistroDiarioBatchResponse,
+    summary='Enviar registros diários em lote',
+    description=(
+        'Cria ou atualiza vários registros diários datados (por exemplo, '
+        'capturados offline) em uma única transação. Itens com data futura '
+        'são rejeitados; se houver mais de um item para o mesmo dia, '
+        'prevalece o último'
+    ),
+)
+async def create_registros_diarios_batch(
+    batch: RegistroDiarioBatch,
+    session: Session,
+    paciente: CurrentPaciente,
+):
+    fuso = _fuso(paciente)
+    now = datetime.now(fuso)
+    resultados: list[dict] = [
+        {'indice': indice} for indice in range(len(batch.registros))
+    ]
+
+    aceitos: dict[date, tuple[int, tuple[datetime, dict]]] = {}
+    for indice, item in enumerate(batch.registros):
+        if item.data_hora.tzinfo is None:
+            data_hora = item.data_hora.replace(tzinfo=fuso)
+        else:
+            data_hora = item.data_hora.astimezone(fuso)
+
+        if data_hora > now:
+            resultados[indice].update(
+                status='rejeitado', motivo='Data no futuro'
+            )
+            continue
+
+        anterior = aceitos.get(data_hora.date())
+        if anterior is not None:
+            resultados[anterior[0]].update(
+                status='rejeitado',
+                motivo='Substituído por outro item do mesmo dia no lote',
+            )
+        aceitos[data_hora.date()] = (
+            indice,
+            (data_hora, _com_regioes(item.model_dump(exclude={'data_hora'}))),
+        )
+
+    if aceitos:
+        gravados = await _upsert_registros_diarios(
+            session,
+            paciente.id,
+            [item for _, item in aceitos.values()],
+        )
         await session.commit()
-        await session.refresh(db_registro)
-        return db_registro
 
-    response.status_code = HTTPStatus.CREATED
-    db_registro = RegistroDiario(
-        **registro_schema.model_dump(),
-        paciente_id=paciente.id,
-        tipo_registro='diario',
-    )
-    db_registro.data_hora = datetime.now(TIMEZONE)
-    session.add(db_registro)
-    await session.commit()
-    await session.refresh(db_registro)
-    return db_registro
+        for (indice, _), (registro, _) in zip(aceitos.values(), gravados):
+            resultados[indice].update(
+                id=registro.id,
+                status='criado' if registro.versao == 1 else 'atualizado',
+            )
+
+    return {'resultados': resultados}
 
 
 @router.get(
     '/',
     response_model=RegistroDiarioList,
     summary='Listar registros diários',
-    description='Retorna todos os registros diários do paciente autenticado',
+    description=(
+        'Retorna os registros diários do paciente autenticado, do mais '
+        'recente para o mais antigo, paginados por cursor e opcionalmente '
+        'filtrados por período (from/to, inclusivos). Suporta requisições '
+        'condicionais com `If-None-Match`'
+    ),
+    responses={HTTPStatus.NOT_MODIFIED: {'description': 'Não modificado'}},
+)
+async def get_registros_diarios(
+    session: Session,
+    paciente: CurrentPaciente,
+    filtro: Annotated[FilterPeriodo, Query()],
+    request: Request,
+    response: Response,
+):
+    # Toda escrita ou exclusão avança a sequência de sincronização, então o
+    # maior `seq` do paciente identifica a versão de qualquer listagem.
+    ultima_alteracao = await session.execute(
+        select(
+            select(func.max(Registro.seq))
+            .where(Registro.paciente_id == paciente.id)
+            .scalar_subquery(),
+            select(func.max(RegistroRemovido.seq))
+            .where(RegistroRemovido.paciente_id == paciente.id)
+            .scalar_subquery(),
+        )
+    )
+    etag = make_etag(
+        'registros-diarios',
+        paciente.id,
+        paciente.created_at,
+        *ultima_alteracao.one(),
+        filtro.model_dump_json(),
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    statement = (
+        select(RegistroDiario)
+        .where(RegistroDiario.paciente_id == paciente.id)
+        .order_by(RegistroDiario.data_hora.desc(), Registro.id.desc())
+        .limit(filtro.limit + 1)
+    )
+    if filtro.de:
+        statement = statement.where(
+            RegistroDiario.data_hora >= datetime.combine(filtro.de, time.min)
+        )
+    if filtro.ate:
+        statement = statement.where(
+            RegistroDiario.data_hora
+            < datetime.combine(filtro.ate + timedelta(days=1), time.min)
+        )
+    if filtro.cursor:
+        data_hora, registro_id = decode_cursor(filtro.cursor, (datetime, int))
+        statement = statement.where(
+            or_(
+                RegistroDiario.data_hora < data_hora,
+                and_(
+                    RegistroDiario.data_hora == data_hora,
+                    Registro.id < registro_id,
+                ),
+            )
+        )
+
+    rapido = json_rapido.ativo()
+    if rapido:
+        statement = statement.with_only_columns(*REGISTRO_COLUNAS)
+        registros = (await session.execute(statement)).all()
+    else:
+        registros = (await session.scalars(statement)).all()
+
+    proximo_cursor = None
+    if len(registros) > filtro.limit:
+        registros = registros[: filtro.limit]
+        ultimo = registros[-1]
+        proximo_cursor = encode_cursor(ultimo.data_hora.isoformat(), ultimo.id)
+
+    if rapido:
+        return json_rapido.resposta_json(
+            REGISTRO_LIST_JSON,
+            {
+                'registros': [
+                    {
+                        **linha._asdict(),
+                        'regioes_dor': regioes_da_mascara(linha.regioes_dor),
+                    }
+                    for linha in registros
+                ],
+                'proximo_cursor': proximo_cursor,
+            },
+            etag,
+        )
+    set_cache_headers(response, etag)
+    return {'registros': registros, 'proximo_cursor': proximo_cursor}
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    summary='Exportar histórico',
+    description=(
+        'Exporta todos os registros do paciente autenticado (diários e de '
+        'crise), em ordem cronológica, como CSV ou NDJSON. O arquivo é '
+        'gerado em streaming'
+    ),
+    responses={
+        HTTPStatus.OK: {
+            'content': {media_type: {} for media_type in MEDIA_TYPES.values()}
+        }
+    },
+)
+async def export_registros(
+    session: Session,
+    paciente: CurrentPaciente,
+    formato: Annotated[
+        Literal['csv', 'ndjson'], Query(alias='format')
+    ] = 'csv',
+):
+    return StreamingResponse(
+        exportar_historico(session, paciente.id, formato),
+        media_type=MEDIA_TYPES[formato],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="fibrolog-historico.{formato}"'
+            )
+        },
+    )
+
+
+@router.get(
+    '/stats',
+    response_model=RegistroDiarioStats,
+    summary='Estatísticas por período',
+    description=(
+        'Médias de intensidade da dor, qualidade do sono e nível de fadiga '
+        'e distribuição do estado emocional por semana ou mês, no fuso '
+        'horário do paciente. Os períodos vêm em listas paralelas'
+    ),
+)
+async def get_registros_diarios_stats(
+    session: Session,
+    paciente: CurrentPaciente,
+    filtro: Annotated[RegistroDiarioStatsFiltro, Query()],
+):
+    return await agregar_registros_diarios(
+        session, paciente.id, filtro.bucket, filtro.de, filtro.ate
+    )
+
+
+@router.get(
+    '/heatmap',
+    response_model=RegistroDiarioHeatmap,
+    summary='Mapa de calor da dor',
+    description=(
+        'Em quantos registros diários do período (from/to, inclusivos) cada '
+        'região do Índice de Dor Generalizada (WPI) foi marcada, da mais à '
+        'menos frequente'
+    ),
+)
+async def get_registros_diarios_heatmap(
+    session: Session,
+    paciente: CurrentPaciente,
+    filtro: Annotated[RegistroDiarioHeatmapFiltro, Query()],
+):
+    return await frequencia_regioes(
+        session, paciente.id, filtro.de, filtro.ate
+    )
+
+
+@router.get(
+    '/insights',
+    response_model=RegistroDiarioInsights,
+    summary='Tendências e correlações',
+    description=(
+        'Correlações entre dor, sono e fadiga (inclusive do sono com a dor '
+        'dos dias seguintes), médias móveis de 7 e 30 dias e tendências dos '
+        'últimos `dias` dias'
+    ),
 )
-async def get_registros_diarios(session: Session, paciente: CurrentPaciente):
-    registros = await session.scalars(
-        select(RegistroDiario).where(RegistroDiario.paciente_id == paciente.id)
+async def get_registros_diarios_insights(
+    session: Session,
+    paciente: CurrentPaciente,
+    filtro: Annotated[RegistroDiarioInsightsFiltro, Query()],
+):
+    return await calcular_insights(
+        session,
+        paciente.id,
+        ate=datetime.now(_fuso(paciente)).date(),
+        dias=filtro.dias,
+        defasagem=filtro.defasagem,
     )
-    return {'registros': registros.all()}
 
 
 @router.get(
     '/{registro_id}',
     response_model=RegistroDiarioPublic,
     summary='Buscar registro diário',
-    description='Retorna um registro diário específico',
+    description=(
+        'Retorna um registro diário específico. Suporta requisições '
+        'condicionais com `If-None-Match`'
+    ),
+    responses={HTTPStatus.NOT_MODIFIED: {'description': 'Não modificado'}},
 )
 async def get_registro_diario(
-    registro_id: int, session: Session, paciente: CurrentPaciente
+    registro_id: int,
+    session: Session,
+    paciente: CurrentPaciente,
+    request: Request,
+    response: Response,
 ):
-    registro = await session.scalar(
-        select(RegistroDiario).where(
-            RegistroDiario.id == registro_id,
-            RegistroDiario.paciente_id == paciente.id,
+    versao = await session.scalar(
+        select(Registro.versao).where(
+            Registro.id == registro_id,
+            Registro.paciente_id == paciente.id,
+            Registro.tipo_registro == 'diario',
         )
     )
-    if not registro:
+    if versao is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail='Registro diário não encontrado.',
         )
+
+    etag = make_etag('registro-diario', registro_id, versao)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    registro = await session.scalar(
+        select(RegistroDiario).where(RegistroDiario.id == registro_id)
+    )
+    set_cache_headers(response, etag)
     return registro
 
 
@@ -141,9 +564,20 @@ async def update_registro_diario(
             detail='Registro diário não encontrado.',
         )
 
-    for key, value in registro_schema.model_dump().items():
+    resumos = AtualizacaoResumos(paciente.id)
+    resumos.remover_diario(registro.dia_local, _valores(registro))
+
+    for key, value in _com_regioes(registro_schema.model_dump()).items():
         setattr(registro, key, value)
+    resumos.adicionar_diario(registro.dia_local, _valores(registro))
+    registro.versao = RegistroDiario.versao + 1
+    registro.seq = await reservar_seq(session, paciente.id)
 
+    await session.flush()
+    await resumos.aplicar(session)
+    await detectar_crises(
+        session, paciente.id, [(registro.dia_local, _valores(registro))]
+    )
     await session.commit()
     await session.refresh(registro)
     return registro
@@ -174,10 +608,27 @@ async def patch_registro_diario(
         )
 
     update_data = registro_schema.model_dump(exclude_unset=True)
+    if update_data.keys() & {'localizacao_dor', 'regioes_dor'}:
+        update_data = _com_regioes({
+            'localizacao_dor': registro.localizacao_dor,
+            'regioes_dor': None,
+            **update_data,
+        })
+
+    resumos = AtualizacaoResumos(paciente.id)
+    resumos.remover_diario(registro.dia_local, _valores(registro))
 
     for key, value in update_data.items():
         setattr(registro, key, value)
+    resumos.adicionar_diario(registro.dia_local, _valores(registro))
+    registro.versao = RegistroDiario.versao + 1
+    registro.seq = await reservar_seq(session, paciente.id)
 
+    await session.flush()
+    await resumos.aplicar(session)
+    await detectar_crises(
+        session, paciente.id, [(registro.dia_local, _valores(registro))]
+    )
     await session.commit()
     await session.refresh(registro)
     return registro
@@ -204,5 +655,12 @@ async def delete_registro_diario(
             detail='Registro diário não encontrado.',
         )
 
+    resumos = AtualizacaoResumos(paciente.id)
+    resumos.remover_diario(registro.dia_local, _valores(registro))
+
+    await registrar_remocao(session, registro)
     await session.delete(registro)
+    await session.flush()
+    await resumos.aplicar(session)
+    await invalidar_detector(session, paciente.id)
     await session.commit()
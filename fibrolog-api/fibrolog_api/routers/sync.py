@@ -0,0 +1,86 @@
+"""
+Rota de sincronização incremental para o aplicativo.
+"""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.database import get_session
+from fibrolog_api.models import (
+    Paciente,
+    RegistroCrise,
+    RegistroDiario,
+    RegistroRemovido,
+)
+from fibrolog_api.schemas import SyncResponse
+from fibrolog_api.security import get_current_paciente
+
+router = APIRouter(prefix='/sync', tags=['Sincronização'])
+
+Session = Annotated[AsyncSession, Depends(get_session)]
+CurrentPaciente = Annotated[Paciente, Depends(get_current_paciente)]
+
+
+@router.get(
+    '',
+    response_model=SyncResponse,
+    summary='Sincronizar alterações',
+    description=(
+        'Retorna os registros criados ou alterados e os registros excluídos '
+        'após o cursor `since`. Use o `cursor` da resposta na próxima '
+        'chamada; enquanto `tem_mais` for verdadeiro há outras páginas'
+    ),
+)
+async def get_sync(
+    session: Session,
+    paciente: CurrentPaciente,
+    since: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 500,
+):
+    registros = await session.scalars(
+        select(RegistroDiario)
+        .where(
+            RegistroDiario.paciente_id == paciente.id,
+            RegistroDiario.seq > since,
+        )
+        .order_by(RegistroDiario.seq)
+        .limit(limit + 1)
+    )
+    crises = await session.scalars(
+        select(RegistroCrise)
+        .where(
+            RegistroCrise.paciente_id == paciente.id,
+            RegistroCrise.seq > since,
+        )
+        .order_by(RegistroCrise.seq)
+        .limit(limit + 1)
+    )
+    removidos = await session.scalars(
+        select(RegistroRemovido)
+        .where(
+            RegistroRemovido.paciente_id == paciente.id,
+            RegistroRemovido.seq > since,
+        )
+        .order_by(RegistroRemovido.seq)
+        .limit(limit + 1)
+    )
+
+    alteracoes = sorted(
+        [*registros.all(), *crises.all(), *removidos.all()],
+        key=lambda a: a.seq,
+    )
+    tem_mais = len(alteracoes) > limit
+    alteracoes = alteracoes[:limit]
+
+    return {
+        'registros': [a for a in alteracoes if isinstance(a, RegistroDiario)],
+        'crises': [a for a in alteracoes if isinstance(a, RegistroCrise)],
+        'removidos': [
+            a for a in alteracoes if isinstance(a, RegistroRemovido)
+        ],
+        'cursor': alteracoes[-1].seq if alteracoes else since,
+        'tem_mais': tem_mais,
+    }
@@ -3,32 +3,71 @@ Módulo que inicializa o pacote de schemas, expondo os principais schemas
 para facilitar a importação em outros módulos.
 """
 
-from .base import FilterPage, Message
+from .alerta import (
+    AgendaAlertas,
+    AlertaList,
+    AlertaPublic,
+    AlertaSchema,
+    AlertaUpdate,
+    FilterAgenda,
+    FilterAlertas,
+    OcorrenciaAlerta,
+)
+from .base import FilterCursor, FilterPeriodo, Message
+from .busca import BuscaList, FilterBusca, ResultadoBusca
 from .paciente import (
     PacienteList,
+    PacienteListDict,
     PacientePublic,
     PacienteSchema,
     PacienteUpdate,
 )
+from .registro_crise import (
+    RegistroCriseList,
+    RegistroCrisePublic,
+    RegistroCriseSchema,
+    RegistroCriseUpdate,
+)
 from .registro_diario import (
     RegistroDiarioList,
     RegistroDiarioPublic,
     RegistroDiarioSchema,
     RegistroDiarioUpdate,
 )
-from .token import Token, TokenData
+from .sincronizacao import RegistroRemovidoPublic, SyncResponse
+from .token import RefreshTokenRequest, Token, TokenData
 
 __all__ = [
-    'FilterPage',
+    'AgendaAlertas',
+    'AlertaList',
+    'AlertaPublic',
+    'AlertaSchema',
+    'AlertaUpdate',
+    'BuscaList',
+    'FilterAgenda',
+    'FilterAlertas',
+    'FilterBusca',
+    'FilterCursor',
+    'FilterPeriodo',
     'Message',
+    'OcorrenciaAlerta',
     'PacienteList',
+    'PacienteListDict',
     'PacientePublic',
     'PacienteSchema',
     'PacienteUpdate',
+    'RefreshTokenRequest',
+    'RegistroCriseList',
+    'RegistroCrisePublic',
+    'RegistroCriseSchema',
+    'RegistroCriseUpdate',
     'RegistroDiarioList',
     'RegistroDiarioPublic',
     'RegistroDiarioSchema',
     'RegistroDiarioUpdate',
+    'RegistroRemovidoPublic',
+    'ResultadoBusca',
+    'SyncResponse',
     'Token',
     'TokenData',
 ]
@@ -0,0 +1,105 @@
+"""
+Schemas para validação de dados de alertas.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from fibrolog_api.recorrencia import validar_recorrencia
+from fibrolog_api.schemas.base import FilterCursor
+
+
+class AlertaSchema(BaseModel):
+    """Schema para criação e atualização de um alerta."""
+
+    # Ex.: "medicação" ou "consulta"
+    tipo: str = Field(..., min_length=1, max_length=50)
+    # Momento do alerta (ou início da recorrência); sem fuso, é
+    # interpretado no fuso do paciente
+    data_hora: datetime
+    descricao: str = Field(..., min_length=1, max_length=1000)
+    # Regra RRULE, ex.: "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;BYHOUR=9"
+    recorrencia: Optional[str] = Field(None, max_length=200)
+
+    @field_validator('recorrencia')
+    @classmethod
+    def validate_recorrencia(cls, v: str | None) -> str | None:
+        return validar_recorrencia(v)
+
+
+class AlertaUpdate(BaseModel):
+    """Schema para atualização parcial de um alerta."""
+
+    tipo: Optional[str] = Field(None, min_length=1, max_length=50)
+    data_hora: Optional[datetime] = None
+    descricao: Optional[str] = Field(None, min_length=1, max_length=1000)
+    recorrencia: Optional[str] = Field(None, max_length=200)
+    ativo: Optional[bool] = None
+
+    @field_validator('recorrencia')
+    @classmethod
+    def validate_recorrencia(cls, v: str | None) -> str | None:
+        return validar_recorrencia(v)
+
+
+class AlertaPublic(BaseModel):
+    """Schema para retorno público de um alerta."""
+
+    id: int
+    paciente_id: int
+    tipo: str
+    data_hora: datetime
+    descricao: str
+    recorrencia: Optional[str]
+    proxima_execucao: datetime
+    ativo: bool
+    disparado_em: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+    @field_validator('data_hora', 'proxima_execucao', 'disparado_em')
+    @classmethod
+    def validate_utc(cls, v: datetime | None) -> datetime | None:
+        # Os momentos são gravados em UTC, sem fuso
+        if v is not None and v.tzinfo is None:
+            return v.replace(tzinfo=timezone.utc)
+        return v
+
+
+class AlertaList(BaseModel):
+    """Schema para listagem de alertas."""
+
+    alertas: list[AlertaPublic]
+    proximo_cursor: Optional[str] = None
+
+
+class FilterAlertas(FilterCursor):
+    # Se informado, lista apenas os alertas ativos (ou inativos)
+    ativo: Optional[bool] = None
+
+
+class FilterAgenda(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    # Início e fim da janela; sem fuso, no fuso do paciente
+    de: Optional[datetime] = Field(None, alias='from')
+    ate: Optional[datetime] = Field(None, alias='to')
+    limit: int = Field(100, ge=1, le=500)
+
+
+class OcorrenciaAlerta(BaseModel):
+    """Uma ocorrência de alerta, calculada a partir da sua recorrência."""
+
+    alerta_id: int
+    tipo: str
+    descricao: str
+    data_hora: datetime
+
+
+class AgendaAlertas(BaseModel):
+    """Schema para as próximas ocorrências dos alertas."""
+
+    ocorrencias: list[OcorrenciaAlerta]
@@ -1,10 +1,20 @@
-from pydantic import BaseModel
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class Message(BaseModel):
     message: str
 
 
-class FilterPage(BaseModel):
-    offset: int = 0
-    limit: int = 100
+class FilterCursor(BaseModel):
+    cursor: Optional[str] = None
+    limit: int = Field(100, ge=1, le=500)
+
+
+class FilterPeriodo(FilterCursor):
+    model_config = ConfigDict(populate_by_name=True)
+
+    de: Optional[date] = Field(None, alias='from')
+    ate: Optional[date] = Field(None, alias='to')
@@ -0,0 +1,36 @@
+"""
+Schemas para a busca textual no histórico do paciente.
+"""
+
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from fibrolog_api.schemas.base import FilterCursor
+
+
+class FilterBusca(FilterCursor):
+    # Palavras a buscar; acentos e maiúsculas são ignorados
+    q: str = Field(..., min_length=1, max_length=200)
+    limit: int = Field(20, ge=1, le=100)
+
+
+class ResultadoBusca(BaseModel):
+    """Um texto do histórico que contém os termos buscados."""
+
+    tipo: Literal['crise', 'diario', 'medicacoes']
+    # Registro de crise ou diário; ausente para as medicações do paciente
+    registro_id: Optional[int]
+    data_hora: Optional[datetime]
+    # Trecho do texto com os termos encontrados entre `**`
+    trecho: str
+    # BM25: quanto maior, mais relevante
+    relevancia: float
+
+
+class BuscaList(BaseModel):
+    """Schema para os resultados da busca, do mais relevante ao menos."""
+
+    resultados: list[ResultadoBusca]
+    proximo_cursor: Optional[str] = None
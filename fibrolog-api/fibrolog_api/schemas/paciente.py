@@ -1,8 +1,12 @@
 import re
+import zoneinfo
 from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, EmailStr, field_validator
+from typing_extensions import TypedDict
+
+from fibrolog_api.models import FUSO_HORARIO_PADRAO
 
 MIN_PASSWORD_LENGTH = 8
 
@@ -41,6 +45,15 @@ def validate_password_strength(password: str) -> str:
     return password
 
 
+def validate_fuso_horario(fuso_horario: str) -> str:
+    """Garante que o fuso horário é um identificador IANA conhecido."""
+    try:
+        zoneinfo.ZoneInfo(fuso_horario)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValueError('Fuso horário inválido')
+    return fuso_horario
+
+
 class PacienteSchema(BaseModel):
     nome: str
     email: EmailStr
@@ -49,12 +62,18 @@ class PacienteSchema(BaseModel):
     sexo: Optional[str] = None
     data_diagnostico: Optional[datetime] = None
     medicacoes: Optional[str] = None
+    fuso_horario: str = FUSO_HORARIO_PADRAO
 
     @field_validator('password')
     @classmethod
     def validate_password(cls, v: str) -> str:
         return validate_password_strength(v)
 
+    @field_validator('fuso_horario')
+    @classmethod
+    def validate_fuso_horario(cls, v: str) -> str:
+        return validate_fuso_horario(v)
+
 
 class PacienteUpdate(BaseModel):
     nome: Optional[str] = None
@@ -64,6 +83,7 @@ class PacienteUpdate(BaseModel):
     sexo: Optional[str] = None
     data_diagnostico: Optional[datetime] = None
     medicacoes: Optional[str] = None
+    fuso_horario: Optional[str] = None
 
     @field_validator('password')
     @classmethod
@@ -72,6 +92,13 @@ class PacienteUpdate(BaseModel):
             return None
         return validate_password_strength(v)
 
+    @field_validator('fuso_horario')
+    @classmethod
+    def validate_fuso_horario(cls, v: str | None) -> str | None:
+        if v is None:
+            return None
+        return validate_fuso_horario(v)
+
 
 class PacientePublic(BaseModel):
     id: int
@@ -81,6 +108,7 @@ class PacientePublic(BaseModel):
     sexo: Optional[str]
     data_diagnostico: Optional[datetime]
     medicacoes: Optional[str]
+    fuso_horario: str
     created_at: datetime
     updated_at: datetime
 
@@ -90,3 +118,26 @@ class PacientePublic(BaseModel):
 
 class PacienteList(BaseModel):
     pacientes: list[PacientePublic]
+    proximo_cursor: Optional[str] = None
+
+
+class PacientePublicDict(TypedDict):
+    """`PacientePublic` como dicionário, para o caminho JSON rápido."""
+
+    id: int
+    nome: str
+    email: str
+    data_nascimento: Optional[datetime]
+    sexo: Optional[str]
+    data_diagnostico: Optional[datetime]
+    medicacoes: Optional[str]
+    fuso_horario: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class PacienteListDict(TypedDict):
+    """`PacienteList` como dicionário, para o caminho JSON rápido."""
+
+    pacientes: list[PacientePublicDict]
+    proximo_cursor: Optional[str]
@@ -0,0 +1,77 @@
+"""
+Schemas para validação de dados de registros de crise.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import AliasChoices, BaseModel, Field, field_validator
+
+
+class RegistroCriseSchema(BaseModel):
+    """Schema para criação e atualização de um registro de crise."""
+
+    intensidade_dor: int = Field(..., ge=0, le=10)
+    duracao: str = Field(..., min_length=1, max_length=50)
+    # Momento da crise; se omitido, o momento do envio
+    data_hora: Optional[datetime] = None
+
+
+class RegistroCriseUpdate(BaseModel):
+    """Schema para atualização parcial de um registro de crise."""
+
+    intensidade_dor: Optional[int] = Field(None, ge=0, le=10)
+    duracao: Optional[str] = Field(None, min_length=1, max_length=50)
+    data_hora: Optional[datetime] = None
+
+
+class RegistroCrisePublic(BaseModel):
+    """Schema para retorno público de um registro de crise."""
+
+    id: int
+    paciente_id: int
+    data_hora: datetime
+    intensidade_dor: int
+    duracao: str
+    texto_transcrito: Optional[str]
+    # O caminho do áudio no servidor não é exposto, só a sua existência
+    tem_audio: bool = Field(
+        validation_alias=AliasChoices('tem_audio', 'audio_path')
+    )
+
+    class Config:
+        from_attributes = True
+
+    @field_validator('tem_audio', mode='before')
+    @classmethod
+    def validate_tem_audio(cls, v: str | bool | None) -> bool:
+        return bool(v)
+
+
+class RegistroCriseList(BaseModel):
+    """Schema para listagem de registros de crise."""
+
+    registros: list[RegistroCrisePublic]
+    proximo_cursor: Optional[str] = None
+
+
+class UploadAudioSchema(BaseModel):
+    """Schema para criar um upload retomável de áudio."""
+
+    # Tamanho total do áudio, em bytes
+    tamanho: int = Field(..., gt=0)
+    # Tipo MIME do áudio (ex.: audio/mp4)
+    tipo: str
+
+
+class UploadAudioPublic(BaseModel):
+    """Schema para retorno do estado de um upload retomável."""
+
+    id: str
+    tamanho: int
+    # Bytes já recebidos: o próximo pedaço começa neste offset
+    recebido: int
+    expira_em: datetime
+
+    class Config:
+        from_attributes = True
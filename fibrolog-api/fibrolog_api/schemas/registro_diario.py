@@ -2,12 +2,16 @@
 Schemas para validação de dados de registros diários.
 """
 
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing_extensions import TypedDict
 
 from fibrolog_api.models import EstadoEmocional
+from fibrolog_api.regioes import RegiaoDor, regioes_da_mascara
+
+MAX_BATCH_SIZE = 1000
 
 
 class RegistroDiarioSchema(BaseModel):
@@ -18,6 +22,8 @@ class RegistroDiarioSchema(BaseModel):
     nivel_fadiga: int = Field(..., ge=0, le=10)
     estado_emocional: EstadoEmocional
     localizacao_dor: Optional[str] = None
+    # Se omitidas, as regiões são extraídas de `localizacao_dor`
+    regioes_dor: Optional[list[RegiaoDor]] = None
 
 
 class RegistroDiarioUpdate(BaseModel):
@@ -28,11 +34,13 @@ class RegistroDiarioUpdate(BaseModel):
     nivel_fadiga: Optional[int] = Field(None, ge=0, le=10)
     estado_emocional: Optional[EstadoEmocional] = None
     localizacao_dor: Optional[str] = None
+    regioes_dor: Optional[list[RegiaoDor]] = None
 
 
 class RegistroDiarioPublic(RegistroDiarioSchema):
     """Schema para retorno público de um registro diário."""
 
+    regioes_dor: list[RegiaoDor]
     id: int
     paciente_id: int
     data_hora: datetime
@@ -40,8 +48,156 @@ class RegistroDiarioPublic(RegistroDiarioSchema):
     class Config:
         from_attributes = True
 
+    @field_validator('regioes_dor', mode='before')
+    @classmethod
+    def validate_regioes_dor(cls, v: int | list) -> list:
+        return regioes_da_mascara(v) if isinstance(v, int) else v
+
+
+class RegistroDiarioBatchItem(RegistroDiarioSchema):
+    """Registro diário capturado offline, com a data em que foi feito."""
+
+    data_hora: datetime
+
+
+class RegistroDiarioBatch(BaseModel):
+    """Schema para envio em lote de registros diários."""
+
+    registros: list[RegistroDiarioBatchItem] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE
+    )
+
+
+class RegistroDiarioBatchResultado(BaseModel):
+    """Resultado do processamento de um item do lote."""
+
+    indice: int
+    status: Literal['criado', 'atualizado', 'rejeitado']
+    id: Optional[int] = None
+    motivo: Optional[str] = None
+
+
+class RegistroDiarioBatchResponse(BaseModel):
+    """Schema de resposta do envio em lote, na ordem dos itens enviados."""
+
+    resultados: list[RegistroDiarioBatchResultado]
+
 
 class RegistroDiarioList(BaseModel):
     """Schema para listagem de registros diários."""
 
     registros: list[RegistroDiarioPublic]
+    proximo_cursor: Optional[str] = None
+
+
+class RegistroDiarioPublicDict(TypedDict):
+    """`RegistroDiarioPublic` como dicionário, para o caminho JSON rápido."""
+
+    intensidade_dor: int
+    qualidade_sono: int
+    nivel_fadiga: int
+    estado_emocional: EstadoEmocional
+    localizacao_dor: Optional[str]
+    regioes_dor: list[RegiaoDor]
+    id: int
+    paciente_id: int
+    data_hora: datetime
+
+
+class RegistroDiarioListDict(TypedDict):
+    """`RegistroDiarioList` como dicionário, para o caminho JSON rápido."""
+
+    registros: list[RegistroDiarioPublicDict]
+    proximo_cursor: Optional[str]
+
+
+class RegistroDiarioStatsFiltro(BaseModel):
+    """Parâmetros da agregação por período (datas locais, inclusivas)."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    bucket: Literal['week', 'month'] = 'week'
+    de: Optional[date] = Field(None, alias='from')
+    ate: Optional[date] = Field(None, alias='to')
+
+
+class RegistroDiarioStats(BaseModel):
+    """
+    Agregação por período em listas paralelas: a posição `i` de cada lista
+    se refere ao período iniciado em `periodos[i]`.
+    """
+
+    bucket: Literal['week', 'month']
+    periodos: list[date]
+    registros: list[int]
+    intensidade_dor: list[float]
+    qualidade_sono: list[float]
+    nivel_fadiga: list[float]
+    estado_emocional: dict[EstadoEmocional, list[int]]
+
+
+class RegistroDiarioHeatmapFiltro(BaseModel):
+    """Período do mapa de calor (datas locais, inclusivas)."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    de: Optional[date] = Field(None, alias='from')
+    ate: Optional[date] = Field(None, alias='to')
+
+
+class FrequenciaRegiao(BaseModel):
+    """Registros com dor em uma região e a sua fração do total."""
+
+    regiao: RegiaoDor
+    rotulo: str
+    registros: int
+    proporcao: float
+
+
+class RegistroDiarioHeatmap(BaseModel):
+    """
+    Frequência de cada região do WPI nos registros diários do período, da
+    mais à menos frequente. `media_regioes` é o número médio de regiões
+    doloridas por registro.
+    """
+
+    registros: int
+    media_regioes: float
+    regioes: list[FrequenciaRegiao]
+
+
+class RegistroDiarioInsightsFiltro(BaseModel):
+    """Parâmetros das análises de tendência e correlação."""
+
+    dias: int = Field(365, ge=7, le=3660)
+    defasagem: int = Field(1, ge=1, le=7)
+
+
+class Correlacao(BaseModel):
+    """Coeficientes de correlação e número de dias pareados."""
+
+    pearson: Optional[float]
+    spearman: Optional[float]
+    n: int
+
+
+class MediasMoveis(BaseModel):
+    """Médias móveis diárias, uma posição por dia da janela analisada."""
+
+    media_7d: list[Optional[float]]
+    media_30d: list[Optional[float]]
+
+
+class RegistroDiarioInsights(BaseModel):
+    """
+    Análises dos últimos `dias` dias. `tendencias` traz a variação média por
+    semana de cada métrica; `sono_dor_seguinte` correlaciona o sono de um dia
+    com a dor `defasagem` dias depois.
+    """
+
+    inicio: date
+    fim: date
+    dias_com_registro: int
+    correlacoes: dict[str, Correlacao]
+    tendencias: dict[str, Optional[float]]
+    medias_moveis: dict[str, MediasMoveis]
@@ -0,0 +1,29 @@
+"""
+Schemas da sincronização incremental.
+"""
+
+from pydantic import BaseModel
+
+from fibrolog_api.schemas.registro_crise import RegistroCrisePublic
+from fibrolog_api.schemas.registro_diario import RegistroDiarioPublic
+
+
+class RegistroRemovidoPublic(BaseModel):
+    """Schema de um registro excluído desde o último cursor."""
+
+    registro_id: int
+    tipo_registro: str
+    seq: int
+
+    class Config:
+        from_attributes = True
+
+
+class SyncResponse(BaseModel):
+    """Alterações posteriores ao cursor informado, em ordem de `seq`."""
+
+    registros: list[RegistroDiarioPublic]
+    crises: list[RegistroCrisePublic]
+    removidos: list[RegistroRemovidoPublic]
+    cursor: int
+    tem_mais: bool
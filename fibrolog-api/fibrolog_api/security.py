@@ -1,3 +1,6 @@
+import hashlib
+import hmac
+import secrets
 from datetime import datetime, timedelta
 from http import HTTPStatus
 from zoneinfo import ZoneInfo
@@ -5,18 +8,28 @@ from zoneinfo import ZoneInfo
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError, ExpiredSignatureError, decode, encode
-from pwdlib import PasswordHash
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from fibrolog_api.cache import PrincipalCache, attach_paciente
 from fibrolog_api.database import get_session
-from fibrolog_api.models import Paciente
+from fibrolog_api.hashing import HashingSaturatedError, PasswordHasher
+from fibrolog_api.models import Paciente, RefreshToken
+from fibrolog_api.relogio import utcnow
 from fibrolog_api.settings import Settings
 
-pwd_context = PasswordHash.recommended()
-
 settings = Settings()
 
+password_hasher = PasswordHasher(
+    max_workers=settings.HASH_POOL_WORKERS,
+    max_queue=settings.HASH_POOL_MAX_QUEUE,
+)
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -30,12 +43,71 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+def hash_refresh_token(token: str) -> str:
+    """Calcula o HMAC-SHA256 usado para localizar um refresh token."""
+    return hmac.new(
+        settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def create_refresh_token(session: AsyncSession, paciente_id: int) -> str:
+    """
+    Gera um refresh token opaco e adiciona seu HMAC à sessão.
+
+    O commit fica a cargo de quem chama, para que a emissão faça parte da
+    mesma transação do login ou da rotação.
+
+    Args:
+        session: Sessão da requisição atual.
+        paciente_id: Paciente dono do token.
+
+    Returns:
+        O refresh token em texto claro, que só é conhecido pelo cliente.
+    """
+    token = secrets.token_urlsafe(32)
+    session.add(
+        RefreshToken(
+            paciente_id=paciente_id,
+            token_hash=hash_refresh_token(token),
+            expira_em=utcnow()
+            + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+async def revoke_refresh_tokens(session: AsyncSession, paciente_id: int):
+    """Revoga todos os refresh tokens ativos de um paciente."""
+    await session.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.paciente_id == paciente_id,
+            RefreshToken.revogado_em.is_(None),
+        )
+        .values(revogado_em=utcnow())
+    )
+
+
+def _hashing_unavailable():
+    return HTTPException(
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        detail='Serviço de autenticação sobrecarregado, tente novamente',
+        headers={'Retry-After': '1'},
+    )
+
+
+async def get_password_hash(password: str):
+    try:
+        return await password_hasher.hash(password)
+    except HashingSaturatedError:
+        raise _hashing_unavailable()
 
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HashingSaturatedError:
+        raise _hashing_unavailable()
 
 
 oauth2_scheme = OAuth2PasswordBearer(
@@ -53,6 +125,10 @@ async def get_current_paciente(
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return await attach_paciente(session, cached)
+
     try:
         payload = decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -75,4 +151,6 @@ async def get_current_paciente(
     if not paciente:
         raise credentials_exception
 
+    token_exp = payload.get('exp', float('inf'))
+    principal_cache.set(token, paciente, token_exp)
     return paciente
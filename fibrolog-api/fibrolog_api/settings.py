@@ -10,3 +10,30 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = 'HS256'
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    HASH_POOL_WORKERS: int = 2
+    HASH_POOL_MAX_QUEUE: int = 64
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    FAST_JSON_RESPONSES: bool = False
+    COMPRESSION_MIN_SIZE: int = 500
+    AUDIO_DIR: str = 'audios'
+    AUDIO_MAX_BYTES: int = 10 * 1024 * 1024
+    AUDIO_UPLOAD_TTL_HOURS: int = 24
+    TRANSCRIPTION_ENGINE: str = 'fibrolog_api.transcricao:TranscritorLocal'
+    TRANSCRIPTION_WORKERS: int = 1
+    TRANSCRIPTION_MAX_ATTEMPTS: int = 5
+    TRANSCRIPTION_VISIBILITY_TIMEOUT_SECONDS: int = 600
+    TRANSCRIPTION_BACKOFF_SECONDS: int = 30
+    ALERTS_WINDOW_SECONDS: int = 120
+    ALERTS_LOAD_LIMIT: int = 10_000
+    NOTIFICATIONS_SENDER: str = 'fibrolog_api.notificacoes:RemetenteArquivo'
+    NOTIFICATIONS_DIR: str = 'notificacoes'
+    NOTIFICATIONS_BATCH_SIZE: int = 100
+    NOTIFICATIONS_EMAIL_CONCURRENCY: int = 10
+    NOTIFICATIONS_PHONE_CONCURRENCY: int = 2
+    NOTIFICATIONS_MAX_ATTEMPTS: int = 8
+    NOTIFICATIONS_SEND_TIMEOUT_SECONDS: int = 30
+    NOTIFICATIONS_VISIBILITY_TIMEOUT_SECONDS: int = 300
+    NOTIFICATIONS_BACKOFF_SECONDS: int = 30
+    METRICS_TOKEN: str | None = None
@@ -0,0 +1,59 @@
+"""
+Sequência de alterações de cada paciente, usada pela sincronização
+incremental.
+
+Toda escrita em `registros` recebe um `seq` tirado do contador do paciente
+(tabela `sequencias`), e toda exclusão deixa uma marca em
+`registros_removidos` com seu próprio `seq`. O contador é incrementado com um
+upsert que bloqueia a linha até o commit, de modo que as transações de
+escrita do paciente são confirmadas na mesma ordem dos valores reservados:
+um cliente que já viu o `seq` N nunca deixa de receber uma alteração com
+`seq` menor que N. Como a sincronização é sempre de um paciente, escritas
+de pacientes diferentes não disputam a mesma linha.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.database import upsert
+from fibrolog_api.models import Registro, RegistroRemovido, Sequencia
+
+SEQUENCIA_SYNC = 'sync'
+
+
+async def reservar_seq(
+    session: AsyncSession, paciente_id: int, quantidade: int = 1
+) -> int:
+    """
+    Reserva posições consecutivas na sequência de sincronização do paciente.
+
+    Args:
+        session: Sessão da transação de escrita.
+        paciente_id: Paciente dono das alterações.
+        quantidade: Número de posições a reservar.
+
+    Returns:
+        A primeira posição reservada.
+    """
+    sequencias = Sequencia.__table__
+    statement = upsert(session, sequencias).values(
+        paciente_id=paciente_id, nome=SEQUENCIA_SYNC, valor=quantidade
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=['paciente_id', 'nome'],
+        set_={'valor': sequencias.c.valor + quantidade},
+    ).returning(sequencias.c.valor)
+
+    ultimo = (await session.execute(statement)).scalar_one()
+    return ultimo - quantidade + 1
+
+
+async def registrar_remocao(session: AsyncSession, registro: Registro):
+    """Adiciona à sessão a marca de exclusão de um registro."""
+    session.add(
+        RegistroRemovido(
+            registro_id=registro.id,
+            tipo_registro=registro.tipo_registro,
+            paciente_id=registro.paciente_id,
+            seq=await reservar_seq(session, registro.paciente_id),
+        )
+    )
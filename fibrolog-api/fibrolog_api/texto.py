@@ -0,0 +1,37 @@
+"""
+Normalização de texto livre em palavras, compartilhada pela busca
+(`fibrolog_api.busca`) e pelo mapa corporal (`fibrolog_api.regioes`).
+
+As palavras seguem o tokenizador `unicode61` do FTS5 com
+`remove_diacritics 2`: sem acentos e em minúsculas.
+"""
+
+import re
+import unicodedata
+
+# Palavras, como no tokenizador `unicode61`
+PALAVRA = re.compile(r'[^\W_]+')
+# Sinais diacríticos combinantes, que restam da decomposição NFKD
+ACENTOS = re.compile('[\u0300-\u036f]')
+
+
+def palavras(texto: str) -> list[str]:
+    """Palavras do texto sem acentos e em minúsculas, como no índice."""
+    texto = texto.lower()
+    if not texto.isascii():
+        texto = ACENTOS.sub('', unicodedata.normalize('NFKD', texto))
+    return PALAVRA.findall(texto)
+
+
+def variantes(palavra: str) -> set[str]:
+    """A palavra e as suas formas de plural ou de singular."""
+    formas = {palavra, f'{palavra}s', f'{palavra}es'}
+    for singular, plural in (('ao', 'oes'), ('m', 'ns')):
+        if palavra.endswith(singular):
+            formas.add(palavra.removesuffix(singular) + plural)
+        if palavra.endswith(plural):
+            formas.add(palavra.removesuffix(plural) + singular)
+    for sufixo in ('es', 's'):
+        if palavra.endswith(sufixo) and len(palavra) > len(sufixo) + 2:
+            formas.add(palavra.removesuffix(sufixo))
+    return formas
@@ -0,0 +1,455 @@
+"""
+Transcrição dos áudios das crises em segundo plano.
+
+Cada áudio recebido gera uma linha em `tarefas_transcricao` na mesma
+transação que o associa ao registro. Um pool de workers na própria aplicação
+consome a fila:
+
+- Reserva: um `UPDATE` condicional marca a tarefa como `executando`, com o
+  worker como dono e `disponivel_em` no fim do prazo de visibilidade. Só um
+  worker (de qualquer processo) consegue reservar cada tarefa.
+- Execução: a transcrição, cara em CPU, roda em um `ProcessPoolExecutor`
+  com um processo por worker, nunca no event loop nem em um handler.
+- Conclusão: o texto é gravado no registro apenas se o worker ainda é o
+  dono e se o registro não trocou de áudio nesse meio tempo.
+- Falha: a tarefa volta para `pendente` com espera exponencial; depois de
+  `TRANSCRIPTION_MAX_ATTEMPTS` tentativas, fica como `falhou`.
+- Queda: se o processo morre, a reserva expira e outra instância retoma a
+  tarefa. Na inicialização, as reservas já expiradas voltam a `pendente`.
+
+O motor de transcrição é configurável (`TRANSCRIPTION_ENGINE`, no formato
+`modulo:Classe`) e deve seguir o protocolo `Transcritor`. O padrão,
+`TranscritorLocal`, não reconhece fala: ele apenas consome CPU
+proporcionalmente ao tamanho do áudio, para testar a fila sob carga sem
+serviços externos.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Protocol
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api import filas
+from fibrolog_api.audio import caminho_audio, tipo_audio
+from fibrolog_api.database import async_session
+from fibrolog_api.models import (
+    Registro,
+    RegistroCrise,
+    TarefaTranscricao,
+)
+from fibrolog_api.relogio import utcnow
+from fibrolog_api.settings import Settings
+from fibrolog_api.sincronizacao import reservar_seq
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+PENDENTE = filas.PENDENTE
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+FALHOU = filas.FALHOU
+CANCELADA = 'cancelada'
+
+# Espera máxima entre consultas à fila quando não há avisos de novas tarefas
+INTERVALO_CONSULTA = 5.0
+# Pausa de um worker após um erro do banco (ex.: "database is locked")
+ESPERA_APOS_ERRO = 5.0
+
+
+class Transcritor(Protocol):
+    """Motor de transcrição, executado em um processo do pool."""
+
+    def transcrever(self, caminho: Path, tipo: str) -> str:
+        """Retorna o texto falado no áudio `caminho`, do tipo MIME `tipo`."""
+        ...
+
+
+class TranscritorLocal:
+    """
+    Motor simulado: calcula hashes do áudio por um tempo proporcional ao seu
+    tamanho e retorna um texto determinístico.
+
+    Args:
+        custo_minimo: Segundos de CPU gastos com qualquer áudio.
+        segundos_por_mb: Segundos de CPU adicionais por MiB de áudio.
+    """
+
+    def __init__(
+        self, custo_minimo: float = 0.02, segundos_por_mb: float = 0.5
+    ):
+        self.custo_minimo = custo_minimo
+        self.segundos_por_mb = segundos_por_mb
+
+    def transcrever(self, caminho: Path, tipo: str) -> str:
+        dados = caminho.read_bytes()
+        if not dados:
+            raise ValueError('Áudio vazio')
+
+        custo = self.custo_minimo + len(dados) / 2**20 * self.segundos_por_mb
+        limite = time.process_time() + custo
+        digest = hashlib.sha256(dados)
+        while time.process_time() < limite:
+            digest = hashlib.sha256(digest.digest() + dados[:4096])
+        return (
+            f'[transcrição simulada] {tipo}, {len(dados)} bytes, '
+            f'{hashlib.sha256(dados).hexdigest()[:12]}'
+        )
+
+
+@cache
+def _carregar(motor: str) -> Transcritor:
+    return filas.instanciar(motor)
+
+
+def _transcrever(motor: str, caminho: str, tipo: str) -> tuple[str, float]:
+    """Executado no pool; o motor é carregado uma vez por processo."""
+    inicio = time.perf_counter()
+    texto = _carregar(motor).transcrever(Path(caminho), tipo)
+    return texto, time.perf_counter() - inicio
+
+
+async def enfileirar_transcricao(
+    session: AsyncSession, registro_id: int, audio_path: str
+) -> None:
+    """
+    Agenda a transcrição do novo áudio de um registro, sem fazer commit.
+
+    Tarefas ainda pendentes de áudios anteriores do registro são canceladas.
+    """
+    await session.execute(
+        update(TarefaTranscricao)
+        .where(
+            TarefaTranscricao.registro_id == registro_id,
+            TarefaTranscricao.estado == PENDENTE,
+        )
+        .values(estado=CANCELADA)
+    )
+    session.add(
+        TarefaTranscricao(
+            registro_id=registro_id,
+            audio_path=audio_path,
+            disponivel_em=utcnow(),
+        )
+    )
+
+
+async def cancelar_transcricoes(
+    session: AsyncSession, registro_id: int
+) -> None:
+    """Remove as tarefas de um registro que será excluído."""
+    await session.execute(
+        delete(TarefaTranscricao).where(
+            TarefaTranscricao.registro_id == registro_id
+        )
+    )
+
+
+async def reservar_tarefa(
+    session: AsyncSession, visibilidade: float
+) -> TarefaTranscricao | None:
+    """
+    Reserva a tarefa disponível há mais tempo e faz commit.
+
+    Tarefas `executando` cuja reserva expirou também estão disponíveis. Cada
+    reserva recebe um dono novo, de modo que o worker cuja reserva expirou
+    não consegue mais concluir a tarefa.
+    """
+    reservadas = await filas.reservar(
+        session, TarefaTranscricao, EXECUTANDO, 1, visibilidade
+    )
+    return reservadas[0] if reservadas else None
+
+
+def _ainda_reservada(tarefa: TarefaTranscricao):
+    return (
+        TarefaTranscricao.id == tarefa.id,
+        TarefaTranscricao.dono == tarefa.dono,
+        TarefaTranscricao.estado == EXECUTANDO,
+    )
+
+
+async def concluir_tarefa(
+    session: AsyncSession, tarefa: TarefaTranscricao, texto: str
+) -> bool:
+    """
+    Grava a transcrição no registro e conclui a tarefa, com commit.
+
+    Returns:
+        False se a reserva foi perdida (expirou e outro worker a assumiu).
+    """
+    concluida = await session.execute(
+        update(TarefaTranscricao)
+        .where(*_ainda_reservada(tarefa))
+        .values(estado=CONCLUIDA, concluida_em=utcnow(), erro=None)
+    )
+    if concluida.rowcount == 0:
+        await session.rollback()
+        return False
+
+    crises = RegistroCrise.__table__
+    transcrito = await session.scalar(
+        update(crises)
+        .where(
+            crises.c.id == tarefa.registro_id,
+            crises.c.audio_path == tarefa.audio_path,
+        )
+        .values(texto_transcrito=texto)
+        .returning(crises.c.id)
+    )
+    if transcrito is not None:
+        registros = Registro.__table__
+        paciente_id = await session.scalar(
+            select(registros.c.paciente_id).where(registros.c.id == transcrito)
+        )
+        await session.execute(
+            update(registros)
+            .where(registros.c.id == transcrito)
+            .values(
+                versao=registros.c.versao + 1,
+                seq=await reservar_seq(session, paciente_id),
+            )
+        )
+    await session.commit()
+    return True
+
+
+async def falhar_tarefa(
+    session: AsyncSession,
+    tarefa: TarefaTranscricao,
+    erro: str,
+    max_tentativas: int,
+    backoff: float,
+) -> bool | None:
+    """
+    Agenda uma nova tentativa com backoff ou, esgotadas as tentativas,
+    marca a tarefa como falha definitiva. Faz commit.
+
+    Returns:
+        True se haverá nova tentativa, False se a falha é definitiva e None
+        se a reserva foi perdida.
+    """
+    nova_tentativa = await filas.falhar(
+        session,
+        tarefa,
+        _ainda_reservada(tarefa),
+        erro,
+        max_tentativas,
+        backoff,
+    )
+    await session.commit()
+    return nova_tentativa
+
+
+async def recuperar_tarefas(session: AsyncSession) -> int:
+    """
+    Devolve à fila as tarefas cuja reserva expirou (worker que caiu).
+
+    Reservas ainda válidas, de workers de outros processos, não são
+    alteradas.
+
+    Returns:
+        Quantidade de tarefas devolvidas.
+    """
+    resultado = await session.execute(
+        update(TarefaTranscricao)
+        .where(
+            TarefaTranscricao.estado == EXECUTANDO,
+            TarefaTranscricao.disponivel_em <= utcnow(),
+        )
+        .values(estado=PENDENTE, dono=None)
+    )
+    await session.commit()
+    return resultado.rowcount
+
+
+@dataclass
+class MetricasTranscricao:
+    """Métricas acumuladas da fila (tempos em segundos)."""
+
+    concluidas: int = 0
+    retentativas: int = 0
+    falhas: int = 0
+    reservas_perdidas: int = 0
+    recuperadas: int = 0
+    espera_total: float = 0.0
+    transcricao_total: float = 0.0
+
+    def resumo(self) -> dict:
+        n = self.concluidas or 1
+        return {
+            'concluidas': self.concluidas,
+            'retentativas': self.retentativas,
+            'falhas': self.falhas,
+            'reservas_perdidas': self.reservas_perdidas,
+            'recuperadas': self.recuperadas,
+            'espera_media_ms': self.espera_total / n * 1000,
+            'transcricao_media_ms': self.transcricao_total / n * 1000,
+        }
+
+
+class FilaTranscricao:
+    """
+    Pool de workers que consome `tarefas_transcricao`.
+
+    Args:
+        workers: Tarefas transcritas ao mesmo tempo (e processos do pool).
+        motor: Motor de transcrição, no formato `modulo:Classe`.
+        max_tentativas: Tentativas antes da falha definitiva.
+        visibilidade: Segundos de reserva de uma tarefa; deve exceder o
+            tempo da transcrição mais longa.
+        backoff: Espera, em segundos, antes da segunda tentativa; dobra a
+            cada nova falha.
+        sessoes: Fábrica de sessões do banco.
+        executor: Executor da transcrição; por padrão, um pool de processos.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        workers: int,
+        motor: str,
+        max_tentativas: int,
+        visibilidade: float,
+        backoff: float,
+        sessoes=async_session,
+        executor: Executor | None = None,
+    ):
+        self.workers = workers
+        self.motor = motor
+        self.max_tentativas = max_tentativas
+        self.visibilidade = visibilidade
+        self.backoff = backoff
+        self.sessoes = sessoes
+        self.metricas = MetricasTranscricao()
+        self._executor = executor
+        self._executor_proprio = executor is None
+        self._aviso = asyncio.Event()
+        self._tarefas: list[asyncio.Task] = []
+        self.em_execucao = 0
+
+    async def iniciar(self) -> None:
+        """Recupera tarefas abandonadas e inicia os workers."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        async with self.sessoes() as session:
+            self.metricas.recuperadas += await recuperar_tarefas(session)
+        self._tarefas = [
+            asyncio.create_task(self._trabalhar()) for _ in range(self.workers)
+        ]
+
+    def notificar(self) -> None:
+        """Avisa os workers locais de que há uma nova tarefa."""
+        self._aviso.set()
+
+    async def _trabalhar(self) -> None:
+        while True:
+            try:
+                processou = await self.processar_uma()
+            except Exception:
+                logger.exception('Falha ao processar a fila de transcrição')
+                await asyncio.sleep(ESPERA_APOS_ERRO)
+                continue
+            if not processou:
+                try:
+                    await asyncio.wait_for(
+                        self._aviso.wait(), INTERVALO_CONSULTA
+                    )
+                except TimeoutError:
+                    pass
+                self._aviso.clear()
+
+    async def processar_uma(self) -> bool:
+        """
+        Reserva e executa uma tarefa.
+
+        Returns:
+            False se não havia tarefa disponível.
+        """
+        async with self.sessoes() as session:
+            tarefa = await reservar_tarefa(session, self.visibilidade)
+            if tarefa is None:
+                return False
+            self.metricas.espera_total += max(
+                (utcnow() - tarefa.created_at).total_seconds(), 0.0
+            )
+
+            if tarefa.tentativas > self.max_tentativas:
+                # A reserva expirou em todas as tentativas anteriores.
+                await self._falhar(
+                    session, tarefa, 'Prazo de visibilidade esgotado'
+                )
+            else:
+                await self._executar(session, tarefa)
+            return True
+
+    async def _executar(
+        self, session: AsyncSession, tarefa: TarefaTranscricao
+    ) -> None:
+        self.em_execucao += 1
+        try:
+            texto, duracao = await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                _transcrever,
+                self.motor,
+                str(caminho_audio(tarefa.audio_path).resolve()),
+                tipo_audio(tarefa.audio_path),
+            )
+        except Exception as erro:
+            await self._falhar(
+                session, tarefa, f'{type(erro).__name__}: {erro}'
+            )
+            return
+        finally:
+            self.em_execucao -= 1
+
+        if await concluir_tarefa(session, tarefa, texto):
+            self.metricas.concluidas += 1
+            self.metricas.transcricao_total += duracao
+        else:
+            self.metricas.reservas_perdidas += 1
+
+    async def _falhar(
+        self, session: AsyncSession, tarefa: TarefaTranscricao, erro: str
+    ) -> None:
+        nova_tentativa = await falhar_tarefa(
+            session, tarefa, erro, self.max_tentativas, self.backoff
+        )
+        if nova_tentativa is None:
+            self.metricas.reservas_perdidas += 1
+        elif nova_tentativa:
+            self.metricas.retentativas += 1
+        else:
+            self.metricas.falhas += 1
+
+    def resumo(self) -> dict:
+        return {
+            'workers': self.workers,
+            'motor': self.motor,
+            'em_execucao': self.em_execucao,
+            **self.metricas.resumo(),
+        }
+
+    async def parar(self) -> None:
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        if self._executor_proprio and self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+fila_transcricao = FilaTranscricao(
+    workers=settings.TRANSCRIPTION_WORKERS,
+    motor=settings.TRANSCRIPTION_ENGINE,
+    max_tentativas=settings.TRANSCRIPTION_MAX_ATTEMPTS,
+    visibilidade=settings.TRANSCRIPTION_VISIBILITY_TIMEOUT_SECONDS,
+    backoff=settings.TRANSCRIPTION_BACKOFF_SECONDS,
+)
@@ -0,0 +1,289 @@
+"""
+Uploads retomáveis do áudio das crises.
+
+O protocolo segue a ideia do tus (https://tus.io), sobre as rotas de
+`/registros-crise/{id}/audio/uploads`:
+
+1. `POST` declara o tamanho e o tipo do áudio e cria a sessão de upload.
+2. `PATCH /{upload_id}` com o cabeçalho `Upload-Offset` envia um pedaço. Os
+   bytes são gravados direto no arquivo parcial, na posição do offset.
+3. `GET /{upload_id}` retorna o offset confirmado, de onde retomar depois de
+   uma falha.
+4. `POST /{upload_id}/concluir` calcula o SHA-256 e renomeia o arquivo
+   parcial para o seu endereço definitivo (ver `fibrolog_api.audio`).
+
+Como os pedaços já são gravados no lugar, concluir não copia nada. Se a
+conexão cai no meio de um pedaço, os bytes que chegaram são confirmados. Se
+o servidor cai depois de gravar e antes do commit, o arquivo fica maior que
+o offset confirmado, e o próximo pedaço o trunca nesse offset. O offset só
+avança se ainda for o lido no início do pedaço (`UPDATE ... WHERE recebido =
+offset`): de dois pedaços simultâneos no mesmo offset, em processos
+diferentes, apenas um é confirmado.
+
+Sessões sem atividade por `AUDIO_UPLOAD_TTL_HOURS` são descartadas pela
+coleta periódica iniciada com a aplicação.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from datetime import timedelta
+from http import HTTPStatus
+from pathlib import Path
+
+import anyio
+from fastapi import HTTPException, Request
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import ClientDisconnect
+
+from fibrolog_api import audio
+from fibrolog_api.database import async_session
+from fibrolog_api.models import UploadAudio
+from fibrolog_api.relogio import utcnow
+from fibrolog_api.settings import Settings
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+INTERVALO_COLETA = 60 * 60  # segundos
+
+# Uploads recebendo um pedaço neste processo; um segundo PATCH simultâneo
+# no mesmo upload escreveria sobre os mesmos bytes. Entre processos, vale a
+# confirmação condicional do offset em `gravar_pedaco`.
+_em_andamento: set[str] = set()
+
+
+def diretorio_uploads() -> Path:
+    return audio.diretorio_audios() / 'uploads'
+
+
+def caminho_upload(upload_id: str) -> Path:
+    return diretorio_uploads() / f'{upload_id}.parcial'
+
+
+def _validade():
+    return utcnow() + timedelta(hours=settings.AUDIO_UPLOAD_TTL_HOURS)
+
+
+def _nao_encontrado() -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.NOT_FOUND,
+        detail='Upload não encontrado ou expirado.',
+    )
+
+
+async def criar_upload(
+    session: AsyncSession, registro_id: int, tamanho: int, tipo: str
+) -> UploadAudio:
+    """
+    Cria a sessão de upload e o arquivo parcial vazio, sem fazer commit.
+
+    Raises:
+        HTTPException: Se o tipo não é suportado ou o tamanho excede o
+            limite de áudio.
+    """
+    if tipo not in audio.TIPOS_AUDIO:
+        raise HTTPException(
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            detail=(
+                'Formato de áudio não suportado. Use: '
+                f'{", ".join(sorted(audio.TIPOS_AUDIO))}.'
+            ),
+        )
+    audio.verificar_tamanho(tamanho)
+
+    upload = UploadAudio(
+        id=uuid.uuid4().hex,
+        registro_id=registro_id,
+        tipo=tipo,
+        tamanho=tamanho,
+        expira_em=_validade(),
+    )
+    caminho = anyio.Path(caminho_upload(upload.id))
+    await caminho.parent.mkdir(parents=True, exist_ok=True)
+    await caminho.touch()
+    session.add(upload)
+    return upload
+
+
+async def buscar_upload(
+    session: AsyncSession, registro_id: int, upload_id: str
+) -> UploadAudio:
+    upload = await session.scalar(
+        select(UploadAudio).where(
+            UploadAudio.id == upload_id,
+            UploadAudio.registro_id == registro_id,
+            UploadAudio.expira_em > utcnow(),
+        )
+    )
+    if upload is None:
+        raise _nao_encontrado()
+    return upload
+
+
+async def gravar_pedaco(
+    session: AsyncSession, upload: UploadAudio, offset: int, request: Request
+) -> None:
+    """
+    Grava o corpo da requisição a partir de `offset` e avança o upload.
+
+    Se o cliente desconecta no meio do corpo, os bytes recebidos até ali
+    são mantidos. O chamador deve fazer commit em seguida.
+
+    Raises:
+        HTTPException: Se `offset` não é o offset confirmado, se há outro
+            pedaço sendo gravado ou se o corpo ultrapassa o tamanho
+            declarado.
+    """
+    if offset != upload.recebido:
+        raise _offset_divergente(offset, upload.recebido)
+    if upload.id in _em_andamento:
+        raise _pedaco_simultaneo()
+
+    _em_andamento.add(upload.id)
+    try:
+        recebido = await _anexar(upload, offset, request)
+    finally:
+        _em_andamento.discard(upload.id)
+
+    resultado = await session.execute(
+        update(UploadAudio)
+        .where(UploadAudio.id == upload.id, UploadAudio.recebido == offset)
+        .values(recebido=recebido, expira_em=_validade())
+    )
+    if resultado.rowcount == 0:
+        raise _pedaco_simultaneo()
+
+
+def _offset_divergente(offset: int, recebido: int) -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.CONFLICT,
+        detail=(
+            f'Offset {offset} não confere com os {recebido} bytes já '
+            'recebidos.'
+        ),
+    )
+
+
+def _pedaco_simultaneo() -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.CONFLICT,
+        detail='Outro pedaço deste upload está sendo enviado.',
+    )
+
+
+async def _anexar(upload: UploadAudio, offset: int, request: Request) -> int:
+    try:
+        arquivo = await anyio.open_file(caminho_upload(upload.id), 'r+b')
+    except FileNotFoundError:
+        raise _nao_encontrado() from None
+
+    recebido = offset
+    async with arquivo:
+        await arquivo.seek(offset)
+        await arquivo.truncate()
+        try:
+            async for pedaco in request.stream():
+                if recebido + len(pedaco) > upload.tamanho:
+                    raise HTTPException(
+                        status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        detail=(
+                            'O pedaço ultrapassa o tamanho declarado de '
+                            f'{upload.tamanho} bytes.'
+                        ),
+                    )
+                await arquivo.write(pedaco)
+                recebido += len(pedaco)
+        except ClientDisconnect:
+            pass
+    return recebido
+
+
+def _sha256(caminho: Path) -> str:
+    with open(caminho, 'rb') as arquivo:
+        return hashlib.file_digest(arquivo, 'sha256').hexdigest()
+
+
+async def concluir_upload(
+    session: AsyncSession, upload: UploadAudio
+) -> audio.AudioArmazenado:
+    """
+    Move o arquivo completo para o seu endereço e remove a sessão, sem
+    fazer commit.
+
+    Raises:
+        HTTPException: Se ainda faltam bytes.
+    """
+    if upload.recebido != upload.tamanho:
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail=(
+                f'Upload incompleto: {upload.recebido} de '
+                f'{upload.tamanho} bytes recebidos.'
+            ),
+        )
+    caminho = caminho_upload(upload.id)
+    digest = await anyio.to_thread.run_sync(_sha256, caminho)
+    armazenado = await audio.armazenar(
+        caminho, digest, audio.TIPOS_AUDIO[upload.tipo]
+    )
+    await session.delete(upload)
+    return armazenado
+
+
+async def descartar_uploads(
+    session: AsyncSession, registro_id: int, upload_id: str | None = None
+) -> None:
+    """Remove as sessões de upload de um registro e seus arquivos parciais."""
+    statement = (
+        delete(UploadAudio)
+        .where(UploadAudio.registro_id == registro_id)
+        .returning(UploadAudio.id)
+    )
+    if upload_id is not None:
+        statement = statement.where(UploadAudio.id == upload_id)
+    for removido in (await session.scalars(statement)).all():
+        await anyio.Path(caminho_upload(removido)).unlink(missing_ok=True)
+
+
+async def remover_uploads_expirados(session: AsyncSession) -> int:
+    """
+    Descarta as sessões expiradas e os arquivos parciais sem sessão.
+
+    Returns:
+        Quantidade de sessões descartadas.
+    """
+    expirados = (
+        await session.scalars(
+            delete(UploadAudio)
+            .where(UploadAudio.expira_em <= utcnow())
+            .returning(UploadAudio.id)
+        )
+    ).all()
+    await session.commit()
+
+    # Um arquivo sem gravações há mais que a validade pertence a uma
+    # sessão expirada ou que nunca chegou a ser confirmada.
+    limite = time.time() - settings.AUDIO_UPLOAD_TTL_HOURS * 60 * 60
+    diretorio = anyio.Path(diretorio_uploads())
+    if await diretorio.exists():
+        async for arquivo in diretorio.glob('*.parcial'):
+            if (await arquivo.stat()).st_mtime < limite:
+                await arquivo.unlink(missing_ok=True)
+    for upload_id in expirados:
+        await anyio.Path(caminho_upload(upload_id)).unlink(missing_ok=True)
+    return len(expirados)
+
+
+async def coletar_periodicamente(intervalo: float = INTERVALO_COLETA):
+    """Executa `remover_uploads_expirados` até ser cancelada."""
+    while True:
+        try:
+            async with async_session() as session:
+                await remover_uploads_expirados(session)
+        except Exception:
+            logger.exception('Falha ao remover uploads de áudio expirados')
+        await asyncio.sleep(intervalo)
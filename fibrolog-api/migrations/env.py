@@ -35,6 +35,17 @@ target_metadata = table_registry.metadata
 # ... etc.
 
 
+def include_name(name, type_, parent_names):
+    """Ignora a tabela FTS5 `busca`, suas tabelas internas e gatilhos.
+
+    Elas são criadas por DDL em `fibrolog_api.busca`, fora dos modelos, e
+    o autogenerate as removeria.
+    """
+    if type_ == "table":
+        return not name.startswith("busca")
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -52,6 +63,7 @@ def run_migrations_offline() -> None:
         url=url,
         target_metadata=target_metadata,
         literal_binds=True,
+        include_name=include_name,
         dialect_opts={"paramstyle": "named"},
     )
 
@@ -74,7 +86,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,29 @@
+"""add versao to pacientes
+
+Revision ID: 3f6b8d2c9e17
+Revises: e4a19c6d7b30
+Create Date: 2026-10-18 14:47:12.093316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b8d2c9e17'
+down_revision: Union[str, Sequence[str], None] = 'e4a19c6d7b30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pacientes', sa.Column('versao', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('pacientes') as batch_op:
+        batch_op.drop_column('versao')
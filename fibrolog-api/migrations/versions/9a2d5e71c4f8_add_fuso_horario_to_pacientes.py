@@ -0,0 +1,29 @@
+"""add fuso_horario to pacientes
+
+Revision ID: 9a2d5e71c4f8
+Revises: 3f6b8d2c9e17
+Create Date: 2026-10-18 15:21:37.640182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a2d5e71c4f8'
+down_revision: Union[str, Sequence[str], None] = '3f6b8d2c9e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pacientes', sa.Column('fuso_horario', sa.String(length=64), server_default='America/Sao_Paulo', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('pacientes') as batch_op:
+        batch_op.drop_column('fuso_horario')
@@ -0,0 +1,58 @@
+"""key sequencias by paciente
+
+Revision ID: a6c3e9d2f184
+Revises: f2b8d6e1a937
+Create Date: 2026-10-18 23:59:31.284615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3e9d2f184'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d6e1a937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.rename_table('sequencias', 'sequencias_globais')
+    op.create_table('sequencias',
+    sa.Column('paciente_id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=50), nullable=False),
+    sa.Column('valor', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id'], ),
+    sa.PrimaryKeyConstraint('paciente_id', 'nome')
+    )
+
+    # Cada paciente continua do valor global: os cursores que os clientes
+    # já receberam continuam válidos.
+    op.execute(
+        """
+        INSERT INTO sequencias (paciente_id, nome, valor)
+        SELECT pacientes.id, sequencias_globais.nome, sequencias_globais.valor
+        FROM pacientes CROSS JOIN sequencias_globais
+        """
+    )
+    op.drop_table('sequencias_globais')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('sequencias', 'sequencias_pacientes')
+    op.create_table('sequencias',
+    sa.Column('nome', sa.String(length=50), nullable=False),
+    sa.Column('valor', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('nome')
+    )
+    op.execute(
+        """
+        INSERT INTO sequencias (nome, valor)
+        SELECT nome, max(valor) FROM sequencias_pacientes GROUP BY nome
+        """
+    )
+    op.drop_table('sequencias_pacientes')
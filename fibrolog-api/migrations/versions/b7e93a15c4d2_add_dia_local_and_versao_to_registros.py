@@ -0,0 +1,48 @@
+"""add dia_local and versao to registros
+
+Revision ID: b7e93a15c4d2
+Revises: 8d41c7e2f0a6
+Create Date: 2026-10-18 13:10:05.227301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e93a15c4d2'
+down_revision: Union[str, Sequence[str], None] = '8d41c7e2f0a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('registros', sa.Column('dia_local', sa.Date(), nullable=True))
+    op.add_column('registros', sa.Column('versao', sa.Integer(), server_default='1', nullable=False))
+
+    # `data_hora` dos registros diários já foi gravado no horário local.
+    # Em caso de duplicatas no mesmo dia, apenas o mais recente recebe
+    # `dia_local`; os demais ficam preservados fora da restrição única.
+    op.execute(
+        """
+        UPDATE registros SET dia_local = date(data_hora)
+        WHERE tipo_registro = 'diario' AND id IN (
+            SELECT max(id) FROM registros
+            WHERE tipo_registro = 'diario'
+            GROUP BY paciente_id, date(data_hora)
+        )
+        """
+    )
+
+    op.create_index('uq_registros_paciente_id_dia_local', 'registros', ['paciente_id', 'dia_local'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_registros_paciente_id_dia_local', table_name='registros')
+    with op.batch_alter_table('registros') as batch_op:
+        batch_op.drop_column('versao')
+        batch_op.drop_column('dia_local')
@@ -0,0 +1,96 @@
+"""create busca fts5 index
+
+Revision ID: c4e7a2d9f516
+Revises: 6d3a9f1c2b84
+Create Date: 2026-10-19 00:41:08.215734
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a2d9f516'
+down_revision: Union[str, Sequence[str], None] = '6d3a9f1c2b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabela, coluna, tipo, rowid, paciente); `{linha}` é `new` ou `old`
+FONTES = [
+    (
+        'registros_crises',
+        'texto_transcrito',
+        'crise',
+        '{linha}.id',
+        '(SELECT paciente_id FROM registros WHERE id = {linha}.id)',
+    ),
+    (
+        'registros_diarios',
+        'localizacao_dor',
+        'diario',
+        '{linha}.id',
+        '(SELECT paciente_id FROM registros WHERE id = {linha}.id)',
+    ),
+    ('pacientes', 'medicacoes', 'medicacoes', '-{linha}.id', '{linha}.id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 é exclusivo do SQLite
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE busca USING fts5(
+            texto,
+            paciente,
+            tipo UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    for tabela, coluna, tipo, chave, dono in FONTES:
+        inserir = (
+            f'INSERT INTO busca(rowid, texto, paciente, tipo) '
+            f'SELECT {chave.format(linha="new")}, new.{coluna}, '
+            f"'p' || {dono.format(linha='new')}, '{tipo}' "
+            f'WHERE new.{coluna} IS NOT NULL;'
+        )
+        remover = (
+            f'DELETE FROM busca WHERE rowid = {chave.format(linha="old")};'
+        )
+        op.execute(
+            f'CREATE TRIGGER busca_{tabela}_ai AFTER INSERT ON {tabela} '
+            f'BEGIN {inserir} END'
+        )
+        op.execute(
+            f'CREATE TRIGGER busca_{tabela}_au AFTER UPDATE OF {coluna} '
+            f'ON {tabela} BEGIN {remover} {inserir} END'
+        )
+        op.execute(
+            f'CREATE TRIGGER busca_{tabela}_ad AFTER DELETE ON {tabela} '
+            f'BEGIN {remover} END'
+        )
+        # Documentos já existentes
+        op.execute(
+            f'INSERT INTO busca(rowid, texto, paciente, tipo) '
+            f'SELECT {chave.format(linha="t")}, t.{coluna}, '
+            f"'p' || {dono.format(linha='t')}, '{tipo}' "
+            f'FROM {tabela} AS t WHERE t.{coluna} IS NOT NULL'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for tabela, *_ in FONTES:
+        for sufixo in ('ai', 'au', 'ad'):
+            op.execute(f'DROP TRIGGER IF EXISTS busca_{tabela}_{sufixo}')
+    op.execute('DROP TABLE IF EXISTS busca')
@@ -0,0 +1,53 @@
+"""create table resumos_registros
+
+Revision ID: c58e0f3a7d19
+Revises: 9a2d5e71c4f8
+Create Date: 2026-10-18 16:05:48.771204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e0f3a7d19'
+down_revision: Union[str, Sequence[str], None] = '9a2d5e71c4f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Após aplicar, preencha os resumos com `task rebuild_resumos`.
+    op.create_table('resumos_registros',
+    sa.Column('paciente_id', sa.Integer(), nullable=False),
+    sa.Column('periodo', sa.String(length=5), nullable=False),
+    sa.Column('inicio', sa.Date(), nullable=False),
+    sa.Column('registros', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('soma_intensidade_dor', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('soma_quadrados_intensidade_dor', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('min_intensidade_dor', sa.Integer(), nullable=True),
+    sa.Column('max_intensidade_dor', sa.Integer(), nullable=True),
+    sa.Column('soma_qualidade_sono', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('soma_quadrados_qualidade_sono', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('min_qualidade_sono', sa.Integer(), nullable=True),
+    sa.Column('max_qualidade_sono', sa.Integer(), nullable=True),
+    sa.Column('soma_nivel_fadiga', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('soma_quadrados_nivel_fadiga', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('min_nivel_fadiga', sa.Integer(), nullable=True),
+    sa.Column('max_nivel_fadiga', sa.Integer(), nullable=True),
+    sa.Column('feliz', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('ansioso', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('irritado', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('triste', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('crises', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id'], ),
+    sa.PrimaryKeyConstraint('paciente_id', 'periodo', 'inicio')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('resumos_registros')
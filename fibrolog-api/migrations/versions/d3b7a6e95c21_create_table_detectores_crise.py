@@ -0,0 +1,44 @@
+"""create table detectores_crise
+
+Revision ID: d3b7a6e95c21
+Revises: c58e0f3a7d19
+Create Date: 2026-10-18 16:58:03.418862
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3b7a6e95c21'
+down_revision: Union[str, Sequence[str], None] = 'c58e0f3a7d19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Após aplicar, preencha o estado com `task rebuild_detector`.
+    op.create_table('detectores_crise',
+    sa.Column('paciente_id', sa.Integer(), nullable=False),
+    sa.Column('dias', sa.Integer(), nullable=False),
+    sa.Column('media_dor', sa.Float(), nullable=False),
+    sa.Column('variancia_dor', sa.Float(), nullable=False),
+    sa.Column('cusum_dor', sa.Float(), nullable=False),
+    sa.Column('media_fadiga', sa.Float(), nullable=False),
+    sa.Column('variancia_fadiga', sa.Float(), nullable=False),
+    sa.Column('cusum_fadiga', sa.Float(), nullable=False),
+    sa.Column('ultimo_dia', sa.Date(), nullable=True),
+    sa.Column('anterior', sa.JSON(), nullable=True),
+    sa.Column('ultimo_alerta_dia', sa.Date(), nullable=True),
+    sa.Column('desatualizado', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id'], ),
+    sa.PrimaryKeyConstraint('paciente_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('detectores_crise')
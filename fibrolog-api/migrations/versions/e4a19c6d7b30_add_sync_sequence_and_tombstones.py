@@ -0,0 +1,61 @@
+"""add sync sequence and tombstones
+
+Revision ID: e4a19c6d7b30
+Revises: b7e93a15c4d2
+Create Date: 2026-10-18 14:02:41.518930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a19c6d7b30'
+down_revision: Union[str, Sequence[str], None] = 'b7e93a15c4d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sequencias',
+    sa.Column('nome', sa.String(length=50), nullable=False),
+    sa.Column('valor', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('nome')
+    )
+    op.create_table('registros_removidos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('registro_id', sa.Integer(), nullable=False),
+    sa.Column('tipo_registro', sa.String(), nullable=False),
+    sa.Column('paciente_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('removido_em', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_registros_removidos_paciente_id_seq', 'registros_removidos', ['paciente_id', 'seq'], unique=False)
+    op.add_column('registros', sa.Column('seq', sa.Integer(), server_default='0', nullable=False))
+
+    # Registros existentes entram na sequência na ordem de criação, e o
+    # contador continua a partir do maior id.
+    op.execute('UPDATE registros SET seq = id')
+    op.execute(
+        """
+        INSERT INTO sequencias (nome, valor)
+        SELECT 'sync', coalesce(max(id), 0) FROM registros
+        """
+    )
+
+    op.create_index('ix_registros_paciente_id_seq', 'registros', ['paciente_id', 'seq'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_registros_paciente_id_seq', table_name='registros')
+    with op.batch_alter_table('registros') as batch_op:
+        batch_op.drop_column('seq')
+    op.drop_index('ix_registros_removidos_paciente_id_seq', table_name='registros_removidos')
+    op.drop_table('registros_removidos')
+    op.drop_table('sequencias')
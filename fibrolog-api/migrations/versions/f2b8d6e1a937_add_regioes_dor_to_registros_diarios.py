@@ -0,0 +1,33 @@
+"""add regioes_dor to registros_diarios
+
+Revision ID: f2b8d6e1a937
+Revises: c4e7a2d9f516
+Create Date: 2026-10-18 23:58:14.603118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d6e1a937'
+down_revision: Union[str, Sequence[str], None] = 'c4e7a2d9f516'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('registros_diarios', sa.Column('regioes_dor', sa.Integer(), server_default='0', nullable=False))
+
+    # Os registros existentes são preenchidos fora da migração, com o
+    # interpretador atual: `python -m fibrolog_api.regioes`
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Sem `batch_alter_table`: recriar a tabela no SQLite descartaria os
+    # gatilhos do índice de busca.
+    op.drop_column('registros_diarios', 'regioes_dor')
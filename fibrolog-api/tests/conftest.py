@@ -10,7 +10,12 @@ from sqlalchemy.pool import StaticPool
 from fibrolog_api.app import app
 from fibrolog_api.database import get_session
 from fibrolog_api.models import Paciente, table_registry
-from fibrolog_api.security import create_access_token, get_password_hash
+from fibrolog_api.routers import metricas
+from fibrolog_api.security import (
+    create_access_token,
+    get_password_hash,
+    principal_cache,
+)
 
 
 @pytest.fixture(scope='session')
@@ -20,6 +25,13 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
 @pytest_asyncio.fixture
 async def session():
     engine = create_async_engine(
@@ -60,7 +72,7 @@ async def paciente(session):
     paciente = Paciente(
         nome='Gustavo Silva',
         email='gustavo@example.com',
-        password=get_password_hash(password_plain),
+        password=await get_password_hash(password_plain),
         data_nascimento=datetime(1990, 5, 15),
         sexo='M',
         data_diagnostico=datetime(2020, 3, 10),
@@ -81,7 +93,7 @@ async def other_paciente(session):
     paciente = Paciente(
         nome='Maria Santos',
         email='maria@example.com',
-        password=get_password_hash(password_plain),
+        password=await get_password_hash(password_plain),
         data_nascimento=datetime(1985, 8, 22),
         sexo='F',
         data_diagnostico=datetime(2018, 11, 5),
@@ -98,3 +110,10 @@ async def other_paciente(session):
 @pytest_asyncio.fixture
 async def token(paciente):
     return create_access_token(data={'sub': paciente.email})
+
+
+@pytest.fixture
+def token_metricas(monkeypatch):
+    token = 'token-de-metricas'
+    monkeypatch.setattr(metricas.settings, 'METRICS_TOKEN', token)
+    return token
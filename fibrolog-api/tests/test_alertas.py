@@ -0,0 +1,425 @@
+"""
+Testes para as rotas de alertas e o agendador de disparos.
+"""
+
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.agendador import AgendadorAlertas
+from fibrolog_api.models import Alerta, Paciente
+from fibrolog_api.pagination import encode_cursor
+from fibrolog_api.relogio import utcnow
+
+pytestmark = pytest.mark.asyncio
+
+
+def _agendador(session: AsyncSession, **kwargs) -> AgendadorAlertas:
+    def sessoes():
+        return AsyncSession(session.bind, expire_on_commit=False)
+
+    return AgendadorAlertas(
+        **{'janela': 60, 'limite_carga': 100, **kwargs}, sessoes=sessoes
+    )
+
+
+async def _alertas(
+    session: AsyncSession, paciente: Paciente, atrasos: list[int]
+) -> list[Alerta]:
+    """Cria alertas vencidos há `atrasos` segundos (negativo: no futuro)."""
+    momentos = [utcnow() - timedelta(seconds=atraso) for atraso in atrasos]
+    alertas = [
+        Alerta(
+            tipo='medicação',
+            data_hora=momento,
+            paciente_id=paciente.id,
+            descricao='Pregabalina 75mg',
+            proxima_execucao=momento,
+        )
+        for momento in momentos
+    ]
+    session.add_all(alertas)
+    await session.commit()
+    return alertas
+
+
+async def _disparados(session: AsyncSession) -> list[int]:
+    session.expire_all()
+    return list(
+        await session.scalars(
+            select(Alerta.id)
+            .where(Alerta.disparado_em.is_not(None))
+            .order_by(Alerta.id)
+        )
+    )
+
+
+async def test_create_alerta_converte_para_utc(client: AsyncClient, token):
+    amanha = (datetime.now() + timedelta(days=1)).date()
+    response = await client.post(
+        '/alertas/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'tipo': 'consulta',
+            'data_hora': f'{amanha}T09:00:00',
+            'descricao': 'Reumatologista',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    alerta = response.json()
+    # America/Sao_Paulo (padrão) é UTC-3
+    assert alerta['data_hora'] == f'{amanha}T12:00:00Z'
+    assert alerta['ativo'] is True
+    assert alerta['disparado_em'] is None
+
+
+async def test_create_alerta_no_passado(client: AsyncClient, token):
+    response = await client.post(
+        '/alertas/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'tipo': 'consulta',
+            'data_hora': '2024-01-10T09:00:00Z',
+            'descricao': 'Reumatologista',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_listar_alertas_por_cursor(
+    client: AsyncClient, session: AsyncSession, paciente, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    alertas = await _alertas(session, paciente, [-300, -100, -200, 60])
+    alertas[3].ativo = False
+    await session.commit()
+
+    pagina = (
+        await client.get(
+            '/alertas/', headers=headers, params={'limit': 2, 'ativo': True}
+        )
+    ).json()
+    seguinte = (
+        await client.get(
+            '/alertas/',
+            headers=headers,
+            params={
+                'limit': 2,
+                'ativo': True,
+                'cursor': pagina['proximo_cursor'],
+            },
+        )
+    ).json()
+
+    ids = [a['id'] for a in pagina['alertas'] + seguinte['alertas']]
+    assert ids == [alertas[1].id, alertas[2].id, alertas[0].id]
+    assert seguinte['proximo_cursor'] is None
+
+
+@pytest.mark.parametrize('valores', [(1, 2), ('x', 1)])
+async def test_listar_alertas_cursor_invalido(
+    client: AsyncClient, token: str, valores: tuple
+):
+    response = await client.get(
+        '/alertas/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'cursor': encode_cursor(*valores)},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_alerta_de_outro_paciente(
+    client: AsyncClient, session: AsyncSession, other_paciente, token
+):
+    [alerta] = await _alertas(session, other_paciente, [-60])
+
+    response = await client.delete(
+        f'/alertas/{alerta.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+async def test_dispara_alertas_vencidos_uma_vez(
+    session: AsyncSession, paciente
+):
+    vencidos = await _alertas(session, paciente, [120, 5, -3600])
+    ids = [alerta.id for alerta in vencidos]
+    agendador = _agendador(session)
+
+    assert await agendador.carregar() == 2  # noqa: PLR2004
+    assert await agendador.disparar_vencidos() == 2  # noqa: PLR2004
+    assert await _disparados(session) == ids[:2]
+    await session.refresh(vencidos[0])
+    assert vencidos[0].ativo is False
+
+    # Depois de reiniciar, os alertas disparados não são carregados
+    reiniciado = _agendador(session)
+    assert await reiniciado.carregar() == 0
+    assert await reiniciado.disparar_vencidos() == 0
+
+
+async def test_duas_instancias_nao_disparam_o_mesmo_alerta(
+    session: AsyncSession, paciente
+):
+    await _alertas(session, paciente, [10, 20])
+    primeira, segunda = _agendador(session), _agendador(session)
+    await primeira.carregar()
+    await segunda.carregar()
+
+    assert await primeira.disparar_vencidos() == 2  # noqa: PLR2004
+    assert await segunda.disparar_vencidos() == 0
+    assert segunda.resumo()['descartados'] == 2  # noqa: PLR2004
+
+
+async def test_alerta_cancelado_nao_dispara(
+    client: AsyncClient, session: AsyncSession, paciente, token
+):
+    agendador = _agendador(session)
+    await agendador.carregar()
+    [cancelado, desativado, mantido] = await _alertas(
+        session, paciente, [1, 2, 3]
+    )
+    mantido_id = mantido.id
+    for alerta in (cancelado, desativado, mantido):
+        agendador.agendar(alerta.id, alerta.proxima_execucao)
+    assert len(agendador) == 3  # noqa: PLR2004
+
+    agendador.cancelar(cancelado.id)
+    # Desativado por outra instância, sem passar por este agendador
+    desativado.ativo = False
+    await session.commit()
+
+    assert await agendador.disparar_vencidos() == 1
+    assert await _disparados(session) == [mantido_id]
+
+
+async def test_reagendar_substitui_entrada_anterior(
+    session: AsyncSession, paciente
+):
+    agendador = _agendador(session)
+    await agendador.carregar()
+    [alerta] = await _alertas(session, paciente, [-30])
+    agendador.agendar(alerta.id, alerta.proxima_execucao)
+
+    alerta.proxima_execucao = utcnow() - timedelta(seconds=1)
+    await session.commit()
+    agendador.agendar(alerta.id, alerta.proxima_execucao)
+
+    assert await agendador.disparar_vencidos() == 1
+    assert agendador.resumo()['agendados'] == 0
+
+
+async def test_alerta_fora_da_janela_fica_para_a_proxima_carga(
+    session: AsyncSession, paciente
+):
+    agendador = _agendador(session, janela=60)
+    await agendador.carregar()
+    [distante] = await _alertas(session, paciente, [-3600])
+
+    agendador.agendar(distante.id, distante.proxima_execucao)
+
+    assert len(agendador) == 0
+
+
+async def test_tratador_com_falha_mantem_alertas_ativos(
+    session: AsyncSession, paciente
+):
+    [alerta] = await _alertas(session, paciente, [1])
+    agendador = _agendador(session)
+
+    async def falhar(session, alertas):
+        raise RuntimeError('canal indisponível')
+
+    agendador.ao_disparar.append(falhar)
+    await agendador.carregar()
+    with pytest.raises(RuntimeError):
+        await agendador.disparar_vencidos()
+
+    assert await _disparados(session) == []
+    # Na carga seguinte o alerta volta ao heap
+    agendador.ao_disparar.pop()
+    await agendador.carregar()
+    assert await agendador.disparar_vencidos() == 1
+
+
+async def test_laco_dispara_em_lotes_limitados(
+    session: AsyncSession, paciente
+):
+    alertas = await _alertas(session, paciente, [5, 4, 3, 2, 1, -1])
+    ids = [alerta.id for alerta in alertas]
+    agendador = _agendador(session, janela=60, limite_carga=2)
+
+    await agendador.iniciar()
+    try:
+        async with asyncio.timeout(5):
+            while agendador.resumo()['disparados'] < len(ids):
+                await asyncio.sleep(0.05)
+    finally:
+        await agendador.parar()
+
+    assert await _disparados(session) == ids
+    assert agendador.resumo()['cargas'] >= 3  # noqa: PLR2004
+
+
+async def test_carga_usa_indice_ativo_proxima_execucao(session: AsyncSession):
+    consultas = []
+
+    def capturar(conn, cursor, statement, parameters, *args):
+        if statement.startswith('SELECT'):
+            consultas.append((statement, parameters))
+
+    engine = session.bind.sync_engine
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        await _agendador(session).carregar()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+    [(statement, parameters)] = consultas
+    conn = await session.connection()
+    plano = await conn.exec_driver_sql(
+        f'EXPLAIN QUERY PLAN {statement}', parameters
+    )
+    assert any(
+        'ix_alertas_ativo_proxima_execucao' in linha[-1] for linha in plano
+    )
+
+
+async def test_create_alerta_recorrente(client: AsyncClient, token):
+    response = await client.post(
+        '/alertas/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'tipo': 'medicação',
+            'data_hora': '2024-01-01T09:00:00',
+            'descricao': 'Duloxetina 60mg',
+            'recorrencia': 'freq=daily;byhour=9;byminute=0',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    alerta = response.json()
+    assert alerta['recorrencia'] == 'FREQ=DAILY;BYHOUR=9;BYMINUTE=0'
+    proxima = datetime.fromisoformat(alerta['proxima_execucao'])
+    assert proxima.time() == time(12, 0)  # 9:00 em America/Sao_Paulo
+    assert timedelta(0) < proxima - datetime.now(timezone.utc) <= timedelta(1)
+
+
+@pytest.mark.parametrize(
+    'recorrencia', ['FREQ=MONTHLY', 'FREQ=DAILY;BYHOUR=24', 'FREQ=DAILY;X=1']
+)
+async def test_create_alerta_recorrencia_invalida(
+    client: AsyncClient, token, recorrencia
+):
+    response = await client.post(
+        '/alertas/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'tipo': 'medicação',
+            'data_hora': '2024-01-01T09:00:00',
+            'descricao': 'Duloxetina 60mg',
+            'recorrencia': recorrencia,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def test_alerta_recorrente_avanca_para_a_proxima_ocorrencia(
+    session: AsyncSession, paciente
+):
+    inicio = utcnow() - timedelta(hours=10)
+    alerta = Alerta(
+        tipo='medicação',
+        data_hora=inicio,
+        paciente_id=paciente.id,
+        descricao='Pregabalina 75mg',
+        # A ocorrência de 2h atrás não foi disparada com a aplicação parada
+        proxima_execucao=inicio + timedelta(hours=8),
+        recorrencia='FREQ=HOURLY;INTERVAL=8',
+    )
+    session.add(alerta)
+    await session.commit()
+    agendador = _agendador(session)
+
+    await agendador.carregar()
+    assert await agendador.disparar_vencidos() == 1
+    assert await agendador.disparar_vencidos() == 0
+
+    await session.refresh(alerta)
+    assert alerta.ativo is True
+    assert alerta.disparado_em is not None
+    assert alerta.proxima_execucao == inicio + timedelta(hours=16)
+    assert await session.scalar(select(func.count()).select_from(Alerta)) == 1
+
+
+async def test_alerta_recorrente_fica_inativo_no_fim_da_serie(
+    session: AsyncSession, paciente
+):
+    inicio = utcnow() - timedelta(minutes=1)
+    alerta = Alerta(
+        tipo='medicação',
+        data_hora=inicio,
+        paciente_id=paciente.id,
+        descricao='Pregabalina 75mg',
+        proxima_execucao=inicio,
+        recorrencia='FREQ=DAILY;COUNT=1',
+    )
+    session.add(alerta)
+    await session.commit()
+    agendador = _agendador(session)
+
+    await agendador.carregar()
+    await agendador.disparar_vencidos()
+
+    await session.refresh(alerta)
+    assert alerta.ativo is False
+
+
+async def test_agenda_expande_ocorrencias_na_janela(
+    client: AsyncClient, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    amanha = (datetime.now(timezone.utc) + timedelta(days=1)).date()
+    for json in [
+        {
+            'tipo': 'medicação',
+            'data_hora': f'{amanha}T08:00:00Z',
+            'descricao': 'Pregabalina 75mg',
+            'recorrencia': 'FREQ=DAILY;BYHOUR=8,20',
+        },
+        {
+            'tipo': 'consulta',
+            'data_hora': f'{amanha}T14:00:00Z',
+            'descricao': 'Reumatologista',
+        },
+    ]:
+        await client.post('/alertas/', headers=headers, json=json)
+
+    response = await client.get(
+        '/alertas/agenda',
+        headers=headers,
+        params={
+            'from': f'{amanha}T00:00:00Z',
+            'to': f'{amanha + timedelta(days=2)}T00:00:00Z',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    ocorrencias = response.json()['ocorrencias']
+    assert [(o['tipo'], o['data_hora'][11:16]) for o in ocorrencias] == [
+        ('medicação', '11:00'),
+        ('consulta', '14:00'),
+        ('medicação', '23:00'),
+        ('medicação', '11:00'),
+        ('medicação', '23:00'),
+    ]
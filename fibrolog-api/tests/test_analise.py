@@ -0,0 +1,109 @@
+"""
+Testes para as análises de tendência e correlação.
+"""
+
+import zoneinfo
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+
+import numpy as np
+import pytest
+from httpx import AsyncClient
+
+from fibrolog_api.analise import (
+    correlacao,
+    correlacao_defasada,
+    media_movel,
+    postos,
+    tendencia,
+)
+
+DIAS = 60
+
+
+def test_postos_com_empates():
+    np.testing.assert_array_equal(
+        postos(np.array([10.0, 20.0, 10.0, 30.0])), [1.5, 3.0, 1.5, 4.0]
+    )
+
+
+def test_correlacao_ignora_dias_sem_registro():
+    x = np.array([1.0, 2.0, np.nan, 4.0, 5.0])
+    y = np.array([2.0, 4.0, 1.0, np.nan, 25.0])
+
+    resultado = correlacao(x, y)
+
+    assert resultado['n'] == 3  # noqa: PLR2004
+    assert resultado['spearman'] == pytest.approx(1.0)
+    assert resultado['pearson'] == pytest.approx(
+        np.corrcoef([1, 2, 5], [2, 4, 25])[0, 1]
+    )
+
+
+def test_correlacao_indefinida():
+    constante = np.full(5, 3.0)
+    assert correlacao(constante, np.arange(5.0))['pearson'] is None
+    assert correlacao(np.arange(2.0), np.arange(2.0))['spearman'] is None
+
+
+def test_correlacao_defasada():
+    sono = np.array([8.0, 2.0, 7.0, 1.0, 9.0, 3.0])
+    # A dor de cada dia é o oposto do sono da noite anterior
+    dor = np.concatenate(([np.nan], 10 - sono[:-1]))
+
+    assert correlacao_defasada(sono, dor, 1)['pearson'] == pytest.approx(-1)
+
+
+def test_media_movel_com_lacunas():
+    serie = np.array([2.0, np.nan, 4.0, 6.0, np.nan, np.nan, np.nan])
+
+    np.testing.assert_allclose(
+        media_movel(serie, 3), [2, 2, 3, 5, 5, 6, np.nan], equal_nan=True
+    )
+
+
+def test_tendencia():
+    dias = np.arange(10.0)
+    serie = 0.5 * dias + 1
+    serie[3] = np.nan
+
+    assert tendencia(serie) == pytest.approx(0.5)
+    assert tendencia(np.array([np.nan, 1.0])) is None
+
+
+@pytest.mark.asyncio
+async def test_get_insights(client: AsyncClient, token: str):
+    hoje = datetime.now(zoneinfo.ZoneInfo('America/Sao_Paulo')).date()
+    registros = []
+    for i in range(DIAS):
+        dia = hoje - timedelta(days=DIAS - 1 - i)
+        registros.append({
+            'data_hora': f'{dia.isoformat()}T00:00:00',
+            'intensidade_dor': i % 10,
+            'qualidade_sono': 10 - i % 10,
+            'nivel_fadiga': 5,
+            'estado_emocional': 'TRISTE',
+        })
+    await client.post(
+        '/registros-diarios/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'registros': registros},
+    )
+
+    response = await client.get(
+        '/registros-diarios/insights',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'dias': 30},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert date.fromisoformat(data['fim']) == hoje
+    assert data['dias_com_registro'] == 30  # noqa: PLR2004
+    assert data['correlacoes']['dor_sono']['pearson'] == pytest.approx(-1)
+    assert data['correlacoes']['dor_fadiga']['pearson'] is None
+    assert data['tendencias']['nivel_fadiga'] == 0
+    medias = data['medias_moveis']['intensidade_dor']
+    assert len(medias['media_7d']) == 30  # noqa: PLR2004
+    # A janela de 30 dias usa também os registros anteriores ao período
+    assert medias['media_30d'][0] == pytest.approx(4.5)
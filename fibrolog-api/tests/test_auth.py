@@ -1,6 +1,11 @@
+from datetime import datetime
 from http import HTTPStatus
 
 import pytest
+from sqlalchemy import update
+
+from fibrolog_api.models import RefreshToken
+from fibrolog_api.security import password_hasher
 
 
 @pytest.mark.asyncio
@@ -36,3 +41,160 @@ async def test_get_token_inexistent_user(client):
 
     assert response.status_code == HTTPStatus.BAD_REQUEST
     assert response.json()['detail'] == 'Email ou senha incorretos'
+
+
+@pytest.mark.asyncio
+async def test_get_token_hashing_saturated(client, paciente, monkeypatch):
+    monkeypatch.setattr(password_hasher, 'max_workers', 0)
+    monkeypatch.setattr(password_hasher, 'max_queue', 0)
+
+    response = await client.post(
+        '/auth/token',
+        data={'username': paciente.email, 'password': paciente.password_plain},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
+
+
+async def login(client, paciente):
+    response = await client.post(
+        '/auth/token',
+        data={'username': paciente.email, 'password': paciente.password_plain},
+    )
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_get_token_returns_refresh_token(client, paciente):
+    token = await login(client, paciente)
+
+    assert token['refresh_token']
+
+
+@pytest.mark.asyncio
+async def test_refresh_token(client, paciente):
+    token = await login(client, paciente)
+
+    response = await client.post(
+        '/auth/refresh', json={'refresh_token': token['refresh_token']}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    new_token = response.json()
+    assert new_token['refresh_token'] != token['refresh_token']
+
+    registros = await client.get(
+        '/registros-diarios/',
+        headers={'Authorization': f'Bearer {new_token["access_token"]}'},
+    )
+    assert registros.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_invalid(client):
+    response = await client.post(
+        '/auth/refresh', json={'refresh_token': 'token-inexistente'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json()['detail'] == 'Refresh token inválido ou expirado'
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_reuse_revokes_family(client, paciente):
+    token = await login(client, paciente)
+    rotated = (
+        await client.post(
+            '/auth/refresh', json={'refresh_token': token['refresh_token']}
+        )
+    ).json()
+
+    # Reutilizar o token antigo revoga também o token rotacionado
+    reuse = await client.post(
+        '/auth/refresh', json={'refresh_token': token['refresh_token']}
+    )
+    response = await client.post(
+        '/auth/refresh', json={'refresh_token': rotated['refresh_token']}
+    )
+
+    assert reuse.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_expired(client, session, paciente):
+    token = await login(client, paciente)
+    await session.execute(
+        update(RefreshToken).values(expira_em=datetime(2000, 1, 1))
+    )
+    await session.commit()
+
+    response = await client.post(
+        '/auth/refresh', json={'refresh_token': token['refresh_token']}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_revoke_refresh_token(client, paciente):
+    token = await login(client, paciente)
+
+    response = await client.post(
+        '/auth/revoke', json={'refresh_token': token['refresh_token']}
+    )
+    refresh = await client.post(
+        '/auth/refresh', json={'refresh_token': token['refresh_token']}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['message'] == 'Token revogado'
+    assert refresh.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_patch_password_revokes_refresh_tokens(client, paciente):
+    token = await login(client, paciente)
+
+    response = await client.patch(
+        f'/pacientes/{paciente.id}',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+        json={'password': 'NovaSenha@123'},
+    )
+    refresh = await client.post(
+        '/auth/refresh', json={'refresh_token': token['refresh_token']}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert refresh.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ('password', 'status'),
+    [('NovaSenha@123', HTTPStatus.UNAUTHORIZED), (None, HTTPStatus.OK)],
+)
+async def test_put_password_revokes_refresh_tokens(
+    client, paciente, password, status
+):
+    token = await login(client, paciente)
+
+    # Reenviar a mesma senha não encerra as sessões
+    response = await client.put(
+        f'/pacientes/{paciente.id}',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+        json={
+            'nome': paciente.nome,
+            'email': paciente.email,
+            'password': password or paciente.password_plain,
+            'data_nascimento': '1990-05-15T00:00:00',
+            'sexo': 'M',
+        },
+    )
+    refresh = await client.post(
+        '/auth/refresh', json={'refresh_token': token['refresh_token']}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert refresh.status_code == status
@@ -0,0 +1,164 @@
+"""
+Testes para a busca textual no histórico do paciente.
+"""
+
+from datetime import datetime
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.models import (
+    EstadoEmocional,
+    Paciente,
+    RegistroCrise,
+    RegistroDiario,
+)
+from fibrolog_api.pagination import encode_cursor
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _diario(client: AsyncClient, token: str, localizacao: str) -> int:
+    response = await client.post(
+        '/registros-diarios/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'intensidade_dor': 6,
+            'qualidade_sono': 4,
+            'nivel_fadiga': 5,
+            'estado_emocional': 'ANSIOSO',
+            'localizacao_dor': localizacao,
+        },
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    return response.json()['id']
+
+
+async def _buscar(client: AsyncClient, token: str, q: str, **params):
+    response = await client.get(
+        '/busca/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'q': q, **params},
+    )
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+async def test_busca_em_registros_e_medicacoes_sem_acentos(
+    client: AsyncClient,
+    session: AsyncSession,
+    token: str,
+    other_paciente: Paciente,
+):
+    diario_id = await _diario(client, token, 'Joelho esquerdo e ombros')
+    crise = (
+        await client.post(
+            '/registros-crise/',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'intensidade_dor': 9,
+                'duracao': '3h',
+                'data_hora': '2024-01-10T15:00:00',
+            },
+        )
+    ).json()
+    # A transcrição é gravada pela fila, fora do ORM
+    await session.execute(
+        update(RegistroCrise.__table__)
+        .where(RegistroCrise.__table__.c.id == crise['id'])
+        .values(texto_transcrito='Acordei com dor forte nos joelhos e febre')
+    )
+    await session.commit()
+
+    joelho = await _buscar(client, token, 'JOELHO')
+    medicacao = await _buscar(client, token, 'pregabalína')
+    outra = await _buscar(client, token, 'gabapentina')
+
+    assert sorted(r['tipo'] for r in joelho['resultados']) == [
+        'crise',
+        'diario',
+    ]
+    [diario] = [r for r in joelho['resultados'] if r['tipo'] == 'diario']
+    assert diario['registro_id'] == diario_id
+    assert diario['trecho'] == '**Joelho** esquerdo e ombros'
+    [crise_encontrada] = [
+        r for r in joelho['resultados'] if r['tipo'] == 'crise'
+    ]
+    assert crise_encontrada['data_hora'] == '2024-01-10T15:00:00'
+    assert medicacao['resultados'][0]['tipo'] == 'medicacoes'
+    assert medicacao['resultados'][0]['registro_id'] is None
+    # As medicações de outro paciente não aparecem
+    assert outra['resultados'] == []
+
+
+async def test_indice_acompanha_alteracoes(
+    client: AsyncClient, session: AsyncSession, token: str, paciente
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    registro_id = await _diario(client, token, 'lombar')
+
+    await client.patch(
+        f'/registros-diarios/{registro_id}',
+        headers=headers,
+        json={'localizacao_dor': 'cervical'},
+    )
+    assert (await _buscar(client, token, 'lombar'))['resultados'] == []
+    assert len((await _buscar(client, token, 'cervical'))['resultados']) == 1
+
+    await client.delete(f'/registros-diarios/{registro_id}', headers=headers)
+    assert (await _buscar(client, token, 'cervical'))['resultados'] == []
+
+    paciente.medicacoes = 'Duloxetina 30mg'
+    await session.commit()
+    assert (await _buscar(client, token, 'pregabalina'))['resultados'] == []
+    assert len((await _buscar(client, token, 'duloxetina'))['resultados']) == 1
+
+
+async def test_paginacao_por_relevancia(
+    client: AsyncClient, session: AsyncSession, token: str, paciente
+):
+    # Quanto mais vezes o termo aparece, mais relevante o registro
+    for dia in range(1, 6):
+        registro = RegistroDiario(
+            tipo_registro='diario',
+            paciente_id=paciente.id,
+            intensidade_dor=5,
+            qualidade_sono=5,
+            nivel_fadiga=5,
+            estado_emocional=EstadoEmocional.TRISTE,
+            localizacao_dor=' '.join(['joelho'] * dia),
+        )
+        registro.data_hora = datetime(2024, 1, dia, 9)
+        session.add(registro)
+    await session.commit()
+
+    ids, relevancias, cursor = [], [], None
+    while True:
+        params = {'limit': 2} | ({'cursor': cursor} if cursor else {})
+        pagina = await _buscar(client, token, 'joelho', **params)
+        ids += [r['registro_id'] for r in pagina['resultados']]
+        relevancias += [r['relevancia'] for r in pagina['resultados']]
+        cursor = pagina['proximo_cursor']
+        if cursor is None:
+            break
+
+    assert len(set(ids)) == 5  # noqa: PLR2004
+    assert relevancias == sorted(relevancias, reverse=True)
+
+
+async def test_busca_sem_palavras_e_cursor_invalido(
+    client: AsyncClient, token: str
+):
+    await _diario(client, token, 'joelho')
+
+    assert (await _buscar(client, token, '"*" - :'))['resultados'] == []
+    for cursor in ['x', encode_cursor('x', 1), encode_cursor({}, {})]:
+        response = await client.get(
+            '/busca/',
+            headers={'Authorization': f'Bearer {token}'},
+            params={'q': 'joelho', 'cursor': cursor},
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
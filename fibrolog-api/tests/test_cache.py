@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import event
+
+from fibrolog_api.cache import PrincipalCache
+from fibrolog_api.security import principal_cache
+
+
+def count_queries(session):
+    statements = []
+
+    @event.listens_for(session.bind.sync_engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_get_current_paciente_uses_cache(client, session, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    await client.get('/registros-diarios/', headers=headers)
+    assert len(principal_cache) == 1
+
+    statements = count_queries(session)
+    response = await client.get('/registros-diarios/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert not any('FROM pacientes' in s for s in statements)
+
+
+@pytest.mark.asyncio
+async def test_patch_paciente_invalidates_cache(client, paciente, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    await client.get('/registros-diarios/', headers=headers)
+
+    response = await client.patch(
+        f'/pacientes/{paciente.id}',
+        headers=headers,
+        json={'nome': 'Gustavo S. Pereira'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(principal_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_paciente_invalidates_cache(client, paciente, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    await client.get('/registros-diarios/', headers=headers)
+
+    await client.delete(f'/pacientes/{paciente.id}', headers=headers)
+    response = await client.get('/registros-diarios/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_principal_cache_lru_eviction(paciente):
+    cache = PrincipalCache(max_size=2, ttl=60)
+    exp = float('inf')
+
+    cache.set('a', paciente, exp)
+    cache.set('b', paciente, exp)
+    cache.get('a')
+    cache.set('c', paciente, exp)
+
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+
+
+def test_principal_cache_respects_token_expiration(paciente):
+    cache = PrincipalCache(max_size=2, ttl=60)
+
+    cache.set('expirado', paciente, 0)
+
+    assert cache.get('expirado') is None
+    assert len(cache) == 0
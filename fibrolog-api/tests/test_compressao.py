@@ -0,0 +1,232 @@
+"""
+Testes para o middleware de compressão.
+"""
+
+import asyncio
+import zlib
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from fibrolog_api.compressao import (
+    CompressaoMiddleware,
+    MetricasCompressao,
+    escolher_codificacao,
+    metricas_compressao,
+)
+
+pytestmark = pytest.mark.asyncio
+
+MINIMO = 500
+LINHA = b'{"intensidade_dor":5,"qualidade_sono":7,"nivel_fadiga":6}\n'
+
+
+@pytest.fixture(autouse=True)
+def limpar_metricas():
+    metricas_compressao.limpar()
+    yield
+    metricas_compressao.limpar()
+
+
+@pytest.mark.parametrize(
+    ('accept_encoding', 'brotli', 'esperada'),
+    [
+        ('gzip, deflate', False, 'gzip'),
+        ('gzip, br', True, 'br'),
+        ('gzip;q=1.0, br;q=0.5', True, 'gzip'),
+        ('br', False, None),
+        ('gzip;q=0', False, None),
+        ('*', False, 'gzip'),
+        ('*, gzip;q=0', False, None),
+        ('identity', True, None),
+        ('', True, None),
+    ],
+)
+def test_escolher_codificacao(accept_encoding, brotli, esperada):
+    assert escolher_codificacao(accept_encoding, brotli) == esperada
+
+
+async def _chamar(app, accept_encoding: str = 'gzip') -> list[dict]:
+    """Executa uma requisição GET e retorna as mensagens ASGI enviadas."""
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/',
+        'raw_path': b'/',
+        'root_path': '',
+        'scheme': 'http',
+        'query_string': b'',
+        'headers': [(b'accept-encoding', accept_encoding.encode())],
+        'server': ('teste', 80),
+    }
+    mensagens = []
+    recebidas = []
+
+    async def receive():
+        if recebidas:
+            # Cliente conectado até o fim da resposta
+            await asyncio.Event().wait()
+        recebidas.append(True)
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        mensagens.append(message)
+
+    await CompressaoMiddleware(app, minimo=MINIMO)(scope, receive, send)
+    return mensagens
+
+
+def _app(resposta) -> Starlette:
+    async def endpoint(request):
+        return resposta()
+
+    return Starlette(routes=[Route('/', endpoint)])
+
+
+def _headers(mensagem: dict) -> dict:
+    return {k.decode(): v.decode() for k, v in mensagem['headers']}
+
+
+async def test_comprime_resposta_grande():
+    corpo = LINHA * 50
+    mensagens = await _chamar(
+        _app(lambda: Response(corpo, media_type='application/json'))
+    )
+
+    headers = _headers(mensagens[0])
+    assert headers['content-encoding'] == 'gzip'
+    assert headers['vary'] == 'Accept-Encoding'
+    assert int(headers['content-length']) == len(mensagens[1]['body'])
+    assert zlib.decompress(mensagens[1]['body'], wbits=31) == corpo
+
+
+async def test_nao_comprime_resposta_pequena():
+    mensagens = await _chamar(
+        _app(lambda: Response(LINHA, media_type='application/json'))
+    )
+
+    assert 'content-encoding' not in _headers(mensagens[0])
+    assert mensagens[1]['body'] == LINHA
+
+
+async def test_nao_comprime_midia_comprimida():
+    audio = bytes(range(256)) * 10
+    mensagens = await _chamar(
+        _app(lambda: Response(audio, media_type='audio/mpeg'))
+    )
+
+    assert 'content-encoding' not in _headers(mensagens[0])
+    assert mensagens[1]['body'] == audio
+
+
+async def test_sem_accept_encoding_nao_comprime():
+    corpo = LINHA * 50
+    mensagens = await _chamar(
+        _app(lambda: Response(corpo, media_type='application/json')),
+        accept_encoding='identity',
+    )
+
+    assert 'content-encoding' not in _headers(mensagens[0])
+    assert mensagens[1]['body'] == corpo
+
+
+async def test_comprime_streaming_pedaco_a_pedaco():
+    pedacos = 5
+
+    async def gerar():
+        for _ in range(pedacos):
+            yield LINHA * 20
+
+    mensagens = await _chamar(
+        _app(
+            lambda: StreamingResponse(
+                gerar(), media_type='application/x-ndjson'
+            )
+        )
+    )
+
+    headers = _headers(mensagens[0])
+    assert headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in headers
+    corpos = [m['body'] for m in mensagens[1:]]
+    # Cada pedaço é descarregado e já pode ser descomprimido ao chegar.
+    descompressor = zlib.decompressobj(wbits=31)
+    assert descompressor.decompress(corpos[0]) == LINHA * 20
+    recebido = LINHA * 20 + b''.join(
+        descompressor.decompress(corpo) for corpo in corpos[1:]
+    )
+    assert recebido == LINHA * 20 * pedacos
+    assert mensagens[-1]['more_body'] is False
+
+
+async def test_streaming_pequeno_nao_comprime():
+    async def gerar():
+        yield LINHA
+        yield LINHA
+
+    mensagens = await _chamar(
+        _app(lambda: StreamingResponse(gerar(), media_type='text/csv'))
+    )
+
+    assert 'content-encoding' not in _headers(mensagens[0])
+    assert b''.join(m.get('body', b'') for m in mensagens[1:]) == LINHA * 2
+
+
+def test_metricas_compressao_por_rota():
+    metricas = MetricasCompressao()
+    metricas.registrar('GET /a', 1000, 100, 0.002, comprimida=True)
+    metricas.registrar('GET /a', 100, 100, 0.0, comprimida=False)
+
+    resumo = metricas.resumo()['GET /a']
+
+    assert resumo['respostas'] == 2  # noqa: PLR2004
+    assert resumo['comprimidas'] == 1
+    assert resumo['razao'] == pytest.approx(1100 / 200)
+    assert resumo['cpu_media_ms'] == pytest.approx(2.0)
+
+
+async def test_listagem_comprimida_com_etag_fraca(
+    client: AsyncClient, token: str, token_metricas: str
+):
+    headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'}
+    await client.post(
+        '/registros-diarios/batch',
+        headers=headers,
+        json={
+            'registros': [
+                {
+                    'intensidade_dor': 5,
+                    'qualidade_sono': 7,
+                    'nivel_fadiga': 6,
+                    'estado_emocional': 'ANSIOSO',
+                    'data_hora': f'2024-01-{dia:02d}T08:00:00',
+                }
+                for dia in range(1, 11)
+            ]
+        },
+    )
+
+    response = await client.get('/registros-diarios/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-encoding'] == 'gzip'
+    assert len(response.json()['registros']) == 10  # noqa: PLR2004
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+
+    not_modified = await client.get(
+        '/registros-diarios/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+    metricas = (
+        await client.get(
+            '/metricas/compressao',
+            headers={'Authorization': f'Bearer {token_metricas}'},
+        )
+    ).json()
+    assert metricas['GET /registros-diarios/']['comprimidas'] == 1
@@ -0,0 +1,146 @@
+"""
+Testes para as estatísticas de coorte.
+"""
+
+from datetime import date, datetime, time
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from fibrolog_api.coorte import (
+    ANOS_DIAGNOSTICO,
+    Atributos,
+    agregar_lote,
+    calcular_coorte,
+    dividir_faixas,
+    medicamentos,
+    resumir,
+)
+from fibrolog_api.models import (
+    Paciente,
+    Registro,
+    RegistroDiario,
+    table_registry,
+)
+
+
+def test_medicamentos_extrai_primeira_palavra_de_cada_item():
+    texto = 'Pregabalina 75mg (2x/dia), Duloxetina 60mg; 500mg Dipirona'
+
+    assert medicamentos(texto) == {'pregabalina', 'duloxetina', 'dipirona'}
+    assert medicamentos(None) == set()
+
+
+def test_dividir_faixas_equilibra_registros():
+    contagens = [(1, 10), (2, 10), (5, 10), (7, 10), (9, 10), (12, 10)]
+
+    assert dividir_faixas(contagens, 3) == [(1, 2), (5, 7), (9, 12)]
+    assert dividir_faixas(contagens, 1) == [(1, 12)]
+    assert dividir_faixas([], 4) == []
+
+
+def test_agregar_lote_agrupa_por_atributos():
+    atributos = Atributos(
+        ids=np.array([3, 8]),
+        sexo=np.array([0, 1]),
+        diagnostico=np.array([0, 365 * 4]),
+        tem_diagnostico=np.array([True, False]),
+        medicacoes=np.array([[True, False], [True, True]]),
+    )
+    dias = np.array([10, 365 * 2, 400, 365 * 6])
+
+    parcial = agregar_lote(
+        atributos, 2, np.array([3, 3, 8, 8]), dias, np.array([2, 4, 7, 7])
+    )
+
+    assert parcial.sexo[0].tolist() == [0, 0, 1, 0, 1, 0, 0, 0, 0, 0, 0]
+    assert parcial.sexo[1, 7] == 2  # noqa: PLR2004
+    faixas = dict(zip(ANOS_DIAGNOSTICO, parcial.anos_diagnostico.sum(1)))
+    assert faixas == {
+        'antes do diagnóstico': 0,
+        '<1': 1,
+        '1-3': 1,
+        '3-5': 0,
+        '5-10': 0,
+        '10+': 0,
+        'não informado': 2,
+    }
+    assert parcial.medicacao.sum(1).tolist() == [4, 2]
+
+
+def test_resumir_histograma():
+    histograma = np.zeros(11, dtype=np.int64)
+    histograma[[2, 4, 6, 8]] = 1
+
+    resumo = resumir(histograma)
+
+    assert resumo['registros'] == 4  # noqa: PLR2004
+    assert resumo['media'] == pytest.approx(5.0)
+    assert resumo['desvio_padrao'] == pytest.approx(5**0.5, abs=1e-3)
+    assert (resumo['p25'], resumo['mediana'], resumo['p75']) == (2, 4, 6)
+
+
+@pytest.mark.asyncio
+async def test_calcular_coorte_com_processos(tmp_path):
+    url = f'sqlite+aiosqlite:///{tmp_path / "coorte.db"}'
+    engine = create_async_engine(url)
+    pacientes = [
+        ('F', datetime(2020, 1, 1), 'Pregabalina 75mg'),
+        ('M', None, None),
+        ('f', datetime(2015, 6, 1), 'Duloxetina 60mg, Pregabalina 75mg'),
+    ]
+    dor_por_paciente = [3, 5, 8]
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        for numero, (sexo, diagnostico, medicacoes) in enumerate(pacientes):
+            await conn.execute(
+                insert(Paciente.__table__),
+                {
+                    'id': numero + 1,
+                    'nome': f'Paciente {numero}',
+                    'email': f'p{numero}@example.com',
+                    'password': 'x',
+                    'sexo': sexo,
+                    'data_diagnostico': diagnostico,
+                    'medicacoes': medicacoes,
+                },
+            )
+        registros = []
+        diarios = []
+        for numero, dor in enumerate(dor_por_paciente):
+            for dia in range(1, 11):
+                registro_id = len(registros) + 1
+                registros.append({
+                    'id': registro_id,
+                    'tipo_registro': 'diario',
+                    'paciente_id': numero + 1,
+                    'data_hora': datetime.combine(date(2024, 1, dia), time(9)),
+                    'dia_local': date(2024, 1, dia),
+                })
+                diarios.append({
+                    'id': registro_id,
+                    'intensidade_dor': dor,
+                    'qualidade_sono': 5,
+                    'nivel_fadiga': 5,
+                    'estado_emocional': 'FELIZ',
+                })
+        await conn.execute(insert(Registro.__table__), registros)
+        await conn.execute(insert(RegistroDiario.__table__), diarios)
+    await engine.dispose()
+
+    resultado = await calcular_coorte(url, workers=2, tamanho_lote=4)
+
+    assert resultado['registros'] == 30  # noqa: PLR2004
+    assert resultado['pacientes'] == 3  # noqa: PLR2004
+    assert resultado['por_sexo']['F']['registros'] == 20  # noqa: PLR2004
+    assert resultado['por_sexo']['F']['media'] == pytest.approx(5.5)
+    assert resultado['por_sexo']['M']['mediana'] == 5  # noqa: PLR2004
+    assert set(resultado['por_anos_diagnostico']) == {
+        '3-5',
+        '5-10',
+        'não informado',
+    }
+    assert resultado['por_medicacao']['pregabalina']['registros'] == 20  # noqa: PLR2004
+    assert resultado['por_medicacao']['nenhuma']['media'] == pytest.approx(5)
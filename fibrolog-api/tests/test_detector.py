@@ -0,0 +1,147 @@
+"""
+Testes para a detecção online de crises.
+"""
+
+from dataclasses import asdict
+from datetime import date, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.detector import (
+    DIAS_AQUECIMENTO,
+    EstadoDetector,
+    reconstruir_detector,
+)
+from fibrolog_api.models import Alerta, DetectorCrise, Paciente
+
+INICIO = date(2024, 3, 1)
+DIAS_BASE = 14
+
+
+def _valores(dor: int, fadiga: int = 4) -> dict:
+    return {
+        'intensidade_dor': dor,
+        'qualidade_sono': 6,
+        'nivel_fadiga': fadiga,
+        'estado_emocional': 'ANSIOSO',
+    }
+
+
+def _lote(dores: list[int], inicio: date = INICIO) -> dict:
+    return {
+        'registros': [
+            {
+                **_valores(dor),
+                'data_hora': f'{inicio + timedelta(days=i)}T08:00:00',
+            }
+            for i, dor in enumerate(dores)
+        ]
+    }
+
+
+def test_estado_sem_alerta_em_serie_estavel():
+    estado = EstadoDetector()
+    alertas = [estado.passo(_valores(3 + i % 2)) for i in range(60)]
+
+    assert not any(alertas)
+    assert estado.media_dor == pytest.approx(3.5, abs=0.5)
+
+
+def test_estado_alerta_com_aumento_persistente():
+    estado = EstadoDetector()
+    for i in range(DIAS_BASE):
+        assert estado.passo(_valores(3 + i % 2)) is None
+
+    assert estado.passo(_valores(8)) is None
+    assert estado.passo(_valores(8)) == 'dor'
+    # O CUSUM é zerado após o alerta
+    assert estado.cusum_dor == 0
+
+
+def test_estado_alerta_com_dor_e_fadiga():
+    estado = EstadoDetector()
+    for _ in range(DIAS_AQUECIMENTO + 1):
+        estado.passo(_valores(3, fadiga=3))
+
+    sintomas = [estado.passo(_valores(5, fadiga=6)) for _ in range(3)]
+
+    assert 'dor e fadiga' in sintomas
+
+
+@pytest.mark.asyncio
+async def test_registros_criam_alerta_de_crise(
+    client: AsyncClient, session: AsyncSession, paciente: Paciente, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    dores = [3, 4] * (DIAS_BASE // 2) + [8, 8, 8]
+
+    await client.post(
+        '/registros-diarios/batch', headers=headers, json=_lote(dores)
+    )
+
+    alertas = (
+        await session.scalars(
+            select(Alerta).where(Alerta.paciente_id == paciente.id)
+        )
+    ).all()
+    assert [alerta.tipo for alerta in alertas] == ['crise']
+    detector = await session.get(DetectorCrise, paciente.id)
+    assert detector.ultimo_dia == INICIO + timedelta(days=len(dores) - 1)
+    assert detector.dias == len(dores)
+
+
+@pytest.mark.asyncio
+async def test_correcao_do_ultimo_dia_reaplica_o_passo(
+    client: AsyncClient, session: AsyncSession, paciente: Paciente, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    ultimo = INICIO + timedelta(days=DIAS_BASE)
+    await client.post(
+        '/registros-diarios/batch',
+        headers=headers,
+        json=_lote([3, 4] * (DIAS_BASE // 2) + [9]),
+    )
+    # Corrige o último dia duas vezes: conta como um único dia
+    for dor in (5, 4):
+        await client.post(
+            '/registros-diarios/batch',
+            headers=headers,
+            json=_lote([dor], inicio=ultimo),
+        )
+
+    detector = await session.get(DetectorCrise, paciente.id)
+    incremental = asdict(EstadoDetector.de(detector))
+    assert detector.dias == DIAS_BASE + 1
+    assert not detector.desatualizado
+
+    reconstruido = await reconstruir_detector(session, paciente.id)
+    assert asdict(EstadoDetector.de(reconstruido)) == pytest.approx(
+        incremental
+    )
+
+
+@pytest.mark.asyncio
+async def test_alteracao_de_dia_antigo_marca_desatualizado(
+    client: AsyncClient, session: AsyncSession, paciente: Paciente, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = await client.post(
+        '/registros-diarios/batch', headers=headers, json=_lote([3, 4, 5])
+    )
+    primeiro_id = response.json()['resultados'][0]['id']
+
+    await client.patch(
+        f'/registros-diarios/{primeiro_id}',
+        headers=headers,
+        json={'intensidade_dor': 9},
+    )
+
+    detector = await session.get(DetectorCrise, paciente.id)
+    assert detector.desatualizado
+
+    await reconstruir_detector(session, paciente.id)
+    assert not detector.desatualizado
+    assert detector.dias == 3  # noqa: PLR2004
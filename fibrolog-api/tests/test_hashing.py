@@ -0,0 +1,75 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+from fibrolog_api.hashing import HashingSaturatedError, PasswordHasher
+from fibrolog_api.routers import metricas
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_hash_and_verify():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    try:
+        chamadas = 3
+        hashed = await hasher.hash('Senha@123')
+
+        assert await hasher.verify('Senha@123', hashed)
+        assert not await hasher.verify('Outra@123', hashed)
+        assert hasher.metricas()['concluidas'] == chamadas
+        assert hasher.pendentes == 0
+    finally:
+        hasher.shutdown()
+
+
+async def test_hash_rejects_when_saturated():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    try:
+        results = await asyncio.gather(
+            *(hasher.hash('Senha@123') for _ in range(4)),
+            return_exceptions=True,
+        )
+
+        rejeitadas = [
+            r for r in results if isinstance(r, HashingSaturatedError)
+        ]
+        capacidade = hasher.max_workers + hasher.max_queue
+        assert len(rejeitadas) == len(results) - capacidade
+        assert hasher.metricas()['rejeitadas'] == len(rejeitadas)
+    finally:
+        hasher.shutdown()
+
+
+async def test_get_metricas_hashing(client, token_metricas):
+    response = await client.get(
+        '/metricas/hashing',
+        headers={'Authorization': f'Bearer {token_metricas}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert 'espera_media_ms' in data
+    assert 'hash_medio_ms' in data
+
+
+async def test_metricas_exigem_token(client, token_metricas):
+    sem_token = await client.get('/metricas/hashing')
+    token_errado = await client.get(
+        '/metricas/hashing', headers={'Authorization': 'Bearer outro'}
+    )
+
+    assert sem_token.status_code == HTTPStatus.UNAUTHORIZED
+    assert sem_token.headers['WWW-Authenticate'] == 'Bearer'
+    assert token_errado.status_code == HTTPStatus.UNAUTHORIZED
+
+
+async def test_metricas_desativadas_sem_token_configurado(
+    client, token, monkeypatch
+):
+    monkeypatch.setattr(metricas.settings, 'METRICS_TOKEN', None)
+    response = await client.get(
+        '/metricas/hashing', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,303 @@
+"""
+Testes para o outbox de notificações aos contatos de apoio.
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.models import ContatoApoio, Notificacao, Paciente
+from fibrolog_api.notificacoes import (
+    EMAIL,
+    ENVIADA,
+    ENVIANDO,
+    FALHOU,
+    PENDENTE,
+    TELEFONE,
+    DespachanteNotificacoes,
+    RemetenteArquivo,
+    enfileirar_notificacoes,
+)
+from fibrolog_api.relogio import utcnow
+
+pytestmark = pytest.mark.asyncio
+
+MAX_TENTATIVAS = 2
+
+
+class RemetenteComFalha:
+    """Remetente que sempre falha, para testar as novas tentativas."""
+
+    @staticmethod
+    async def enviar(notificacao: Notificacao) -> None:
+        raise ConnectionError('provedor indisponível')
+
+
+class RemetenteLento:
+    """Registra o máximo de envios simultâneos por canal."""
+
+    def __init__(self):
+        self.simultaneos: dict[str, int] = {}
+        self.maximo: dict[str, int] = {}
+
+    async def enviar(self, notificacao: Notificacao) -> None:
+        canal = notificacao.canal
+        self.simultaneos[canal] = self.simultaneos.get(canal, 0) + 1
+        self.maximo[canal] = max(
+            self.maximo.get(canal, 0), self.simultaneos[canal]
+        )
+        await asyncio.sleep(0.01)
+        self.simultaneos[canal] -= 1
+
+
+def _despachante(
+    session: AsyncSession, remetente, lote: int = 10, email: int = 5
+) -> DespachanteNotificacoes:
+    def sessoes():
+        return AsyncSession(session.bind, expire_on_commit=False)
+
+    return DespachanteNotificacoes(
+        remetente=remetente,
+        concorrencia={EMAIL: email, TELEFONE: 1},
+        lote=lote,
+        max_tentativas=MAX_TENTATIVAS,
+        tempo_limite=1,
+        visibilidade=60,
+        backoff=30,
+        sessoes=sessoes,
+    )
+
+
+@pytest_asyncio.fixture
+async def contatos(session: AsyncSession, paciente: Paciente):
+    session.add_all([
+        ContatoApoio(
+            nome='Ana',
+            email='ana@example.com',
+            telefone='+55 (11) 99999-0000',
+            parentesco='irmã',
+            paciente_id=paciente.id,
+        ),
+        # Mesmo e-mail, escrito de outra forma, e sem telefone
+        ContatoApoio(
+            nome='Ana (trabalho)',
+            email=' Ana@Example.com ',
+            telefone='',
+            parentesco='irmã',
+            paciente_id=paciente.id,
+        ),
+        ContatoApoio(
+            nome='Bruno',
+            email='bruno@example.com',
+            telefone='+5511988887777',
+            parentesco='cônjuge',
+            paciente_id=paciente.id,
+        ),
+    ])
+    await session.commit()
+
+
+async def _notificacoes(session: AsyncSession) -> list[Notificacao]:
+    session.expire_all()
+    return (
+        await session.scalars(select(Notificacao).order_by(Notificacao.id))
+    ).all()
+
+
+async def _criar_crise(client: AsyncClient, token: str) -> dict:
+    response = await client.post(
+        '/registros-crise/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'intensidade_dor': 8,
+            'duracao': '1h',
+            'data_hora': '2024-01-10T15:00:00',
+        },
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    return response.json()
+
+
+@pytest.mark.usefixtures('contatos')
+async def test_crise_grava_notificacoes_na_mesma_transacao(
+    client: AsyncClient, session: AsyncSession, token: str
+):
+    crise = await _criar_crise(client, token)
+
+    notificacoes = await _notificacoes(session)
+
+    # Um destino por canal, sem repetir o e-mail nem o telefone vazio
+    assert sorted((n.canal, n.destino) for n in notificacoes) == [
+        (EMAIL, 'ana@example.com'),
+        (EMAIL, 'bruno@example.com'),
+        (TELEFONE, '+5511988887777'),
+        (TELEFONE, '+5511999990000'),
+    ]
+    assert {n.estado for n in notificacoes} == {PENDENTE}
+    assert 'intensidade 8/10 em 10/01/2024 às 15:00' in (
+        notificacoes[0].mensagem
+    )
+
+    # Enfileirar a mesma origem de novo não duplica nada
+    await enfileirar_notificacoes(
+        session, crise['paciente_id'], f'crise:{crise["id"]}', 'a', 'b'
+    )
+    await session.commit()
+    assert len(await _notificacoes(session)) == len(notificacoes)
+
+
+async def test_crise_sem_contatos_nao_gera_notificacoes(
+    client: AsyncClient, session: AsyncSession, token: str
+):
+    await _criar_crise(client, token)
+
+    assert await _notificacoes(session) == []
+
+
+@pytest.mark.usefixtures('contatos')
+async def test_despachante_envia_em_lotes_por_canal(
+    client: AsyncClient, session: AsyncSession, token: str, tmp_path
+):
+    await _criar_crise(client, token)
+    despachante = _despachante(session, RemetenteArquivo(tmp_path), lote=1)
+
+    assert await despachante.processar_lote(EMAIL) == 1
+    assert await despachante.processar_lote(EMAIL) == 1
+    assert await despachante.processar_lote(EMAIL) == 0
+    assert await despachante.processar_lote(TELEFONE) == 1
+
+    notificacoes = await _notificacoes(session)
+    estados = sorted((n.canal, n.estado) for n in notificacoes)
+    assert estados == [
+        (EMAIL, ENVIADA),
+        (EMAIL, ENVIADA),
+        (TELEFONE, ENVIADA),
+        (TELEFONE, PENDENTE),
+    ]
+    emails = (tmp_path / 'email.jsonl').read_text().splitlines()
+    assert [json.loads(linha)['destino'] for linha in emails] == [
+        'ana@example.com',
+        'bruno@example.com',
+    ]
+    assert despachante.resumo()['enviadas_por_canal'] == {
+        EMAIL: 2,
+        TELEFONE: 1,
+    }
+
+
+@pytest.mark.usefixtures('contatos')
+async def test_falha_agenda_nova_tentativa_e_depois_desiste(
+    client: AsyncClient, session: AsyncSession, token: str
+):
+    await _criar_crise(client, token)
+    despachante = _despachante(session, RemetenteComFalha())
+
+    assert await despachante.processar_lote(EMAIL) == 2  # noqa: PLR2004
+    notificacoes = [
+        n for n in await _notificacoes(session) if n.canal == EMAIL
+    ]
+    assert {n.estado for n in notificacoes} == {PENDENTE}
+    assert all(n.disponivel_em > utcnow() for n in notificacoes)
+    assert notificacoes[0].erro == 'ConnectionError: provedor indisponível'
+
+    # Ainda em espera: nada é reservado
+    assert await despachante.processar_lote(EMAIL) == 0
+
+    await session.execute(
+        update(Notificacao).values(disponivel_em=utcnow() - timedelta(1))
+    )
+    await session.commit()
+    await despachante.processar_lote(EMAIL)
+
+    notificacoes = [
+        n for n in await _notificacoes(session) if n.canal == EMAIL
+    ]
+    assert {n.estado for n in notificacoes} == {FALHOU}
+    assert {n.tentativas for n in notificacoes} == {MAX_TENTATIVAS}
+    resumo = despachante.resumo()
+    assert resumo['retentativas'] == resumo['falhas'] == 2  # noqa: PLR2004
+
+
+async def test_concorrencia_limitada_por_canal(
+    session: AsyncSession, paciente: Paciente
+):
+    session.add_all([
+        ContatoApoio(
+            nome=f'Contato {i}',
+            email=f'contato{i}@example.com',
+            telefone=f'+55119000000{i:02d}',
+            parentesco='amigo',
+            paciente_id=paciente.id,
+        )
+        for i in range(12)
+    ])
+    await enfileirar_notificacoes(session, paciente.id, 'teste:1', 'a', 'b')
+    await session.commit()
+    remetente = RemetenteLento()
+    despachante = _despachante(session, remetente, lote=12, email=4)
+
+    await asyncio.gather(
+        despachante.processar_lote(EMAIL),
+        despachante.processar_lote(TELEFONE),
+    )
+
+    assert remetente.maximo == {EMAIL: 4, TELEFONE: 1}
+    assert {n.estado for n in await _notificacoes(session)} == {ENVIADA}
+
+
+@pytest.mark.usefixtures('contatos')
+async def test_reserva_expirada_e_reenviada_sem_duplicar(
+    client: AsyncClient, session: AsyncSession, token: str, tmp_path
+):
+    await _criar_crise(client, token)
+    remetente = RemetenteArquivo(tmp_path)
+    [primeira, *_] = [
+        n for n in await _notificacoes(session) if n.canal == EMAIL
+    ]
+    # O remetente enviou, mas o processo caiu antes de gravar o resultado
+    await remetente.enviar(primeira)
+    await session.execute(
+        update(Notificacao).values(
+            estado=ENVIANDO,
+            dono='caiu',
+            tentativas=1,
+            disponivel_em=utcnow() - timedelta(seconds=1),
+        )
+    )
+    await session.commit()
+
+    despachante = _despachante(session, RemetenteArquivo(tmp_path))
+    assert await despachante.processar_lote(EMAIL) == 2  # noqa: PLR2004
+
+    linhas = (tmp_path / 'email.jsonl').read_text().splitlines()
+    assert len(linhas) == 2  # noqa: PLR2004
+    emails = [n for n in await _notificacoes(session) if n.canal == EMAIL]
+    assert {n.estado for n in emails} == {ENVIADA}
+
+
+@pytest.mark.usefixtures('contatos')
+async def test_workers_enviam_apos_aviso(
+    client: AsyncClient, session: AsyncSession, token: str, tmp_path
+):
+    despachante = _despachante(session, RemetenteArquivo(tmp_path))
+    await despachante.iniciar()
+    try:
+        # Deixa os workers encontrarem a fila vazia e aguardarem o aviso
+        await asyncio.sleep(0.05)
+        await _criar_crise(client, token)
+        despachante.notificar()
+        for _ in range(100):
+            if despachante.resumo()['enviadas'] == 4:  # noqa: PLR2004
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await despachante.parar()
+
+    assert {n.estado for n in await _notificacoes(session)} == {ENVIADA}
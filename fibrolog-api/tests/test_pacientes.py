@@ -1,7 +1,12 @@
+from datetime import datetime
 from http import HTTPStatus
 
 import pytest
 
+from fibrolog_api import json_rapido
+from fibrolog_api.models import Paciente
+from fibrolog_api.pagination import encode_cursor
+
 
 @pytest.mark.asyncio
 async def test_create_paciente(client):
@@ -124,7 +129,13 @@ async def test_get_pacientes(client):
 async def test_get_pacientes_with_pagination(client):
     # Criar vários pacientes
     sexos = ['M', 'F', 'M', 'F', 'M']
-    dates = ['1985-01-15', '1986-02-15', '1987-03-15', '1988-04-15', '1989-05-15']
+    dates = [
+        '1985-01-15',
+        '1986-02-15',
+        '1987-03-15',
+        '1988-04-15',
+        '1989-05-15',
+    ]
     for i in range(5):
         await client.post(
             '/pacientes/',
@@ -137,14 +148,51 @@ async def test_get_pacientes_with_pagination(client):
             },
         )
 
-    # Testar paginação
-    response = await client.get('/pacientes/?offset=1&limit=2')
+    # Testar paginação por cursor
+    first_page = await client.get('/pacientes/?limit=1')
+    cursor = first_page.json()['proximo_cursor']
+    response = await client.get(f'/pacientes/?cursor={cursor}&limit=2')
 
     assert response.status_code == HTTPStatus.OK
     data = response.json()
     assert 'pacientes' in data
     assert data['pacientes'][0]['nome'] == 'Paciente 2'
     assert data['pacientes'][1]['nome'] == 'Paciente 3'
+    assert data['proximo_cursor'] is not None
+
+
+@pytest.mark.asyncio
+async def test_get_pacientes_json_rapido(
+    client, paciente, other_paciente, monkeypatch
+):
+    padrao = await client.get('/pacientes/?limit=1')
+
+    monkeypatch.setattr(json_rapido.settings, 'FAST_JSON_RESPONSES', True)
+    rapido = await client.get('/pacientes/?limit=1')
+
+    assert rapido.status_code == HTTPStatus.OK
+    assert rapido.headers['content-type'] == 'application/json'
+    assert rapido.content == padrao.content
+    assert 'password' not in rapido.json()['pacientes'][0]
+
+
+@pytest.mark.asyncio
+async def test_get_pacientes_last_page_has_no_cursor(client, paciente):
+    response = await client.get('/pacientes/?limit=1')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['proximo_cursor'] is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'cursor', ['invalido', encode_cursor({}), encode_cursor('1'), '5w']
+)
+async def test_get_pacientes_invalid_cursor(client, cursor):
+    response = await client.get('/pacientes/', params={'cursor': cursor})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'] == 'Cursor inválido'
 
 
 @pytest.mark.asyncio
@@ -300,3 +348,70 @@ async def test_delete_paciente_wrong_user(client, other_paciente, token):
 
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json()['detail'] == 'Permissões insuficientes'
+
+
+@pytest.mark.asyncio
+async def test_get_paciente_etag(client, paciente, token):
+    response = await client.get(f'/pacientes/{paciente.id}')
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    not_modified = await client.get(
+        f'/pacientes/{paciente.id}', headers={'If-None-Match': etag}
+    )
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert not_modified.content == b''
+    assert not_modified.headers['ETag'] == etag
+
+    await client.patch(
+        f'/pacientes/{paciente.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'medicacoes': 'Duloxetina 30mg'},
+    )
+
+    modified = await client.get(
+        f'/pacientes/{paciente.id}', headers={'If-None-Match': etag}
+    )
+    assert modified.status_code == HTTPStatus.OK
+    assert modified.headers['ETag'] != etag
+    assert modified.json()['medicacoes'] == 'Duloxetina 30mg'
+
+
+@pytest.mark.asyncio
+async def test_get_paciente_etag_nao_vale_para_id_reutilizado(
+    client, session, paciente, token
+):
+    paciente_id = paciente.id
+    etag = (await client.get(f'/pacientes/{paciente_id}')).headers['ETag']
+    await client.delete(
+        f'/pacientes/{paciente_id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    # SQLite sem AUTOINCREMENT reaproveita o id da conta excluída
+    nova = Paciente(
+        nome='Outra Pessoa',
+        email='outra@example.com',
+        password='hash',
+    )
+    nova.id = paciente_id
+    nova.created_at = datetime(2030, 1, 1)
+    session.add(nova)
+    await session.commit()
+
+    response = await client.get(
+        f'/pacientes/{paciente_id}', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['nome'] == 'Outra Pessoa'
+
+
+@pytest.mark.asyncio
+async def test_patch_paciente_fuso_horario_invalido(client, paciente, token):
+    response = await client.patch(
+        f'/pacientes/{paciente.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'fuso_horario': 'America/Atlantida'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
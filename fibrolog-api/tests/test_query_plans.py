@@ -0,0 +1,124 @@
+"""
+Testes de regressão dos planos de consulta das rotas de registros.
+
+As rotas são exercitadas contra um banco populado enquanto os comandos SQL
+emitidos são capturados; cada consulta que toca as tabelas de registros é
+então submetida a `EXPLAIN QUERY PLAN`, e o teste falha se alguma delas fizer
+uma varredura completa (SCAN) em vez de usar um índice.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+
+from fibrolog_api.models import EstadoEmocional, RegistroDiario
+
+pytestmark = pytest.mark.asyncio
+
+DIAS_POR_PACIENTE = 200
+
+FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)')
+
+
+@pytest_asyncio.fixture
+async def seeded(session, paciente, other_paciente):
+    inicio = datetime(2024, 1, 1, 9)
+    for dono in (paciente, other_paciente):
+        for dia in range(DIAS_POR_PACIENTE):
+            registro = RegistroDiario(
+                tipo_registro='diario',
+                paciente_id=dono.id,
+                intensidade_dor=dia % 11,
+                qualidade_sono=(dia * 3) % 11,
+                nivel_fadiga=(dia * 7) % 11,
+                estado_emocional=EstadoEmocional.ANSIOSO,
+            )
+            registro.data_hora = inicio + timedelta(days=dia)
+            session.add(registro)
+    await session.commit()
+
+
+@pytest.fixture
+def captured(session):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        ignored = statement.startswith(('INSERT', 'EXPLAIN'))
+        if 'registros' in statement and not ignored:
+            statements.append((statement, parameters))
+
+    engine = session.bind.sync_engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+async def explain(session, statement, parameters):
+    conn = await session.connection()
+    result = await conn.exec_driver_sql(
+        f'EXPLAIN QUERY PLAN {statement}', parameters
+    )
+    return [row[-1] for row in result]
+
+
+async def assert_no_full_scan(session, statements):
+    assert statements
+    for statement, parameters in statements:
+        plan = await explain(session, statement, parameters)
+        scans = [detail for detail in plan if FULL_SCAN.match(detail)]
+        assert not scans, f'{statement}\n{plan}'
+
+
+@pytest.mark.usefixtures('seeded')
+async def test_registros_diarios_queries_use_indexes(
+    client, session, token, captured
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    data = {
+        'intensidade_dor': 5,
+        'qualidade_sono': 7,
+        'nivel_fadiga': 6,
+        'estado_emocional': 'ANSIOSO',
+    }
+
+    registro_id = (
+        await client.post('/registros-diarios/', headers=headers, json=data)
+    ).json()['id']
+    await client.post('/registros-diarios/', headers=headers, json=data)
+    pagina = await client.get(
+        '/registros-diarios/', headers=headers, params={'limit': 10}
+    )
+    await client.get(
+        '/registros-diarios/',
+        headers=headers,
+        params={
+            'cursor': pagina.json()['proximo_cursor'],
+            'from': '2024-02-01',
+            'to': '2024-03-01',
+        },
+    )
+    await client.get(f'/registros-diarios/{registro_id}', headers=headers)
+    await client.put(
+        f'/registros-diarios/{registro_id}', headers=headers, json=data
+    )
+    await client.patch(
+        f'/registros-diarios/{registro_id}',
+        headers=headers,
+        json={'nivel_fadiga': 2},
+    )
+    await client.delete(f'/registros-diarios/{registro_id}', headers=headers)
+    await client.get('/registros-diarios/export', headers=headers)
+    await client.get('/registros-diarios/insights', headers=headers)
+    await client.get(
+        '/registros-diarios/stats',
+        headers=headers,
+        params={'bucket': 'month', 'from': '2024-02-01', 'to': '2024-05-31'},
+    )
+    await client.get(
+        '/sync', headers=headers, params={'since': DIAS_POR_PACIENTE}
+    )
+
+    await assert_no_full_scan(session, captured)
@@ -0,0 +1,99 @@
+"""
+Testes para as regras de recorrência dos alertas.
+"""
+
+import zoneinfo
+from datetime import datetime, timedelta
+from itertools import islice
+
+import pytest
+
+from fibrolog_api.recorrencia import Recorrencia
+
+SAO_PAULO = zoneinfo.ZoneInfo('America/Sao_Paulo')
+NOVA_YORK = zoneinfo.ZoneInfo('America/New_York')
+
+
+def test_parse_normaliza_a_regra():
+    regra = Recorrencia.parse('RRULE:freq=weekly;byday=FR,MO;interval=1')
+
+    assert str(regra) == 'FREQ=WEEKLY;BYDAY=MO,FR'
+
+
+@pytest.mark.parametrize(
+    'regra',
+    [
+        'BYHOUR=9',
+        'FREQ=YEARLY',
+        'FREQ=DAILY;BYDAY=XX',
+        'FREQ=DAILY;INTERVAL=0',
+        'FREQ=DAILY;COUNT=2;UNTIL=20260101',
+        'FREQ=DAILY;FREQ=HOURLY',
+    ],
+)
+def test_parse_regra_invalida(regra):
+    with pytest.raises(ValueError):  # noqa: PT011
+        Recorrencia.parse(regra)
+
+
+def test_dias_uteis_as_nove_no_horario_local():
+    regra = Recorrencia.parse('FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;BYHOUR=9')
+    # Sábado, 17/10/2026, 9:00 em São Paulo (UTC-3)
+    inicio = datetime(2026, 10, 17, 12)
+
+    ocorrencias = list(islice(regra.ocorrencias(inicio, SAO_PAULO), 6))
+
+    assert [o.day for o in ocorrencias] == [19, 20, 21, 22, 23, 26]
+    assert {o.hour for o in ocorrencias} == {12}
+
+
+def test_horario_local_mantido_apos_fim_do_horario_de_verao():
+    regra = Recorrencia.parse('FREQ=DAILY;BYHOUR=9;BYMINUTE=0')
+    inicio = datetime(2026, 10, 30, 13)  # 9:00 em Nova York (UTC-4)
+
+    ocorrencias = list(islice(regra.ocorrencias(inicio, NOVA_YORK), 4))
+
+    # O horário de verão termina em 01/11; 9:00 passa a ser 14:00 UTC
+    assert [o.hour for o in ocorrencias] == [13, 13, 14, 14]
+
+
+def test_count_e_until_encerram_a_serie():
+    inicio = datetime(2026, 10, 18, 12)
+
+    contagem = Recorrencia.parse('FREQ=DAILY;BYHOUR=8,20;COUNT=3')
+    ate = Recorrencia.parse('FREQ=DAILY;UNTIL=20261020T120000Z')
+
+    assert len(list(contagem.ocorrencias(inicio, SAO_PAULO))) == 3  # noqa: PLR2004
+    assert list(ate.ocorrencias(inicio, SAO_PAULO)) == [
+        datetime(2026, 10, 18, 12),
+        datetime(2026, 10, 19, 12),
+    ]
+
+
+def test_serie_sem_ocorrencias_termina():
+    # A cada 7 dias a partir de uma segunda-feira, nunca cai em um sábado
+    regra = Recorrencia.parse('FREQ=DAILY;INTERVAL=7;BYDAY=SA')
+
+    assert list(regra.ocorrencias(datetime(2026, 10, 19, 12), SAO_PAULO)) == []
+
+
+@pytest.mark.parametrize(
+    'regra',
+    [
+        'FREQ=HOURLY;INTERVAL=8',
+        'FREQ=HOURLY;INTERVAL=5;BYDAY=MO,WE',
+        'FREQ=DAILY;INTERVAL=3;BYHOUR=8,20',
+        'FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,SA;BYHOUR=7;BYMINUTE=15,45',
+    ],
+)
+def test_proxima_salta_direto_ao_periodo(regra):
+    recorrencia = Recorrencia.parse(regra)
+    inicio = datetime(2024, 3, 1, 10, 30)
+    apos = datetime(2026, 10, 18, 15, 7)
+
+    esperada = next(
+        o for o in recorrencia.ocorrencias(inicio, NOVA_YORK) if o > apos
+    )
+
+    assert recorrencia.proxima(inicio, NOVA_YORK, apos) == esperada
+    assert esperada - apos < timedelta(weeks=2)
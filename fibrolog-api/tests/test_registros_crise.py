@@ -0,0 +1,415 @@
+"""
+Testes para o CRUD de registros de crise e o upload de áudio.
+"""
+
+import hashlib
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api import audio
+from fibrolog_api.models import RegistroCrise, ResumoRegistros
+from fibrolog_api.pagination import encode_cursor
+from fibrolog_api.security import create_access_token
+
+pytestmark = pytest.mark.asyncio
+
+BOUNDARY = 'limite-de-teste'
+AUDIO = b'ID3' + bytes(range(256)) * 8
+
+
+@pytest.fixture(autouse=True)
+def diretorio_audios(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio.settings, 'AUDIO_DIR', str(tmp_path))
+    return tmp_path
+
+
+def _multipart(
+    conteudo: bytes, tipo: str = 'audio/mpeg', campo: str = 'audio'
+) -> bytes:
+    return (
+        (
+            f'--{BOUNDARY}\r\n'
+            'Content-Disposition: form-data; name="descricao"\r\n\r\n'
+            'Crise forte\r\n'
+            f'--{BOUNDARY}\r\n'
+            f'Content-Disposition: form-data; name="{campo}"; '
+            'filename="crise.mp3"\r\n'
+            f'Content-Type: {tipo}\r\n\r\n'
+        ).encode()
+        + conteudo
+        + f'\r\n--{BOUNDARY}--\r\n'.encode()
+    )
+
+
+def _headers_upload(token: str) -> dict:
+    return {
+        'Authorization': f'Bearer {token}',
+        'Content-Type': f'multipart/form-data; boundary={BOUNDARY}',
+    }
+
+
+async def _criar_crise(
+    client: AsyncClient, token: str, data_hora: str = '2024-01-10T15:00:00'
+) -> dict:
+    response = await client.post(
+        '/registros-crise/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'intensidade_dor': 9,
+            'duracao': '2h',
+            'data_hora': data_hora,
+        },
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    return response.json()
+
+
+async def _crises_por_mes(session: AsyncSession) -> dict:
+    linhas = await session.execute(
+        select(ResumoRegistros.inicio, ResumoRegistros.crises).where(
+            ResumoRegistros.periodo == 'month'
+        )
+    )
+    return {inicio.isoformat(): crises for inicio, crises in linhas}
+
+
+async def test_crud_registro_crise(
+    client: AsyncClient, session: AsyncSession, paciente, token: str
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    crise = await _criar_crise(client, token)
+
+    assert crise == {
+        'id': crise['id'],
+        'paciente_id': paciente.id,
+        'data_hora': '2024-01-10T15:00:00',
+        'intensidade_dor': 9,
+        'duracao': '2h',
+        'texto_transcrito': None,
+        'tem_audio': False,
+    }
+    assert await _crises_por_mes(session) == {'2024-01-01': 1}
+
+    response = await client.patch(
+        f'/registros-crise/{crise["id"]}',
+        headers=headers,
+        json={'data_hora': '2024-02-01T08:00:00-03:00'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['data_hora'] == '2024-02-01T08:00:00'
+    assert response.json()['duracao'] == '2h'
+    assert await _crises_por_mes(session) == {
+        '2024-01-01': 0,
+        '2024-02-01': 1,
+    }
+
+    response = await client.put(
+        f'/registros-crise/{crise["id"]}',
+        headers=headers,
+        json={'intensidade_dor': 6, 'duracao': '30min'},
+    )
+    assert response.json()['intensidade_dor'] == 6  # noqa: PLR2004
+    assert response.json()['data_hora'] == '2024-02-01T08:00:00'
+
+    response = await client.delete(
+        f'/registros-crise/{crise["id"]}', headers=headers
+    )
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert await _crises_por_mes(session) == {
+        '2024-01-01': 0,
+        '2024-02-01': 0,
+    }
+    response = await client.get(
+        f'/registros-crise/{crise["id"]}', headers=headers
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+async def test_criar_crise_no_futuro(client: AsyncClient, token: str):
+    response = await client.post(
+        '/registros-crise/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'intensidade_dor': 9,
+            'duracao': '2h',
+            'data_hora': '2999-01-01T00:00:00',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_listar_crises_paginado(client: AsyncClient, token: str):
+    headers = {'Authorization': f'Bearer {token}'}
+    ids = [
+        (await _criar_crise(client, token, f'2024-01-{dia:02d}T10:00:00'))[
+            'id'
+        ]
+        for dia in range(1, 6)
+    ]
+
+    primeira = (
+        await client.get(
+            '/registros-crise/', headers=headers, params={'limit': 3}
+        )
+    ).json()
+    segunda = (
+        await client.get(
+            '/registros-crise/',
+            headers=headers,
+            params={'limit': 3, 'cursor': primeira['proximo_cursor']},
+        )
+    ).json()
+
+    recebidos = [r['id'] for r in primeira['registros'] + segunda['registros']]
+    assert recebidos == ids[::-1]
+    assert segunda['proximo_cursor'] is None
+
+
+@pytest.mark.parametrize('valores', [(1, 2), ('x', 1)])
+async def test_listar_crises_cursor_invalido(
+    client: AsyncClient, token: str, valores: tuple
+):
+    response = await client.get(
+        '/registros-crise/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'cursor': encode_cursor(*valores)},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_crise_de_outro_paciente(
+    client: AsyncClient, other_paciente, token: str
+):
+    crise = await _criar_crise(
+        client, create_access_token(data={'sub': other_paciente.email})
+    )
+
+    response = await client.put(
+        f'/registros-crise/{crise["id"]}/audio',
+        headers=_headers_upload(token),
+        content=_multipart(AUDIO),
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+async def test_upload_audio_deduplicado(
+    client: AsyncClient, token: str, diretorio_audios
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    primeira = await _criar_crise(client, token)
+    segunda = await _criar_crise(client, token)
+
+    for crise in (primeira, segunda):
+        response = await client.put(
+            f'/registros-crise/{crise["id"]}/audio',
+            headers=_headers_upload(token),
+            content=_multipart(AUDIO),
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['tem_audio'] is True
+
+    arquivos = [p for p in diretorio_audios.rglob('*') if p.is_file()]
+    assert len(arquivos) == 1
+    assert arquivos[0].suffix == '.mp3'
+    assert arquivos[0].read_bytes() == AUDIO
+
+    response = await client.get(
+        f'/registros-crise/{primeira["id"]}/audio', headers=headers
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'audio/mpeg'
+    assert response.content == AUDIO
+
+    # O arquivo compartilhado só é apagado com o último registro.
+    await client.delete(f'/registros-crise/{primeira["id"]}', headers=headers)
+    assert arquivos[0].exists()
+    await client.delete(f'/registros-crise/{segunda["id"]}', headers=headers)
+    assert not arquivos[0].exists()
+
+
+async def test_audio_reaproveitado_e_removido_antes_do_commit(
+    client: AsyncClient, session: AsyncSession, token: str, diretorio_audios
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    primeira = await _criar_crise(client, token)
+    segunda = await _criar_crise(client, token)
+    await client.put(
+        f'/registros-crise/{primeira["id"]}/audio',
+        headers=_headers_upload(token),
+        content=_multipart(AUDIO),
+    )
+    recebido = diretorio_audios / 'recebido.parcial'
+    recebido.write_bytes(AUDIO)
+
+    # O upload da segunda crise reaproveita o arquivo, e a primeira crise
+    # é excluída antes do commit que o associa à segunda
+    armazenado = await audio.armazenar(
+        recebido, hashlib.sha256(AUDIO).hexdigest(), '.mp3'
+    )
+    await client.delete(f'/registros-crise/{primeira["id"]}', headers=headers)
+    assert not audio.caminho_audio(armazenado.audio_path).exists()
+    await session.execute(
+        update(RegistroCrise)
+        .where(RegistroCrise.id == segunda['id'])
+        .values(audio_path=armazenado.audio_path)
+    )
+    await session.commit()
+    await armazenado.confirmar()
+
+    response = await client.get(
+        f'/registros-crise/{segunda["id"]}/audio', headers=headers
+    )
+    assert response.content == AUDIO
+    assert not recebido.exists()
+
+
+async def test_audio_orfao_referenciado_depois_da_contagem_e_mantido(
+    client: AsyncClient,
+    session: AsyncSession,
+    token: str,
+    diretorio_audios,
+    monkeypatch,
+):
+    crise = await _criar_crise(client, token)
+    await client.put(
+        f'/registros-crise/{crise["id"]}/audio',
+        headers=_headers_upload(token),
+        content=_multipart(AUDIO),
+    )
+    [arquivo] = [p for p in diretorio_audios.rglob('*') if p.is_file()]
+    # Outro registro faz commit com o mesmo áudio entre as duas contagens
+    contagens = iter([0, 1])
+
+    async def referencias(session, audio_path):
+        return next(contagens)
+
+    monkeypatch.setattr(audio, '_referencias', referencias)
+    await audio.remover_audio_orfao(
+        session, str(arquivo.relative_to(diretorio_audios))
+    )
+
+    assert [p for p in diretorio_audios.rglob('*') if p.is_file()] == [arquivo]
+
+
+async def test_substituir_audio_remove_o_anterior(
+    client: AsyncClient, token: str, diretorio_audios
+):
+    crise = await _criar_crise(client, token)
+    url = f'/registros-crise/{crise["id"]}/audio'
+
+    await client.put(
+        url, headers=_headers_upload(token), content=_multipart(AUDIO)
+    )
+    await client.put(
+        url,
+        headers=_headers_upload(token),
+        content=_multipart(b'OggS' + AUDIO, tipo='audio/ogg'),
+    )
+
+    arquivos = [p for p in diretorio_audios.rglob('*') if p.is_file()]
+    assert [p.suffix for p in arquivos] == ['.ogg']
+
+
+async def test_upload_audio_acima_do_limite_pelo_cabecalho(
+    client: AsyncClient, token: str, monkeypatch
+):
+    monkeypatch.setattr(audio.settings, 'AUDIO_MAX_BYTES', 1024)
+    crise = await _criar_crise(client, token)
+
+    response = await client.put(
+        f'/registros-crise/{crise["id"]}/audio',
+        headers=_headers_upload(token),
+        content=_multipart(b'0' * (1024 + audio.FOLGA_MULTIPART + 1)),
+    )
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
+async def test_upload_audio_acima_do_limite_em_streaming(
+    client: AsyncClient, token: str, monkeypatch, diretorio_audios
+):
+    monkeypatch.setattr(audio.settings, 'AUDIO_MAX_BYTES', 1024)
+    crise = await _criar_crise(client, token)
+    corpo = _multipart(b'0' * 2048)
+
+    async def pedacos():
+        # Sem Content-Length: o limite é verificado durante a gravação.
+        for inicio in range(0, len(corpo), 256):
+            yield corpo[inicio : inicio + 256]
+
+    response = await client.put(
+        f'/registros-crise/{crise["id"]}/audio',
+        headers=_headers_upload(token),
+        content=pedacos(),
+    )
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert not [p for p in diretorio_audios.rglob('*') if p.is_file()]
+
+
+@pytest.mark.parametrize(
+    ('content_type', 'corpo', 'status'),
+    [
+        (
+            f'multipart/form-data; boundary={BOUNDARY}',
+            _multipart(AUDIO, tipo='video/mp4'),
+            HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+        ),
+        ('application/json', b'{}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE),
+        (
+            f'multipart/form-data; boundary={BOUNDARY}',
+            _multipart(AUDIO, campo='arquivo'),
+            HTTPStatus.BAD_REQUEST,
+        ),
+        (
+            f'multipart/form-data; boundary={BOUNDARY}',
+            _multipart(b''),
+            HTTPStatus.BAD_REQUEST,
+        ),
+    ],
+)
+async def test_upload_audio_invalido(  # noqa: PLR0913, PLR0917
+    client: AsyncClient,
+    token: str,
+    diretorio_audios,
+    content_type,
+    corpo,
+    status,
+):
+    crise = await _criar_crise(client, token)
+
+    response = await client.put(
+        f'/registros-crise/{crise["id"]}/audio',
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': content_type,
+        },
+        content=corpo,
+    )
+
+    assert response.status_code == status
+    assert not [p for p in diretorio_audios.rglob('*') if p.is_file()]
+
+
+async def test_sync_inclui_crises(client: AsyncClient, token: str):
+    headers = {'Authorization': f'Bearer {token}'}
+    crise = await _criar_crise(client, token)
+
+    sync = (await client.get('/sync', headers=headers)).json()
+    assert [c['id'] for c in sync['crises']] == [crise['id']]
+
+    await client.delete(f'/registros-crise/{crise["id"]}', headers=headers)
+    sync = (
+        await client.get(
+            '/sync', headers=headers, params={'since': sync['cursor']}
+        )
+    ).json()
+    assert sync['crises'] == []
+    assert sync['removidos'][0]['tipo_registro'] == 'crise'
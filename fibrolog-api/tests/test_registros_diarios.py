@@ -2,15 +2,43 @@
 Testes para o CRUD de registros diários.
 """
 
+import csv
+import io
+import json
+import math
+from datetime import date, datetime
 from http import HTTPStatus
 
 import pytest
+import pytest_asyncio
 from httpx import AsyncClient
-
-from fibrolog_api.models import Paciente
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api import json_rapido
+from fibrolog_api.models import (
+    EstadoEmocional,
+    Paciente,
+    Registro,
+    RegistroCrise,
+    RegistroDiario,
+)
+from fibrolog_api.pagination import encode_cursor
+from fibrolog_api.regioes import (
+    RegiaoDor,
+    descrever,
+    interpretar_localizacao,
+    mascara,
+    preencher_regioes,
+    regioes_da_mascara,
+)
+from fibrolog_api.resumos import reconstruir_resumos
 
 pytestmark = pytest.mark.asyncio
 
+DIAS_HISTORICO = 10
+
 
 @pytest.fixture
 def registro_diario_data():
@@ -74,7 +102,7 @@ async def test_get_registros_diarios_vazio(client: AsyncClient, token: str):
         '/registros-diarios/', headers={'Authorization': f'Bearer {token}'}
     )
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'registros': []}
+    assert response.json() == {'registros': [], 'proximo_cursor': None}
 
 
 async def test_get_registros_diarios(
@@ -240,3 +268,627 @@ async def test_delete_registro_diario_not_found(
         headers={'Authorization': f'Bearer {token}'},
     )
     assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+async def test_create_registro_diario_sobrescrever_mantem_um_registro(
+    client: AsyncClient,
+    session: AsyncSession,
+    token: str,
+    registro_diario_data: dict,
+):
+    envios = 3
+    for _ in range(envios):
+        await client.post(
+            '/registros-diarios/',
+            headers={'Authorization': f'Bearer {token}'},
+            json=registro_diario_data,
+        )
+
+    total = await session.scalar(select(func.count()).select_from(Registro))
+    versao = await session.scalar(select(Registro.versao))
+    assert total == 1
+    assert versao == envios
+
+
+async def test_registro_diario_unico_por_dia(
+    session: AsyncSession, paciente: Paciente
+):
+    for _ in range(2):
+        registro = RegistroDiario(
+            tipo_registro='diario',
+            paciente_id=paciente.id,
+            intensidade_dor=5,
+            qualidade_sono=5,
+            nivel_fadiga=5,
+            estado_emocional=EstadoEmocional.FELIZ,
+        )
+        registro.dia_local = date(2024, 1, 1)
+        session.add(registro)
+
+    with pytest.raises(IntegrityError):
+        await session.commit()
+
+
+@pytest_asyncio.fixture
+async def historico(session: AsyncSession, paciente: Paciente):
+    """Cria um registro por dia a partir de 1º de janeiro de 2024."""
+    for dia in range(1, DIAS_HISTORICO + 1):
+        registro = RegistroDiario(
+            tipo_registro='diario',
+            paciente_id=paciente.id,
+            intensidade_dor=dia % 11,
+            qualidade_sono=5,
+            nivel_fadiga=5,
+            estado_emocional=EstadoEmocional.FELIZ,
+        )
+        registro.data_hora = datetime(2024, 1, dia, 9)
+        registro.dia_local = date(2024, 1, dia)
+        session.add(registro)
+    await session.flush()
+    await reconstruir_resumos(session, paciente.id)
+    await session.commit()
+
+
+@pytest.mark.usefixtures('historico')
+async def test_get_registros_diarios_paginacao(
+    client: AsyncClient, token: str
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    limite = 4
+    datas = []
+    cursor = None
+    paginas = 0
+    while True:
+        params = {'limit': limite}
+        if cursor:
+            params['cursor'] = cursor
+        response = await client.get(
+            '/registros-diarios/', headers=headers, params=params
+        )
+        data = response.json()
+        datas.extend(r['data_hora'] for r in data['registros'])
+        paginas += 1
+        cursor = data['proximo_cursor']
+        if not cursor:
+            break
+
+    assert paginas == math.ceil(DIAS_HISTORICO / limite)
+    assert datas == sorted(datas, reverse=True)
+    assert len(set(datas)) == DIAS_HISTORICO
+
+
+@pytest.mark.parametrize(
+    'valores', [(1, 2), ('x', 1), ('2024-01-01T09:00:00', '1'), ({},)]
+)
+async def test_get_registros_diarios_cursor_invalido(
+    client: AsyncClient, token: str, valores: tuple
+):
+    response = await client.get(
+        '/registros-diarios/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'cursor': encode_cursor(*valores)},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'] == 'Cursor inválido'
+
+
+@pytest.mark.usefixtures('historico')
+async def test_get_registros_diarios_filtro_periodo(
+    client: AsyncClient, token: str
+):
+    response = await client.get(
+        '/registros-diarios/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'from': '2024-01-03', 'to': '2024-01-05'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    datas = [r['data_hora'][:10] for r in response.json()['registros']]
+    assert datas == ['2024-01-05', '2024-01-04', '2024-01-03']
+
+
+async def test_create_registros_diarios_batch(
+    client: AsyncClient, token: str, registro_diario_data: dict
+):
+    itens = [
+        {**registro_diario_data, 'data_hora': f'2024-03-{dia:02d}T08:00:00'}
+        for dia in range(1, 31)
+    ]
+
+    response = await client.post(
+        '/registros-diarios/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'registros': itens},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    resultados = response.json()['resultados']
+    assert [r['indice'] for r in resultados] == list(range(len(itens)))
+    assert all(r['status'] == 'criado' for r in resultados)
+    assert len({r['id'] for r in resultados}) == len(itens)
+
+    listagem = await client.get(
+        '/registros-diarios/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'from': '2024-03-01', 'to': '2024-03-31'},
+    )
+    assert len(listagem.json()['registros']) == len(itens)
+
+
+async def test_create_registros_diarios_batch_atualiza_e_rejeita(
+    client: AsyncClient, token: str, registro_diario_data: dict
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    await client.post(
+        '/registros-diarios/batch',
+        headers=headers,
+        json={
+            'registros': [
+                {**registro_diario_data, 'data_hora': '2024-03-01T08:00:00'}
+            ]
+        },
+    )
+
+    response = await client.post(
+        '/registros-diarios/batch',
+        headers=headers,
+        json={
+            'registros': [
+                {**registro_diario_data, 'data_hora': '2024-03-01T21:00:00'},
+                {**registro_diario_data, 'data_hora': '2024-03-02T08:00:00'},
+                {**registro_diario_data, 'data_hora': '2024-03-02T22:00:00'},
+                {**registro_diario_data, 'data_hora': '2999-01-01T08:00:00'},
+            ]
+        },
+    )
+
+    resultados = response.json()['resultados']
+    assert [r['status'] for r in resultados] == [
+        'atualizado',
+        'rejeitado',
+        'criado',
+        'rejeitado',
+    ]
+    assert resultados[3]['motivo'] == 'Data no futuro'
+
+
+async def test_create_registros_diarios_batch_invalido(
+    client: AsyncClient, token: str, registro_diario_data: dict
+):
+    response = await client.post(
+        '/registros-diarios/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'registros': [
+                {
+                    **registro_diario_data,
+                    'intensidade_dor': 11,
+                    'data_hora': '2024-03-01T08:00:00',
+                }
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def test_get_registro_diario_etag(
+    client: AsyncClient, token: str, registro_diario_data: dict
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    registro_id = (
+        await client.post(
+            '/registros-diarios/', headers=headers, json=registro_diario_data
+        )
+    ).json()['id']
+
+    response = await client.get(
+        f'/registros-diarios/{registro_id}', headers=headers
+    )
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    not_modified = await client.get(
+        f'/registros-diarios/{registro_id}',
+        headers={**headers, 'If-None-Match': f'"outra", W/{etag}'},
+    )
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert not_modified.content == b''
+
+    await client.patch(
+        f'/registros-diarios/{registro_id}',
+        headers=headers,
+        json={'nivel_fadiga': 1},
+    )
+
+    modified = await client.get(
+        f'/registros-diarios/{registro_id}',
+        headers={**headers, 'If-None-Match': etag},
+    )
+    assert modified.status_code == HTTPStatus.OK
+    assert modified.headers['ETag'] != etag
+
+
+@pytest.mark.usefixtures('historico')
+async def test_get_registros_diarios_etag(client: AsyncClient, token: str):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = await client.get('/registros-diarios/', headers=headers)
+    etag = response.headers['ETag']
+
+    not_modified = await client.get(
+        '/registros-diarios/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+    # Outro filtro é outra representação
+    filtrado = await client.get(
+        '/registros-diarios/',
+        headers={**headers, 'If-None-Match': etag},
+        params={'limit': 2},
+    )
+    assert filtrado.status_code == HTTPStatus.OK
+
+    # Uma exclusão muda a listagem
+    registro_id = response.json()['registros'][0]['id']
+    await client.delete(f'/registros-diarios/{registro_id}', headers=headers)
+
+    modified = await client.get(
+        '/registros-diarios/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert modified.status_code == HTTPStatus.OK
+    assert modified.headers['ETag'] != etag
+
+
+@pytest.mark.usefixtures('historico')
+async def test_get_registros_diarios_json_rapido(
+    client: AsyncClient, token: str, monkeypatch: pytest.MonkeyPatch
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    params = {'limit': 3}
+    padrao = await client.get(
+        '/registros-diarios/', headers=headers, params=params
+    )
+
+    monkeypatch.setattr(json_rapido.settings, 'FAST_JSON_RESPONSES', True)
+    rapido = await client.get(
+        '/registros-diarios/', headers=headers, params=params
+    )
+
+    assert rapido.status_code == HTTPStatus.OK
+    assert rapido.content == padrao.content
+    assert rapido.headers['ETag'] == padrao.headers['ETag']
+    assert rapido.headers['Cache-Control'] == padrao.headers['Cache-Control']
+
+    proxima = await client.get(
+        '/registros-diarios/',
+        headers=headers,
+        params={**params, 'cursor': rapido.json()['proximo_cursor']},
+    )
+    assert len(proxima.json()['registros']) == params['limit']
+
+
+@pytest_asyncio.fixture
+async def crise(session: AsyncSession, paciente: Paciente):
+    registro = RegistroCrise(
+        tipo_registro='crise',
+        paciente_id=paciente.id,
+        intensidade_dor=9,
+        duracao='2h',
+        texto_transcrito='Dor forte nas costas',
+    )
+    registro.data_hora = datetime(2024, 1, 3, 22)
+    session.add(registro)
+    await session.commit()
+    return registro
+
+
+@pytest.mark.usefixtures('historico')
+async def test_export_registros_csv(
+    client: AsyncClient, token: str, crise: RegistroCrise
+):
+    response = await client.get(
+        '/registros-diarios/export',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'attachment' in response.headers['content-disposition']
+
+    linhas = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(linhas) == DIAS_HISTORICO + 1
+    # Ordem cronológica, com a crise entre os registros do dia 3 e do dia 4
+    assert [linha['tipo_registro'] for linha in linhas[2:5]] == [
+        'diario',
+        'crise',
+        'diario',
+    ]
+    assert linhas[3]['id'] == str(crise.id)
+    assert linhas[3]['duracao'] == '2h'
+    assert not linhas[3]['estado_emocional']
+    assert linhas[0]['estado_emocional'] == 'FELIZ'
+    assert linhas[0]['data_hora'] == '2024-01-01T09:00:00'
+
+
+@pytest.mark.usefixtures('historico', 'crise')
+async def test_export_registros_ndjson(client: AsyncClient, token: str):
+    response = await client.get(
+        '/registros-diarios/export',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'format': 'ndjson'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    registros = [json.loads(linha) for linha in response.text.splitlines()]
+    assert len(registros) == DIAS_HISTORICO + 1
+    assert registros[3]['tipo_registro'] == 'crise'
+    assert registros[3]['qualidade_sono'] is None
+    assert registros[3]['texto_transcrito'] == 'Dor forte nas costas'
+
+
+async def test_export_registros_formato_invalido(
+    client: AsyncClient, token: str
+):
+    response = await client.get(
+        '/registros-diarios/export',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'format': 'xml'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.usefixtures('historico')
+async def test_stats_por_semana(client: AsyncClient, token: str):
+    response = await client.get(
+        '/registros-diarios/stats',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'bucket': 'week'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    # 1º de janeiro de 2024 foi uma segunda-feira
+    assert response.json() == {
+        'bucket': 'week',
+        'periodos': ['2024-01-01', '2024-01-08'],
+        'registros': [7, 3],
+        'intensidade_dor': [4.0, 9.0],
+        'qualidade_sono': [5.0, 5.0],
+        'nivel_fadiga': [5.0, 5.0],
+        'estado_emocional': {
+            'FELIZ': [7, 3],
+            'ANSIOSO': [0, 0],
+            'IRRITADO': [0, 0],
+            'TRISTE': [0, 0],
+        },
+    }
+
+
+@pytest.mark.usefixtures('historico')
+async def test_stats_por_mes_com_periodo(client: AsyncClient, token: str):
+    response = await client.get(
+        '/registros-diarios/stats',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'bucket': 'month', 'from': '2024-01-03', 'to': '2024-01-06'},
+    )
+
+    data = response.json()
+    assert data['periodos'] == ['2024-01-01']
+    assert data['registros'] == [4]
+    assert data['intensidade_dor'] == [4.5]
+
+
+@pytest.mark.parametrize(
+    ('localizacao', 'regioes'),
+    [
+        ('Joelho esquerdo e ombros', {'OMBRO_ESQUERDO', 'OMBRO_DIREITO',
+                                      'PERNA_ESQUERDA'}),
+        ('Costas e pescoço', {'PESCOCO', 'COSTAS_SUPERIOR', 'LOMBAR'}),
+        ('dor nas costas baixas', {'LOMBAR'}),
+        ('Quadril esquerdo/direito', {'QUADRIL_ESQUERDO', 'QUADRIL_DIREITO'}),
+        ('Cabeça', set()),
+    ],
+)  # fmt: skip
+def test_interpretar_localizacao_legada(localizacao: str, regioes: set):
+    bits = interpretar_localizacao(localizacao)
+
+    assert {regiao.value for regiao in regioes_da_mascara(bits)} == regioes
+
+
+def test_rotulos_das_regioes_sao_interpretados_de_volta():
+    for regiao in RegiaoDor:
+        assert interpretar_localizacao(descrever(mascara([regiao]))) == (
+            mascara([regiao])
+        )
+
+
+async def test_regioes_dor_a_partir_do_texto_ou_da_lista(
+    client: AsyncClient, token: str, registro_diario_data: dict
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = await client.post(
+        '/registros-diarios/',
+        headers=headers,
+        json={**registro_diario_data, 'localizacao_dor': 'Ombro direito'},
+    )
+    registro_id = response.json()['id']
+    assert response.json()['regioes_dor'] == ['OMBRO_DIREITO']
+
+    # A lista prevalece e, sem texto, vira o texto pesquisável
+    response = await client.put(
+        f'/registros-diarios/{registro_id}',
+        headers=headers,
+        json={
+            **registro_diario_data,
+            'localizacao_dor': None,
+            'regioes_dor': ['LOMBAR', 'TORAX'],
+        },
+    )
+    assert response.json()['regioes_dor'] == ['LOMBAR', 'TORAX']
+    assert response.json()['localizacao_dor'] == 'Lombar, Tórax'
+
+    # Alterar só o texto reinterpreta as regiões
+    response = await client.patch(
+        f'/registros-diarios/{registro_id}',
+        headers=headers,
+        json={'localizacao_dor': 'mandíbula'},
+    )
+    assert response.json()['regioes_dor'] == [
+        'MANDIBULA_ESQUERDA',
+        'MANDIBULA_DIREITA',
+    ]
+
+
+async def test_preencher_regioes_dos_registros_antigos(
+    session: AsyncSession, paciente: Paciente, other_paciente: Paciente
+):
+    localizacoes = [
+        (paciente, 'Ombro direito'),
+        (paciente, 'Ombro direito'),
+        (paciente, 'Cabeça'),
+        (other_paciente, 'Ombro direito'),
+    ]
+    registros = []
+    for dia, (dono, localizacao) in enumerate(localizacoes, start=1):
+        registro = RegistroDiario(
+            tipo_registro='diario',
+            paciente_id=dono.id,
+            intensidade_dor=5,
+            qualidade_sono=5,
+            nivel_fadiga=5,
+            estado_emocional=EstadoEmocional.FELIZ,
+            localizacao_dor=localizacao,
+        )
+        registro.dia_local = date(2024, 1, dia)
+        registros.append(registro)
+    session.add_all(registros)
+    await session.commit()
+
+    assert await preencher_regioes(session, paciente.id) == 2  # noqa: PLR2004
+    await session.commit()
+    for registro in registros:
+        await session.refresh(registro)
+
+    ombro = mascara([RegiaoDor.OMBRO_DIREITO])
+    assert [registro.regioes_dor for registro in registros] == [
+        ombro,
+        ombro,
+        0,
+        0,
+    ]
+
+
+async def test_heatmap_conta_registros_por_regiao(
+    client: AsyncClient, token: str, registro_diario_data: dict
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    localizacoes = [
+        {'localizacao_dor': 'Ombros e lombar'},
+        {'localizacao_dor': 'lombar'},
+        {'localizacao_dor': None, 'regioes_dor': ['LOMBAR', 'PESCOCO']},
+        {'localizacao_dor': 'Cabeça'},
+        # Fora do período pedido
+        {'localizacao_dor': 'corpo todo'},
+    ]
+    await client.post(
+        '/registros-diarios/batch',
+        headers=headers,
+        json={
+            'registros': [
+                {
+                    **registro_diario_data,
+                    **localizacao,
+                    'data_hora': f'2024-01-{dia:02d}T09:00:00',
+                }
+                for dia, localizacao in enumerate(localizacoes, start=1)
+            ]
+        },
+    )
+
+    response = await client.get(
+        '/registros-diarios/heatmap',
+        headers=headers,
+        params={'from': '2024-01-01', 'to': '2024-01-04'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['registros'] == 4  # noqa: PLR2004
+    assert data['media_regioes'] == 1.5  # noqa: PLR2004
+    assert data['regioes'][:4] == [
+        {
+            'regiao': 'LOMBAR',
+            'rotulo': 'Lombar',
+            'registros': 3,
+            'proporcao': 0.75,
+        },
+        {
+            'regiao': 'OMBRO_ESQUERDO',
+            'rotulo': 'Ombro esquerdo',
+            'registros': 1,
+            'proporcao': 0.25,
+        },
+        {
+            'regiao': 'OMBRO_DIREITO',
+            'rotulo': 'Ombro direito',
+            'registros': 1,
+            'proporcao': 0.25,
+        },
+        {
+            'regiao': 'PESCOCO',
+            'rotulo': 'Pescoço',
+            'registros': 1,
+            'proporcao': 0.25,
+        },
+    ]
+    assert len(data['regioes']) == len(RegiaoDor)
+    assert {r['registros'] for r in data['regioes'][4:]} == {0}
+
+
+async def test_heatmap_sem_registros(client: AsyncClient, token: str):
+    response = await client.get(
+        '/registros-diarios/heatmap',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    data = response.json()
+    assert data['registros'] == 0
+    assert data['media_regioes'] == 0
+    assert {r['proporcao'] for r in data['regioes']} == {0}
+
+
+async def test_registro_usa_fuso_horario_do_paciente(
+    client: AsyncClient,
+    session: AsyncSession,
+    paciente: Paciente,
+    token: str,
+    registro_diario_data: dict,
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    await client.patch(
+        f'/pacientes/{paciente.id}',
+        headers=headers,
+        json={'fuso_horario': 'Asia/Tokyo'},
+    )
+
+    response = await client.post(
+        '/registros-diarios/batch',
+        headers=headers,
+        json={
+            'registros': [
+                {
+                    **registro_diario_data,
+                    'data_hora': '2024-01-01T20:00:00-03:00',
+                }
+            ]
+        },
+    )
+
+    registro_id = response.json()['resultados'][0]['id']
+    dia_local = await session.scalar(
+        select(Registro.dia_local).where(Registro.id == registro_id)
+    )
+    assert dia_local == date(2024, 1, 2)
@@ -0,0 +1,120 @@
+"""
+Testes para a manutenção incremental dos resumos de registros.
+"""
+
+from datetime import date
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api.models import ResumoRegistros
+from fibrolog_api.resumos import (
+    fim_do_periodo,
+    inicio_do_periodo,
+    reconstruir_resumos,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+def _item(dia: int, intensidade_dor: int, estado: str = 'ANSIOSO') -> dict:
+    return {
+        'data_hora': f'2024-01-{dia:02d}T09:00:00-03:00',
+        'intensidade_dor': intensidade_dor,
+        'qualidade_sono': 10 - intensidade_dor,
+        'nivel_fadiga': dia % 11,
+        'estado_emocional': estado,
+    }
+
+
+async def _resumos(session: AsyncSession) -> list[tuple]:
+    tabela = ResumoRegistros.__table__
+    linhas = await session.execute(
+        select(tabela).order_by(
+            tabela.c.paciente_id, tabela.c.periodo, tabela.c.inicio
+        )
+    )
+    return [tuple(linha) for linha in linhas]
+
+
+def test_limites_dos_periodos():
+    # 2024 é bissexto
+    assert inicio_do_periodo(date(2024, 2, 29), 'month') == date(2024, 2, 1)
+    assert fim_do_periodo(date(2024, 2, 1), 'month') == date(2024, 2, 29)
+    assert fim_do_periodo(date(2024, 12, 1), 'month') == date(2024, 12, 31)
+    assert inicio_do_periodo(date(2024, 1, 7), 'week') == date(2024, 1, 1)
+    assert fim_do_periodo(date(2024, 1, 1), 'week') == date(2024, 1, 7)
+
+
+async def test_resumos_acompanham_escritas(
+    client: AsyncClient, session: AsyncSession, token: str
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = await client.post(
+        '/registros-diarios/batch',
+        headers=headers,
+        json={
+            'registros': [
+                _item(1, 2),
+                _item(2, 9, 'FELIZ'),
+                _item(3, 5),
+                _item(9, 7, 'TRISTE'),
+            ]
+        },
+    )
+    ids = [r['id'] for r in response.json()['resultados']]
+
+    # Sobrescreve o dia 3 pelo lote, altera o máximo e remove o mínimo
+    await client.post(
+        '/registros-diarios/batch',
+        headers=headers,
+        json={'registros': [_item(3, 6, 'IRRITADO')]},
+    )
+    await client.put(
+        f'/registros-diarios/{ids[1]}',
+        headers=headers,
+        json={k: v for k, v in _item(2, 4).items() if k != 'data_hora'},
+    )
+    await client.patch(
+        f'/registros-diarios/{ids[3]}',
+        headers=headers,
+        json={'nivel_fadiga': 0},
+    )
+    await client.delete(f'/registros-diarios/{ids[0]}', headers=headers)
+
+    incrementais = await _resumos(session)
+    await reconstruir_resumos(session)
+    assert incrementais == await _resumos(session)
+
+    semana = await session.scalar(
+        select(ResumoRegistros).where(
+            ResumoRegistros.periodo == 'week',
+            ResumoRegistros.inicio == date(2024, 1, 1),
+        )
+    )
+    assert semana.registros == 2  # noqa: PLR2004
+    assert semana.min_intensidade_dor == 4  # noqa: PLR2004
+    assert semana.max_intensidade_dor == 6  # noqa: PLR2004
+    assert semana.soma_quadrados_intensidade_dor == 4**2 + 6**2
+
+
+async def test_stats_le_resumos(client: AsyncClient, token: str):
+    headers = {'Authorization': f'Bearer {token}'}
+    await client.post(
+        '/registros-diarios/batch',
+        headers=headers,
+        json={'registros': [_item(1, 2), _item(2, 3), _item(3, 3)]},
+    )
+
+    response = await client.get(
+        '/registros-diarios/stats',
+        headers=headers,
+        params={'bucket': 'month', 'from': '2024-01-01', 'to': '2024-01-31'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['intensidade_dor'] == [2.67]
+    assert response.json()['estado_emocional']['ANSIOSO'] == [3]
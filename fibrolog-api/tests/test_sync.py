@@ -0,0 +1,155 @@
+"""
+Testes para a sincronização incremental.
+"""
+
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+def _item(data_hora: str, intensidade_dor: int = 5) -> dict:
+    return {
+        'data_hora': data_hora,
+        'intensidade_dor': intensidade_dor,
+        'qualidade_sono': 7,
+        'nivel_fadiga': 6,
+        'estado_emocional': 'ANSIOSO',
+    }
+
+
+async def _criar_registros(client: AsyncClient, token: str, dias: int):
+    response = await client.post(
+        '/registros-diarios/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'registros': [
+                _item(f'2024-01-{dia:02d}T09:00:00-03:00')
+                for dia in range(1, dias + 1)
+            ]
+        },
+    )
+    return [r['id'] for r in response.json()['resultados']]
+
+
+async def test_sync_sem_alteracoes(client: AsyncClient, token: str):
+    response = await client.get(
+        '/sync', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'registros': [],
+        'crises': [],
+        'removidos': [],
+        'cursor': 0,
+        'tem_mais': False,
+    }
+
+
+async def test_sync_retorna_apenas_alteracoes_apos_cursor(
+    client: AsyncClient, token: str
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    ids = await _criar_registros(client, token, 3)
+
+    inicial = (await client.get('/sync', headers=headers)).json()
+    assert [r['id'] for r in inicial['registros']] == ids
+    cursor = inicial['cursor']
+
+    # Nada mudou desde o cursor
+    vazio = (
+        await client.get('/sync', headers=headers, params={'since': cursor})
+    ).json()
+    assert vazio['registros'] == []
+    assert vazio['cursor'] == cursor
+
+    await client.patch(
+        f'/registros-diarios/{ids[0]}',
+        headers=headers,
+        json={'nivel_fadiga': 2},
+    )
+    await client.delete(f'/registros-diarios/{ids[1]}', headers=headers)
+
+    delta = (
+        await client.get('/sync', headers=headers, params={'since': cursor})
+    ).json()
+    assert [r['id'] for r in delta['registros']] == [ids[0]]
+    assert delta['registros'][0]['nivel_fadiga'] == 2  # noqa: PLR2004
+    assert [r['registro_id'] for r in delta['removidos']] == [ids[1]]
+    assert delta['removidos'][0]['tipo_registro'] == 'diario'
+    assert delta['cursor'] > cursor
+    assert delta['tem_mais'] is False
+
+
+async def test_sync_paginacao(client: AsyncClient, token: str):
+    headers = {'Authorization': f'Bearer {token}'}
+    dias = 5
+    ids = await _criar_registros(client, token, dias)
+    await client.delete(f'/registros-diarios/{ids[0]}', headers=headers)
+
+    recebidos = []
+    removidos = []
+    cursor = 0
+    while True:
+        data = (
+            await client.get(
+                '/sync', headers=headers, params={'since': cursor, 'limit': 2}
+            )
+        ).json()
+        recebidos.extend(r['id'] for r in data['registros'])
+        removidos.extend(r['registro_id'] for r in data['removidos'])
+        cursor = data['cursor']
+        if not data['tem_mais']:
+            break
+
+    assert recebidos == ids[1:]
+    assert removidos == [ids[0]]
+
+
+async def test_sync_isola_pacientes(
+    client: AsyncClient, token: str, other_paciente
+):
+    await _criar_registros(client, token, 2)
+
+    login = await client.post(
+        '/auth/token',
+        data={
+            'username': other_paciente.email,
+            'password': other_paciente.password_plain,
+        },
+    )
+    other_token = login.json()['access_token']
+
+    response = await client.get(
+        '/sync', headers={'Authorization': f'Bearer {other_token}'}
+    )
+
+    assert response.json()['registros'] == []
+
+
+async def test_sync_sequencia_por_paciente(
+    client: AsyncClient, token: str, other_paciente
+):
+    login = await client.post(
+        '/auth/token',
+        data={
+            'username': other_paciente.email,
+            'password': other_paciente.password_plain,
+        },
+    )
+    other_token = login.json()['access_token']
+
+    # As escritas de um paciente não avançam a sequência do outro
+    await _criar_registros(client, token, 3)
+    await _criar_registros(client, other_token, 2)
+
+    cursores = [
+        (
+            await client.get('/sync', headers={'Authorization': f'Bearer {t}'})
+        ).json()['cursor']
+        for t in (token, other_token)
+    ]
+    assert cursores == [3, 2]
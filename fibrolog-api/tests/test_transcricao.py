@@ -0,0 +1,282 @@
+"""
+Testes para a fila de transcrição dos áudios das crises.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fibrolog_api import audio, transcricao
+from fibrolog_api.filas import espera_para_nova_tentativa
+from fibrolog_api.models import TarefaTranscricao
+from fibrolog_api.relogio import utcnow
+from fibrolog_api.transcricao import (
+    CANCELADA,
+    CONCLUIDA,
+    EXECUTANDO,
+    FALHOU,
+    PENDENTE,
+    FilaTranscricao,
+    TranscritorLocal,
+    concluir_tarefa,
+    reservar_tarefa,
+)
+
+pytestmark = pytest.mark.asyncio
+
+BOUNDARY = 'limite-de-teste'
+MAX_TENTATIVAS = 2
+
+
+class TranscritorComFalha:
+    """Motor que sempre falha, para testar as novas tentativas."""
+
+    @staticmethod
+    def transcrever(caminho: Path, tipo: str) -> str:
+        raise RuntimeError('motor indisponível')
+
+
+@pytest.fixture(autouse=True)
+def diretorio_audios(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio.settings, 'AUDIO_DIR', str(tmp_path))
+    return tmp_path
+
+
+def _fila(session: AsyncSession, motor: str) -> FilaTranscricao:
+    def sessoes():
+        return AsyncSession(session.bind, expire_on_commit=False)
+
+    return FilaTranscricao(
+        workers=1,
+        motor=motor,
+        max_tentativas=MAX_TENTATIVAS,
+        visibilidade=60,
+        backoff=30,
+        sessoes=sessoes,
+        executor=ThreadPoolExecutor(max_workers=1),
+    )
+
+
+@pytest_asyncio.fixture
+async def crise(client: AsyncClient, token: str) -> dict:
+    headers = {'Authorization': f'Bearer {token}'}
+    crise = (
+        await client.post(
+            '/registros-crise/',
+            headers=headers,
+            json={
+                'intensidade_dor': 8,
+                'duracao': '1h',
+                'data_hora': '2024-01-10T15:00:00',
+            },
+        )
+    ).json()
+    await _enviar_audio(client, token, crise['id'], b'audio-1')
+    return crise
+
+
+async def _enviar_audio(
+    client: AsyncClient, token: str, registro_id: int, conteudo: bytes
+):
+    corpo = (
+        (
+            f'--{BOUNDARY}\r\n'
+            'Content-Disposition: form-data; name="audio"; '
+            'filename="crise.ogg"\r\n'
+            'Content-Type: audio/ogg\r\n\r\n'
+        ).encode()
+        + conteudo
+        + f'\r\n--{BOUNDARY}--\r\n'.encode()
+    )
+    response = await client.put(
+        f'/registros-crise/{registro_id}/audio',
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': f'multipart/form-data; boundary={BOUNDARY}',
+        },
+        content=corpo,
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+async def _tarefas(session: AsyncSession) -> list[TarefaTranscricao]:
+    session.expire_all()
+    return (
+        await session.scalars(
+            select(TarefaTranscricao).order_by(TarefaTranscricao.id)
+        )
+    ).all()
+
+
+def test_transcritor_local_e_deterministico(tmp_path):
+    caminho = tmp_path / 'a.ogg'
+    caminho.write_bytes(b'abc' * 100)
+    transcritor = TranscritorLocal(custo_minimo=0.0, segundos_por_mb=0.0)
+
+    texto = transcritor.transcrever(caminho, 'audio/ogg')
+
+    assert texto == transcritor.transcrever(caminho, 'audio/ogg')
+    assert '300 bytes' in texto
+
+
+def test_backoff_exponencial_com_jitter():
+    for tentativas, prazo in [(1, 30), (2, 60), (3, 120)]:
+        espera = espera_para_nova_tentativa(tentativas, 30)
+        assert prazo / 2 <= espera <= prazo
+
+
+async def test_upload_de_audio_e_transcrito(
+    client: AsyncClient, session: AsyncSession, token: str, crise: dict
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    fila = _fila(session, 'fibrolog_api.transcricao:TranscritorLocal')
+    [tarefa] = await _tarefas(session)
+    assert tarefa.estado == PENDENTE
+
+    assert await fila.processar_uma() is True
+    assert await fila.processar_uma() is False
+
+    [tarefa] = await _tarefas(session)
+    assert tarefa.estado == CONCLUIDA
+    assert tarefa.tentativas == 1
+    registro = (
+        await client.get(f'/registros-crise/{crise["id"]}', headers=headers)
+    ).json()
+    assert registro['texto_transcrito'].startswith('[transcrição simulada]')
+    sync = (await client.get('/sync', headers=headers)).json()
+    assert (
+        sync['crises'][0]['texto_transcrito'] == registro['texto_transcrito']
+    )
+    assert fila.resumo()['concluidas'] == 1
+
+
+async def test_falha_agenda_nova_tentativa_e_depois_desiste(
+    session: AsyncSession, crise: dict
+):
+    fila = _fila(session, 'tests.test_transcricao:TranscritorComFalha')
+
+    await fila.processar_uma()
+    [tarefa] = await _tarefas(session)
+    assert tarefa.estado == PENDENTE
+    assert tarefa.tentativas == 1
+    assert tarefa.disponivel_em > utcnow()
+    assert 'motor indisponível' in tarefa.erro
+
+    # Antes do backoff a tarefa não é reservada de novo
+    assert await fila.processar_uma() is False
+    tarefa.disponivel_em = utcnow()
+    await session.commit()
+
+    await fila.processar_uma()
+    [tarefa] = await _tarefas(session)
+    assert tarefa.estado == FALHOU
+    assert tarefa.tentativas == MAX_TENTATIVAS
+    assert fila.resumo()['retentativas'] == 1
+    assert fila.resumo()['falhas'] == 1
+
+
+async def test_reserva_expirada_e_recuperada(
+    session: AsyncSession, crise: dict
+):
+    # Um worker reservou a tarefa e caiu antes de concluir
+    abandonada = await reservar_tarefa(session, visibilidade=60)
+    assert abandonada.estado == EXECUTANDO
+    abandonada.disponivel_em = utcnow() - timedelta(seconds=1)
+    await session.commit()
+
+    fila = _fila(session, 'fibrolog_api.transcricao:TranscritorLocal')
+    await fila.iniciar()
+    await fila.parar()
+
+    [tarefa] = await _tarefas(session)
+    assert tarefa.estado == PENDENTE
+    assert tarefa.dono is None
+    assert fila.resumo()['recuperadas'] == 1
+
+
+async def test_worker_continua_apos_erro_do_banco(
+    session: AsyncSession, crise: dict, monkeypatch
+):
+    monkeypatch.setattr(transcricao, 'ESPERA_APOS_ERRO', 0)
+    fila = _fila(session, 'fibrolog_api.transcricao:TranscritorLocal')
+    processar_uma = fila.processar_uma
+    erros = []
+
+    async def processar_com_erro():
+        if not erros:
+            erros.append(1)
+            raise OperationalError('UPDATE', {}, Exception('database locked'))
+        return await processar_uma()
+
+    monkeypatch.setattr(fila, 'processar_uma', processar_com_erro)
+    await fila.iniciar()
+    try:
+        for _ in range(100):
+            if fila.resumo()['concluidas'] == 1:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await fila.parar()
+
+    [tarefa] = await _tarefas(session)
+    assert erros == [1]
+    assert tarefa.estado == CONCLUIDA
+
+
+async def test_reserva_perdida_nao_grava_transcricao(
+    client: AsyncClient, session: AsyncSession, token: str, crise: dict
+):
+    fila = _fila(session, 'fibrolog_api.transcricao:TranscritorLocal')
+    lenta = await reservar_tarefa(session, visibilidade=0)
+
+    # A reserva expirou e outro worker concluiu a tarefa
+    assert await fila.processar_uma() is True
+
+    assert await concluir_tarefa(session, lenta, 'texto antigo') is False
+    registro = (
+        await client.get(
+            f'/registros-crise/{crise["id"]}',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+    ).json()
+    assert registro['texto_transcrito'] != 'texto antigo'
+
+
+async def test_novo_audio_cancela_e_descarta_transcricao_antiga(
+    client: AsyncClient, session: AsyncSession, token: str, crise: dict
+):
+    fila = _fila(session, 'fibrolog_api.transcricao:TranscritorLocal')
+    await _enviar_audio(client, token, crise['id'], b'audio-dois')
+
+    tarefas = await _tarefas(session)
+    assert [t.estado for t in tarefas] == [CANCELADA, PENDENTE]
+
+    await fila.processar_uma()
+    registro = (
+        await client.get(
+            f'/registros-crise/{crise["id"]}',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+    ).json()
+    assert '10 bytes' in registro['texto_transcrito']
+
+
+async def test_excluir_crise_remove_tarefas(
+    client: AsyncClient, session: AsyncSession, token: str, crise: dict
+):
+    response = await client.delete(
+        f'/registros-crise/{crise["id"]}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert await _tarefas(session) == []
@@ -0,0 +1,252 @@
+"""
+Testes para os uploads retomáveis de áudio.
+"""
+
+import os
+import time
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from fibrolog_api import audio, uploads
+from fibrolog_api.models import UploadAudio
+from fibrolog_api.relogio import utcnow
+
+pytestmark = pytest.mark.asyncio
+
+AUDIO = bytes(range(256)) * 40
+
+
+@pytest.fixture(autouse=True)
+def diretorio_audios(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio.settings, 'AUDIO_DIR', str(tmp_path))
+    return tmp_path
+
+
+@pytest_asyncio.fixture
+async def crise(client: AsyncClient, token: str) -> dict:
+    response = await client.post(
+        '/registros-crise/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'intensidade_dor': 8,
+            'duracao': '1h',
+            'data_hora': '2024-01-10T15:00:00',
+        },
+    )
+    return response.json()
+
+
+async def _iniciar(
+    client: AsyncClient, token: str, crise: dict, tamanho: int = len(AUDIO)
+) -> str:
+    response = await client.post(
+        f'/registros-crise/{crise["id"]}/audio/uploads',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'tamanho': tamanho, 'tipo': 'audio/mp4'},
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.headers['Location'].endswith(response.json()['id'])
+    return response.headers['Location']
+
+
+async def _enviar(
+    client: AsyncClient, token: str, url: str, offset: int, dados: bytes
+):
+    return await client.patch(
+        url,
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Upload-Offset': str(offset),
+            'Content-Type': 'application/offset+octet-stream',
+        },
+        content=dados,
+    )
+
+
+async def test_upload_em_pedacos(
+    client: AsyncClient, token: str, crise: dict, diretorio_audios
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    url = await _iniciar(client, token, crise)
+    meio = len(AUDIO) // 3
+
+    response = await _enviar(client, token, url, 0, AUDIO[:meio])
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['Upload-Offset'] == str(meio)
+
+    estado = await client.get(url, headers=headers)
+    assert estado.json()['recebido'] == meio
+
+    await _enviar(client, token, url, meio, AUDIO[meio:])
+    response = await client.post(f'{url}/concluir', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['tem_audio'] is True
+    arquivos = [p for p in diretorio_audios.rglob('*') if p.is_file()]
+    assert [p.suffix for p in arquivos] == ['.m4a']
+    assert arquivos[0].read_bytes() == AUDIO
+
+    # A sessão é encerrada ao concluir
+    response = await client.get(url, headers=headers)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+async def test_offset_divergente_e_upload_incompleto(
+    client: AsyncClient, token: str, crise: dict
+):
+    url = await _iniciar(client, token, crise)
+    await _enviar(client, token, url, 0, AUDIO[:100])
+
+    response = await _enviar(client, token, url, 50, AUDIO[50:200])
+    assert response.status_code == HTTPStatus.CONFLICT
+
+    response = await client.post(
+        f'{url}/concluir', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.CONFLICT
+
+
+async def test_pedaco_alem_do_tamanho_declarado(
+    client: AsyncClient, token: str, crise: dict
+):
+    url = await _iniciar(client, token, crise, tamanho=100)
+
+    response = await _enviar(client, token, url, 0, AUDIO[:101])
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
+async def test_upload_acima_do_limite_de_audio(
+    client: AsyncClient, token: str, crise: dict
+):
+    response = await client.post(
+        f'/registros-crise/{crise["id"]}/audio/uploads',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'tamanho': audio.settings.AUDIO_MAX_BYTES + 1,
+            'tipo': 'audio/mp4',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
+async def test_desconexao_mantem_bytes_recebidos(
+    session: AsyncSession, crise: dict
+):
+    upload = await uploads.criar_upload(
+        session, crise['id'], len(AUDIO), 'audio/mp4'
+    )
+    await session.commit()
+    mensagens = [
+        {'type': 'http.request', 'body': AUDIO[:1000], 'more_body': True},
+        {'type': 'http.request', 'body': AUDIO[1000:1500], 'more_body': True},
+        {'type': 'http.disconnect'},
+    ]
+
+    async def receive():
+        return mensagens.pop(0)
+
+    request = Request({'type': 'http', 'headers': []}, receive)
+    await uploads.gravar_pedaco(session, upload, 0, request)
+
+    assert upload.recebido == 1500  # noqa: PLR2004
+    conteudo = uploads.caminho_upload(upload.id).read_bytes()
+    assert conteudo == AUDIO[:1500]
+
+
+async def test_retomada_trunca_bytes_nao_confirmados(
+    session: AsyncSession, crise: dict
+):
+    upload = await uploads.criar_upload(
+        session, crise['id'], len(AUDIO), 'audio/mp4'
+    )
+    await session.commit()
+    # Bytes gravados por uma requisição que não chegou a confirmar o offset
+    uploads.caminho_upload(upload.id).write_bytes(b'lixo' * 100)
+    mensagens = [{'type': 'http.request', 'body': AUDIO[:10]}]
+
+    async def receive():
+        return mensagens.pop(0)
+
+    await uploads.gravar_pedaco(
+        session, upload, 0, Request({'type': 'http', 'headers': []}, receive)
+    )
+
+    assert uploads.caminho_upload(upload.id).read_bytes() == AUDIO[:10]
+
+
+async def test_offset_confirmado_por_outro_processo(
+    session: AsyncSession, crise: dict
+):
+    upload = await uploads.criar_upload(
+        session, crise['id'], len(AUDIO), 'audio/mp4'
+    )
+    await session.commit()
+    # Outro processo confirmou um pedaço depois que este leu o upload
+    await session.execute(
+        update(UploadAudio)
+        .values(recebido=100)
+        .execution_options(synchronize_session=False)
+    )
+    mensagens = [{'type': 'http.request', 'body': AUDIO[:10]}]
+
+    async def receive():
+        return mensagens.pop(0)
+
+    with pytest.raises(HTTPException) as erro:
+        await uploads.gravar_pedaco(
+            session,
+            upload,
+            0,
+            Request({'type': 'http', 'headers': []}, receive),
+        )
+
+    assert erro.value.status_code == HTTPStatus.CONFLICT
+    confirmado = await session.scalar(select(UploadAudio.recebido))
+    assert confirmado == 100  # noqa: PLR2004
+
+
+async def test_remover_uploads_expirados(
+    client: AsyncClient,
+    session: AsyncSession,
+    token: str,
+    crise: dict,
+    diretorio_audios,
+):
+    await _iniciar(client, token, crise)
+    expirado = await session.scalar(select(UploadAudio))
+    expirado.expira_em = utcnow() - timedelta(minutes=1)
+    await session.commit()
+    ativo = (await _iniciar(client, token, crise)).rsplit('/', 1)[1]
+    orfao = uploads.diretorio_uploads() / 'orfao.parcial'
+    orfao.write_bytes(b'x')
+    antigo = time.time() - 2 * 24 * 60 * 60
+    os.utime(orfao, (antigo, antigo))
+
+    assert await uploads.remover_uploads_expirados(session) == 1
+
+    restantes = sorted(p.stem for p in uploads.diretorio_uploads().iterdir())
+    assert restantes == [ativo]
+
+
+async def test_excluir_crise_descarta_uploads(
+    client: AsyncClient, token: str, crise: dict
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    await _iniciar(client, token, crise)
+
+    response = await client.delete(
+        f'/registros-crise/{crise["id"]}', headers=headers
+    )
+
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert not list(uploads.diretorio_uploads().iterdir())